@@ -206,6 +206,22 @@ class JSONEncoder(object):
         '{"foo": ["bar", "baz"]}'
 
         """
+        if type(self).iterencode.im_func is not _default_iterencode:
+            # a subclass overrides iterencode(), e.g. to format floats
+            chunks = self.iterencode(o, _one_shot=True)
+            if not isinstance(chunks, (list, tuple)):
+                chunks = list(chunks)
+            return ''.join(chunks)
+        if (_pypyjson_dumps is not None and self.encoding == 'utf-8' and
+                type(self.item_separator) is str and
+                type(self.key_separator) is str and
+                (self.indent is None or isinstance(self.indent, (int, long)))):
+            # the whole encoding is done at interp-level
+            return _pypyjson_dumps(o, self.skipkeys, self.ensure_ascii,
+                                   self.check_circular, self.allow_nan,
+                                   self.sort_keys, self.indent,
+                                   (self.item_separator, self.key_separator),
+                                   self.default)
         if self.check_circular:
             markers = {}
         else:
@@ -536,3 +552,9 @@ try:
     from _pypyjson import raw_encode_basestring_ascii
 except ImportError:
     pass
+try:
+    from _pypyjson import dumps as _pypyjson_dumps
+except ImportError:
+    _pypyjson_dumps = None
+
+_default_iterencode = JSONEncoder.iterencode.im_func
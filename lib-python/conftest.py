@@ -175,7 +175,7 @@ testmap = [
     RegrTest('test_cookielib.py'),
     RegrTest('test_copy.py', core=True),
     RegrTest('test_copy_reg.py', core=True),
-    RegrTest('test_cpickle.py', core=True),
+    RegrTest('test_cpickle.py', core=True, usemodules='cPickle'),
     RegrTest('test_cprofile.py'),
     RegrTest('test_crypt.py'),
     RegrTest('test_csv.py', usemodules='_csv'),
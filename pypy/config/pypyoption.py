@@ -36,7 +36,7 @@ working_modules.update([
     "cStringIO", "thread", "itertools", "pyexpat", "cpyext", "array",
     "binascii", "_multiprocessing", '_warnings', "_collections",
     "_multibytecodec", "micronumpy", "_continuation", "_cffi_backend",
-    "_csv", "_cppyy", "_pypyjson", "_jitlog",
+    "_csv", "_cppyy", "_pypyjson", "_jitlog", "cPickle",
     # "_hashlib", "crypt"
 ])
 
@@ -203,6 +203,38 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                    "enable optimized ways to store lists of primitives ",
                    default=True),
 
+        BoolOption("withtuplelists",
+                   "store lists of small tuples of ints, floats and strings "
+                   "column-wise, without the tuple objects",
+                   default=False,
+                   requires=[("objspace.std.withliststrategies", True)]),
+
+        BoolOption("withintpairdicts",
+                   "store the keys of dicts whose keys are all tuples of two "
+                   "ints as unboxed pairs, without the tuple objects",
+                   default=False),
+
+        BoolOption("withlistslices",
+                   "let large slices of lists of primitives share the items "
+                   "of the sliced list until one of them is mutated",
+                   default=False,
+                   requires=[("objspace.std.withliststrategies", True)]),
+
+        BoolOption("withstrslice", "use strings optimized for slicing",
+                   default=False),
+
+        BoolOption("withstrbuf", "use strings optimized for repeated addition",
+                   default=False),
+
+        BoolOption("withfixedwidthunicode",
+                   "index, slice and search large non-ascii unicode strings "
+                   "through a fixed-width copy of their characters",
+                   default=False),
+
+        BoolOption("withunboxedattributes",
+                   "store int and float instance attributes unboxed",
+                   default=False),
+
         BoolOption("withmethodcachecounter",
                    "try to cache methods and provide a counter in __pypy__. "
                    "for testing purposes only.",
@@ -244,6 +276,9 @@ def set_pypy_opt_level(config, level):
         config.objspace.std.suggest(optimized_list_getitem=True)
         #config.objspace.std.suggest(newshortcut=True)
         config.objspace.std.suggest(withspecialisedtuple=True)
+        config.objspace.std.suggest(withlistslices=True)
+        config.objspace.std.suggest(withstrslice=True)
+        config.objspace.std.suggest(withstrbuf=True)
         #if not IS_64_BITS:
         #    config.objspace.std.suggest(withsmalllong=True)
 
@@ -257,6 +292,8 @@ def set_pypy_opt_level(config, level):
     if level == 'mem':
         config.objspace.std.suggest(withprebuiltint=True)
         config.objspace.std.suggest(withliststrategies=True)
+        config.objspace.std.suggest(withtuplelists=True)
+        config.objspace.std.suggest(withintpairdicts=True)
         if not IS_64_BITS:
             config.objspace.std.suggest(withsmalllong=True)
 
@@ -45,6 +45,8 @@ PYTHONIOENCODING: Encoding[:errors] used for stdin/stdout/stderr.
 PYPY_IRC_TOPIC: if set to a non-empty value, print a random #pypy IRC
                topic at startup of interactive mode.
 PYPYLOG: If set to a non-empty value, enable logging.
+PYPY_JIT_CACHE: file in which the places where the JIT started tracing are
+               recorded, to trace them as soon as possible in the next runs.
 """
 
 try:
@@ -615,6 +617,12 @@ def run_command_line(interactive,
     mainmodule = type(sys)('__main__')
     sys.modules['__main__'] = mainmodule
 
+    # before importing site, so that its code objects are looked up too
+    jit_cache = not ignore_environment and getenv('PYPY_JIT_CACHE')
+    if jit_cache and 'pypyjit' in sys.builtin_module_names:
+        import pypyjit
+        pypyjit.set_jit_cache(jit_cache)
+
     if not no_site:
         try:
             import site
@@ -53,6 +53,18 @@ def cpython_code_signature(code):
 class CodeHookCache(object):
     def __init__(self, space):
         self._code_hook = None
+        # an interp-level object with a new_code(code) method, or None;
+        # see pypy.module.pypyjit.jitcache
+        self._interp_code_hook = None
+
+class LazyCodeBody(object):
+    """The not-yet-loaded co_code, co_consts, co_names and co_lnotab of a
+    PyCode.  See pypy.module.imp.codecache."""
+    remove_docstrings = False
+
+    def load(self, code):
+        """Return (co_code, co_consts_w, co_names, co_lnotab)."""
+        raise NotImplementedError
 
 class PyCode(eval.Code):
     "CPython-style code objects."
@@ -63,7 +75,9 @@ class PyCode(eval.Code):
                           "co_stacksize", "co_varnames[*]",
                           "_args_as_cellvars[*]",
                           "w_globals?",
-                          "cell_families[*]"]
+                          "cell_families[*]",
+                          "lazy_body?"]
+    lazy_body = None     # or a LazyCodeBody
 
     def __init__(self, space,  argcount, nlocals, stacksize, flags,
                      code, consts, names, varnames, filename,
@@ -108,7 +122,10 @@ class PyCode(eval.Code):
         return True
 
     def new_code_hook(self):
-        code_hook = self.space.fromcache(CodeHookCache)._code_hook
+        cache = self.space.fromcache(CodeHookCache)
+        if cache._interp_code_hook is not None:
+            cache._interp_code_hook.new_code(self)
+        code_hook = cache._code_hook
         if code_hook is not None:
             try:
                 self.space.call_function(code_hook, self)
@@ -141,6 +158,27 @@ class PyCode(eval.Code):
     def _init_ready(self):
         "This is a hook for the vmprof module, which overrides this method."
 
+    def ensure_loaded(self):
+        """Load the body of the code object, if it comes from the code
+        cache and was not needed so far."""
+        lazy_body = self.lazy_body
+        if lazy_body is not None:
+            self._load_lazy_body(lazy_body)
+
+    @jit.dont_look_inside
+    def _load_lazy_body(self, lazy_body):
+        from pypy.objspace.std.mapdict import init_mapdict_cache
+        code, consts_w, names, lnotab = lazy_body.load(self)
+        self.co_code = code
+        self.co_consts_w = consts_w
+        self.co_names_w = [self.space.new_interned_str(aname)
+                           for aname in names]
+        self.co_lnotab = lnotab
+        init_mapdict_cache(self)
+        self.lazy_body = None
+        if lazy_body.remove_docstrings:
+            self.remove_docstrings(self.space)
+
     def _cleanup_(self):
         if (self.magic == cpython_magic and
             '__pypy__' not in sys.builtin_module_names):
@@ -238,6 +276,7 @@ class PyCode(eval.Code):
         return self.co_varnames
 
     def getdocstring(self, space):
+        self.ensure_loaded()
         if self.co_consts_w:   # it is probably never empty
             w_first = self.co_consts_w[0]
             if space.isinstance_w(w_first, space.w_basestring):
@@ -245,6 +284,9 @@ class PyCode(eval.Code):
         return space.w_None
 
     def remove_docstrings(self, space):
+        if self.lazy_body is not None:
+            self.lazy_body.remove_docstrings = True   # done when loaded
+            return
         if self.co_flags & CO_KILL_DOCSTRING:
             self.co_consts_w[0] = space.w_None
         for w_co in self.co_consts_w:
@@ -253,6 +295,7 @@ class PyCode(eval.Code):
 
     def _to_code(self):
         """For debugging only."""
+        self.ensure_loaded()
         consts = [None] * len(self.co_consts_w)
         num = 0
         for w in self.co_consts_w:
@@ -288,10 +331,16 @@ class PyCode(eval.Code):
         co = self._to_code()
         dis.dis(co)
 
+    def fget_co_code(self, space):
+        self.ensure_loaded()
+        return space.newbytes(self.co_code)
+
     def fget_co_consts(self, space):
+        self.ensure_loaded()
         return space.newtuple(self.co_consts_w)
 
     def fget_co_names(self, space):
+        self.ensure_loaded()
         return space.newtuple(self.co_names_w)
 
     def fget_co_varnames(self, space):
@@ -303,10 +352,16 @@ class PyCode(eval.Code):
     def fget_co_freevars(self, space):
         return space.newtuple([space.newtext(name) for name in self.co_freevars])
 
+    def fget_co_lnotab(self, space):
+        self.ensure_loaded()
+        return space.newbytes(self.co_lnotab)
+
     def descr_code__eq__(self, w_other):
         space = self.space
         if not isinstance(w_other, PyCode):
             return space.w_False
+        self.ensure_loaded()
+        w_other.ensure_loaded()
         areEqual = (self.co_name == w_other.co_name and
                     self.co_argcount == w_other.co_argcount and
                     self.co_nlocals == w_other.co_nlocals and
@@ -333,6 +388,7 @@ class PyCode(eval.Code):
 
     def descr_code__hash__(self):
         space = self.space
+        self.ensure_loaded()
         result =  compute_hash(self.co_name)
         result ^= self.co_argcount
         result ^= self.co_nlocals
@@ -393,6 +449,7 @@ class PyCode(eval.Code):
         w_mod    = space.getbuiltinmodule('_pickle_support')
         mod      = space.interp_w(MixedModule, w_mod)
         new_inst = mod.get('code_new')
+        self.ensure_loaded()
         tup      = [
             space.newint(self.co_argcount),
             space.newint(self.co_nlocals),
@@ -0,0 +1,47 @@
+
+def mapdict_report(objects=None, megamorphic_fills=8):
+    """Report how the instances in 'objects' (by default all the objects
+    returned by gc.get_objects()) use maps, the hidden classes that describe
+    the layout of instances.
+
+    Returns a dict with two keys:
+
+    'types': a dict mapping every class with instances in 'objects' to a
+    dict with the keys 'maps', 'terminal_maps' and 'depth' (see
+    mapdict_tree_stats()) and 'instances', a dict mapping the attribute
+    names of a map (see mapdict_attributes()) to the number of instances
+    that currently have this map.
+
+    'megamorphic_sites': a list of (fills, attribute name, code object) for
+    all attribute caches in the code objects in 'objects' that were filled
+    at least 'megamorphic_fills' times, most filled first.
+    """
+    import gc
+    from types import CodeType
+    from __pypy__ import (mapdict_tree_stats, mapdict_attributes,
+                          mapdict_code_sites)
+    if objects is None:
+        objects = gc.get_objects()
+    types = {}
+    sites = []
+    for obj in objects:
+        if isinstance(obj, CodeType):
+            for name, fills in mapdict_code_sites(obj):
+                if fills >= megamorphic_fills:
+                    sites.append((fills, name, obj))
+        attributes = mapdict_attributes(obj)
+        if attributes is None:
+            continue
+        cls = type(obj)
+        try:
+            report = types[cls]
+        except KeyError:
+            maps, terminal_maps, depth = mapdict_tree_stats(cls)
+            report = types[cls] = {'maps': maps,
+                                   'terminal_maps': terminal_maps,
+                                   'depth': depth,
+                                   'instances': {}}
+        instances = report['instances']
+        instances[attributes] = instances.get(attributes, 0) + 1
+    sites.sort(reverse=True)
+    return {'types': types, 'megamorphic_sites': sites}
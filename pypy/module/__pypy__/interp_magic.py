@@ -51,6 +51,46 @@ def mapdict_cache_counter(space, name):
     return space.newtuple([space.newint(cache.hits.get(name, 0)),
                            space.newint(cache.misses.get(name, 0))])
 
+def mapdict_tree_stats(space, w_type):
+    """mapdict_tree_stats(cls) -> (maps, terminal_maps, depth)
+
+    Return the number of maps (the hidden classes describing the layout of
+    the instances) that were created for 'cls', how many of them are
+    terminal maps that no attribute was ever added to, and the number of
+    attributes of the longest map."""
+    from pypy.objspace.std.mapdict import map_tree_stats
+    from pypy.objspace.std.typeobject import W_TypeObject
+    w_type = space.interp_w(W_TypeObject, w_type)
+    num_maps, num_terminal, depth = map_tree_stats(w_type.terminator)
+    return space.newtuple([space.newint(num_maps),
+                           space.newint(num_terminal),
+                           space.newint(depth)])
+
+def mapdict_attributes(space, w_obj):
+    """mapdict_attributes(obj) -> tuple or None
+
+    Return the names of the attributes in the map of 'obj', in storage
+    order, or None if 'obj' does not use maps."""
+    from pypy.objspace.std.mapdict import map_attribute_names
+    map = w_obj._get_mapdict_map()
+    if map is None:
+        return space.w_None
+    return space.newtuple([space.newtext(name)
+                           for name in map_attribute_names(map)])
+
+def mapdict_code_sites(space, w_code):
+    """mapdict_code_sites(code) -> list of (name, fills)
+
+    Return, for every attribute cache in 'code' that was used, the attribute
+    name and how many times the cache was filled.  Sites that are refilled
+    all the time see objects of many different maps or classes."""
+    from pypy.interpreter.pycode import PyCode
+    from pypy.objspace.std.mapdict import code_mapdict_sites
+    code = space.interp_w(PyCode, w_code)
+    return space.newlist([
+        space.newtuple([code.co_names_w[nameindex], space.newint(fills)])
+        for nameindex, fills in code_mapdict_sites(code)])
+
 def builtinify(space, w_func):
     """To implement at app-level modules that are, in CPython,
     implemented in C: this decorator protects a function from being ever
@@ -78,6 +78,7 @@ class Module(MixedModule):
     """ PyPy specific "magic" functions. A lot of them are experimental and
     subject to change, many are internal. """
     appleveldefs = {
+        'mapdict_report'            : 'app_mapdict.mapdict_report',
     }
 
     interpleveldefs = {
@@ -119,6 +120,9 @@ class Module(MixedModule):
         'pyos_inputhook'            : 'interp_magic.pyos_inputhook',
         'newmemoryview'             : 'interp_buffer.newmemoryview',
         'utf8content'               : 'interp_magic.utf8content',
+        'mapdict_tree_stats'        : 'interp_magic.mapdict_tree_stats',
+        'mapdict_attributes'        : 'interp_magic.mapdict_attributes',
+        'mapdict_code_sites'        : 'interp_magic.mapdict_code_sites',
     }
     if sys.platform == 'win32':
         interpleveldefs['get_console_cp'] = 'interp_magic.get_console_cp'
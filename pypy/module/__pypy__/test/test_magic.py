@@ -72,6 +72,78 @@ def f():
         assert utf8content(u"a") == b"a"
         assert utf8content(u"\xe4") == b'\xc3\xa4'
 
+    def test_mapdict_tree_stats(self):
+        from __pypy__ import mapdict_tree_stats, mapdict_attributes
+        class A(object):
+            pass
+        assert mapdict_tree_stats(A) == (0, 0, 0)
+        a = A()
+        assert mapdict_attributes(a) == ()
+        a.x = 1
+        a.y = 2
+        b = A()
+        b.x = 3
+        b.z = 4
+        assert mapdict_tree_stats(A) == (3, 2, 2)
+        assert mapdict_attributes(a) == ('x', 'y')
+        assert mapdict_attributes(b) == ('x', 'z')
+        assert mapdict_attributes(42) is None
+        raises(TypeError, mapdict_tree_stats, a)
+
+    def test_mapdict_attributes_slots(self):
+        from __pypy__ import mapdict_attributes
+        class B(object):
+            __slots__ = ['a', 'b']
+        b = B()
+        b.b = 1
+        b.a = 2
+        assert mapdict_attributes(b) == ('<slot 1>', '<slot 0>')
+
+    def test_mapdict_code_sites(self):
+        from __pypy__ import mapdict_code_sites
+        def f(obj):
+            return obj.attr
+        classes = []
+        for i in range(5):
+            class C(object):
+                pass
+            c = C()
+            c.attr = i
+            classes.append(c)
+        for c in classes:
+            f(c)
+            f(c)
+        assert mapdict_code_sites(f.__code__) == [('attr', 5)]
+
+    def test_mapdict_report(self):
+        from __pypy__ import mapdict_report
+        def f(obj):
+            return obj.attr
+        class A(object):
+            pass
+        objs = []
+        for i in range(10):
+            a = A()
+            a.attr = i
+            if i % 2:
+                a.other = i
+            objs.append(a)
+        for i in range(3):
+            class C(object):
+                pass
+            c = C()
+            c.attr = i
+            f(c)
+        report = mapdict_report(objs + [f.__code__, 42],
+                                megamorphic_fills=3)
+        assert report['types'] == {A: {'maps': 2, 'terminal_maps': 1,
+                                       'depth': 2,
+                                       'instances': {('attr',): 5,
+                                                     ('attr', 'other'): 5}}}
+        assert report['megamorphic_sites'] == [(3, 'attr', f.__code__)]
+        report = mapdict_report([f.__code__], megamorphic_fills=4)
+        assert report['megamorphic_sites'] == []
+
     @pytest.mark.skipif(sys.platform != 'win32', reason="win32 only")
     def test_get_osfhandle(self):
         from __pypy__ import get_osfhandle
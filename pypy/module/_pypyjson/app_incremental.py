@@ -0,0 +1,15 @@
+from _pypyjson import IncrementalDecoder
+
+def iterload(fp, items=False, chunksize=65536):
+    """Iterate over the JSON values read from the file object 'fp', or over
+    the elements of the single JSON array it contains if 'items' is true.
+    The input is read and decoded 'chunksize' bytes at a time."""
+    decoder = IncrementalDecoder(items)
+    while True:
+        data = fp.read(chunksize)
+        if not data:
+            break
+        for value in decoder.feed(data):
+            yield value
+    for value in decoder.close():
+        yield value
@@ -77,15 +77,10 @@ class JSONDecoder(W_Root):
         self.space = space
         self.w_empty_string = space.newutf8("", 0)
 
-        self.s = s
-
-        # we put our string in a raw buffer so:
-        # 1) we automatically get the '\0' sentinel at the end of the string,
-        #    which means that we never have to check for the "end of string"
-        # 2) we can pass the buffer directly to strtod
-        self.ll_chars, self.llobj, self.flag = rffi.get_nonmovingbuffer_ll_final_null(self.s)
-        self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
-        self.pos = 0
+        self._init_buffer(s)
+        # the number of bytes seen so far, which decides whether to use the
+        # string cache at all
+        self.total_length = len(s)
         self.intcache = space.fromcache(IntCache)
 
         # two caches, one for keys, one for general strings. they both have the
@@ -113,6 +108,24 @@ class JSONDecoder(W_Root):
         self.scratch = [[None] * self.DEFAULT_SIZE_SCRATCH]
 
 
+    def _init_buffer(self, s):
+        self.s = s
+
+        # we put our string in a raw buffer so:
+        # 1) we automatically get the '\0' sentinel at the end of the string,
+        #    which means that we never have to check for the "end of string"
+        # 2) we can pass the buffer directly to strtod
+        self.ll_chars, self.llobj, self.flag = rffi.get_nonmovingbuffer_ll_final_null(self.s)
+        self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
+        self.pos = 0
+
+    def reset(self, s):
+        """ Start decoding the new string s after a close(). The key and
+        string caches are kept, which is what the incremental decoder needs
+        to share them between chunks. """
+        self._init_buffer(s)
+        self.total_length += len(s)
+
     def close(self):
         rffi.free_nonmovingbuffer_ll(self.ll_chars, self.llobj, self.flag)
         lltype.free(self.end_ptr, flavor='raw')
@@ -121,6 +134,7 @@ class JSONDecoder(W_Root):
             jsonmap = self._get_jsonmap_from_dict(w_obj)
             if jsonmap.is_state_blocked():
                 self._devolve_jsonmap_dict(w_obj)
+        self.unclear_objects = []
 
     def getslice(self, start, end):
         assert start >= 0
@@ -566,7 +580,7 @@ class JSONDecoder(W_Root):
             contextmap.decoded_strings += 1
             if not contextmap.should_cache_strings():
                 cache = False
-        if len(self.s) < self.MIN_SIZE_FOR_STRING_CACHE:
+        if self.total_length < self.MIN_SIZE_FOR_STRING_CACHE:
             cache = False
 
         if not cache:
@@ -994,6 +1008,10 @@ class JSONMap(MapBase):
         self.keys_in_order = None
         self.strategy_instance = None
 
+        # for the encoder: the quoted JSON form of the keys in order
+        self.encoded_keys_ascii = None
+        self.encoded_keys_utf8 = None
+
     def __repr__(self):
         return "<JSONMap key_repr=%s #instantiation=%s #leaves=%s prev=%r>" % (
                 self.key_repr, self.instantiation_count, self.number_of_leaves, self.prev)
@@ -1154,6 +1172,24 @@ class JSONMap(MapBase):
                 keys_in_order[index] = w_key
         return keys_in_order
 
+    def get_encoded_keys(self, ensure_ascii):
+        if ensure_ascii:
+            encoded_keys = self.encoded_keys_ascii
+        else:
+            encoded_keys = self.encoded_keys_utf8
+        if encoded_keys is None:
+            from pypy.module._pypyjson.interp_encoder import encode_jsonmap_key
+            keys_in_order = self.get_keys_in_order()
+            encoded_keys = [None] * len(keys_in_order)
+            for index, w_key in enumerate(keys_in_order):
+                encoded_keys[index] = encode_jsonmap_key(
+                    self.space.utf8_w(w_key), ensure_ascii)
+            if ensure_ascii:
+                self.encoded_keys_ascii = encoded_keys
+            else:
+                self.encoded_keys_utf8 = encoded_keys
+        return encoded_keys
+
     # _____________________________________________________
 
     def _get_dot_text(self):
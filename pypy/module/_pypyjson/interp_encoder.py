@@ -1,6 +1,11 @@
+import math
+
 from rpython.rlib.rstring import StringBuilder
-from rpython.rlib import rutf8
-from pypy.interpreter import unicodehelper
+from rpython.rlib import rutf8, rstackovf
+from rpython.rlib.rfloat import isfinite
+from pypy.interpreter import unicodehelper, gateway
+from pypy.interpreter.error import oefmt
+from pypy.objspace.std.floatobject import float2string
 
 
 HEX = '0123456789abcdef'
@@ -45,6 +50,14 @@ def raw_encode_basestring_ascii(space, w_string):
         sb = StringBuilder(len(s))
         first = 0
 
+    _escape_utf8_ascii(sb, s, first)
+    res = sb.build()
+    return space.newtext(res)
+
+def _escape_utf8_ascii(sb, s, first):
+    """ Append to 'sb' the ASCII-only JSON escaping of the utf-8 string 's',
+    whose first 'first' characters are known not to need escaping (and
+    have already been copied). """
     it = rutf8.Utf8StringIterator(s)
     for i in range(first):
         it.next()
@@ -77,5 +90,440 @@ def raw_encode_basestring_ascii(space, w_string):
                 sb.append(HEX[(s2 >> 4) & 0x0f])
                 sb.append(HEX[s2 & 0x0f])
 
-    res = sb.build()
-    return space.newtext(res)
+def _escape_bytes_ascii(space, sb, s):
+    """ Append the ASCII-only JSON escaping of the byte string 's', which
+    must be valid utf-8 unless it is pure ASCII. """
+    for i in range(len(s)):
+        c = s[i]
+        if c < ' ' or c > '~' or c == '"' or c == '\\':
+            break
+    else:
+        sb.append(s)
+        return
+    unicodehelper.check_utf8_or_raise(space, s)
+    sb.append_slice(s, 0, i)
+    _escape_utf8_ascii(sb, s, i)
+
+def _escape_raw(sb, s):
+    """ Append the JSON escaping of 's' that only touches quotes,
+    backslashes and control characters; everything else, including
+    non-ASCII bytes, is copied verbatim. """
+    start = 0
+    for i in range(len(s)):
+        c = s[i]
+        if c < ' ':
+            sb.append_slice(s, start, i)
+            sb.append(ESCAPE_BEFORE_SPACE[ord(c)])
+            start = i + 1
+        elif c == '"' or c == '\\':
+            sb.append_slice(s, start, i)
+            sb.append('\\')
+            sb.append(c)
+            start = i + 1
+    sb.append_slice(s, start, len(s))
+
+
+app = gateway.applevel("""
+    def sorted_items(d):
+        return sorted(d.items(), key=lambda kv: kv[0])
+
+    def default(o):
+        raise TypeError(repr(o) + " is not JSON serializable")
+""", filename=__file__)
+
+sorted_items = app.interphook("sorted_items")
+
+
+class JSONEncoder(object):
+    """ Interp-level version of json.encoder.JSONEncoder.encode(): the
+    whole object graph is serialized into a single StringBuilder, without
+    creating intermediate app-level strings. Lists, dicts and strings whose
+    storage strategy gives direct access to unwrapped items are encoded
+    without going through the wrapped objects at all. """
+
+    def __init__(self, space, skipkeys, ensure_ascii, check_circular,
+                 allow_nan, sort_keys, indent, item_separator,
+                 key_separator, w_default):
+        self.space = space
+        self.skipkeys = skipkeys
+        self.ensure_ascii = ensure_ascii
+        self.allow_nan = allow_nan
+        self.sort_keys = sort_keys
+        self.indent = indent       # -1 means no indentation
+        self.item_separator = item_separator
+        self.key_separator = key_separator
+        self.w_default = w_default
+        if check_circular:
+            self.markers = {}
+        else:
+            self.markers = None
+        # set to True as soon as a unicode object was written in
+        # non-ensure_ascii mode: the result is then a unicode object
+        self.is_unicode = False
+        self.builder = StringBuilder()
+
+    def encode(self, w_obj):
+        space = self.space
+        try:
+            self.encode_any(w_obj, 0)
+        except rstackovf.StackOverflow:
+            rstackovf.check_stack_overflow()
+            raise oefmt(space.w_RuntimeError,
+                        "maximum recursion depth exceeded while encoding a "
+                        "JSON object")
+        res = self.builder.build()
+        if self.is_unicode:
+            length = unicodehelper.check_utf8_or_raise(space, res)
+            return space.newutf8(res, length)
+        return space.newbytes(res)
+
+    # ____________________________________________________________
+    # markers for circular reference detection
+
+    def mark(self, w_obj):
+        if self.markers is not None:
+            if w_obj in self.markers:
+                raise oefmt(self.space.w_ValueError,
+                            "Circular reference detected")
+            self.markers[w_obj] = None
+
+    def unmark(self, w_obj):
+        if self.markers is not None:
+            del self.markers[w_obj]
+
+    # ____________________________________________________________
+    # indentation
+
+    def emit_indent(self, level):
+        if self.indent >= 0:
+            level += 1
+            self.builder.append('\n')
+            self.builder.append(' ' * (self.indent * level))
+        return level
+
+    def emit_separator(self, level):
+        self.builder.append(self.item_separator)
+        if self.indent >= 0:
+            self.builder.append('\n')
+            self.builder.append(' ' * (self.indent * level))
+
+    def emit_unindent(self, level):
+        if self.indent >= 0:
+            self.builder.append('\n')
+            self.builder.append(' ' * (self.indent * (level - 1)))
+
+    # ____________________________________________________________
+    # scalars
+
+    def encode_bytes(self, s):
+        self.builder.append('"')
+        if self.ensure_ascii:
+            _escape_bytes_ascii(self.space, self.builder, s)
+        else:
+            _escape_raw(self.builder, s)
+        self.builder.append('"')
+
+    def encode_utf8(self, s):
+        self.builder.append('"')
+        if self.ensure_ascii:
+            _escape_utf8_ascii(self.builder, s, 0)
+        else:
+            self.is_unicode = True
+            _escape_raw(self.builder, s)
+        self.builder.append('"')
+
+    def floatstr(self, x):
+        if isfinite(x):
+            return float2string(x, 'r', 0)
+        if math.isinf(x):
+            if x > 0.0:
+                text = 'Infinity'
+            else:
+                text = '-Infinity'
+        else:
+            text = 'NaN'
+        if not self.allow_nan:
+            space = self.space
+            raise oefmt(space.w_ValueError,
+                        "Out of range float values are not JSON compliant: "
+                        "%s", float2string(x, 'r', 0))
+        return text
+
+    def encode_scalar(self, w_obj):
+        """ Encode w_obj if it is a string, a number, a bool or None, and
+        return True; otherwise return False. """
+        space = self.space
+        if space.isinstance_w(w_obj, space.w_bytes):
+            self.encode_bytes(space.bytes_w(w_obj))
+        elif space.isinstance_w(w_obj, space.w_unicode):
+            self.encode_utf8(space.utf8_w(w_obj))
+        elif space.is_w(w_obj, space.w_None):
+            self.builder.append('null')
+        elif space.is_w(w_obj, space.w_True):
+            self.builder.append('true')
+        elif space.is_w(w_obj, space.w_False):
+            self.builder.append('false')
+        elif space.is_w(space.type(w_obj), space.w_int):
+            self.builder.append(str(space.int_w(w_obj)))
+        elif (space.isinstance_w(w_obj, space.w_int) or
+              space.isinstance_w(w_obj, space.w_long)):
+            self.builder.append(space.text_w(space.str(w_obj)))
+        elif space.isinstance_w(w_obj, space.w_float):
+            self.builder.append(self.floatstr(space.float_w(w_obj)))
+        else:
+            return False
+        return True
+
+    # ____________________________________________________________
+    # containers
+
+    def encode_any(self, w_obj, level):
+        space = self.space
+        if self.encode_scalar(w_obj):
+            return
+        if (space.isinstance_w(w_obj, space.w_list) or
+                space.isinstance_w(w_obj, space.w_tuple)):
+            self.encode_list(w_obj, level)
+        elif space.isinstance_w(w_obj, space.w_dict):
+            self.encode_dict(w_obj, level)
+        else:
+            self.mark(w_obj)
+            w_res = space.call_function(self.w_default, w_obj)
+            self.encode_any(w_res, level)
+            self.unmark(w_obj)
+
+    def encode_list(self, w_lst, level):
+        space = self.space
+        w_type = space.type(w_lst)
+        if space.is_w(w_type, space.w_list):
+            # use the list strategy to avoid looking at wrapped items
+            intlist = space.listview_int(w_lst)
+            if intlist is not None:
+                self.encode_int_list(w_lst, intlist, level)
+                return
+            floatlist = space.listview_float(w_lst)
+            if floatlist is not None:
+                self.encode_float_list(w_lst, floatlist, level)
+                return
+            byteslist = space.listview_bytes(w_lst)
+            if byteslist is not None:
+                self.encode_bytes_list(w_lst, byteslist, level)
+                return
+        # for subclasses overriding __iter__, fixedview() calls it
+        items_w = space.fixedview(w_lst)
+        if not items_w:
+            self.builder.append('[]')
+            return
+        self.mark(w_lst)
+        self.builder.append('[')
+        level = self.emit_indent(level)
+        for i in range(len(items_w)):
+            if i > 0:
+                self.emit_separator(level)
+            self.encode_any(items_w[i], level)
+        self.emit_unindent(level)
+        self.builder.append(']')
+        self.unmark(w_lst)
+
+    def encode_int_list(self, w_lst, intlist, level):
+        if not intlist:
+            self.builder.append('[]')
+            return
+        self.builder.append('[')
+        level = self.emit_indent(level)
+        for i in range(len(intlist)):
+            if i > 0:
+                self.emit_separator(level)
+            self.builder.append(str(intlist[i]))
+        self.emit_unindent(level)
+        self.builder.append(']')
+
+    def encode_float_list(self, w_lst, floatlist, level):
+        if not floatlist:
+            self.builder.append('[]')
+            return
+        self.builder.append('[')
+        level = self.emit_indent(level)
+        for i in range(len(floatlist)):
+            if i > 0:
+                self.emit_separator(level)
+            self.builder.append(self.floatstr(floatlist[i]))
+        self.emit_unindent(level)
+        self.builder.append(']')
+
+    def encode_bytes_list(self, w_lst, byteslist, level):
+        if not byteslist:
+            self.builder.append('[]')
+            return
+        self.builder.append('[')
+        level = self.emit_indent(level)
+        for i in range(len(byteslist)):
+            if i > 0:
+                self.emit_separator(level)
+            self.encode_bytes(byteslist[i])
+        self.emit_unindent(level)
+        self.builder.append(']')
+
+    def encode_dict(self, w_dict, level):
+        from pypy.objspace.std.dictmultiobject import W_DictObject
+        from pypy.objspace.std.jsondict import JsonDictStrategy
+        space = self.space
+        if space.len_w(w_dict) == 0:
+            self.builder.append('{}')
+            return
+        if (not self.sort_keys and
+                space.is_w(space.type(w_dict), space.w_dict) and
+                isinstance(w_dict, W_DictObject)):
+            strategy = w_dict.get_strategy()
+            if isinstance(strategy, JsonDictStrategy):
+                # a dict produced by _pypyjson.loads(): the keys are shared
+                # in the map, and their encoded form is cached there
+                values_w = strategy.unerase(w_dict.dstorage)
+                keys = strategy.jsonmap.get_encoded_keys(self.ensure_ascii)
+                self.encode_dict_items(w_dict, keys, values_w, level,
+                                       self.ensure_ascii)
+                return
+            keys, values_w = space.view_as_kwargs(w_dict)
+            if keys is not None:
+                # string-keyed dict: the keys are available unwrapped
+                self.encode_dict_bytes_keys(w_dict, keys, values_w, level)
+                return
+        self.mark(w_dict)
+        self.builder.append('{')
+        level = self.emit_indent(level)
+        first = True
+        if self.sort_keys:
+            items_w = space.listview(sorted_items(space, w_dict))
+            for w_item in items_w:
+                w_key, w_value = space.fixedview(w_item, 2)
+                if self.encode_key(w_key, first, level):
+                    first = False
+                    self.encode_any(w_value, level)
+        elif isinstance(w_dict, W_DictObject):
+            iteritems = w_dict.iteritems()
+            while True:
+                w_key, w_value = iteritems.next_item()
+                if w_key is None:
+                    break
+                if self.encode_key(w_key, first, level):
+                    first = False
+                    self.encode_any(w_value, level)
+        else:
+            w_iter = space.call_method(w_dict, "iteritems")
+            for w_item in space.unpackiterable(w_iter):
+                w_key, w_value = space.fixedview(w_item, 2)
+                if self.encode_key(w_key, first, level):
+                    first = False
+                    self.encode_any(w_value, level)
+        self.emit_unindent(level)
+        self.builder.append('}')
+        self.unmark(w_dict)
+
+    def encode_key(self, w_key, first, level):
+        """ Write the separator and the key, if it is a valid JSON key.
+        Return False if the key should be skipped. """
+        space = self.space
+        if (space.isinstance_w(w_key, space.w_bytes) or
+                space.isinstance_w(w_key, space.w_unicode)):
+            key = None
+        elif space.isinstance_w(w_key, space.w_float):
+            key = self.floatstr(space.float_w(w_key))
+        elif space.is_w(w_key, space.w_True):
+            key = 'true'
+        elif space.is_w(w_key, space.w_False):
+            key = 'false'
+        elif space.is_w(w_key, space.w_None):
+            key = 'null'
+        elif (space.isinstance_w(w_key, space.w_int) or
+              space.isinstance_w(w_key, space.w_long)):
+            key = space.text_w(space.str(w_key))
+        elif self.skipkeys:
+            return False
+        else:
+            raise oefmt(space.w_TypeError,
+                        "key %R is not a string", w_key)
+        if not first:
+            self.emit_separator(level)
+        if key is None:
+            self.encode_scalar(w_key)
+        else:
+            self.encode_bytes(key)
+        self.builder.append(self.key_separator)
+        return True
+
+    def encode_dict_bytes_keys(self, w_dict, keys, values_w, level):
+        self.mark(w_dict)
+        self.builder.append('{')
+        level = self.emit_indent(level)
+        for i in range(len(keys)):
+            if i > 0:
+                self.emit_separator(level)
+            self.encode_bytes(keys[i])
+            self.builder.append(self.key_separator)
+            self.encode_any(values_w[i], level)
+        self.emit_unindent(level)
+        self.builder.append('}')
+        self.unmark(w_dict)
+
+    def encode_dict_items(self, w_dict, keys, values_w, level, is_ascii):
+        # 'keys' are already encoded, including the quotes
+        if not is_ascii:
+            self.is_unicode = True
+        self.mark(w_dict)
+        self.builder.append('{')
+        level = self.emit_indent(level)
+        for i in range(len(keys)):
+            if i > 0:
+                self.emit_separator(level)
+            self.builder.append(keys[i])
+            self.builder.append(self.key_separator)
+            self.encode_any(values_w[i], level)
+        self.emit_unindent(level)
+        self.builder.append('}')
+        self.unmark(w_dict)
+
+
+def encode_jsonmap_key(s, ensure_ascii):
+    """ Return the quoted JSON representation of the utf-8 string 's'. """
+    sb = StringBuilder(len(s) + 2)
+    sb.append('"')
+    if ensure_ascii:
+        _escape_utf8_ascii(sb, s, 0)
+    else:
+        _escape_raw(sb, s)
+    sb.append('"')
+    return sb.build()
+
+
+def _flag(space, w_flag, default):
+    if w_flag is None:
+        return default
+    return space.is_true(w_flag)
+
+def dumps(space, w_obj, w_skipkeys=None, w_ensure_ascii=None,
+          w_check_circular=None, w_allow_nan=None, w_sort_keys=None,
+          w_indent=None, w_separators=None, w_default=None):
+    """Serialize obj to a JSON formatted string, like json.dumps() with the
+    default utf-8 encoding."""
+    skipkeys = _flag(space, w_skipkeys, False)
+    ensure_ascii = _flag(space, w_ensure_ascii, True)
+    check_circular = _flag(space, w_check_circular, True)
+    allow_nan = _flag(space, w_allow_nan, True)
+    sort_keys = _flag(space, w_sort_keys, False)
+    if w_indent is None or space.is_w(w_indent, space.w_None):
+        indent = -1
+    else:
+        indent = max(space.int_w(w_indent), 0)
+    if w_separators is None or space.is_w(w_separators, space.w_None):
+        item_separator = ', '
+        key_separator = ': '
+    else:
+        w_item_separator, w_key_separator = space.fixedview(w_separators, 2)
+        item_separator = space.bytes_w(w_item_separator)
+        key_separator = space.bytes_w(w_key_separator)
+    if w_default is None or space.is_w(w_default, space.w_None):
+        w_default = app.wget(space, "default")
+    encoder = JSONEncoder(space, skipkeys, ensure_ascii, check_circular,
+                          allow_nan, sort_keys, indent, item_separator,
+                          key_separator, w_default)
+    return encoder.encode(w_obj)
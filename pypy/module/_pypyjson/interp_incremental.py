@@ -0,0 +1,258 @@
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.module._pypyjson.interp_decoder import JSONDecoder, is_whitespace
+
+# states of the top level of the input
+VALUES = 0        # a sequence of JSON values, e.g. JSON lines
+ITEMS_START = 1   # items mode: before the opening '['
+ITEMS_FIRST = 2   # items mode: expecting the first element or ']'
+ITEMS_NEXT = 3    # items mode: expecting an element after a ','
+ITEMS_AFTER = 4   # items mode: expecting ',' or ']' after an element
+ITEMS_DONE = 5    # items mode: after the closing ']'
+
+def is_atom_end(ch):
+    return (is_whitespace(ch) or ch == ',' or ch == ']' or ch == '}' or
+            ch == '[' or ch == '{' or ch == '"' or ch == ':')
+
+
+class W_IncrementalDecoder(W_Root):
+    """ Decodes a JSON document that arrives in chunks.
+
+    Every chunk is first scanned with a small state machine that only tracks
+    nesting, strings and escapes, to find where the top-level values (or, in
+    items mode, the elements of the top-level array) end. The complete
+    values are then decoded by a JSONDecoder that is kept alive across
+    chunks, so that its key and string caches stay warm. The bytes of a
+    value that is not complete yet are kept as a list of pending chunks,
+    which are only joined once the value is complete. """
+
+    def __init__(self, space, items):
+        self.space = space
+        if items:
+            self.state = ITEMS_START
+        else:
+            self.state = VALUES
+        self.decoder = None
+        self.closed = False
+
+        # the unconsumed input: the beginning of the value that is not
+        # complete yet, split into the chunks it was fed in
+        self.pending = []
+        self.pending_length = 0
+        # absolute position in the whole input of the first pending byte
+        self.offset = 0
+
+        # scanner state. 'valuestart' is the position of the current value
+        # in the pending chunks followed by the chunk being scanned, or -1
+        # between values
+        self.valuestart = -1
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.in_atom = False
+
+    def _raise_unexpected(self, ch, i):
+        raise oefmt(self.space.w_ValueError,
+                    "No JSON object could be decoded: unexpected '%s' at "
+                    "char %d", ch, i)
+
+    def _value_done(self, end, spans):
+        spans.append(self.valuestart)
+        spans.append(end)
+        self.valuestart = -1
+        if self.state != VALUES:
+            self.state = ITEMS_AFTER
+
+    def _start_value(self, ch, i):
+        self.valuestart = i
+        if ch == '[' or ch == '{':
+            self.depth = 1
+        elif ch == '"':
+            self.depth = 0
+            self.in_string = True
+        elif ch == ']' or ch == '}' or ch == ',' or ch == ':':
+            self._raise_unexpected(ch, self.offset + i)
+        else:
+            self.in_atom = True
+
+    def _scan_between_values(self, ch, i):
+        state = self.state
+        if state == VALUES or state == ITEMS_NEXT:
+            self._start_value(ch, i)
+        elif state == ITEMS_FIRST:
+            if ch == ']':
+                self.state = ITEMS_DONE
+            else:
+                self._start_value(ch, i)
+        elif state == ITEMS_START:
+            if ch != '[':
+                raise oefmt(self.space.w_ValueError,
+                            "Expected '[' at char %d", self.offset + i)
+            self.state = ITEMS_FIRST
+        elif state == ITEMS_AFTER:
+            if ch == ',':
+                self.state = ITEMS_NEXT
+            elif ch == ']':
+                self.state = ITEMS_DONE
+            else:
+                self._raise_unexpected(ch, self.offset + i)
+        else:
+            assert state == ITEMS_DONE
+            raise oefmt(self.space.w_ValueError,
+                        "Extra data: char %d", self.offset + i)
+
+    def scan(self, data, base, spans):
+        """ Scan the new chunk 'data', which follows 'base' pending bytes.
+        The start and end positions of the values that are complete are
+        appended to 'spans'. """
+        i = 0
+        length = len(data)
+        while i < length:
+            ch = data[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        self._value_done(base + i + 1, spans)
+            elif self.in_atom:
+                if is_atom_end(ch):
+                    self.in_atom = False
+                    self._value_done(base + i, spans)
+                    continue     # 'ch' is not part of the value
+            elif self.valuestart != -1:
+                if ch == '"':
+                    self.in_string = True
+                elif ch == '[' or ch == '{':
+                    self.depth += 1
+                elif ch == ']' or ch == '}':
+                    self.depth -= 1
+                    if self.depth == 0:
+                        self._value_done(base + i + 1, spans)
+            elif not is_whitespace(ch):
+                self._scan_between_values(ch, base + i)
+            i += 1
+
+    def decode_spans(self, s, spans):
+        space = self.space
+        if self.decoder is None:
+            self.decoder = decoder = JSONDecoder(space, s)
+        else:
+            decoder = self.decoder
+            decoder.reset(s)
+        values_w = [None] * (len(spans) // 2)
+        try:
+            for index in range(len(values_w)):
+                start = spans[index * 2]
+                end = spans[index * 2 + 1]
+                values_w[index] = decoder.decode_any(start)
+                i = decoder.skip_whitespace(decoder.pos)
+                if i < end:
+                    raise oefmt(space.w_ValueError,
+                                "Extra data: char %d - %d",
+                                self.offset + i, self.offset + end - 1)
+        finally:
+            decoder.close()
+        return values_w
+
+    def feed(self, data):
+        spans = []
+        base = self.pending_length
+        if self.valuestart != -1:
+            # the pending chunks always start with the current value
+            self.valuestart = 0
+        self.scan(data, base, spans)
+        values_w = []
+        if spans:
+            if self.pending:
+                self.pending.append(data)
+                s = ''.join(self.pending)
+            else:
+                s = data
+            values_w = self.decode_spans(s, spans)
+            self.pending = []
+            if self.valuestart != -1:
+                start = self.valuestart
+                assert start >= 0
+                self.pending.append(s[start:])
+        elif self.valuestart != -1:
+            if self.pending:
+                self.pending.append(data)
+            else:
+                start = self.valuestart - base
+                assert start >= 0
+                self.pending.append(data[start:])
+        else:
+            self.pending = []
+        new_length = 0
+        for chunk in self.pending:
+            new_length += len(chunk)
+        self.offset += base + len(data) - new_length
+        self.pending_length = new_length
+        return values_w
+
+    def _check_not_closed(self):
+        if self.closed:
+            raise oefmt(self.space.w_ValueError,
+                        "I/O operation on closed decoder")
+
+    def descr_feed(self, space, w_data):
+        """feed(data) -> list of the values completed by this chunk"""
+        self._check_not_closed()
+        if space.isinstance_w(w_data, space.w_unicode):
+            raise oefmt(space.w_TypeError,
+                        "Expected utf8-encoded str, got unicode")
+        return space.newlist(self.feed(space.bufferstr_w(w_data)))
+
+    def descr_close(self, space):
+        """close() -> list of the values completed by the end of the input
+
+Raises ValueError if the input stops in the middle of a value."""
+        self._check_not_closed()
+        values_w = []
+        if self.in_atom:
+            # a number or a literal is only complete at the end of the input
+            self.in_atom = False
+            self.valuestart = 0
+            spans = []
+            self._value_done(self.pending_length, spans)
+            values_w = self.decode_spans(''.join(self.pending), spans)
+            self.pending = []
+            self.pending_length = 0
+        self.closed = True
+        if self.valuestart != -1:
+            raise oefmt(space.w_ValueError,
+                        "Unterminated JSON value starting at char %d",
+                        self.offset)
+        if self.state != VALUES and self.state != ITEMS_DONE:
+            raise oefmt(space.w_ValueError,
+                        "Unterminated JSON array at end of input")
+        return space.newlist(values_w)
+
+    def descr_get_closed(self, space):
+        return space.newbool(self.closed)
+
+
+@unwrap_spec(items=bool)
+def descr_new_incremental_decoder(space, w_subtype, items=False):
+    return W_IncrementalDecoder(space, items)
+
+W_IncrementalDecoder.typedef = TypeDef(
+    '_pypyjson.IncrementalDecoder',
+    __new__ = interp2app(descr_new_incremental_decoder),
+    feed = interp2app(W_IncrementalDecoder.descr_feed),
+    close = interp2app(W_IncrementalDecoder.descr_close),
+    closed = GetSetProperty(W_IncrementalDecoder.descr_get_closed),
+    __doc__ = """IncrementalDecoder(items=False)
+
+Decode JSON input that is fed in chunks.  By default the input is a sequence
+of JSON values separated by whitespace (e.g. JSON lines), and feed() returns
+the values that are complete.  With items=True the input must be a single
+JSON array, and its elements are returned as soon as they are complete.""",
+)
+W_IncrementalDecoder.typedef.acceptable_as_base_class = False
@@ -274,7 +274,7 @@ class TestJson(object):
 
 
 class AppTest(object):
-    spaceconfig = {"objspace.usemodules._pypyjson": True}
+    spaceconfig = {"usemodules": ["_pypyjson", "struct"]}
 
     def test_raise_on_unicode(self):
         import _pypyjson
@@ -513,6 +513,186 @@ class AppTest(object):
         assert check("\\\"\b\f\n\r\t") == '\\\\\\"\\b\\f\\n\\r\\t'
         assert check("\x07") == "\\u0007"
 
+    def test_dumps_scalars(self):
+        import _pypyjson
+        assert _pypyjson.dumps(None) == 'null'
+        assert _pypyjson.dumps(True) == 'true'
+        assert _pypyjson.dumps(False) == 'false'
+        assert _pypyjson.dumps(42) == '42'
+        assert _pypyjson.dumps(-10**20) == '-100000000000000000000'
+        assert _pypyjson.dumps(1.5) == '1.5'
+        assert _pypyjson.dumps(0.1) == '0.1'
+        assert _pypyjson.dumps("a\"b\n") == '"a\\"b\\n"'
+        assert _pypyjson.dumps(u"\u1234") == '"\\u1234"'
+        assert type(_pypyjson.dumps(u"abc")) is str
+
+    def test_dumps_special_floats(self):
+        import _pypyjson
+        inf = float("inf")
+        assert _pypyjson.dumps([inf, -inf]) == '[Infinity, -Infinity]'
+        assert _pypyjson.dumps(inf - inf) == 'NaN'
+        exc = raises(ValueError, _pypyjson.dumps, [1.0, inf], allow_nan=False)
+        assert str(exc.value) == (
+            "Out of range float values are not JSON compliant: inf")
+
+    def test_dumps_lists(self):
+        import _pypyjson
+        assert _pypyjson.dumps([]) == '[]'
+        assert _pypyjson.dumps(()) == '[]'
+        assert _pypyjson.dumps([1, 2, 3]) == '[1, 2, 3]'
+        assert _pypyjson.dumps([1.5, 2.25]) == '[1.5, 2.25]'
+        assert _pypyjson.dumps(["a", "b\t"]) == '["a", "b\\t"]'
+        assert _pypyjson.dumps((1, "x", None, [2.5])) == '[1, "x", null, [2.5]]'
+        class L(list):
+            def __iter__(self):
+                return iter([7])
+        assert _pypyjson.dumps(L([1, 2])) == '[7]'
+
+    def test_dumps_dicts(self):
+        import _pypyjson
+        assert _pypyjson.dumps({}) == '{}'
+        assert _pypyjson.dumps({"a": 1}) == '{"a": 1}'
+        assert _pypyjson.dumps({u"\xe4": 1}) == '{"\\u00e4": 1}'
+        assert _pypyjson.dumps({1: 2}) == '{"1": 2}'
+        assert _pypyjson.dumps({1.5: 2}) == '{"1.5": 2}'
+        assert _pypyjson.dumps({None: 2}) == '{"null": 2}'
+        assert _pypyjson.dumps({True: 2}) == '{"true": 2}'
+        raises(TypeError, _pypyjson.dumps, {(1, 2): 3})
+        assert _pypyjson.dumps({(1, 2): 3, "a": 4}, skipkeys=True) == '{"a": 4}'
+        d = {"c": 0, "b": 0, "a": [1, {"y": 1, "x": 2}]}
+        assert _pypyjson.dumps(d, sort_keys=True) == (
+            '{"a": [1, {"x": 2, "y": 1}], "b": 0, "c": 0}')
+
+    def test_dumps_jsondict(self):
+        import _pypyjson
+        s = '{"a": 1, "b\\n": [2.5, "x"], "\\u1234": null}'
+        for i in range(10):
+            d = _pypyjson.loads(s)
+            assert _pypyjson.dumps(d) == (
+                '{"a": 1, "b\\n": [2.5, "x"], "\\u1234": null}')
+            assert _pypyjson.dumps(d, ensure_ascii=False) == (
+                u'{"a": 1, "b\\n": [2.5, "x"], "\u1234": null}')
+
+    def test_dumps_indent_separators(self):
+        import _pypyjson
+        assert _pypyjson.dumps([1, {"a": [2]}], indent=2) == (
+            '[\n  1, \n  {\n    "a": [\n      2\n    ]\n  }\n]')
+        assert _pypyjson.dumps([1, {"a": 2}], separators=(',', ':')) == (
+            '[1,{"a":2}]')
+
+    def test_dumps_ensure_ascii_false(self):
+        import _pypyjson
+        assert _pypyjson.dumps("\xc3\xa4", ensure_ascii=False) == '"\xc3\xa4"'
+        res = _pypyjson.dumps(["\xc3\xa4", u"\u1234"], ensure_ascii=False)
+        assert res == u'["\xe4", "\u1234"]'
+        assert type(res) is unicode
+
+    def test_dumps_circular(self):
+        import _pypyjson
+        l = [1]
+        l.append(l)
+        exc = raises(ValueError, _pypyjson.dumps, l)
+        assert str(exc.value) == "Circular reference detected"
+        d = {}
+        d["x"] = [d]
+        raises(ValueError, _pypyjson.dumps, d)
+        shared = [1]
+        assert _pypyjson.dumps([shared, shared]) == '[[1], [1]]'
+
+    def test_dumps_default(self):
+        import _pypyjson
+        exc = raises(TypeError, _pypyjson.dumps, [1j])
+        assert str(exc.value) == "1j is not JSON serializable"
+        def default(o):
+            return [o.real, o.imag]
+        assert _pypyjson.dumps([1j], default=default) == '[[0.0, 1.0]]'
+
+    def test_json_encoder_uses_dumps(self):
+        import json
+        assert json.dumps({"a": [1, 2.5, "x"]}) == '{"a": [1, 2.5, "x"]}'
+        class Encoder(json.JSONEncoder):
+            def default(self, o):
+                return list(o)
+        assert Encoder().encode(set([3])) == '[3]'
+
+    def test_json_encoder_iterencode_override(self):
+        import json
+        class Encoder(json.JSONEncoder):
+            def iterencode(self, o, _one_shot=False):
+                return iter(['OVERRIDDEN'])
+        assert Encoder().encode([1.5]) == 'OVERRIDDEN'
+        assert json.dumps([1.5], cls=Encoder) == 'OVERRIDDEN'
+
+    def test_incremental_values(self):
+        import _pypyjson
+        d = _pypyjson.IncrementalDecoder()
+        assert d.feed('{"a": 1}\n{"a"') == [{u"a": 1}]
+        assert d.feed(': [2, "x]"') == []
+        assert d.feed(']}\n"b\\"c" 12') == [{u"a": [2, u"x]"]}, u'b"c']
+        assert d.feed('3 true') == [123]
+        assert d.close() == [True]
+        assert d.closed
+        raises(ValueError, d.feed, '1')
+
+    def test_incremental_byte_at_a_time(self):
+        import _pypyjson
+        s = '[1, {"k": "\\u1234\\\\"}, -2.5e3, null, [[]], "\xc3\xa4"]'
+        d = _pypyjson.IncrementalDecoder(items=True)
+        res = []
+        for c in s:
+            res.extend(d.feed(c))
+        res.extend(d.close())
+        assert res == _pypyjson.loads(s)
+
+    def test_incremental_items(self):
+        import _pypyjson
+        d = _pypyjson.IncrementalDecoder(items=True)
+        assert d.feed(' [ 1, 2') == [1]
+        assert d.feed(', {"x": 3}, ') == [2, {u"x": 3}]
+        assert d.feed('4] ') == [4]
+        assert d.close() == []
+        d = _pypyjson.IncrementalDecoder(items=True)
+        assert d.feed('[]') == []
+        assert d.close() == []
+        d = _pypyjson.IncrementalDecoder(items=True)
+        raises(ValueError, d.feed, '{}')
+        d = _pypyjson.IncrementalDecoder(items=True)
+        raises(ValueError, d.feed, '[1] 2')
+        d = _pypyjson.IncrementalDecoder(items=True)
+        d.feed('[1, 2')
+        raises(ValueError, d.close)
+
+    def test_incremental_errors(self):
+        import _pypyjson
+        d = _pypyjson.IncrementalDecoder()
+        exc = raises(ValueError, d.feed, '1 ]')
+        assert str(exc.value) == (
+            "No JSON object could be decoded: unexpected ']' at char 2")
+        d = _pypyjson.IncrementalDecoder()
+        d.feed('{"a": ')
+        exc = raises(ValueError, d.close)
+        assert str(exc.value) == "Unterminated JSON value starting at char 0"
+        d = _pypyjson.IncrementalDecoder()
+        raises(ValueError, d.feed, '[1 2] ')
+        raises(TypeError, _pypyjson.IncrementalDecoder().feed, u'1')
+
+    def test_incremental_buffer(self):
+        import _pypyjson
+        d = _pypyjson.IncrementalDecoder()
+        assert d.feed(buffer('[1] [2] ')) == [[1], [2]]
+
+    def test_iterload(self):
+        import _pypyjson
+        from StringIO import StringIO
+        lines = ['{"id": %d, "tags": ["a", "b"]}' % i for i in range(50)]
+        f = StringIO('\n'.join(lines))
+        res = list(_pypyjson.iterload(f, chunksize=7))
+        assert res == [{u"id": i, u"tags": [u"a", u"b"]} for i in range(50)]
+        f = StringIO('[' + ', '.join(lines) + ']')
+        res = list(_pypyjson.iterload(f, items=True, chunksize=13))
+        assert len(res) == 50
+        assert res[-1] == {u"id": 49, u"tags": [u"a", u"b"]}
+
     def test_error_position(self):
         import _pypyjson
         test_cases = [
@@ -0,0 +1,63 @@
+import sys
+from types import ClassType
+from pickle import PickleError, PicklingError, UnpicklingError
+from pickle import whichmodule, _EmptyClass
+from copy_reg import dispatch_table as _dispatch_table
+from copy_reg import _extension_registry, _inverted_registry, _extension_cache
+
+# These are purely informational; no code uses these.
+format_version = "2.0"                  # File format version we write
+compatible_formats = ["1.0",            # Original protocol 0
+                      "1.1",            # Protocol 0 with INST added
+                      "1.2",            # Original protocol 1
+                      "1.3",            # Protocol 1 with BINFLOAT added
+                      "2.0",            # Protocol 2
+                      ]                 # Old format versions we can read
+
+BadPickleGet = KeyError
+UnpickleableError = PicklingError
+
+
+def _lookup_global(obj, name, proto):
+    """Return (module, name, extension code or 0) under which 'obj' can
+    be pickled as a global, checking that it can be found again."""
+    if name is None:
+        name = obj.__name__
+    module = getattr(obj, "__module__", None)
+    if module is None:
+        module = whichmodule(obj, name)
+    try:
+        __import__(module)
+        mod = sys.modules[module]
+        klass = getattr(mod, name)
+    except (ImportError, KeyError, AttributeError):
+        raise PicklingError(
+            "Can't pickle %r: it's not found as %s.%s" %
+            (obj, module, name))
+    else:
+        if klass is not obj:
+            raise PicklingError(
+                "Can't pickle %r: it's not the same object as %s.%s" %
+                (obj, module, name))
+    code = 0
+    if proto >= 2:
+        code = _extension_registry.get((module, name), 0)
+    return module, name, code
+
+def _find_global(module, name):
+    __import__(module)
+    mod = sys.modules[module]
+    return getattr(mod, name)
+
+def _instantiate(klass, args):
+    if (not args and
+            type(klass) is ClassType and
+            not hasattr(klass, "__getinitargs__")):
+        value = _EmptyClass()
+        value.__class__ = klass
+        return value
+    try:
+        return klass(*args)
+    except TypeError, err:
+        raise TypeError, "in constructor for %s: %s" % (
+            klass.__name__, str(err)), sys.exc_info()[2]
@@ -0,0 +1,61 @@
+""" Compare the interp-level cPickle module with the pure Python version
+that lives in lib_pypy.  Run it with a translated pypy-c:
+
+    pypy-c bench_cpickle.py [number_of_rounds]
+"""
+
+import sys, os, time, imp
+import cPickle
+
+libpypy = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       '..', '..', '..', '..', 'lib_pypy', 'cPickle.py')
+app_cPickle = imp.load_source('app_cPickle', libpypy)
+
+
+class Record(object):
+    def __init__(self, i):
+        self.id = i
+        self.name = 'record%d' % i
+        self.tags = ['a', 'b', 'c']
+        self.score = i * 0.5
+
+def make_data():
+    return {
+        'ints': range(100000),
+        'floats': [i * 1.5 for i in range(100000)],
+        'strings': [str(i) for i in range(50000)],
+        'dicts': [{'id': i, 'name': 'x%d' % i, 'value': i * 2.0}
+                  for i in range(20000)],
+        'tuples': [(i, str(i), i * 1.0) for i in range(20000)],
+        'objects': [Record(i) for i in range(10000)],
+    }
+
+def measure(name, func, rounds):
+    t0 = time.time()
+    for i in range(rounds):
+        func()
+    return time.time() - t0
+
+def main(rounds):
+    data = make_data()
+    for key in sorted(data):
+        value = data[key]
+        for proto in (0, 2):
+            s = cPickle.dumps(value, proto)
+            t_new = measure('dumps', lambda: cPickle.dumps(value, proto),
+                            rounds)
+            t_old = measure('dumps', lambda: app_cPickle.dumps(value, proto),
+                            rounds)
+            l_new = measure('loads', lambda: cPickle.loads(s), rounds)
+            l_old = measure('loads', lambda: app_cPickle.loads(s), rounds)
+            print '%-8s proto %d  dumps: %6.3fs vs %6.3fs (x%.1f)   ' \
+                  'loads: %6.3fs vs %6.3fs (x%.1f)' % (
+                key, proto, t_new, t_old, t_old / t_new,
+                l_new, l_old, l_old / l_new)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        rounds = int(sys.argv[1])
+    else:
+        rounds = 10
+    main(rounds)
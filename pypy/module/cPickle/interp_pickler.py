@@ -0,0 +1,780 @@
+from rpython.rlib import rstackovf, rutf8
+from rpython.rlib.objectmodel import specialize
+from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rstruct.ieee import float_pack
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.function import Function, BuiltinFunction
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.unicodehelper import raw_unicode_escape_helper
+from pypy.module.__builtin__.interp_classobj import (W_ClassObject,
+                                                     W_InstanceObject)
+from pypy.module.cPickle.opcodes import *
+from pypy.objspace.std.bytesobject import string_escape_encode
+from pypy.objspace.std.floatobject import float2string
+
+
+def get_error(space, name):
+    w_module = space.getbuiltinmodule('cPickle')
+    return space.getattr(w_module, space.newtext(name))
+
+def check_protocol(space, proto):
+    if proto < 0:
+        return HIGHEST_PROTOCOL
+    if proto > HIGHEST_PROTOCOL:
+        raise oefmt(space.w_ValueError,
+                    "pickle protocol %d asked for; the highest available "
+                    "protocol is %d", proto, HIGHEST_PROTOCOL)
+    return proto
+
+def next_or_none(space, w_iter):
+    try:
+        return space.next(w_iter)
+    except OperationError as e:
+        if not e.match(space, space.w_StopIteration):
+            raise
+        return None
+
+def encode_long(bigint):
+    """Encode a long to a two's complement little-endian binary string,
+    using as few bytes as possible (see pickle.encode_long)."""
+    if bigint.sign == 0:
+        return ''
+    nbytes = (bigint.abs().bit_length() >> 3) + 1
+    data = bigint.tobytes(nbytes, 'little', True)
+    if (bigint.sign < 0 and len(data) > 1 and data[-1] == '\xff' and
+            ord(data[-2]) >= 0x80):
+        data = data[:-1]
+    return data
+
+
+class W_Pickler(W_Root):
+    """Interp-level pickler.  The output of every dump() is accumulated in a
+    StringBuilder and handed to the file's write() method in one call."""
+
+    def __init__(self, space, w_file, proto):
+        self.space = space
+        self.proto = proto
+        self.bin = proto >= 1
+        self.fast = False
+        self.w_file = w_file
+        self.w_persistent_id = None
+        self.builder = StringBuilder()
+        # maps the pickled objects (by identity) to their memo index.
+        # Being keys here keeps them alive for the whole lifetime of
+        # the pickler, which pickle.py needs the _keep_alive() hack for.
+        self.memo = {}
+        w_module = space.getbuiltinmodule('cPickle')
+        self.w_dispatch_table = space.getattr(w_module,
+                                              space.newtext('_dispatch_table'))
+        self.w_lookup_global = space.getattr(w_module,
+                                             space.newtext('_lookup_global'))
+
+    def flush(self):
+        if self.w_file is None:
+            return
+        space = self.space
+        data = self.builder.build()
+        self.builder = StringBuilder()
+        space.call_method(self.w_file, 'write', space.newbytes(data))
+
+    # ____________________________________________________________
+    # memo handling
+
+    def memoize(self, w_obj):
+        if self.fast:
+            return
+        index = len(self.memo) + 1     # cPickle starts counting at one
+        self.memo[w_obj] = index
+        self.write_put(index)
+
+    def write_put(self, index):
+        builder = self.builder
+        if self.bin:
+            if index < 256:
+                builder.append(BINPUT)
+                builder.append(chr(index))
+            else:
+                builder.append(LONG_BINPUT)
+                self.write_int32(index)
+        else:
+            builder.append(PUT)
+            builder.append(str(index))
+            builder.append('\n')
+
+    def write_get(self, index):
+        builder = self.builder
+        if self.bin:
+            if index < 256:
+                builder.append(BINGET)
+                builder.append(chr(index))
+            else:
+                builder.append(LONG_BINGET)
+                self.write_int32(index)
+        else:
+            builder.append(GET)
+            builder.append(str(index))
+            builder.append('\n')
+
+    def write_int32(self, x):
+        builder = self.builder
+        builder.append(chr(x & 0xff))
+        builder.append(chr((x >> 8) & 0xff))
+        builder.append(chr((x >> 16) & 0xff))
+        builder.append(chr((x >> 24) & 0xff))
+
+    # ____________________________________________________________
+    # unwrapped values; these are never memoized
+
+    def save_bool(self, value):
+        if self.proto >= 2:
+            self.builder.append(NEWTRUE if value else NEWFALSE)
+        else:
+            self.builder.append(TRUE if value else FALSE)
+
+    def save_int(self, value):
+        builder = self.builder
+        if self.bin:
+            if 0 <= value <= 0xff:
+                builder.append(BININT1)
+                builder.append(chr(value))
+                return
+            if 0 <= value <= 0xffff:
+                builder.append(BININT2)
+                builder.append(chr(value & 0xff))
+                builder.append(chr(value >> 8))
+                return
+            if -0x80000000 <= value <= 0x7fffffff:
+                builder.append(BININT)
+                self.write_int32(value)
+                return
+        builder.append(INT)
+        builder.append(str(value))
+        builder.append('\n')
+
+    def save_float(self, value):
+        builder = self.builder
+        if self.bin:
+            bits = float_pack(value, 8)
+            builder.append(BINFLOAT)
+            for i in range(7, -1, -1):
+                builder.append(chr(intmask(bits >> (i * 8)) & 0xff))
+        else:
+            builder.append(FLOAT)
+            builder.append(float2string(value, 'r', 0))
+            builder.append('\n')
+
+    def save_bytes(self, value):
+        builder = self.builder
+        n = len(value)
+        if self.bin:
+            if n < 256:
+                builder.append(SHORT_BINSTRING)
+                builder.append(chr(n))
+            else:
+                builder.append(BINSTRING)
+                self.write_int32(n)
+            builder.append(value)
+        else:
+            quote = "'"
+            if quote in value and '"' not in value:
+                quote = '"'
+            builder.append(STRING)
+            builder.append(string_escape_encode(value, quote))
+            builder.append('\n')
+
+    def save_utf8(self, utf8):
+        builder = self.builder
+        if self.bin:
+            builder.append(BINUNICODE)
+            self.write_int32(len(utf8))
+            builder.append(utf8)
+            return
+        # raw-unicode-escape, after escaping backslashes and newlines
+        builder.append(UNICODE)
+        for ch in rutf8.Utf8StringIterator(utf8):
+            if ch == ord('\\'):
+                builder.append('\\u005c')
+            elif ch == ord('\n'):
+                builder.append('\\u000a')
+            elif ch >= 0x100:
+                raw_unicode_escape_helper(builder, ch)
+            else:
+                builder.append(chr(ch))
+        builder.append('\n')
+
+    def save_long(self, bigint):
+        builder = self.builder
+        if self.proto >= 2:
+            data = encode_long(bigint)
+            n = len(data)
+            if n < 256:
+                builder.append(LONG1)
+                builder.append(chr(n))
+            else:
+                builder.append(LONG4)
+                self.write_int32(n)
+            builder.append(data)
+        else:
+            builder.append(LONG)
+            builder.append(bigint.str())
+            builder.append('L\n')
+
+    # ____________________________________________________________
+    # the main dispatcher
+
+    def save(self, w_obj):
+        space = self.space
+        if self.w_persistent_id is not None:
+            w_pid = space.call_function(self.w_persistent_id, w_obj)
+            if not space.is_w(w_pid, space.w_None):
+                self.save_pers(w_pid)
+                return
+        if space.is_w(w_obj, space.w_None):
+            self.builder.append(NONE)
+            return
+        w_type = space.type(w_obj)
+        if space.is_w(w_type, space.w_int):
+            self.save_int(space.int_w(w_obj))
+        elif space.is_w(w_type, space.w_float):
+            self.save_float(space.float_w(w_obj))
+        elif space.is_w(w_type, space.w_bool):
+            self.save_bool(space.is_true(w_obj))
+        else:
+            index = self.memo.get(w_obj, 0)
+            if index > 0:
+                self.write_get(index)
+                return
+            self.save_memoizable(w_obj, w_type)
+
+    def save_memoizable(self, w_obj, w_type):
+        space = self.space
+        if space.is_w(w_type, space.w_bytes):
+            self.save_bytes(space.bytes_w(w_obj))
+            self.memoize(w_obj)
+        elif space.is_w(w_type, space.w_unicode):
+            self.save_utf8(space.utf8_w(w_obj))
+            self.memoize(w_obj)
+        elif space.is_w(w_type, space.w_long):
+            self.save_long(space.bigint_w(w_obj))
+        elif space.is_w(w_type, space.w_tuple):
+            self.save_tuple(w_obj)
+        elif space.is_w(w_type, space.w_list):
+            self.save_list(w_obj)
+        elif space.is_w(w_type, space.w_dict):
+            self.save_dict(w_obj)
+        elif space.is_w(w_type, space.gettypeobject(W_InstanceObject.typedef)):
+            self.save_inst(w_obj)
+        elif (space.is_w(w_type, space.gettypeobject(W_ClassObject.typedef)) or
+              space.is_w(w_type, space.gettypeobject(Function.typedef)) or
+              space.is_w(w_type,
+                         space.gettypeobject(BuiltinFunction.typedef))):
+            self.save_global(w_obj, None)
+        else:
+            self.save_reduce_object(w_obj, w_type)
+
+    def save_pers(self, w_pid):
+        space = self.space
+        if self.bin:
+            self.save(w_pid)
+            self.builder.append(BINPERSID)
+        else:
+            self.builder.append(PERSID)
+            self.builder.append(space.text_w(space.str(w_pid)))
+            self.builder.append('\n')
+
+    # ____________________________________________________________
+    # containers
+
+    def save_tuple(self, w_tuple):
+        space = self.space
+        builder = self.builder
+        items_w = space.fixedview(w_tuple)
+        n = len(items_w)
+        if n == 0:
+            if self.bin:
+                builder.append(EMPTY_TUPLE)
+            else:
+                builder.append(MARK)
+                builder.append(TUPLE)
+            return
+        if n <= 3 and self.proto >= 2:
+            for w_item in items_w:
+                self.save(w_item)
+            # Subtle.  Same as in the big comment in pickle.save_tuple():
+            # if the tuple is recursive, it was memoized while saving its
+            # items, and we must drop what we just pushed.
+            index = self.memo.get(w_tuple, 0)
+            if index > 0:
+                builder.append_multiple_char(POP, n)
+                self.write_get(index)
+            else:
+                builder.append(tuplesize2code[n])
+                self.memoize(w_tuple)
+            return
+        builder.append(MARK)
+        for w_item in items_w:
+            self.save(w_item)
+        index = self.memo.get(w_tuple, 0)
+        if index > 0:
+            if self.bin:
+                builder.append(POP_MARK)
+            else:
+                builder.append_multiple_char(POP, n + 1)
+            self.write_get(index)
+            return
+        builder.append(TUPLE)
+        self.memoize(w_tuple)
+
+    def save_list(self, w_list):
+        space = self.space
+        if self.bin:
+            self.builder.append(EMPTY_LIST)
+        else:
+            self.builder.append(MARK)
+            self.builder.append(LIST)
+        self.memoize(w_list)
+        if self.w_persistent_id is None:
+            # fast paths for the unboxed list strategies: the items are
+            # written without allocating a wrapper for each of them
+            intlist = space.listview_int(w_list)
+            if intlist is not None:
+                self.batch_appends(intlist, 'save_int')
+                return
+            floatlist = space.listview_float(w_list)
+            if floatlist is not None:
+                self.batch_appends(floatlist, 'save_float')
+                return
+            byteslist = space.listview_bytes(w_list)
+            if byteslist is not None:
+                self.batch_appends(byteslist, 'save_bytes')
+                return
+        self.batch_appends(space.listview(w_list), 'save')
+
+    @specialize.arg(2)
+    def batch_appends(self, items, methname):
+        builder = self.builder
+        n = len(items)
+        if not self.bin:
+            for i in range(n):
+                getattr(self, methname)(items[i])
+                builder.append(APPEND)
+            return
+        start = 0
+        while start < n:
+            stop = min(start + BATCHSIZE, n)
+            if stop - start > 1:
+                builder.append(MARK)
+                for i in range(start, stop):
+                    getattr(self, methname)(items[i])
+                builder.append(APPENDS)
+            else:
+                getattr(self, methname)(items[start])
+                builder.append(APPEND)
+            start = stop
+
+    def batch_appends_iter(self, w_iter):
+        space = self.space
+        builder = self.builder
+        if not self.bin:
+            while True:
+                w_item = next_or_none(space, w_iter)
+                if w_item is None:
+                    return
+                self.save(w_item)
+                builder.append(APPEND)
+        while True:
+            w_first = next_or_none(space, w_iter)
+            if w_first is None:
+                return
+            w_item = next_or_none(space, w_iter)
+            if w_item is None:
+                self.save(w_first)
+                builder.append(APPEND)
+                return
+            builder.append(MARK)
+            self.save(w_first)
+            self.save(w_item)
+            count = 2
+            while count < BATCHSIZE:
+                w_item = next_or_none(space, w_iter)
+                if w_item is None:
+                    break
+                self.save(w_item)
+                count += 1
+            builder.append(APPENDS)
+            if count < BATCHSIZE:
+                return
+
+    def save_dict(self, w_dict):
+        from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+        space = self.space
+        if self.bin:
+            self.builder.append(EMPTY_DICT)
+        else:
+            self.builder.append(MARK)
+            self.builder.append(DICT)
+        self.memoize(w_dict)
+        if self.w_persistent_id is None:
+            # string-keyed strategy: the keys don't need a wrapper
+            keys, values_w = space.view_as_kwargs(w_dict)
+            if keys is not None:
+                self.batch_setitems_kwargs(keys, values_w)
+                return
+        assert isinstance(w_dict, W_DictMultiObject)
+        self.batch_setitems(w_dict.iteritems())
+
+    def batch_setitems_kwargs(self, keys, values_w):
+        builder = self.builder
+        n = len(keys)
+        if not self.bin:
+            for i in range(n):
+                self.save_bytes(keys[i])
+                self.save(values_w[i])
+                builder.append(SETITEM)
+            return
+        start = 0
+        while start < n:
+            stop = min(start + BATCHSIZE, n)
+            if stop - start > 1:
+                builder.append(MARK)
+            for i in range(start, stop):
+                self.save_bytes(keys[i])
+                self.save(values_w[i])
+            builder.append(SETITEMS if stop - start > 1 else SETITEM)
+            start = stop
+
+    def batch_setitems(self, iteritems):
+        builder = self.builder
+        count = 0
+        while True:
+            w_key, w_value = iteritems.next_item()
+            if w_key is None:
+                break
+            if self.bin and count == 0:
+                builder.append(MARK)
+            self.save(w_key)
+            self.save(w_value)
+            if not self.bin:
+                builder.append(SETITEM)
+                continue
+            count += 1
+            if count == BATCHSIZE:
+                builder.append(SETITEMS)
+                count = 0
+        if count > 0:
+            builder.append(SETITEMS)
+
+    def batch_setitems_iter(self, w_iter):
+        space = self.space
+        builder = self.builder
+        count = 0
+        while True:
+            w_item = next_or_none(space, w_iter)
+            if w_item is None:
+                break
+            w_key, w_value = space.fixedview(w_item, 2)
+            if self.bin and count == 0:
+                builder.append(MARK)
+            self.save(w_key)
+            self.save(w_value)
+            if not self.bin:
+                builder.append(SETITEM)
+                continue
+            count += 1
+            if count == BATCHSIZE:
+                builder.append(SETITEMS)
+                count = 0
+        if count > 0:
+            builder.append(SETITEMS)
+
+    # ____________________________________________________________
+    # everything else: classic instances, globals and __reduce__
+
+    def save_inst(self, w_obj):
+        space = self.space
+        builder = self.builder
+        w_cls = space.getattr(w_obj, space.newtext('__class__'))
+        w_getinitargs = space.findattr(w_obj, space.newtext('__getinitargs__'))
+        if w_getinitargs is not None:
+            args_w = space.listview(space.call_function(w_getinitargs))
+        else:
+            args_w = []
+        builder.append(MARK)
+        if self.bin:
+            self.save(w_cls)
+            for w_arg in args_w:
+                self.save(w_arg)
+            builder.append(OBJ)
+        else:
+            for w_arg in args_w:
+                self.save(w_arg)
+            w_module = space.getattr(w_cls, space.newtext('__module__'))
+            w_name = space.getattr(w_cls, space.newtext('__name__'))
+            builder.append(INST)
+            builder.append(space.text_w(w_module))
+            builder.append('\n')
+            builder.append(space.text_w(w_name))
+            builder.append('\n')
+        self.memoize(w_obj)
+        w_getstate = space.findattr(w_obj, space.newtext('__getstate__'))
+        if w_getstate is not None:
+            w_state = space.call_function(w_getstate)
+        else:
+            w_state = space.getattr(w_obj, space.newtext('__dict__'))
+        self.save(w_state)
+        builder.append(BUILD)
+
+    def save_global(self, w_obj, w_name):
+        space = self.space
+        builder = self.builder
+        if w_name is None:
+            w_name = space.w_None
+        w_result = space.call_function(self.w_lookup_global, w_obj, w_name,
+                                       space.newint(self.proto))
+        w_module, w_name, w_code = space.fixedview(w_result, 3)
+        code = space.int_w(w_code)
+        if code > 0:
+            if code <= 0xff:
+                builder.append(EXT1)
+                builder.append(chr(code))
+            elif code <= 0xffff:
+                builder.append(EXT2)
+                builder.append(chr(code & 0xff))
+                builder.append(chr(code >> 8))
+            else:
+                builder.append(EXT4)
+                self.write_int32(code)
+            return
+        builder.append(GLOBAL)
+        builder.append(space.text_w(w_module))
+        builder.append('\n')
+        builder.append(space.text_w(w_name))
+        builder.append('\n')
+        self.memoize(w_obj)
+
+    def save_reduce_object(self, w_obj, w_type):
+        space = self.space
+        w_reduce = space.finditem(self.w_dispatch_table, w_type)
+        if w_reduce is not None:
+            w_rv = space.call_function(w_reduce, w_obj)
+        else:
+            if space.issubtype_w(w_type, space.w_type):
+                self.save_global(w_obj, None)
+                return
+            w_reduce = space.findattr(w_obj, space.newtext('__reduce_ex__'))
+            if w_reduce is not None:
+                w_rv = space.call_function(w_reduce, space.newint(self.proto))
+            else:
+                w_reduce = space.findattr(w_obj, space.newtext('__reduce__'))
+                if w_reduce is None:
+                    raise oefmt(get_error(space, 'PicklingError'),
+                                "Can't pickle %N object: %R", w_type, w_obj)
+                w_rv = space.call_function(w_reduce)
+        if space.isinstance_w(w_rv, space.w_bytes):
+            self.save_global(w_obj, w_rv)
+            return
+        if not space.isinstance_w(w_rv, space.w_tuple):
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "%R must return string or tuple", w_reduce)
+        rv_w = space.fixedview(w_rv)
+        if not 2 <= len(rv_w) <= 5:
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "Tuple returned by %R must have two to five elements",
+                        w_reduce)
+        args_w = [space.w_None] * 5
+        for i in range(len(rv_w)):
+            args_w[i] = rv_w[i]
+        self.save_reduce(args_w[0], args_w[1], args_w[2], args_w[3],
+                         args_w[4], w_obj)
+
+    def save_reduce(self, w_func, w_args, w_state, w_listitems, w_dictitems,
+                    w_obj):
+        space = self.space
+        builder = self.builder
+        if not space.isinstance_w(w_args, space.w_tuple):
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "args from reduce() should be a tuple")
+        if not space.is_true(space.callable(w_func)):
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "func from reduce should be callable")
+        w_funcname = space.findattr(w_func, space.newtext('__name__'))
+        if (self.proto >= 2 and w_funcname is not None and
+                space.eq_w(w_funcname, space.newtext('__newobj__'))):
+            args_w = space.fixedview(w_args)
+            if len(args_w) == 0:
+                raise oefmt(get_error(space, 'PicklingError'),
+                            "__newobj__ arglist is empty")
+            w_cls = args_w[0]
+            if space.findattr(w_cls, space.newtext('__new__')) is None:
+                raise oefmt(get_error(space, 'PicklingError'),
+                            "args[0] from __newobj__ args has no __new__")
+            w_objclass = space.getattr(w_obj, space.newtext('__class__'))
+            if not space.is_w(w_cls, w_objclass):
+                raise oefmt(get_error(space, 'PicklingError'),
+                            "args[0] from __newobj__ args has the wrong class")
+            self.save(w_cls)
+            self.save(space.newtuple(args_w[1:]))
+            builder.append(NEWOBJ)
+        else:
+            self.save(w_func)
+            self.save(w_args)
+            builder.append(REDUCE)
+        # If the object is already in the memo, it is recursive: throw
+        # away what we put on the stack and fetch the object from the memo
+        index = self.memo.get(w_obj, 0)
+        if index > 0:
+            builder.append(POP)
+            self.write_get(index)
+        else:
+            self.memoize(w_obj)
+        if not space.is_w(w_listitems, space.w_None):
+            self.batch_appends_iter(space.iter(w_listitems))
+        if not space.is_w(w_dictitems, space.w_None):
+            self.batch_setitems_iter(space.iter(w_dictitems))
+        if not space.is_w(w_state, space.w_None):
+            self.save(w_state)
+            builder.append(BUILD)
+
+    # ____________________________________________________________
+    # app-level interface
+
+    def dump_w_obj(self, w_obj):
+        space = self.space
+        if self.proto >= 2:
+            self.builder.append(PROTO)
+            self.builder.append(chr(self.proto))
+        try:
+            self.save(w_obj)
+        except rstackovf.StackOverflow:
+            rstackovf.check_stack_overflow()
+            raise oefmt(space.w_RuntimeError,
+                        "maximum recursion depth exceeded while pickling "
+                        "an object")
+        self.builder.append(STOP)
+
+    def descr_dump(self, w_obj):
+        """Write a pickled representation of obj to the open file."""
+        self.dump_w_obj(w_obj)
+        self.flush()
+        return self
+
+    def descr_clear_memo(self):
+        """Clears the pickler's "memo"."""
+        self.memo.clear()
+
+    @unwrap_spec(clear=int)
+    def descr_getvalue(self, clear=1):
+        """Return the pickled data accumulated by a pickler created
+        without a file."""
+        if self.w_file is not None:
+            raise oefmt(self.space.w_AttributeError,
+                        "'cPickle.Pickler' object has no attribute "
+                        "'getvalue'")
+        data = self.builder.build()
+        if clear:
+            self.builder = StringBuilder()
+        return self.space.newbytes(data)
+
+    def get_memo(self, space):
+        w_memo = space.newdict()
+        for w_obj, index in self.memo.items():
+            space.setitem(w_memo, space.id(w_obj),
+                          space.newtuple([space.newint(index), w_obj]))
+        return w_memo
+
+    def set_memo(self, space, w_memo):
+        self.memo.clear()
+        for w_value in space.listview(space.call_method(w_memo, 'values')):
+            w_index, w_obj = space.fixedview(w_value, 2)
+            self.memo[w_obj] = space.int_w(w_index)
+
+    def get_persistent_id(self, space):
+        if self.w_persistent_id is None:
+            return space.w_None
+        return self.w_persistent_id
+
+    def set_persistent_id(self, space, w_func):
+        if space.is_w(w_func, space.w_None):
+            self.w_persistent_id = None
+        else:
+            self.w_persistent_id = w_func
+
+    def get_fast(self, space):
+        return space.newbool(self.fast)
+
+    def set_fast(self, space, w_value):
+        self.fast = space.is_true(w_value)
+
+    def get_binary(self, space):
+        return space.newbool(self.bin)
+
+    def get_proto(self, space):
+        return space.newint(self.proto)
+
+
+W_Pickler.typedef = TypeDef(
+    'cPickle.Pickler',
+    dump = interp2app(W_Pickler.descr_dump),
+    clear_memo = interp2app(W_Pickler.descr_clear_memo),
+    getvalue = interp2app(W_Pickler.descr_getvalue),
+    memo = GetSetProperty(W_Pickler.get_memo, W_Pickler.set_memo),
+    persistent_id = GetSetProperty(W_Pickler.get_persistent_id,
+                                   W_Pickler.set_persistent_id),
+    fast = GetSetProperty(W_Pickler.get_fast, W_Pickler.set_fast),
+    binary = GetSetProperty(W_Pickler.get_binary),
+    proto = GetSetProperty(W_Pickler.get_proto),
+    __doc__ = """Pickler(file, protocol=0) -- Create a pickler.
+
+This takes a file-like object for writing a pickle data stream.
+The optional proto argument tells the pickler to use the given
+protocol; supported protocols are 0, 1, 2.  The default
+protocol is 0, to be backwards compatible.  (Protocol 0 is the
+only protocol that can be written to a file opened in text
+mode and read back successfully.  When using a protocol higher
+than 0, make sure the file is opened in binary mode, both when
+pickling and unpickling.)
+
+Specifying a negative protocol version selects the highest
+protocol version supported.  The higher the protocol used, the
+more recent the version of Python needed to read the pickle
+produced.
+
+The file parameter must have a write() method that accepts a single
+string argument.  It can thus be an open file object, a StringIO
+object, or any other custom object that meets this interface.""")
+W_Pickler.typedef.acceptable_as_base_class = False
+
+
+@unwrap_spec(protocol=int)
+def Pickler(space, w_file=None, protocol=0):
+    """Pickler(file, protocol=0) -- Create a pickler."""
+    if w_file is not None and space.isinstance_w(w_file, space.w_int):
+        # Pickler(protocol): the data is kept for getvalue()
+        protocol = space.int_w(w_file)
+        w_file = None
+    elif space.is_none(w_file):
+        w_file = None
+    elif space.findattr(w_file, space.newtext('write')) is None:
+        raise oefmt(space.w_TypeError, "argument must have 'write' attribute")
+    return W_Pickler(space, w_file, check_protocol(space, protocol))
+
+@unwrap_spec(protocol=int)
+def dump(space, w_obj, w_file, protocol=0):
+    """dump(obj, file, protocol=0) -- Write an object in pickle format to
+the given file."""
+    if space.findattr(w_file, space.newtext('write')) is None:
+        raise oefmt(space.w_TypeError, "argument must have 'write' attribute")
+    pickler = W_Pickler(space, w_file, check_protocol(space, protocol))
+    pickler.dump_w_obj(w_obj)
+    pickler.flush()
+
+@unwrap_spec(protocol=int)
+def dumps(space, w_obj, protocol=0):
+    """dumps(obj, protocol=0) -- Return a string containing an object in
+pickle format."""
+    pickler = W_Pickler(space, None, check_protocol(space, protocol))
+    pickler.dump_w_obj(w_obj)
+    return space.newbytes(pickler.builder.build())
@@ -0,0 +1,625 @@
+from rpython.rlib import rstackovf
+from rpython.rlib.rarithmetic import intmask, string_to_int
+from rpython.rlib.rbigint import rbigint
+from rpython.rlib.rfloat import string_to_float
+from rpython.rlib.rstring import ParseStringError, ParseStringOverflowError
+from rpython.rlib.rstruct.ieee import unpack_float
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app
+from pypy.interpreter.pyparser.parsestring import PyString_DecodeEscape
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.unicodehelper import (check_utf8_or_raise,
+                                            decode_raw_unicode_escape)
+from pypy.module.cPickle.interp_pickler import get_error
+from pypy.module.cPickle.opcodes import *
+from pypy.objspace.std.util import wrap_parsestringerror
+
+
+class AbstractReader(object):
+    def __init__(self, space):
+        self.space = space
+
+    def raise_eof(self):
+        raise OperationError(self.space.w_EOFError, self.space.w_None)
+
+    def read1(self):
+        raise NotImplementedError("Purely abstract method")
+
+    def read(self, n):
+        raise NotImplementedError("Purely abstract method")
+
+    def readline(self):
+        raise NotImplementedError("Purely abstract method")
+
+
+class StringReader(AbstractReader):
+    """Reads directly out of the string given to loads()."""
+
+    def __init__(self, space, data):
+        AbstractReader.__init__(self, space)
+        self.data = data
+        self.pos = 0
+
+    def read1(self):
+        pos = self.pos
+        if pos >= len(self.data):
+            self.raise_eof()
+        self.pos = pos + 1
+        return self.data[pos]
+
+    def read(self, n):
+        pos = self.pos
+        end = pos + n
+        if n < 0 or end > len(self.data):
+            self.raise_eof()
+        self.pos = end
+        return self.data[pos:end]
+
+    def readline(self):
+        pos = self.pos
+        end = self.data.find('\n', pos)
+        if end < 0:
+            self.raise_eof()
+        self.pos = end + 1
+        return self.data[pos:end]
+
+
+class FileReader(AbstractReader):
+    """Reads through the read() and readline() methods of a file-like
+    object, without consuming anything after the end of the pickle."""
+
+    def __init__(self, space, w_file):
+        AbstractReader.__init__(self, space)
+        try:
+            self.w_read = space.getattr(w_file, space.newtext('read'))
+            self.w_readline = space.getattr(w_file, space.newtext('readline'))
+        except OperationError as e:
+            if not e.match(space, space.w_AttributeError):
+                raise
+            raise oefmt(space.w_TypeError,
+                        "argument must have 'read' and 'readline' attributes")
+
+    def read1(self):
+        return self.read(1)[0]
+
+    def read(self, n):
+        space = self.space
+        if n < 0:
+            self.raise_eof()
+        data = space.bytes_w(space.call_function(self.w_read,
+                                                 space.newint(n)))
+        if len(data) != n:
+            self.raise_eof()
+        return data
+
+    def readline(self):
+        space = self.space
+        data = space.bytes_w(space.call_function(self.w_readline))
+        if not data.endswith('\n'):
+            self.raise_eof()
+        return data[:-1]
+
+
+def read_int32(data):
+    x = (ord(data[0]) | (ord(data[1]) << 8) | (ord(data[2]) << 16) |
+         (ord(data[3]) << 24))
+    if x >= 0x80000000:
+        x -= 0x100000000
+    return intmask(x)
+
+
+class W_Unpickler(W_Root):
+
+    def __init__(self, space, reader):
+        self.space = space
+        self.reader = reader
+        self.stack_w = []
+        self.marks = []       # positions in stack_w where MARKs were pushed
+        self.memo = {}
+        self.w_find_global = None
+        self.w_persistent_load = None
+
+    # ____________________________________________________________
+    # stack handling
+
+    def push(self, w_obj):
+        self.stack_w.append(w_obj)
+
+    def pop(self):
+        if len(self.stack_w) == 0:
+            self.stack_underflow()
+        return self.stack_w.pop()
+
+    def top(self):
+        if len(self.stack_w) == 0:
+            self.stack_underflow()
+        return self.stack_w[-1]
+
+    def set_top(self, w_obj):
+        if len(self.stack_w) == 0:
+            self.stack_underflow()
+        self.stack_w[-1] = w_obj
+
+    def stack_underflow(self):
+        raise oefmt(get_error(self.space, 'UnpicklingError'),
+                    "unpickling stack underflow")
+
+    def marker(self):
+        if len(self.marks) == 0:
+            raise oefmt(get_error(self.space, 'UnpicklingError'),
+                        "could not find MARK")
+        return self.marks.pop()
+
+    def pop_mark(self):
+        """Remove and return the items pushed since the last MARK."""
+        k = self.marker()
+        items_w = self.stack_w[k:]
+        del self.stack_w[k:]
+        return items_w
+
+    # ____________________________________________________________
+    # helpers
+
+    def find_class(self, module, name):
+        space = self.space
+        w_module = space.newtext(module)
+        w_name = space.newtext(name)
+        if self.w_find_global is None:
+            w_find_global = space.getattr(space.getbuiltinmodule('cPickle'),
+                                          space.newtext('_find_global'))
+        elif space.is_w(self.w_find_global, space.w_None):
+            raise oefmt(get_error(space, 'UnpicklingError'),
+                        "Global and instance pickles are not supported.")
+        else:
+            w_find_global = self.w_find_global
+        return space.call_function(w_find_global, w_module, w_name)
+
+    def persistent_load(self, w_pid):
+        space = self.space
+        if self.w_persistent_load is None:
+            raise oefmt(get_error(space, 'UnpicklingError'),
+                        "A load persistent id instruction was encountered,\n"
+                        "but no persistent_load function was specified.")
+        return space.call_function(self.w_persistent_load, w_pid)
+
+    def instantiate(self, w_klass, args_w):
+        space = self.space
+        w_instantiate = space.getattr(space.getbuiltinmodule('cPickle'),
+                                      space.newtext('_instantiate'))
+        self.push(space.call_function(w_instantiate, w_klass,
+                                      space.newtuple(args_w[:])))
+
+    def get_extension(self, code):
+        space = self.space
+        w_module = space.getbuiltinmodule('cPickle')
+        w_cache = space.getattr(w_module, space.newtext('_extension_cache'))
+        w_code = space.newint(code)
+        w_obj = space.finditem(w_cache, w_code)
+        if w_obj is None:
+            w_registry = space.getattr(w_module,
+                                       space.newtext('_inverted_registry'))
+            w_key = space.finditem(w_registry, w_code)
+            if w_key is None or not space.is_true(w_key):
+                raise oefmt(space.w_ValueError,
+                            "unregistered extension code %d", code)
+            w_modname, w_name = space.fixedview(w_key, 2)
+            w_obj = self.find_class(space.text_w(w_modname),
+                                    space.text_w(w_name))
+            space.setitem(w_cache, w_code, w_obj)
+        self.push(w_obj)
+
+    def memo_get(self, index):
+        w_obj = self.memo.get(index, None)
+        if w_obj is None:
+            space = self.space
+            raise OperationError(space.w_KeyError, space.newint(index))
+        self.push(w_obj)
+
+    def memo_put(self, index):
+        self.memo[index] = self.top()
+
+    def load_w_obj(self):
+        space = self.space
+        reader = self.reader
+        self.stack_w = []
+        self.marks = []
+        try:
+            while True:
+                opcode = reader.read1()
+                if opcode == STOP:
+                    break
+                func = dispatch[ord(opcode)]
+                if func is None:
+                    raise oefmt(get_error(space, 'UnpicklingError'),
+                                "invalid load key, '%s'.", opcode)
+                func(self)
+        except rstackovf.StackOverflow:
+            rstackovf.check_stack_overflow()
+            raise oefmt(space.w_RuntimeError,
+                        "maximum recursion depth exceeded while unpickling")
+        return self.pop()
+
+    # ____________________________________________________________
+    # app-level interface
+
+    def descr_load(self):
+        """Load a pickle."""
+        return self.load_w_obj()
+
+    def get_memo(self, space):
+        w_memo = space.newdict()
+        for index, w_obj in self.memo.items():
+            space.setitem(w_memo, space.newint(index), w_obj)
+        return w_memo
+
+    def set_memo(self, space, w_memo):
+        self.memo.clear()
+        w_items = space.call_method(w_memo, 'items')
+        for w_item in space.listview(w_items):
+            w_index, w_obj = space.fixedview(w_item, 2)
+            self.memo[space.int_w(w_index)] = w_obj
+
+    def get_find_global(self, space):
+        if self.w_find_global is None:
+            return space.w_None
+        return self.w_find_global
+
+    def set_find_global(self, space, w_func):
+        self.w_find_global = w_func
+
+    def get_persistent_load(self, space):
+        if self.w_persistent_load is None:
+            return space.w_None
+        return self.w_persistent_load
+
+    def set_persistent_load(self, space, w_func):
+        if space.is_w(w_func, space.w_None):
+            self.w_persistent_load = None
+        else:
+            self.w_persistent_load = w_func
+
+
+# ____________________________________________________________
+# the opcodes
+
+def load_proto(self):
+    proto = ord(self.reader.read1())
+    if not 0 <= proto <= HIGHEST_PROTOCOL:
+        raise oefmt(self.space.w_ValueError,
+                    "unsupported pickle protocol: %d", proto)
+
+def load_persid(self):
+    pid = self.reader.readline()
+    self.push(self.persistent_load(self.space.newbytes(pid)))
+
+def load_binpersid(self):
+    w_pid = self.pop()
+    self.push(self.persistent_load(w_pid))
+
+def load_none(self):
+    self.push(self.space.w_None)
+
+def load_false(self):
+    self.push(self.space.w_False)
+
+def load_true(self):
+    self.push(self.space.w_True)
+
+def load_int(self):
+    space = self.space
+    data = self.reader.readline()
+    if data == '00':
+        self.push(space.w_False)
+    elif data == '01':
+        self.push(space.w_True)
+    else:
+        try:
+            self.push(space.newint(string_to_int(data)))
+        except ParseStringOverflowError:
+            self.push(space.call_function(space.w_long, space.newbytes(data)))
+        except ParseStringError as e:
+            raise wrap_parsestringerror(space, e, space.newbytes(data))
+
+def load_binint(self):
+    self.push(self.space.newint(read_int32(self.reader.read(4))))
+
+def load_binint1(self):
+    self.push(self.space.newint(ord(self.reader.read1())))
+
+def load_binint2(self):
+    data = self.reader.read(2)
+    self.push(self.space.newint(ord(data[0]) | (ord(data[1]) << 8)))
+
+def load_long(self):
+    space = self.space
+    data = self.reader.readline()
+    if data.endswith('L'):
+        data = data[:-1]
+    self.push(space.call_function(space.w_long, space.newbytes(data),
+                                  space.newint(0)))
+
+def _load_long_bytes(self, n):
+    if n < 0:
+        raise oefmt(get_error(self.space, 'UnpicklingError'),
+                    "LONG pickle has negative byte count")
+    data = self.reader.read(n)
+    bigint = rbigint.frombytes(data, 'little', True)
+    self.push(self.space.newlong_from_rbigint(bigint))
+
+def load_long1(self):
+    _load_long_bytes(self, ord(self.reader.read1()))
+
+def load_long4(self):
+    _load_long_bytes(self, read_int32(self.reader.read(4)))
+
+def load_float(self):
+    space = self.space
+    data = self.reader.readline()
+    try:
+        self.push(space.newfloat(string_to_float(data)))
+    except ParseStringError as e:
+        raise wrap_parsestringerror(space, e, space.newbytes(data))
+
+def load_binfloat(self):
+    self.push(self.space.newfloat(unpack_float(self.reader.read(8), True)))
+
+def load_string(self):
+    space = self.space
+    rep = self.reader.readline()
+    if len(rep) < 2 or rep[0] != rep[-1] or (rep[0] != "'" and
+                                               rep[0] != '"'):
+        raise oefmt(space.w_ValueError, "insecure string pickle")
+    end = len(rep) - 1
+    assert end >= 1
+    self.push(space.newbytes(PyString_DecodeEscape(space, rep[1:end],
+                                                   'strict', None)))
+
+def load_binstring(self):
+    n = read_int32(self.reader.read(4))
+    if n < 0:
+        raise oefmt(get_error(self.space, 'UnpicklingError'),
+                    "BINSTRING pickle has negative byte count")
+    self.push(self.space.newbytes(self.reader.read(n)))
+
+def load_short_binstring(self):
+    n = ord(self.reader.read1())
+    self.push(self.space.newbytes(self.reader.read(n)))
+
+def load_unicode(self):
+    space = self.space
+    data = self.reader.readline()
+    utf8, length = decode_raw_unicode_escape(space, data)
+    self.push(space.newutf8(utf8, length))
+
+def load_binunicode(self):
+    space = self.space
+    n = read_int32(self.reader.read(4))
+    if n < 0:
+        raise oefmt(get_error(space, 'UnpicklingError'),
+                    "BINUNICODE pickle has negative byte count")
+    data = self.reader.read(n)
+    length = check_utf8_or_raise(space, data)
+    self.push(space.newutf8(data, length))
+
+def load_tuple(self):
+    self.push(self.space.newtuple(self.pop_mark()[:]))
+
+def load_empty_tuple(self):
+    self.push(self.space.newtuple([]))
+
+def load_tuple1(self):
+    self.set_top(self.space.newtuple([self.top()]))
+
+def load_tuple2(self):
+    w_second = self.pop()
+    w_first = self.top()
+    self.set_top(self.space.newtuple([w_first, w_second]))
+
+def load_tuple3(self):
+    w_third = self.pop()
+    w_second = self.pop()
+    w_first = self.top()
+    self.set_top(self.space.newtuple([w_first, w_second, w_third]))
+
+def load_empty_list(self):
+    self.push(self.space.newlist([]))
+
+def load_empty_dict(self):
+    self.push(self.space.newdict())
+
+def load_list(self):
+    self.push(self.space.newlist(self.pop_mark()))
+
+def load_dict(self):
+    space = self.space
+    items_w = self.pop_mark()
+    w_dict = space.newdict()
+    for i in range(0, len(items_w) - 1, 2):
+        space.setitem(w_dict, items_w[i], items_w[i + 1])
+    self.push(w_dict)
+
+def load_inst(self):
+    module = self.reader.readline()
+    name = self.reader.readline()
+    w_klass = self.find_class(module, name)
+    self.instantiate(w_klass, self.pop_mark())
+
+def load_obj(self):
+    # Stack is ... markobject classobject arg1 arg2 ...
+    items_w = self.pop_mark()
+    if len(items_w) == 0:
+        self.stack_underflow()
+    self.instantiate(items_w[0], items_w[1:])
+
+def load_newobj(self):
+    space = self.space
+    w_args = self.pop()
+    w_cls = self.top()
+    args_w = [w_cls] + space.fixedview(w_args)
+    w_new = space.getattr(w_cls, space.newtext('__new__'))
+    self.set_top(space.call(w_new, space.newtuple(args_w)))
+
+def load_global(self):
+    module = self.reader.readline()
+    name = self.reader.readline()
+    self.push(self.find_class(module, name))
+
+def load_ext1(self):
+    self.get_extension(ord(self.reader.read1()))
+
+def load_ext2(self):
+    data = self.reader.read(2)
+    self.get_extension(ord(data[0]) | (ord(data[1]) << 8))
+
+def load_ext4(self):
+    self.get_extension(read_int32(self.reader.read(4)))
+
+def load_reduce(self):
+    space = self.space
+    w_args = self.pop()
+    w_func = self.top()
+    self.set_top(space.call(w_func, w_args))
+
+def load_pop(self):
+    # a MARK on top of the stack is popped too, like cPickle.c does
+    if len(self.marks) > 0 and self.marks[-1] == len(self.stack_w):
+        self.marks.pop()
+    else:
+        self.pop()
+
+def load_pop_mark(self):
+    self.pop_mark()
+
+def load_dup(self):
+    self.push(self.top())
+
+def _memo_index(self, data):
+    try:
+        return string_to_int(data)
+    except (ParseStringError, ParseStringOverflowError):
+        raise oefmt(self.space.w_ValueError, "invalid memo key")
+
+def load_get(self):
+    self.memo_get(_memo_index(self, self.reader.readline()))
+
+def load_binget(self):
+    self.memo_get(ord(self.reader.read1()))
+
+def load_long_binget(self):
+    self.memo_get(read_int32(self.reader.read(4)))
+
+def load_put(self):
+    self.memo_put(_memo_index(self, self.reader.readline()))
+
+def load_binput(self):
+    self.memo_put(ord(self.reader.read1()))
+
+def load_long_binput(self):
+    self.memo_put(read_int32(self.reader.read(4)))
+
+def load_append(self):
+    space = self.space
+    w_value = self.pop()
+    space.call_method(self.top(), 'append', w_value)
+
+def load_appends(self):
+    space = self.space
+    items_w = self.pop_mark()
+    space.call_method(self.top(), 'extend', space.newlist(items_w))
+
+def load_setitem(self):
+    space = self.space
+    w_value = self.pop()
+    w_key = self.pop()
+    space.setitem(self.top(), w_key, w_value)
+
+def load_setitems(self):
+    space = self.space
+    items_w = self.pop_mark()
+    w_dict = self.top()
+    for i in range(0, len(items_w) - 1, 2):
+        space.setitem(w_dict, items_w[i], items_w[i + 1])
+
+def load_build(self):
+    space = self.space
+    w_state = self.pop()
+    w_inst = self.top()
+    w_setstate = space.findattr(w_inst, space.newtext('__setstate__'))
+    if w_setstate is not None:
+        space.call_function(w_setstate, w_state)
+        return
+    w_slotstate = None
+    if (space.isinstance_w(w_state, space.w_tuple) and
+            space.len_w(w_state) == 2):
+        w_state, w_slotstate = space.fixedview(w_state, 2)
+    if space.is_true(w_state):
+        w_dict = space.getattr(w_inst, space.newtext('__dict__'))
+        space.call_method(w_dict, 'update', w_state)
+    if w_slotstate is not None and space.is_true(w_slotstate):
+        w_items = space.call_method(w_slotstate, 'items')
+        for w_item in space.listview(w_items):
+            w_key, w_value = space.fixedview(w_item, 2)
+            space.setattr(w_inst, w_key, w_value)
+
+def load_mark(self):
+    self.marks.append(len(self.stack_w))
+
+
+dispatch = [None] * 256
+for _opcode, _func in [
+        (PROTO, load_proto), (PERSID, load_persid),
+        (BINPERSID, load_binpersid), (NONE, load_none),
+        (NEWFALSE, load_false), (NEWTRUE, load_true), (INT, load_int),
+        (BININT, load_binint), (BININT1, load_binint1),
+        (BININT2, load_binint2), (LONG, load_long), (LONG1, load_long1),
+        (LONG4, load_long4), (FLOAT, load_float), (BINFLOAT, load_binfloat),
+        (STRING, load_string), (BINSTRING, load_binstring),
+        (SHORT_BINSTRING, load_short_binstring), (UNICODE, load_unicode),
+        (BINUNICODE, load_binunicode), (TUPLE, load_tuple),
+        (EMPTY_TUPLE, load_empty_tuple), (TUPLE1, load_tuple1),
+        (TUPLE2, load_tuple2), (TUPLE3, load_tuple3),
+        (EMPTY_LIST, load_empty_list), (EMPTY_DICT, load_empty_dict),
+        (LIST, load_list), (DICT, load_dict), (INST, load_inst),
+        (OBJ, load_obj), (NEWOBJ, load_newobj), (GLOBAL, load_global),
+        (EXT1, load_ext1), (EXT2, load_ext2), (EXT4, load_ext4),
+        (REDUCE, load_reduce), (POP, load_pop), (POP_MARK, load_pop_mark),
+        (DUP, load_dup), (GET, load_get), (BINGET, load_binget),
+        (LONG_BINGET, load_long_binget), (PUT, load_put),
+        (BINPUT, load_binput), (LONG_BINPUT, load_long_binput),
+        (APPEND, load_append), (APPENDS, load_appends),
+        (SETITEM, load_setitem), (SETITEMS, load_setitems),
+        (BUILD, load_build), (MARK, load_mark)]:
+    dispatch[ord(_opcode)] = _func
+del _opcode, _func
+
+
+W_Unpickler.typedef = TypeDef(
+    'cPickle.Unpickler',
+    load = interp2app(W_Unpickler.descr_load),
+    memo = GetSetProperty(W_Unpickler.get_memo, W_Unpickler.set_memo),
+    find_global = GetSetProperty(W_Unpickler.get_find_global,
+                                 W_Unpickler.set_find_global),
+    persistent_load = GetSetProperty(W_Unpickler.get_persistent_load,
+                                     W_Unpickler.set_persistent_load),
+    __doc__ = """Unpickler(file) -- Create an unpickler.
+
+This takes a file-like object for reading a pickle data stream.
+The file-like object must have two methods, a read() method that
+takes an integer argument, and a readline() method that requires no
+arguments.  Both methods should return a string.""")
+W_Unpickler.typedef.acceptable_as_base_class = False
+
+
+def Unpickler(space, w_file):
+    """Unpickler(file) -- Create an unpickler."""
+    return W_Unpickler(space, FileReader(space, w_file))
+
+def load(space, w_file):
+    """load(file) -- Load a pickle from the given file"""
+    return W_Unpickler(space, FileReader(space, w_file)).load_w_obj()
+
+def loads(space, w_str):
+    """loads(string) -- Load a pickle from the given string"""
+    data = space.getarg_w('s#', w_str)
+    return W_Unpickler(space, StringReader(space, data)).load_w_obj()
@@ -0,0 +1,35 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+
+class Module(MixedModule):
+    """C implementation and optimization of the Python pickle module."""
+
+    appleveldefs = {
+        'PickleError':         'app_cPickle.PickleError',
+        'PicklingError':       'app_cPickle.PicklingError',
+        'UnpicklingError':     'app_cPickle.UnpicklingError',
+        'UnpickleableError':   'app_cPickle.UnpickleableError',
+        'BadPickleGet':        'app_cPickle.BadPickleGet',
+        'format_version':      'app_cPickle.format_version',
+        'compatible_formats':  'app_cPickle.compatible_formats',
+
+        '_dispatch_table':     'app_cPickle._dispatch_table',
+        '_extension_cache':    'app_cPickle._extension_cache',
+        '_inverted_registry':  'app_cPickle._inverted_registry',
+        '_lookup_global':      'app_cPickle._lookup_global',
+        '_find_global':        'app_cPickle._find_global',
+        '_instantiate':        'app_cPickle._instantiate',
+        }
+
+    interpleveldefs = {
+        '__version__':      'space.wrap("1.71")',
+        'HIGHEST_PROTOCOL': 'space.wrap(opcodes.HIGHEST_PROTOCOL)',
+
+        'Pickler':          'interp_pickler.Pickler',
+        'dump':             'interp_pickler.dump',
+        'dumps':            'interp_pickler.dumps',
+
+        'Unpickler':        'interp_unpickler.Unpickler',
+        'load':             'interp_unpickler.load',
+        'loads':            'interp_unpickler.loads',
+        }
@@ -0,0 +1,244 @@
+import pickle, pickletools
+
+from pypy.interpreter.gateway import interp2app
+
+
+def big_values():
+    return [range(1001), [str(i) for i in range(1500)],
+            dict.fromkeys(range(1200), 0)]
+
+
+class AppTestCPickle:
+    spaceconfig = dict(usemodules=['cPickle', 'struct', 'binascii'])
+
+    def setup_class(cls):
+        cls.w_helpers = cls.space.appexec([], """():
+            import sys, types
+            mod = types.ModuleType('cpickle_helpers')
+            class Point(object):
+                def __init__(self, x, y):
+                    self.x = x
+                    self.y = y
+                def __eq__(self, other):
+                    return (type(other) is Point and
+                            (self.x, self.y) == (other.x, other.y))
+            class Old:
+                pass
+            for cls in [Point, Old]:
+                cls.__module__ = mod.__name__
+                setattr(mod, cls.__name__, cls)
+            sys.modules[mod.__name__] = mod
+            return mod
+        """)
+        # the output of pickle.py for values with more than BATCHSIZE items,
+        # computed by the host: pickle.py and pickletools.optimize() take
+        # minutes on them untranslated
+        cls.w_big_pickles = cls.space.wrap([
+            [pickletools.optimize(pickle.dumps(value, proto))
+             for proto in range(3)]
+            for value in big_values()])
+        if cls.runappdirect:
+            cls.w_optimize = None
+        else:
+            def optimize(space, w_data):
+                return space.newbytes(
+                    pickletools.optimize(space.bytes_w(w_data)))
+            cls.w_optimize = cls.space.wrap(interp2app(optimize))
+
+    def test_is_builtin(self):
+        import cPickle
+        assert type(cPickle.dumps).__name__ == 'builtin_function'
+        assert cPickle.HIGHEST_PROTOCOL == 2
+        assert issubclass(cPickle.PicklingError, cPickle.PickleError)
+
+    def test_roundtrip_simple(self):
+        import cPickle
+        values = [None, True, False, 0, 1, -1, 255, 256, 65535, 65536,
+                  2**31 - 1, -2**31, 2**40, -2**40, 12345678901234567890,
+                  -2**100, 0L, 1.5, -0.0, 1e300, 'abc', '', 'x' * 300,
+                  'quote\'"\n\\\x00\xff', u'', u'abc', u'\u1234\n\\x',
+                  u'\U00012345', (), (1,), (1, 2), (1, 2, 3), (1, 2, 3, 4),
+                  [], [1, 2], {}, {'a': 1}, {1: 'a', (2,): [3]}]
+        for proto in range(3):
+            for value in values:
+                s = cPickle.dumps(value, proto)
+                result = cPickle.loads(s)
+                assert result == value
+                assert type(result) is type(value)
+
+    def test_same_output_as_pickle(self):
+        import cPickle, pickle, pickletools
+        optimize = self.optimize or pickletools.optimize
+        values = [None, True, 42, -5, 2**40, 12345678901234567890L,
+                  3.25, 'abc', 'x' * 300, u'\xe9\u1234', (1, 'a'),
+                  [1, 2.5, 'c'], {'a': [1, 2]}, {1: 2, 3: 4}]
+        for proto in range(3):
+            for value in values:
+                expected = pickle.dumps(value, proto)
+                got = cPickle.dumps(value, proto)
+                assert pickle.loads(got) == value
+                # the memo indices of cPickle start at one, those of
+                # pickle.py at zero: optimize() drops the unused PUTs
+                assert optimize(got) == optimize(expected)
+        # more than BATCHSIZE items, and more than 256 memo entries; keep
+        # in sync with big_values()
+        big = [range(1001), [str(i) for i in range(1500)],
+               dict.fromkeys(range(1200), 0)]
+        for value, expected in zip(big, self.big_pickles):
+            for proto in range(3):
+                got = cPickle.dumps(value, proto)
+                assert optimize(got) == expected[proto]
+
+    def test_loads_pickle_output(self):
+        import cPickle, pickle
+        value = {'a': [1, 2.0, 3L, (4, u'5')], 'b': ('x', None, True)}
+        for proto in range(3):
+            assert cPickle.loads(pickle.dumps(value, proto)) == value
+
+    def test_strategies(self):
+        import cPickle
+        for proto in range(3):
+            for lst in [range(2500), [1.5] * 1001, ['a', 'bc'] * 700,
+                        [1, 'a', 2.5, None]]:
+                assert cPickle.loads(cPickle.dumps(lst, proto)) == lst
+            d = dict.fromkeys([str(i) for i in range(2500)], 5)
+            assert cPickle.loads(cPickle.dumps(d, proto)) == d
+
+    def test_shared_and_recursive(self):
+        import cPickle
+        for proto in range(3):
+            a = [1, 2]
+            b = [a, a]
+            c = cPickle.loads(cPickle.dumps(b, proto))
+            assert c == b
+            assert c[0] is c[1]
+            l = []
+            l.append(l)
+            l2 = cPickle.loads(cPickle.dumps(l, proto))
+            assert l2[0] is l2
+            d = {}
+            d['self'] = d
+            d2 = cPickle.loads(cPickle.dumps(d, proto))
+            assert d2['self'] is d2
+            t = ([],)
+            t[0].append(t)
+            t2 = cPickle.loads(cPickle.dumps(t, proto))
+            assert t2[0][0] is t2
+
+    def test_instances_and_globals(self):
+        import cPickle
+        Point = self.helpers.Point
+        Old = self.helpers.Old
+        for proto in range(3):
+            p = Point(1, [2])
+            assert cPickle.loads(cPickle.dumps(p, proto)) == p
+            o = Old()
+            o.attr = 'x'
+            o2 = cPickle.loads(cPickle.dumps(o, proto))
+            assert o2.__class__ is Old
+            assert o2.attr == 'x'
+            assert cPickle.loads(cPickle.dumps(Point, proto)) is Point
+            assert cPickle.loads(cPickle.dumps(len, proto)) is len
+            assert cPickle.loads(cPickle.dumps(int, proto)) is int
+
+    def test_reduce(self):
+        import cPickle, collections
+        for proto in range(3):
+            d = collections.OrderedDict([('b', 1), ('a', 2)])
+            d2 = cPickle.loads(cPickle.dumps(d, proto))
+            assert d2 == d and type(d2) is collections.OrderedDict
+            s = set([1, 2, 3])
+            assert cPickle.loads(cPickle.dumps(s, proto)) == s
+
+    def test_unpicklable(self):
+        import cPickle
+        raises(cPickle.PicklingError, cPickle.dumps, lambda: 1, 0)
+        class Local(object):
+            pass
+        raises(cPickle.PicklingError, cPickle.dumps, Local, 2)
+
+    def test_protocol_error(self):
+        import cPickle
+        raises(ValueError, cPickle.dumps, 1, 3)
+        assert cPickle.dumps(1, -1) == cPickle.dumps(1, 2)
+
+    def test_load_errors(self):
+        import cPickle
+        raises(EOFError, cPickle.loads, '')
+        raises(EOFError, cPickle.loads, 'I1')
+        raises(cPickle.UnpicklingError, cPickle.loads, 'z.')
+        raises(cPickle.UnpicklingError, cPickle.loads, 't.')
+        raises(cPickle.UnpicklingError, cPickle.loads, '0.')
+        raises(cPickle.BadPickleGet, cPickle.loads, 'g5\n.')
+        raises(ValueError, cPickle.loads, "S'abc\n.")
+
+    def test_file_interface(self):
+        import cPickle, StringIO
+        f = StringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        obj = [1, 'a']
+        p.dump(obj)
+        p.dump(obj)
+        cPickle.dump({'x': 1}, f)
+        f.write('trailing')
+        f.seek(0)
+        u = cPickle.Unpickler(f)
+        first = u.load()
+        second = u.load()
+        assert first == obj
+        assert second is first        # shared memo
+        assert cPickle.load(f) == {'x': 1}
+        assert f.read() == 'trailing'
+
+    def test_getvalue(self):
+        import cPickle
+        p = cPickle.Pickler(1)
+        p.dump((1, 2))
+        assert cPickle.loads(p.getvalue()) == (1, 2)
+
+    def test_memo(self):
+        import cPickle, StringIO
+        p = cPickle.Pickler(StringIO.StringIO(), 2)
+        lst = [1]
+        p.dump(lst)
+        assert p.memo == {id(lst): (1, lst)}
+        p.clear_memo()
+        assert p.memo == {}
+
+    def test_persistent(self):
+        import cPickle, StringIO
+        class Ref(object):
+            def __init__(self, name):
+                self.name = name
+        for proto in range(3):
+            f = StringIO.StringIO()
+            p = cPickle.Pickler(f, proto)
+            p.persistent_id = lambda obj: (obj.name if isinstance(obj, Ref)
+                                           else None)
+            p.dump([Ref('a'), 5, Ref('b')])
+            f.seek(0)
+            u = cPickle.Unpickler(f)
+            u.persistent_load = lambda pid: 'loaded ' + pid
+            assert u.load() == ['loaded a', 5, 'loaded b']
+            f.seek(0)
+            raises(cPickle.UnpicklingError, cPickle.load, f)
+
+    def test_find_global(self):
+        import cPickle, StringIO
+        f = StringIO.StringIO(cPickle.dumps(len))
+        u = cPickle.Unpickler(f)
+        u.find_global = lambda module, name: (module, name)
+        assert u.load() == ('__builtin__', 'len')
+        f.seek(0)
+        u = cPickle.Unpickler(f)
+        u.find_global = None
+        raises(cPickle.UnpicklingError, u.load)
+
+    def test_fast(self):
+        import cPickle, StringIO
+        f = StringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        p.fast = True
+        p.dump(['a', ('b', [])])
+        assert 'q' not in f.getvalue()
+        assert cPickle.loads(f.getvalue()) == ['a', ('b', [])]
@@ -65,6 +65,10 @@ class GcStats(object):
         self.memory_allocated_sum = self._format(self._s.total_allocated_memory + self._s.total_memory_pressure +
                                             self._s.jit_backend_allocated)
         self.total_gc_time = self._s.total_gc_time
+        for item in ('gc_pause_target', 'gc_pause_p50', 'gc_pause_p90',
+                     'gc_pause_p99', 'gc_pause_max'):
+            # in microseconds
+            setattr(self, item, getattr(self._s, item))
 
     def _format(self, v):
         if v < 1000000:
@@ -72,11 +76,18 @@ class GcStats(object):
             return "%.1fkB" % (v / 1024.)
         return "%.1fMB" % (v / 1024. / 1024.)
 
+    def _format_pause(self, v):
+        return "%.3fms" % (v / 1000.)
+
     def __repr__(self):
         if self._s.total_memory_pressure != -1:
             extra = "\n    memory pressure:    %s" % self.total_memory_pressure
         else:
             extra = ""
+        if self.gc_pause_target:
+            target = " (target: %s)" % self._format_pause(self.gc_pause_target)
+        else:
+            target = ""
         return """Total memory consumed:
     GC used:            %s (peak: %s)
        in arenas:            %s
@@ -96,6 +107,7 @@ class GcStats(object):
     Total:                   %s
 
     Total time spent in GC:  %s
+    Major collection steps:  p50 %s, p90 %s, p99 %s, max %s%s
     """ % (self.total_gc_memory, self.peak_memory,
               self.total_arena_memory,
               self.total_rawmalloced_memory,
@@ -111,7 +123,12 @@ class GcStats(object):
            self.jit_backend_allocated,
            extra,
            self.memory_allocated_sum,
-           self.total_gc_time / 1000.0)
+           self.total_gc_time / 1000.0,
+           self._format_pause(self.gc_pause_p50),
+           self._format_pause(self.gc_pause_p90),
+           self._format_pause(self.gc_pause_p99),
+           self._format_pause(self.gc_pause_max),
+           target)
 
 
 def get_stats(memory_pressure=False):
@@ -44,7 +44,8 @@ class LowLevelGcHooks(GcHooks):
         action.pinned_objects = pinned_objects
         action.fire()
 
-    def on_gc_collect_step(self, duration, oldstate, newstate):
+    def on_gc_collect_step(self, duration, oldstate, newstate,
+                           duration_p50, duration_p90, duration_p99):
         action = self.w_hooks.gc_collect_step
         action.count += 1
         action.duration += duration
@@ -52,14 +53,18 @@ class LowLevelGcHooks(GcHooks):
         action.duration_max = max(action.duration_max, duration)
         action.oldstate = oldstate
         action.newstate = newstate
+        action.duration_p50 = duration_p50
+        action.duration_p90 = duration_p90
+        action.duration_p99 = duration_p99
         action.fire()
 
     def on_gc_collect(self, num_major_collects,
                       arenas_count_before, arenas_count_after,
                       arenas_bytes, rawmalloc_bytes_before,
-                      rawmalloc_bytes_after):
+                      rawmalloc_bytes_after, sweep_duration):
         action = self.w_hooks.gc_collect
         action.count += 1
+        action.sweep_duration += sweep_duration
         action.num_major_collects = num_major_collects
         action.arenas_count_before = arenas_count_before
         action.arenas_count_after = arenas_count_after
@@ -173,6 +178,9 @@ class GcMinorHookAction(NoRecursiveAction):
 class GcCollectStepHookAction(NoRecursiveAction):
     oldstate = 0
     newstate = 0
+    duration_p50 = 0.0
+    duration_p90 = 0.0
+    duration_p99 = 0.0
 
     def __init__(self, space):
         NoRecursiveAction.__init__(self, space)
@@ -196,6 +204,9 @@ class GcCollectStepHookAction(NoRecursiveAction):
             self.duration_max = NonConstant(-53.2)
             self.oldstate = NonConstant(-42)
             self.newstate = NonConstant(-42)
+            self.duration_p50 = NonConstant(-53.2)
+            self.duration_p90 = NonConstant(-53.2)
+            self.duration_p99 = NonConstant(-53.2)
             self.fire()
 
     def _do_perform(self, ec, frame):
@@ -206,7 +217,10 @@ class GcCollectStepHookAction(NoRecursiveAction):
             self.duration_max,
             self.oldstate,
             self.newstate,
-            rgc.is_done__states(self.oldstate, self.newstate))
+            rgc.is_done__states(self.oldstate, self.newstate),
+            self.duration_p50,
+            self.duration_p90,
+            self.duration_p99)
         self.reset()
         self.space.call_function(self.w_callable, w_stats)
 
@@ -226,6 +240,7 @@ class GcCollectHookAction(NoRecursiveAction):
 
     def reset(self):
         self.count = 0
+        self.sweep_duration = 0.0
 
     def fix_annotation(self):
         # the annotation of the class and its attributes must be completed
@@ -239,6 +254,7 @@ class GcCollectHookAction(NoRecursiveAction):
             self.arenas_bytes = NonConstant(r_uint(42))
             self.rawmalloc_bytes_before = NonConstant(r_uint(42))
             self.rawmalloc_bytes_after = NonConstant(r_uint(42))
+            self.sweep_duration = NonConstant(-53.2)
             self.fire()
 
     def _do_perform(self, ec, frame):
@@ -248,7 +264,8 @@ class GcCollectHookAction(NoRecursiveAction):
                                    self.arenas_count_after,
                                    self.arenas_bytes,
                                    self.rawmalloc_bytes_before,
-                                   self.rawmalloc_bytes_after)
+                                   self.rawmalloc_bytes_after,
+                                   self.sweep_duration)
         self.reset()
         self.space.call_function(self.w_callable, w_stats)
 
@@ -284,7 +301,8 @@ class W_GcCollectStepStats(W_Root):
     GC_STATES = tuple(incminimark.GC_STATES + ['USERDEL'])
 
     def __init__(self, count, duration, duration_min, duration_max,
-                 oldstate, newstate, major_is_done):
+                 oldstate, newstate, major_is_done,
+                 duration_p50, duration_p90, duration_p99):
         self.count = count
         self.duration = duration
         self.duration_min = duration_min
@@ -292,13 +310,16 @@ class W_GcCollectStepStats(W_Root):
         self.oldstate = oldstate
         self.newstate = newstate
         self.major_is_done = major_is_done
+        self.duration_p50 = duration_p50
+        self.duration_p90 = duration_p90
+        self.duration_p99 = duration_p99
 
 
 class W_GcCollectStats(W_Root):
     def __init__(self, count, num_major_collects,
                  arenas_count_before, arenas_count_after,
                  arenas_bytes, rawmalloc_bytes_before,
-                 rawmalloc_bytes_after):
+                 rawmalloc_bytes_after, sweep_duration):
         self.count = count
         self.num_major_collects = num_major_collects
         self.arenas_count_before = arenas_count_before
@@ -306,6 +327,7 @@ class W_GcCollectStats(W_Root):
         self.arenas_bytes = arenas_bytes
         self.rawmalloc_bytes_before = rawmalloc_bytes_before
         self.rawmalloc_bytes_after = rawmalloc_bytes_after
+        self.sweep_duration = sweep_duration
 
 
 # just a shortcut to make the typedefs shorter
@@ -367,7 +389,10 @@ W_GcCollectStepStats.typedef = TypeDef(
         "duration_min",
         "duration_max",
         "oldstate",
-        "newstate"))
+        "newstate",
+        "duration_p50",
+        "duration_p90",
+        "duration_p99"))
     )
 
 W_GcCollectStats.typedef = TypeDef(
@@ -379,5 +404,6 @@ W_GcCollectStats.typedef = TypeDef(
         "arenas_count_after",
         "arenas_bytes",
         "rawmalloc_bytes_before",
-        "rawmalloc_bytes_after"))
+        "rawmalloc_bytes_after",
+        "sweep_duration"))
     )
@@ -117,7 +117,10 @@ class StepCollector(object):
             duration_max = duration,
             oldstate = oldstate,
             newstate = newstate,
-            major_is_done = major_is_done)
+            major_is_done = major_is_done,
+            duration_p50 = duration,
+            duration_p90 = duration,
+            duration_p99 = duration)
 
     def _collect_step(self):
         return rgc.collect_step()
@@ -192,6 +192,11 @@ class W_GcStats(W_Root):
         self.peak_rawmalloced_memory = rgc.get_stats(rgc.PEAK_RAWMALLOCED_MEMORY)
         self.nursery_size = rgc.get_stats(rgc.NURSERY_SIZE)
         self.total_gc_time = rgc.get_stats(rgc.TOTAL_GC_TIME)
+        self.gc_pause_target = rgc.get_stats(rgc.GC_PAUSE_TARGET)
+        self.gc_pause_p50 = rgc.get_stats(rgc.GC_PAUSE_P50)
+        self.gc_pause_p90 = rgc.get_stats(rgc.GC_PAUSE_P90)
+        self.gc_pause_p99 = rgc.get_stats(rgc.GC_PAUSE_P99)
+        self.gc_pause_max = rgc.get_stats(rgc.GC_PAUSE_MAX)
 
 W_GcStats.typedef = TypeDef("GcStats",
     total_memory_pressure=interp_attrproperty("total_memory_pressure",
@@ -220,6 +225,16 @@ W_GcStats.typedef = TypeDef("GcStats",
         cls=W_GcStats, wrapfn="newint"),
     total_gc_time=interp_attrproperty("total_gc_time",
         cls=W_GcStats, wrapfn="newint"),
+    gc_pause_target=interp_attrproperty("gc_pause_target",
+        cls=W_GcStats, wrapfn="newint"),
+    gc_pause_p50=interp_attrproperty("gc_pause_p50",
+        cls=W_GcStats, wrapfn="newint"),
+    gc_pause_p90=interp_attrproperty("gc_pause_p90",
+        cls=W_GcStats, wrapfn="newint"),
+    gc_pause_p99=interp_attrproperty("gc_pause_p99",
+        cls=W_GcStats, wrapfn="newint"),
+    gc_pause_max=interp_attrproperty("gc_pause_max",
+        cls=W_GcStats, wrapfn="newint"),
 )
 
 @unwrap_spec(memory_pressure=bool)
@@ -16,22 +16,24 @@ class AppTestGcHooks(object):
         def fire_gc_minor(space, duration, total_memory_used, pinned_objects):
             gchooks.fire_gc_minor(duration, total_memory_used, pinned_objects)
 
-        @unwrap_spec(ObjSpace, int, int, int)
-        def fire_gc_collect_step(space, duration, oldstate, newstate):
-            gchooks.fire_gc_collect_step(duration, oldstate, newstate)
+        @unwrap_spec(ObjSpace, int, int, int, float, float, float)
+        def fire_gc_collect_step(space, duration, oldstate, newstate,
+                                 p50=0.0, p90=0.0, p99=0.0):
+            gchooks.fire_gc_collect_step(duration, oldstate, newstate,
+                                         p50, p90, p99)
 
-        @unwrap_spec(ObjSpace, int, int, int, r_uint, r_uint, r_uint)
-        def fire_gc_collect(space, a, b, c, d, e, f):
-            gchooks.fire_gc_collect(a, b, c, d, e, f)
+        @unwrap_spec(ObjSpace, int, int, int, r_uint, r_uint, r_uint, float)
+        def fire_gc_collect(space, a, b, c, d, e, f, g):
+            gchooks.fire_gc_collect(a, b, c, d, e, f, g)
 
         @unwrap_spec(ObjSpace)
         def fire_many(space):
             gchooks.fire_gc_minor(5.0, 0, 0)
             gchooks.fire_gc_minor(7.0, 0, 0)
-            gchooks.fire_gc_collect_step(5.0, 0, 0)
-            gchooks.fire_gc_collect_step(15.0, 0, 0)
-            gchooks.fire_gc_collect_step(22.0, 0, 0)
-            gchooks.fire_gc_collect(1, 2, 3, 4, 5, 6)
+            gchooks.fire_gc_collect_step(5.0, 0, 0, 5.0, 5.0, 5.0)
+            gchooks.fire_gc_collect_step(15.0, 0, 0, 5.0, 15.0, 15.0)
+            gchooks.fire_gc_collect_step(22.0, 0, 0, 15.0, 22.0, 22.0)
+            gchooks.fire_gc_collect(1, 2, 3, 4, 5, 6, 0.5)
 
         cls.w_fire_gc_minor = space.wrap(interp2app(fire_gc_minor))
         cls.w_fire_gc_collect_step = space.wrap(interp2app(fire_gc_collect_step))
@@ -79,13 +81,16 @@ class AppTestGcHooks(object):
                         stats.duration,
                         stats.oldstate,
                         stats.newstate,
-                        stats.major_is_done))
+                        stats.major_is_done,
+                        stats.duration_p50,
+                        stats.duration_p90,
+                        stats.duration_p99))
         gc.hooks.on_gc_collect_step = on_gc_collect_step
-        self.fire_gc_collect_step(10, SCANNING, MARKING)
-        self.fire_gc_collect_step(40, FINALIZING, SCANNING)
+        self.fire_gc_collect_step(10, SCANNING, MARKING, 10.0, 10.0, 10.0)
+        self.fire_gc_collect_step(40, FINALIZING, SCANNING, 10.0, 40.0, 40.0)
         assert lst == [
-            (1, 10, SCANNING, MARKING, False),
-            (1, 40, FINALIZING, SCANNING, True),
+            (1, 10, SCANNING, MARKING, False, 10.0, 10.0, 10.0),
+            (1, 40, FINALIZING, SCANNING, True, 10.0, 40.0, 40.0),
             ]
         #
         gc.hooks.on_gc_collect_step = None
@@ -103,20 +108,21 @@ class AppTestGcHooks(object):
                         stats.arenas_count_after,
                         stats.arenas_bytes,
                         stats.rawmalloc_bytes_before,
-                        stats.rawmalloc_bytes_after))
+                        stats.rawmalloc_bytes_after,
+                        stats.sweep_duration))
         gc.hooks.on_gc_collect = on_gc_collect
-        self.fire_gc_collect(1, 2, 3, 4, 5, 6)
-        self.fire_gc_collect(7, 8, 9, 10, 11, 12)
+        self.fire_gc_collect(1, 2, 3, 4, 5, 6, 0.25)
+        self.fire_gc_collect(7, 8, 9, 10, 11, 12, 0.5)
         assert lst == [
-            (1, 1, 2, 3, 4, 5, 6),
-            (1, 7, 8, 9, 10, 11, 12),
+            (1, 1, 2, 3, 4, 5, 6, 0.25),
+            (1, 7, 8, 9, 10, 11, 12, 0.5),
             ]
         #
         gc.hooks.on_gc_collect = None
-        self.fire_gc_collect(42, 42, 42, 42, 42, 42)  # won't fire
+        self.fire_gc_collect(42, 42, 42, 42, 42, 42, 42.0)  # won't fire
         assert lst == [
-            (1, 1, 2, 3, 4, 5, 6),
-            (1, 7, 8, 9, 10, 11, 12),
+            (1, 1, 2, 3, 4, 5, 6, 0.25),
+            (1, 7, 8, 9, 10, 11, 12, 0.5),
             ]
 
     def test_consts(self):
@@ -143,7 +149,8 @@ class AppTestGcHooks(object):
 
             def on_gc_collect_step(self, stats):
                 self.steps.append((stats.count, stats.duration,
-                                   stats.duration_min, stats.duration_max))
+                                   stats.duration_min, stats.duration_max,
+                                   stats.duration_p50, stats.duration_p99))
 
             on_gc_collect = None
 
@@ -151,7 +158,8 @@ class AppTestGcHooks(object):
         gc.hooks.set(myhooks)
         self.fire_many()
         assert myhooks.minors == [(2, 12, 5, 7)]
-        assert myhooks.steps == [(3, 42, 5, 22)]
+        # the percentiles are the ones reported by the last step
+        assert myhooks.steps == [(3, 42, 5, 22, 15.0, 22.0)]
 
     def test_clear_queue(self):
         import gc
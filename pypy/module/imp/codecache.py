@@ -0,0 +1,395 @@
+"""
+A consolidated cache of the code objects of all the modules imported by an
+application, enabled by setting the environment variable PYPY_CODE_CACHE to
+the name of the cache file.
+
+The cache file is memory-mapped, and code objects are read from it only
+when they are needed: importing a module whose source file did not change
+creates its code object with only the header fields (name, arguments,
+flags, ...) filled in.  The rest (co_code, co_consts, co_names and
+co_lnotab) is unmarshalled the first time a frame is created for the code
+object, or when it is inspected (see PyCode.ensure_loaded()).  So the body
+of a function that is never called is never unmarshalled, and neither the
+.py nor the .pyc files are read.
+
+The modules that are missing from the cache, or whose source changed, are
+imported as usual and added to the cache when the process exits.  The new
+cache file is written next to the old one and renamed over it, so several
+processes can use the same cache; the last one to exit wins.
+
+Layout of the file (the integers are little-endian 32-bit):
+
+    CACHE_MAGIC, pyc magic, offset of the index
+    a record for every module
+    the index: marshalled tuple of (pathname, mtime, size, start, offset)
+
+A module record is made of marshalled tuples, one for the header and one
+for the body of every code object, in which the position of the other
+tuples are given as offsets from the start of the record: a header tuple
+contains the offset of its body, and a body tuple contains the index in
+co_consts and the offset of the header of every nested code object.  The
+index gives the position of the start of the record and the offset of the
+header of the module's code object.
+"""
+
+import os
+
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.pycode import PyCode, LazyCodeBody, unpack_text_tuple
+from pypy.module.marshal.interp_marshal import (
+    Unmarshaller, StringMarshaller)
+from rpython.rlib import rmmap
+
+CACHE_MAGIC = 'PyPyCC01'
+HEADER_SIZE = len(CACHE_MAGIC) + 8
+MARSHAL_VERSION = 2
+MAX_FILE_SIZE = 0x7fffffff
+
+O_BINARY = getattr(os, 'O_BINARY', 0)
+
+
+class MMapUnmarshaller(Unmarshaller):
+    """Unmarshaller reading directly from a memory-mapped file."""
+
+    def __init__(self, space, mmap, pos):
+        Unmarshaller.__init__(self, space, None)
+        self.mmap = mmap
+        self.bufpos = pos
+        self.limit = mmap.size
+
+    def raise_eof(self):
+        self.raise_exc("truncated code cache")
+
+    def get(self, n):
+        assert n >= 0
+        pos = self.bufpos
+        newpos = pos + n
+        if newpos > self.limit:
+            self.raise_eof()
+        self.bufpos = newpos
+        return self.mmap.getslice(pos, n)
+
+    def get1(self):
+        pos = self.bufpos
+        if pos >= self.limit:
+            self.raise_eof()
+        self.bufpos = pos + 1
+        return self.mmap.data[pos]
+
+
+class CacheEntry(object):
+    def __init__(self, mtime, size, start, offset):
+        self.mtime = mtime
+        self.size = size
+        self.start = start
+        self.offset = offset
+
+
+class CachedCodeBody(LazyCodeBody):
+    def __init__(self, cache, base, offset):
+        self.cache = cache
+        self.base = base
+        self.offset = offset
+
+    def load(self, code):
+        return self.cache.load_body(code, self.base, self.offset)
+
+
+class CodeCache(object):
+
+    def __init__(self, space, filename):
+        self.space = space
+        self.filename = filename
+        self.mmap = None
+        self.index = {}      # {pathname: CacheEntry}
+        self.data_end = HEADER_SIZE
+        self.pending = []    # [(pathname, CacheEntry, module record)]
+
+    def open(self):
+        """Map the cache file, if it exists and is valid."""
+        space = self.space
+        try:
+            fd = os.open(self.filename, os.O_RDONLY | O_BINARY, 0)
+        except OSError:
+            return
+        try:
+            try:
+                mmap = rmmap.mmap(fd, 0, access=rmmap.ACCESS_READ)
+            except (rmmap.RMMapError, OSError):
+                return
+        finally:
+            os.close(fd)
+        if (mmap.size < HEADER_SIZE or
+                mmap.getslice(0, len(CACHE_MAGIC)) != CACHE_MAGIC or
+                _get_int(mmap, len(CACHE_MAGIC)) != get_pyc_magic(space)):
+            mmap.close()
+            return
+        index_offset = _get_int(mmap, len(CACHE_MAGIC) + 4)
+        index = {}
+        try:
+            if not HEADER_SIZE <= index_offset <= mmap.size:
+                raise oefmt(space.w_ValueError, "invalid code cache")
+            w_index = MMapUnmarshaller(space, mmap, index_offset).load_w_obj()
+            for w_entry in space.fixedview(w_index):
+                w_path, w_mtime, w_size, w_start, w_offset = (
+                    space.fixedview(w_entry, 5))
+                index[space.text_w(w_path)] = CacheEntry(
+                    space.int_w(w_mtime), space.int_w(w_size),
+                    space.int_w(w_start), space.int_w(w_offset))
+        except OperationError as e:
+            if e.async(space):
+                raise
+            mmap.close()
+            return
+        self.mmap = mmap
+        self.index = index
+        self.data_end = index_offset
+
+    def lookup(self, pathname, mtime, size):
+        """Return the code object of the module 'pathname' with only its
+        header loaded, or None if it is not in the cache or outdated."""
+        entry = self.index.get(pathname, None)
+        if entry is None or entry.mtime != mtime or entry.size != size:
+            return None
+        try:
+            return self.load_code(entry.start, entry.offset)
+        except OperationError as e:
+            if e.async(self.space):
+                raise
+            return None
+
+    def load_code(self, base, offset):
+        space = self.space
+        w_header = self._load(base + offset)
+        (w_argcount, w_nlocals, w_stacksize, w_flags, w_varnames,
+         w_freevars, w_cellvars, w_filename, w_name, w_firstlineno,
+         w_body) = space.fixedview(w_header, 11)
+        code = PyCode(space, space.int_w(w_argcount),
+                      space.int_w(w_nlocals),
+                      space.int_w(w_stacksize),
+                      space.int_w(w_flags),
+                      '', [], [],
+                      unpack_text_tuple(space, w_varnames),
+                      space.text_w(w_filename),
+                      space.text_w(w_name),
+                      space.int_w(w_firstlineno),
+                      '',
+                      unpack_text_tuple(space, w_freevars),
+                      unpack_text_tuple(space, w_cellvars))
+        code.lazy_body = CachedCodeBody(self, base, space.int_w(w_body))
+        return code
+
+    def load_body(self, code, base, offset):
+        space = self.space
+        w_body = self._load(base + offset)
+        w_code, w_consts, w_names, w_lnotab, w_children = space.fixedview(
+            w_body, 5)
+        consts_w = space.fixedview(w_consts)[:]
+        children_w = space.fixedview(w_children)
+        for i in range(0, len(children_w) - 1, 2):
+            child = self.load_code(base, space.int_w(children_w[i + 1]))
+            child.co_filename = code.co_filename
+            consts_w[space.int_w(children_w[i])] = child
+        return (space.bytes_w(w_code), consts_w,
+                unpack_text_tuple(space, w_names), space.bytes_w(w_lnotab))
+
+    def _load(self, pos):
+        if self.mmap is None:
+            raise oefmt(self.space.w_ValueError, "invalid code cache")
+        return MMapUnmarshaller(self.space, self.mmap, pos).load_w_obj()
+
+    # ____________________________________________________________
+    # writing
+
+    def add(self, pathname, mtime, size, code):
+        """Record the code object of the module 'pathname', to be written
+        to the cache file at exit.  Must be called before the code object
+        is modified in any way (e.g. by remove_docstrings())."""
+        if not isinstance(code, PyCode):
+            return
+        writer = RecordWriter(self.space)
+        try:
+            offset = writer.write_code(code)
+        except OperationError as e:
+            if e.async(self.space):
+                raise
+            return
+        self.pending.append((pathname, CacheEntry(mtime, size, 0, offset),
+                             writer.getvalue()))
+
+    def write(self):
+        """Write a new cache file, with the modules added since it was
+        opened.  The records of the modules that were added again, e.g.
+        because their source changed, are dropped from the new file."""
+        if not self.pending:
+            return
+        space = self.space
+        replaced = {}    # {pathname: index in self.pending of the last}
+        for i in range(len(self.pending)):
+            replaced[self.pending[i][0]] = i
+        # the end of a record is the start of the next one
+        starts = [entry.start for entry in self.index.values()]
+        starts.sort()
+        ends = {}
+        for i in range(len(starts)):
+            if i + 1 < len(starts):
+                ends[starts[i]] = starts[i + 1]
+            else:
+                ends[starts[i]] = self.data_end
+        chunks = []
+        pos = HEADER_SIZE
+        index = {}
+        for pathname, entry in self.index.items():
+            if pathname in replaced:
+                continue
+            length = ends[entry.start] - entry.start
+            index[pathname] = CacheEntry(entry.mtime, entry.size, pos,
+                                         entry.offset)
+            chunks.append(self.mmap.getslice(entry.start, length))
+            pos += length
+        for i in range(len(self.pending)):
+            pathname, entry, record = self.pending[i]
+            if replaced[pathname] != i:
+                continue
+            index[pathname] = CacheEntry(entry.mtime, entry.size, pos,
+                                         entry.offset)
+            chunks.append(record)
+            pos += len(record)
+        self.pending = []
+        entries_w = [space.newtuple([space.newtext(pathname),
+                                     space.newint(entry.mtime),
+                                     space.newint(entry.size),
+                                     space.newint(entry.start),
+                                     space.newint(entry.offset)])
+                     for pathname, entry in index.items()]
+        m = StringMarshaller(space, MARSHAL_VERSION)
+        m.dump_w_obj(space.newtuple(entries_w))
+        chunks.append(m.get_value())
+        if pos > MAX_FILE_SIZE:
+            return
+        header = CACHE_MAGIC + _int_to_str(get_pyc_magic(space)) + \
+                 _int_to_str(pos)
+        tmpname = '%s.%d' % (self.filename, os.getpid())
+        try:
+            fd = os.open(tmpname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC |
+                                  O_BINARY, 0666)
+        except OSError:
+            return
+        try:
+            try:
+                _write_all(fd, header)
+                for chunk in chunks:
+                    _write_all(fd, chunk)
+            finally:
+                os.close(fd)
+            if os.name == 'nt' and os.path.exists(self.filename):
+                os.unlink(self.filename)
+            os.rename(tmpname, self.filename)
+        except OSError:
+            try:
+                os.unlink(tmpname)
+            except OSError:
+                pass
+
+
+class RecordWriter(object):
+    """Builds the record of a module, see the module docstring."""
+
+    def __init__(self, space):
+        self.space = space
+        self.chunks = []
+        self.pos = 0
+
+    def write_code(self, code):
+        """Write the body and then the header of 'code' and of all the
+        code objects it contains; returns the offset of the header."""
+        space = self.space
+        code.ensure_loaded()
+        consts_w = code.co_consts_w[:]
+        children_w = []
+        for i in range(len(consts_w)):
+            w_const = consts_w[i]
+            if isinstance(w_const, PyCode):
+                children_w.append(space.newint(i))
+                children_w.append(space.newint(self.write_code(w_const)))
+                consts_w[i] = space.w_None
+        body = self.write(space.newtuple([
+            space.newbytes(code.co_code),
+            space.newtuple(consts_w),
+            space.newtuple(code.co_names_w[:]),
+            space.newbytes(code.co_lnotab),
+            space.newtuple(children_w[:])]))
+        return self.write(space.newtuple([
+            space.newint(code.co_argcount),
+            space.newint(code.co_nlocals),
+            space.newint(code.co_stacksize),
+            space.newint(code.co_flags),
+            _newtexttuple(space, code.co_varnames),
+            _newtexttuple(space, code.co_freevars),
+            _newtexttuple(space, code.co_cellvars),
+            space.newtext(code.co_filename),
+            space.newtext(code.co_name),
+            space.newint(code.co_firstlineno),
+            space.newint(body)]))
+
+    def write(self, w_obj):
+        m = StringMarshaller(self.space, MARSHAL_VERSION)
+        m.dump_w_obj(w_obj)
+        data = m.get_value()
+        offset = self.pos
+        self.chunks.append(data)
+        self.pos += len(data)
+        return offset
+
+    def getvalue(self):
+        return ''.join(self.chunks)
+
+
+def _newtexttuple(space, names):
+    return space.newtuple([space.newtext(name) for name in names])
+
+def _get_int(mmap, pos):
+    from pypy.module.imp.importing import _get_long
+    return _get_long(mmap.getslice(pos, 4))
+
+def get_pyc_magic(space):
+    from pypy.module.imp.importing import get_pyc_magic
+    return get_pyc_magic(space)
+
+def _int_to_str(x):
+    return (chr(x & 0xff) + chr((x >> 8) & 0xff) + chr((x >> 16) & 0xff) +
+            chr((x >> 24) & 0xff))
+
+def _write_all(fd, data):
+    while data:
+        count = os.write(fd, data)
+        data = data[count:]
+
+# ____________________________________________________________
+
+class CodeCacheState(object):
+    def __init__(self, space):
+        self._cleanup_()
+
+    def _cleanup_(self):
+        self.checked = False
+        self.cache = None
+
+def get_code_cache(space):
+    """Return the CodeCache named by PYPY_CODE_CACHE, or None."""
+    state = space.fromcache(CodeCacheState)
+    if not state.checked:
+        state.checked = True
+        filename = os.environ.get('PYPY_CODE_CACHE')
+        if filename:
+            state.cache = CodeCache(space, filename)
+            state.cache.open()
+            # make sure that the 'imp' module is started, so that its
+            # shutdown() writes the new cache file
+            space.getbuiltinmodule('imp')
+    return state.cache
+
+def write_code_cache(space):
+    state = space.fromcache(CodeCacheState)
+    if state.cache is not None:
+        state.cache.write()
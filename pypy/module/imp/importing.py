@@ -12,6 +12,7 @@ from pypy.interpreter.baseobjspace import W_Root, CannotHaveLock
 from pypy.interpreter.eval import Code
 from pypy.interpreter.pycode import PyCode
 from pypy.interpreter.streamutil import wrap_streamerror
+from pypy.module.imp import codecache
 from rpython.rlib import streamio, jit
 from rpython.rlib.streamio import StreamErrors
 from rpython.rlib.objectmodel import we_are_translated, specialize
@@ -661,8 +662,9 @@ def load_module(space, w_modulename, find_info, reuse=False):
             if find_info.modtype == PY_SOURCE:
                 return load_source_module(
                     space, w_modulename, w_mod,
-                    find_info.filename, _wrap_readall(space, find_info.stream),
-                    find_info.stream.try_to_find_file_descriptor())
+                    find_info.filename, None,
+                    find_info.stream.try_to_find_file_descriptor(),
+                    stream=find_info.stream)
             elif find_info.modtype == PY_COMPILED:
                 magic = _wrap_r_long(space, find_info.stream)
                 timestamp = _wrap_r_long(space, find_info.stream)
@@ -915,10 +917,11 @@ def exec_code_module(space, w_mod, code_w, w_modulename, check_afterwards=True):
 
 @jit.dont_look_inside
 def load_source_module(space, w_modulename, w_mod, pathname, source, fd,
-                       write_pyc=True, check_afterwards=True):
+                       write_pyc=True, check_afterwards=True, stream=None):
     """
     Load a source module from a given file.  Returns the result
-    of sys.modules[modulename], which must exist.
+    of sys.modules[modulename], which must exist.  If 'source' is None,
+    it is read from 'stream' only if needed.
     """
 
     log_pyverbose(space, 1, "import %s # from %s\n" %
@@ -931,22 +934,38 @@ def load_source_module(space, w_modulename, w_mod, pathname, source, fd,
     cpathname = pathname + 'c'
     mtime = int(src_stat[stat.ST_MTIME])
     mode = src_stat[stat.ST_MODE]
-    stream = check_compiled_module(space, cpathname, mtime)
-
-    if stream:
+    size = int(src_stat[stat.ST_SIZE])
+    code_cache = codecache.get_code_cache(space)
+    code_w = None
+    pycstream = None
+    if code_cache is not None:
+        code_w = code_cache.lookup(pathname, mtime, size)
+    if code_w is None:
+        pycstream = check_compiled_module(space, cpathname, mtime)
+
+    if code_w is not None:
+        # found in the code cache: the bodies are loaded lazily
+        pass
+    elif pycstream:
         # existing and up-to-date .pyc file
         try:
             code_w = read_compiled_module(space, cpathname,
-                                          _wrap_readall(space, stream))
+                                          _wrap_readall(space, pycstream))
         finally:
-            _close_ignore(stream)
+            _close_ignore(pycstream)
         space.setattr(w_mod, space.newtext('__file__'), space.newtext(cpathname))
+        if code_cache is not None:
+            code_cache.add(pathname, mtime, size, code_w)
     else:
+        if source is None:
+            source = _wrap_readall(space, stream)
         code_w = parse_source_module(space, pathname, source)
 
         if write_pyc:
             if not space.is_true(space.sys.get('dont_write_bytecode')):
                 write_compiled_module(space, code_w, cpathname, mode, mtime)
+        if code_cache is not None:
+            code_cache.add(pathname, mtime, size, code_w)
 
     try:
         optimize = space.sys.get_flag('optimize')
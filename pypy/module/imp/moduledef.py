@@ -50,3 +50,7 @@ class Module(MixedModule):
         add_fork_hook('parent', interp_imp.release_lock)
         add_fork_hook('child', interp_imp.reinit_lock)
 
+    def shutdown(self, space):
+        from pypy.module.imp import codecache
+        codecache.write_code_cache(space)
+
@@ -0,0 +1,161 @@
+import os
+from pypy.interpreter.pycode import PyCode
+from pypy.interpreter.function import Function
+from pypy.module.imp import importing
+from pypy.module.imp.codecache import CodeCache, CodeCacheState
+from rpython.tool.udir import udir
+
+SOURCE = '''
+"module doc"
+def f(x):
+    "f doc"
+    def g(y):
+        return x + y
+    return g(10)
+
+class A(object):
+    "A doc"
+    def meth(self):
+        return f(5)
+
+unused = lambda: 42
+'''
+
+
+class TestCodeCache:
+
+    def setup_method(self, meth):
+        self.filename = str(udir.join('codecache_' + meth.__name__))
+        self.pathname = str(udir.join('codecache_mod.py'))
+
+    def make_cache(self, **sources):
+        space = self.space
+        cache = CodeCache(space, self.filename)
+        cache.open()
+        for name, source in sources.items():
+            code = importing.parse_source_module(space, name, source)
+            cache.add(name, 1234, len(source), code)
+        cache.write()
+        cache = CodeCache(space, self.filename)
+        cache.open()
+        return cache
+
+    def run(self, code):
+        space = self.space
+        w_dict = space.newdict()
+        code.exec_code(space, w_dict, w_dict)
+        return w_dict
+
+    def test_lazy_loading(self):
+        space = self.space
+        cache = self.make_cache(mod=SOURCE)
+        assert cache.lookup('mod', 1234, len(SOURCE) + 1) is None
+        assert cache.lookup('mod', 1235, len(SOURCE)) is None
+        assert cache.lookup('other', 1234, len(SOURCE)) is None
+        code = cache.lookup('mod', 1234, len(SOURCE))
+        assert code.lazy_body is not None
+        assert code.co_code == ''
+        w_dict = self.run(code)
+        assert code.lazy_body is None
+        #
+        w_f = space.getitem(w_dict, space.wrap('f'))
+        f = space.interp_w(Function, w_f)
+        assert f.code.lazy_body is not None
+        assert f.code.co_name == 'f'
+        assert f.code.co_filename == 'mod'
+        assert space.int_w(space.call_function(w_f, space.wrap(3))) == 13
+        assert f.code.lazy_body is None
+        #
+        w_unused = space.getitem(w_dict, space.wrap('unused'))
+        unused = space.interp_w(Function, w_unused)
+        assert unused.code.lazy_body is not None
+        #
+        w_A = space.getitem(w_dict, space.wrap('A'))
+        w_res = space.call_method(space.call_function(w_A), 'meth')
+        assert space.int_w(w_res) == 15
+        #
+        original = importing.parse_source_module(space, 'mod', SOURCE)
+        code = cache.lookup('mod', 1234, len(SOURCE))
+        assert space.is_true(space.eq(code, original))
+        assert code.lazy_body is None
+
+    def test_inspect_lazy_code(self):
+        space = self.space
+        cache = self.make_cache(mod=SOURCE)
+        w_dict = self.run(cache.lookup('mod', 1234, len(SOURCE)))
+        w_res = space.appexec([w_dict], """(d):
+            f = d['f']
+            return (f.__doc__, len(f.__code__.co_code) > 0,
+                    f.__code__.co_consts[0], f.__code__.co_lnotab != '')
+        """)
+        assert space.unwrap(w_res) == ('f doc', True, 'f doc', True)
+
+    def test_remove_docstrings(self):
+        space = self.space
+        cache = self.make_cache(mod=SOURCE)
+        code = cache.lookup('mod', 1234, len(SOURCE))
+        code.remove_docstrings(space)
+        w_dict = self.run(code)
+        w_res = space.appexec([w_dict], """(d):
+            return d['__doc__'], d['f'].__doc__, d['A'].__doc__
+        """)
+        assert space.unwrap(w_res) == (None, None, None)
+
+    def test_add_modules(self):
+        space = self.space
+        self.make_cache(mod1="x = 1")
+        cache = self.make_cache(mod2="x = 2", mod1="x = 'one'")
+        for name, source, value in [('mod1', "x = 'one'", 'one'),
+                                    ('mod2', "x = 2", 2)]:
+            w_dict = self.run(cache.lookup(name, 1234, len(source)))
+            assert space.unwrap(space.getitem(w_dict, space.wrap('x'))) == value
+
+    def test_replaced_modules_are_dropped(self):
+        space = self.space
+        self.make_cache(mod1=SOURCE, mod2="x = 2")
+        size = os.path.getsize(self.filename)
+        for i in range(5):
+            source = SOURCE.replace('42', str(50 + i))
+            cache = self.make_cache(mod1=source)
+            assert os.path.getsize(self.filename) == size
+        w_dict = self.run(cache.lookup('mod2', 1234, len("x = 2")))
+        assert space.unwrap(space.getitem(w_dict, space.wrap('x'))) == 2
+        w_dict = self.run(cache.lookup('mod1', 1234, len(SOURCE)))
+        w_res = space.call_function(space.getitem(w_dict,
+                                                  space.wrap('unused')))
+        assert space.int_w(w_res) == 54
+
+    def test_invalid_file(self):
+        for data in ['', 'garbage', 'PyPyCC01' + '\x00' * 100]:
+            with open(self.filename, 'wb') as f:
+                f.write(data)
+            cache = CodeCache(self.space, self.filename)
+            cache.open()
+            assert cache.index == {}
+            assert cache.lookup('mod', 1234, 0) is None
+
+    def test_import(self):
+        space = self.space
+        pkgdir = udir.ensure('codecache_import', dir=1)
+        pkgdir.join('codecachemod.py').write(SOURCE)
+        state = space.fromcache(CodeCacheState)
+        for i in range(2):
+            state.checked = True
+            state.cache = CodeCache(space, self.filename)
+            state.cache.open()
+            try:
+                w_res = space.appexec([space.wrap(str(pkgdir))], """(path):
+                    import sys
+                    sys.path.insert(0, path)
+                    try:
+                        import codecachemod
+                        del sys.modules['codecachemod']
+                    finally:
+                        sys.path.pop(0)
+                    return codecachemod.f(1), codecachemod.__doc__
+                """)
+                assert space.unwrap(w_res) == (11, 'module doc')
+                assert len(state.cache.pending) == 1 - i
+                state.cache.write()
+            finally:
+                state._cleanup_()
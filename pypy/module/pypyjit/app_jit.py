@@ -0,0 +1,53 @@
+"""
+Plain Python helpers of the pypyjit module.
+"""
+
+# the flag of the running compiler thread, see start_compiler_thread()
+_compiler_running = None
+
+def start_compiler_thread(max_pending=100, interval=0.001):
+    """start_compiler_thread(max_pending=100, interval=0.001)
+
+    Defer the compilation of the loops traced from the interpreter, by
+    setting the JIT parameter 'deferred_compile' to 'max_pending', and
+    start a thread that compiles them with compile_pending(), one loop at a
+    time.  When there is none, the thread sleeps 'interval' seconds, and
+    twice as long every time it finds none again, up to 64 times
+    'interval'.  The thread that traced a loop continues in the interpreter
+    instead of waiting for the optimizer and the backend.  The compilation
+    still needs the GIL, so it only runs while the other threads release
+    it, e.g. in I/O.  If the thread is already running, only
+    'deferred_compile' is changed.  See stop_compiler_thread().
+    """
+    global _compiler_running
+    import pypyjit, thread, time
+    pypyjit.set_param(deferred_compile=max_pending)
+    if _compiler_running is not None:
+        return
+    running = [True]
+    def compiler():
+        delay = interval
+        while running[0]:
+            if pypyjit.compile_pending(1):
+                delay = interval
+            else:
+                time.sleep(delay)
+                delay = min(delay * 2, interval * 64)
+    thread.start_new_thread(compiler, ())
+    _compiler_running = running
+
+def stop_compiler_thread():
+    """stop_compiler_thread()
+
+    Stop deferring the compilation of loops, by setting the JIT parameter
+    'deferred_compile' to 0, compile the loops that are still waiting in
+    this thread, and make the thread started by start_compiler_thread()
+    exit.
+    """
+    global _compiler_running
+    import pypyjit
+    pypyjit.set_param(deferred_compile=0)
+    if _compiler_running is not None:
+        _compiler_running[0] = False
+        _compiler_running = None
+    pypyjit.compile_pending()
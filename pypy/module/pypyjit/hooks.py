@@ -4,7 +4,8 @@ from rpython.rlib.jit import JitHookInterface, Counters
 
 from pypy.interpreter.error import OperationError
 from pypy.module.pypyjit.interp_resop import (Cache, wrap_greenkey,
-    WrappedOp, W_JitLoopInfo, wrap_oplist)
+    unwrap_greenkey, WrappedOp, W_JitLoopInfo, wrap_oplist)
+from pypy.module.pypyjit.jitcache import get_jit_cache
 
 class PyPyJitIface(JitHookInterface):
     def are_hooks_enabled(self):
@@ -12,7 +13,14 @@ class PyPyJitIface(JitHookInterface):
         cache = space.fromcache(Cache)
         return (cache.w_compile_hook is not None or
                 cache.w_abort_hook is not None or
-                cache.w_trace_too_long_hook is not None)
+                cache.w_trace_too_long_hook is not None or
+                get_jit_cache(space) is not None)
+
+    def on_trace_start(self, jitdriver, greenkey, greenkey_repr):
+        jit_cache = get_jit_cache(self.space)
+        if jit_cache is not None and jitdriver.name == 'pypyjit':
+            pycode, next_instr, is_being_profiled = unwrap_greenkey(greenkey)
+            jit_cache.record(pycode, next_instr, is_being_profiled)
 
 
     def on_abort(self, reason, jitdriver, greenkey, greenkey_repr, logops, operations):
@@ -250,6 +250,17 @@ def releaseall(space):
     """
     jit_hooks.stats_memmgr_release_all(None)
 
+@dont_look_inside
+@unwrap_spec(max_count=int)
+def compile_pending(space, max_count=-1):
+    """ Compile the loops that were traced but not compiled yet, because the
+    JIT parameter 'deferred_compile' is set, oldest first; at most
+    'max_count' of them if it is not negative.  Returns the number of loops
+    that were taken out of the queue.  See start_compiler_thread().
+    """
+    count = jit_hooks.stats_compile_deferred_loops(None, max_count)
+    return space.newint(count)
+
 # class Cache(object):
 #     in_recursion = False
 
@@ -30,16 +30,22 @@ class Cache(object):
         self.no += 1
         return self.no - 1
 
+def unwrap_greenkey(greenkey):
+    """Return (pycode, next_instr, is_being_profiled) for the boxes of a
+    greenkey of the 'pypyjit' jitdriver."""
+    next_instr = greenkey[0].getint()
+    is_being_profiled = greenkey[1].getint()
+    ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT),
+                                     greenkey[2].getref_base())
+    pycode = cast_base_ptr_to_instance(PyCode, ll_code)
+    return pycode, next_instr, is_being_profiled
+
 def wrap_greenkey(space, jitdriver, greenkey, greenkey_repr):
     if greenkey is None:
         return space.w_None
     jitdriver_name = jitdriver.name
     if jitdriver_name == 'pypyjit':
-        next_instr = greenkey[0].getint()
-        is_being_profiled = greenkey[1].getint()
-        ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT),
-                                         greenkey[2].getref_base())
-        pycode = cast_base_ptr_to_instance(PyCode, ll_code)
+        pycode, next_instr, is_being_profiled = unwrap_greenkey(greenkey)
         return space.newtuple([pycode, space.newint(next_instr),
                                space.newbool(bool(is_being_profiled))])
     else:
@@ -397,6 +403,18 @@ def get_stats_asmmemmgr(space):
     m2 = jit_hooks.stats_asmmemmgr_used(None)
     return space.newtuple([space.newint(m1), space.newint(m2)])
 
+def get_stats_code_cache(space):
+    """Returns a tuple (code_size, evicted_loops, recompiled_loops): the
+    size in bytes of the machine code and resume data of the loops kept
+    alive by the JIT, the number of loops that were freed because of the
+    'code_budget' JIT parameter, and how many of them were compiled again
+    afterwards."""
+    m1 = jit_hooks.stats_memmgr_code_size(None)
+    m2 = jit_hooks.stats_memmgr_evicted_loops(None)
+    m3 = jit_hooks.stats_memmgr_recompiled_loops(None)
+    return space.newtuple([space.newint(m1), space.newint(m2),
+                           space.newint(m3)])
+
 def enable_debug(space):
     """ Set the jit debugging - completely necessary for some stats to work,
     most notably assembler counters.
@@ -0,0 +1,281 @@
+"""
+A cache of the places where the JIT started tracing, enabled by setting
+the environment variable PYPY_JIT_CACHE to the name of the cache file, or
+by calling pypyjit.set_jit_cache().
+
+When the process exits, the greenkeys where the JIT started tracing from
+the interpreter, because a loop reached the 'threshold' or a function
+reached the 'function_threshold', are written to the cache file, together
+with the identity of their code object: its co_filename, co_name,
+co_firstlineno and a checksum of its other header fields (see
+code_checksum()).  In the following runs, every code object that is
+created with the same identity gets its greenkeys marked with
+jit_hooks.trace_asap(), so that the JIT starts tracing the first time they
+are reached, instead of counting up to the thresholds first.
+
+This is only a warm-start hint.  The traces and the machine code are not
+stored: they contain the addresses of prebuilt and of run-time objects,
+and descrs, which are only meaningful inside the process that created
+them.  Tracing and optimizing still happen, but without the warmup of the
+counters.  A wrong entry costs at most one useless trace.
+
+The file is a text file, with one line per code object:
+
+    checksum, co_firstlineno, co_name, co_filename, greenkeys
+
+separated by tabs, where every greenkey is 'next_instr:is_being_profiled'
+and the greenkeys are separated by commas.  By default, the entries of the
+file are merged with the greenkeys of the current process, and the new
+file is written next to the old one and renamed over it; the last process
+to exit wins.  With set_jit_cache(filename, update=False), the file is
+only read, which makes the warmup of a given workload reproducible, e.g.
+with a file recorded on a representative run.
+"""
+
+import os
+
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.interpreter.pycode import CodeHookCache
+from rpython.rlib import jit, jit_hooks, rmd5
+from rpython.rlib.rarithmetic import r_uint
+from rpython.rlib.rstring import StringBuilder
+from rpython.rtyper.annlowlevel import cast_instance_to_gcref
+
+CACHE_MAGIC = 'PyPyJC02'
+MAX_FILE_SIZE = 16 * 1024 * 1024
+
+O_BINARY = getattr(os, 'O_BINARY', 0)
+
+
+def code_key(code):
+    return '%s\t%s\t%d' % (code.co_filename, code.co_name,
+                           code.co_firstlineno)
+
+def code_checksum(code):
+    # only the header fields: the body of a code object coming from the
+    # code cache (pypy.module.imp.codecache) is not loaded yet when it is
+    # created, and must not be loaded just for this
+    data = '%d %d %d %d %s %s %s' % (code.co_argcount, code.co_nlocals,
+                                     code.co_stacksize, code.co_flags,
+                                     ','.join(code.co_varnames),
+                                     ','.join(code.co_freevars),
+                                     ','.join(code.co_cellvars))
+    return rmd5.RMD5(data).hexdigest()
+
+
+class CodeEntry(object):
+    """The greenkeys where tracing started in one code object."""
+
+    def __init__(self, checksum):
+        self.checksum = checksum
+        self.greenkeys = []    # list of (next_instr, is_being_profiled)
+        self.matched = False   # a code object of this run has this checksum
+
+    def add(self, next_instr, is_being_profiled):
+        for greenkey in self.greenkeys:
+            if greenkey == (next_instr, is_being_profiled):
+                return
+        self.greenkeys.append((next_instr, is_being_profiled))
+
+
+class JitCache(object):
+
+    def __init__(self, space, filename, update=True):
+        self.space = space
+        self.filename = filename
+        self.update = update     # write the file when the process exits
+        # code_key() -> list of CodeEntry; several code objects can have the
+        # same key, e.g. two lambdas on the same line
+        self.entries = {}
+        # the code keys seen in this run, see write()
+        self.seen_keys = {}
+
+    def lookup(self, key, checksum):
+        entries = self.entries.get(key, None)
+        if entries is not None:
+            for entry in entries:
+                if entry.checksum == checksum:
+                    return entry
+        return None
+
+    def _add_entry(self, key, checksum):
+        entry = CodeEntry(checksum)
+        if key in self.entries:
+            self.entries[key].append(entry)
+        else:
+            self.entries[key] = [entry]
+        return entry
+
+    def load(self):
+        """Read the cache file.  Lines that cannot be parsed are ignored,
+        and so is the whole file if it does not start with CACHE_MAGIC."""
+        try:
+            fd = os.open(self.filename, os.O_RDONLY | O_BINARY, 0)
+        except OSError:
+            return
+        try:
+            data = _read_all(fd)
+        finally:
+            os.close(fd)
+        lines = data.split('\n')
+        if lines[0] != CACHE_MAGIC:
+            return
+        for line in lines[1:]:
+            fields = line.split('\t')
+            if len(fields) != 5:
+                continue
+            try:
+                firstlineno = int(fields[1])
+                greenkeys = []
+                for greenkey in fields[4].split(','):
+                    parts = greenkey.split(':')
+                    if len(parts) != 2:
+                        raise ValueError
+                    is_being_profiled = int(parts[1])
+                    if is_being_profiled != 0 and is_being_profiled != 1:
+                        raise ValueError
+                    greenkeys.append((int(parts[0]), is_being_profiled))
+            except ValueError:
+                continue
+            key = '%s\t%s\t%d' % (fields[3], fields[2], firstlineno)
+            entry = self.lookup(key, fields[0])
+            if entry is None:
+                entry = self._add_entry(key, fields[0])
+            for next_instr, is_being_profiled in greenkeys:
+                entry.add(next_instr, is_being_profiled)
+
+    @jit.dont_look_inside
+    def new_code(self, code):
+        """Called for every new code object."""
+        key = code_key(code)
+        if key not in self.entries:
+            return
+        self.seen_keys[key] = None
+        entry = self.lookup(key, code_checksum(code))
+        if entry is None:
+            return
+        entry.matched = True
+        for next_instr, is_being_profiled in entry.greenkeys:
+            # not checked against len(co_code), which is not loaded yet
+            # for the code objects from the code cache; marking a greenkey
+            # that is never reached is harmless
+            if next_instr >= 0:
+                self.trace_asap(code, next_instr, is_being_profiled)
+
+    def trace_asap(self, code, next_instr, is_being_profiled):
+        jit_hooks.trace_asap('pypyjit', r_uint(next_instr),
+                             is_being_profiled, cast_instance_to_gcref(code))
+
+    def record(self, code, next_instr, is_being_profiled):
+        """Record the greenkey (next_instr, is_being_profiled, code).  Called
+        when the JIT starts tracing there."""
+        key = code_key(code)
+        self.seen_keys[key] = None
+        checksum = code_checksum(code)
+        entry = self.lookup(key, checksum)
+        if entry is None:
+            entry = self._add_entry(key, checksum)
+        entry.matched = True
+        entry.add(next_instr, is_being_profiled)
+
+    def write(self):
+        """Write the cache file, unless 'update' is False.  The entries read
+        from the old file are kept, unless code objects with the same key
+        but a different checksum were created in this run: then the source
+        probably changed."""
+        if not self.update:
+            return
+        builder = StringBuilder()
+        builder.append(CACHE_MAGIC)
+        builder.append('\n')
+        for key, entries in self.entries.items():
+            fields = key.split('\t')
+            if len(fields) != 3 or '\n' in key:
+                continue     # a tab or a newline in the filename or name
+            for entry in entries:
+                if key in self.seen_keys and not entry.matched:
+                    continue
+                if not entry.greenkeys:
+                    continue
+                greenkeys = ['%d:%d' % (next_instr, is_being_profiled)
+                             for next_instr, is_being_profiled
+                             in entry.greenkeys]
+                builder.append('%s\t%s\t%s\t%s\t%s\n' % (
+                    entry.checksum, fields[2], fields[1], fields[0],
+                    ','.join(greenkeys)))
+        data = builder.build()
+        if len(data) > MAX_FILE_SIZE:
+            return
+        tmpname = '%s.%d' % (self.filename, os.getpid())
+        try:
+            fd = os.open(tmpname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC |
+                                  O_BINARY, 0666)
+        except OSError:
+            return
+        try:
+            try:
+                _write_all(fd, data)
+            finally:
+                os.close(fd)
+            if os.name == 'nt' and os.path.exists(self.filename):
+                os.unlink(self.filename)
+            os.rename(tmpname, self.filename)
+        except OSError:
+            try:
+                os.unlink(tmpname)
+            except OSError:
+                pass
+
+
+def _read_all(fd):
+    builder = StringBuilder()
+    while builder.getlength() <= MAX_FILE_SIZE:
+        data = os.read(fd, 65536)
+        if not data:
+            break
+        builder.append(data)
+    return builder.build()
+
+def _write_all(fd, data):
+    while data:
+        count = os.write(fd, data)
+        data = data[count:]
+
+# ____________________________________________________________
+
+class JitCacheState(object):
+    def __init__(self, space):
+        self._cleanup_()
+
+    def _cleanup_(self):
+        self.cache = None
+
+def get_jit_cache(space):
+    """Return the JitCache in use, or None."""
+    return space.fromcache(JitCacheState).cache
+
+@unwrap_spec(filename='fsencode_or_none', update=bool)
+def set_jit_cache(space, filename, update=True):
+    """set_jit_cache(filename, update=True)
+
+    Use 'filename' as the JIT cache file: start tracing as soon as possible
+    where the previous processes that used the same file started tracing,
+    and, if 'update' is true, add the places where this process starts
+    tracing to the file when it exits.  With update=False, the file is
+    only read.  set_jit_cache(filename) is what setting the environment
+    variable PYPY_JIT_CACHE does.  Only the code objects created after the
+    call are looked up in the cache.  With None, stop using the cache
+    without writing it.
+    """
+    state = space.fromcache(JitCacheState)
+    if filename is None:
+        state.cache = None
+    else:
+        state.cache = JitCache(space, filename, update)
+        state.cache.load()
+    space.fromcache(CodeHookCache)._interp_code_hook = state.cache
+
+def write_jit_cache(space):
+    cache = get_jit_cache(space)
+    if cache is not None:
+        cache.write()
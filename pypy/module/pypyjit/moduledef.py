@@ -2,6 +2,8 @@ from pypy.interpreter.mixedmodule import MixedModule
 
 class Module(MixedModule):
     appleveldefs = {
+        'start_compiler_thread': 'app_jit.start_compiler_thread',
+        'stop_compiler_thread': 'app_jit.stop_compiler_thread',
     }
 
     interpleveldefs = {
@@ -13,11 +15,14 @@ class Module(MixedModule):
         'trace_next_iteration': 'interp_jit.trace_next_iteration',
         'trace_next_iteration_hash': 'interp_jit.trace_next_iteration_hash',
         'releaseall': 'interp_jit.releaseall',
+        'compile_pending': 'interp_jit.compile_pending',
+        'set_jit_cache': 'jitcache.set_jit_cache',
         'set_compile_hook': 'interp_resop.set_compile_hook',
         'set_abort_hook': 'interp_resop.set_abort_hook',
         'set_trace_too_long_hook': 'interp_resop.set_trace_too_long_hook',
         'get_stats_snapshot': 'interp_resop.get_stats_snapshot',
         'get_stats_asmmemmgr': 'interp_resop.get_stats_asmmemmgr',
+        'get_stats_code_cache': 'interp_resop.get_stats_code_cache',
         # those things are disabled because they have bugs, but if
         # they're found to be useful, fix test_ztranslation_jit_stats
         # in the backend first. get_stats_snapshot still produces
@@ -42,3 +47,7 @@ class Module(MixedModule):
         w_obj = space.wrap(PARAMETERS)
         space.setattr(self, space.newtext('defaults'), w_obj)
         pypy_hooks.space = space
+
+    def shutdown(self, space):
+        from pypy.module.pypyjit import jitcache
+        jitcache.write_jit_cache(space)
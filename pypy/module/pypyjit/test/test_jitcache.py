@@ -0,0 +1,186 @@
+from pypy.interpreter.pycode import PyCode, LazyCodeBody
+from pypy.module.pypyjit import jitcache
+from pypy.module.pypyjit.jitcache import JitCache, get_jit_cache
+from pypy.module.pypyjit.hooks import pypy_hooks
+from rpython.jit.metainterp.history import ConstInt, ConstPtr
+from rpython.rlib.jit import JitDebugInfo
+from rpython.rtyper.annlowlevel import cast_instance_to_gcref
+from rpython.tool.udir import udir
+
+SOURCE = '''
+def f(n):
+    total = 0
+    while n > 0:
+        total += n
+        n -= 1
+    return total
+'''
+
+
+class TestJitCache:
+    spaceconfig = dict(usemodules=['pypyjit'])
+
+    def setup_method(self, meth):
+        self.filename = str(udir.join('jitcache_' + meth.__name__))
+        self.traced = []
+        def trace_asap(cache, code, next_instr, is_being_profiled):
+            self.traced.append((code, next_instr, is_being_profiled))
+        self.orig_trace_asap = JitCache.trace_asap
+        JitCache.trace_asap = trace_asap
+
+    def teardown_method(self, meth):
+        JitCache.trace_asap = self.orig_trace_asap
+        jitcache.set_jit_cache(self.space, None)
+
+    def compile(self, source, filename='mod.py'):
+        space = self.space
+        code = space.createcompiler().compile(source, filename, 'exec', 0)
+        for w_const in code.co_consts_w:
+            if isinstance(w_const, PyCode):
+                return w_const
+        return code
+
+    def test_write_and_load(self):
+        code = self.compile(SOURCE)
+        cache = JitCache(self.space, self.filename)
+        cache.load()
+        cache.record(code, 9, 0)
+        cache.record(code, 0, 1)
+        cache.record(code, 9, 0)
+        cache.write()
+        #
+        cache = JitCache(self.space, self.filename)
+        cache.load()
+        cache.new_code(self.compile('x = 5'))
+        assert self.traced == []
+        code2 = self.compile(SOURCE)
+        cache.new_code(code2)
+        assert self.traced == [(code2, 9, 0), (code2, 0, 1)]
+        del self.traced[:]
+        cache.new_code(self.compile(SOURCE, filename='other.py'))
+        assert self.traced == []
+
+    def test_changed_code(self):
+        code = self.compile(SOURCE)
+        cache = JitCache(self.space, self.filename)
+        cache.record(code, 9, 0)
+        cache.write()
+        #
+        cache = JitCache(self.space, self.filename)
+        cache.load()
+        cache.new_code(self.compile(SOURCE.replace('total = 0',
+                                                   'total = t = 0')))
+        assert self.traced == []
+        cache.write()
+        cache = JitCache(self.space, self.filename)
+        cache.load()
+        assert cache.entries == {}
+
+    def test_kept_entries(self):
+        code = self.compile(SOURCE)
+        cache = JitCache(self.space, self.filename)
+        cache.record(code, 9, 0)
+        cache.write()
+        # a run that does not create the code object keeps the entry
+        cache = JitCache(self.space, self.filename)
+        cache.load()
+        cache.record(self.compile('while 1: pass'), 0, 0)
+        cache.write()
+        cache = JitCache(self.space, self.filename)
+        cache.load()
+        assert len(cache.entries) == 2
+        code2 = self.compile(SOURCE)
+        cache.new_code(code2)
+        assert self.traced == [(code2, 9, 0)]
+
+    def test_bad_file(self):
+        code = self.compile(SOURCE)
+        cache = JitCache(self.space, self.filename)
+        cache.record(code, 9, 0)
+        cache.write()
+        with open(self.filename) as f:
+            data = f.read()
+        lines = data.splitlines()
+        bad_lines = [lines[1].replace('9:0', '9:x'),
+                     lines[1].replace('9:0', '9:2'),
+                     lines[1].replace('9:0', '9'),
+                     'garbage']
+        with open(self.filename, 'w') as f:
+            f.write('\n'.join(lines[:1] + bad_lines))
+        cache = JitCache(self.space, self.filename)
+        cache.load()
+        assert cache.entries == {}
+        with open(self.filename, 'w') as f:
+            f.write(data.replace('PyPyJC', 'PyPyXX'))
+        cache.load()
+        assert cache.entries == {}
+
+    def test_set_jit_cache(self):
+        space = self.space
+        code = self.compile(SOURCE)
+        cache = JitCache(space, self.filename)
+        cache.record(code, 9, 0)
+        cache.write()
+        #
+        jitcache.set_jit_cache(space, self.filename)
+        assert get_jit_cache(space) is not None
+        code2 = self.compile(SOURCE)
+        assert self.traced == [(code2, 9, 0)]
+        jitcache.set_jit_cache(space, None)
+        assert get_jit_cache(space) is None
+        self.compile(SOURCE)
+        assert len(self.traced) == 1
+
+    def test_trace_start_hook(self):
+        from pypy.module.pypyjit.test.test_jit_hook import MockJitDriverSD
+        space = self.space
+        code = self.compile(SOURCE)
+        jitcache.set_jit_cache(space, self.filename)
+        assert pypy_hooks.are_hooks_enabled()
+        greenkey = [ConstInt(9), ConstInt(0),
+                    ConstPtr(cast_instance_to_gcref(code))]
+        pypy_hooks.on_trace_start(MockJitDriverSD.jitdriver, greenkey, 'f')
+        entry = get_jit_cache(space).lookup(jitcache.code_key(code),
+                                            jitcache.code_checksum(code))
+        assert entry.greenkeys == [(9, 0)]
+
+    def test_no_update(self):
+        space = self.space
+        code = self.compile(SOURCE)
+        cache = JitCache(space, self.filename)
+        cache.record(code, 9, 0)
+        cache.write()
+        with open(self.filename) as f:
+            data = f.read()
+        #
+        jitcache.set_jit_cache(space, self.filename, False)
+        code2 = self.compile(SOURCE)
+        assert self.traced == [(code2, 9, 0)]
+        get_jit_cache(space).record(code2, 0, 1)
+        jitcache.write_jit_cache(space)
+        with open(self.filename) as f:
+            assert f.read() == data
+
+    def test_lazy_code_body(self):
+        # the code objects of the code cache are created without their body,
+        # which must not be loaded by the lookup
+        class NotLoaded(LazyCodeBody):
+            def load(self, code):
+                raise AssertionError("body loaded")
+        space = self.space
+        code = self.compile(SOURCE)
+        cache = JitCache(space, self.filename)
+        cache.record(code, 9, 0)
+        cache.write()
+        #
+        jitcache.set_jit_cache(space, self.filename)
+        code2 = PyCode(space, code.co_argcount, code.co_nlocals,
+                       code.co_stacksize, code.co_flags, '', [], [],
+                       code.co_varnames, code.co_filename, code.co_name,
+                       code.co_firstlineno, '', code.co_freevars,
+                       code.co_cellvars)
+        code2.lazy_body = NotLoaded()
+        assert self.traced == [(code2, 9, 0)]
+        get_jit_cache(space).record(code2, 0, 1)
+        jitcache.write_jit_cache(space)
+        assert code2.lazy_body is not None
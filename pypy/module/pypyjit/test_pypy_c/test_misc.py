@@ -420,3 +420,41 @@ class TestMisc(BaseTestPyPyC):
         # the following assertion fails if the loop was cancelled due
         # to "abort: vable escape"
         assert len(loops) == 1
+
+    def test_deferred_compile(self):
+        def main(n):
+            import pypyjit
+            pypyjit.set_param(deferred_compile=10)
+            def f(n):
+                i = 0
+                while i < n:
+                    i += 1    # ID: add
+                return i
+            f(n)
+            f(n)          # not traced again
+            compiled = pypyjit.compile_pending()
+            f(n)          # runs the compiled loop
+            return compiled
+
+        log = self.run(main, [300])
+        assert log.result == 1
+        loop, = log.loops_by_id("add")
+
+    def test_stop_compiler_thread(self):
+        def main(n):
+            import pypyjit
+            pypyjit.start_compiler_thread(interval=60.0)
+            pypyjit.start_compiler_thread(interval=60.0)   # no second thread
+            def f(n):
+                i = 0
+                while i < n:
+                    i += 1    # ID: add
+                return i
+            f(n)
+            pypyjit.stop_compiler_thread()    # compiles the queued loop
+            f(n)
+            return pypyjit.compile_pending()
+
+        log = self.run(main, [300])
+        assert log.result == 0
+        loop, = log.loops_by_id("add")
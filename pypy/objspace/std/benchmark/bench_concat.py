@@ -0,0 +1,34 @@
+
+""" building strings with 's += piece' in a loop, which is quadratic
+without the objspace.std.withstrbuf option
+"""
+
+import time
+
+def count_operation(name, function):
+    t0 = time.time()
+    retval = function()
+    tk = time.time()
+    print name, " takes: %f" % (tk - t0)
+    return retval
+
+def build(num):
+    s = ""
+    for i in xrange(num):
+        s += "line %d\n" % i
+    return len(s)
+
+def build_and_read(num):
+    # reading the string forces it, so this stays quadratic
+    s = ""
+    for i in xrange(num):
+        s += "line %d\n" % i
+        if s[-1] != "\n":
+            raise AssertionError
+    return len(s)
+
+if __name__ == '__main__':
+    for num in [10000, 100000]:
+        count_operation("%d additions" % num, lambda: build(num))
+    count_operation("10000 additions with reads",
+                    lambda: build_and_read(10000))
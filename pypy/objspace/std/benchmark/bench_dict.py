@@ -2,7 +2,7 @@
 """ some simple benchmarikng stuff
 """
 
-import random, time
+import gc, random, time
 
 def sample(population, num):
     l = len(population)
@@ -45,8 +45,53 @@ def bench_simple_dict(SIZE = 10000):
     count_operation("Existing key access", lambda : rand_keys(lookup_keys))
     return test_d
 
+def memory_used():
+    """Bytes used by the GC, or None if unknown (e.g. not on PyPy)."""
+    gc.collect()
+    gc.collect()
+    try:
+        return gc.get_stats()._s.total_gc_memory
+    except AttributeError:
+        return None
+
+def bench_keys(name, make_key, SIZE=100000, LOOKUPS=1000000):
+    keys = [make_key(i) for i in xrange(SIZE)]
+    # new key objects, equal to the stored ones but not identical
+    lookup_keys = [make_key(random.randrange(SIZE)) for i in xrange(1000)]
+    missing_keys = [make_key(SIZE + i) for i in xrange(1000)]
+
+    before = memory_used()
+    test_d = count_operation("%s creation" % name,
+                             lambda : dict.fromkeys(keys))
+    after = memory_used()
+    if before is not None:
+        print name, " memory per entry: %.1f bytes" % (
+            float(after - before) / SIZE)
+
+    def lookups(keys):
+        for i in xrange(LOOKUPS // len(keys)):
+            for key in keys:
+                key in test_d
+
+    count_operation("%s existing key access" % name,
+                    lambda : lookups(lookup_keys))
+    count_operation("%s missing key access" % name,
+                    lambda : lookups(missing_keys))
+    return test_d
+
+def bench_float_dict():
+    return bench_keys("float keys", lambda i: i * 0.5)
+
+def bench_int_pair_dict():
+    # uses IntPairDictStrategy on a pypy translated with
+    # --objspace-std-withintpairdicts
+    return bench_keys("(int, int) keys", lambda i: (i >> 8, i & 255))
+
 if __name__ == '__main__':
-    test_d = bench_simple_dict()
     import __pypy__
+    test_d = bench_simple_dict()
     print __pypy__.internal_repr(test_d)
     print __pypy__.internal_repr(test_d.iterkeys())
+    for bench in [bench_float_dict, bench_int_pair_dict]:
+        test_d = bench()
+        print __pypy__.internal_repr(test_d)
@@ -0,0 +1,71 @@
+
+""" log-parsing workloads: find, count, split and replace on big str,
+unicode and bytearray buffers.  Run on pypys translated before and after
+the word-at-a-time search of rpython/rlib/rstringsearch.py.
+"""
+
+import time
+
+def count_operation(name, function):
+    t0 = time.time()
+    retval = function()
+    tk = time.time()
+    print name, " takes: %f" % (tk - t0)
+    return retval
+
+LEVELS = ["INFO", "INFO", "DEBUG", "INFO", "WARNING", "INFO", "ERROR"]
+
+def make_log(num):
+    lines = []
+    for i in xrange(num):
+        lines.append("2019-03-%02d 12:%02d:%02d,%03d %s [worker-%d] "
+                     "request /api/v1/items/%d served in %dms\n" % (
+                     i % 28 + 1, i % 60, (i * 7) % 60, i % 1000,
+                     LEVELS[i % len(LEVELS)], i % 16, i, i % 97))
+    return "".join(lines)
+
+def count_errors(log):
+    return log.count(" ERROR ")
+
+def find_all(log, needle):
+    count = 0
+    pos = log.find(needle)
+    while pos >= 0:
+        count += 1
+        pos = log.find(needle, pos + 1)
+    return count
+
+def last_error(log):
+    return log.rfind(" ERROR ")
+
+def split_lines(log):
+    return len(log.split("\n"))
+
+def split_fields(log):
+    total = 0
+    for line in log.split("\n"):
+        total += len(line.split(" "))
+    return total
+
+def anonymize(log):
+    return len(log.replace("/api/v1/items/", "/api/v1/<id>/"))
+
+def bench(name, log):
+    count_operation(name + ": count", lambda: count_errors(log))
+    count_operation(name + ": find loop", lambda: find_all(log, "WARNING"))
+    count_operation(name + ": rfind", lambda: [last_error(log)
+                                                for i in range(100)])
+    count_operation(name + ": split lines", lambda: split_lines(log))
+    count_operation(name + ": split fields", lambda: split_fields(log))
+    count_operation(name + ": replace", lambda: anonymize(log))
+
+def bench_bytearray(log):
+    data = bytearray(log)
+    count_operation("bytearray: count", lambda: data.count(b" ERROR "))
+    count_operation("bytearray: find loop", lambda: find_all(data, b"WARNING"))
+
+if __name__ == '__main__':
+    log = make_log(200000)
+    bench("str", log)
+    bench("unicode", log.decode("ascii") + u"\u20ac\n")
+    bench_bytearray(log)
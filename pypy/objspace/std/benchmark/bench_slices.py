@@ -0,0 +1,75 @@
+
+""" chunked parsing loops, which slice big strings and lists repeatedly.
+Compare pypys translated with and without the objspace.std.withstrslice
+and objspace.std.withlistslices options.
+"""
+
+import time
+
+def count_operation(name, function):
+    t0 = time.time()
+    retval = function()
+    tk = time.time()
+    print name, " takes: %f" % (tk - t0)
+    return retval
+
+def make_records(num):
+    # length-prefixed records, like a simple binary protocol
+    records = []
+    for i in xrange(num):
+        payload = str(i) * (i % 7 + 1)
+        records.append("%04d%s" % (len(payload), payload))
+    return "".join(records)
+
+def parse_consuming(data):
+    # the 'data = data[n:]' idiom: each step copies the rest of the
+    # buffer without slice views
+    count = 0
+    while data:
+        n = int(data[:4])
+        data[4:4 + n]
+        data = data[4 + n:]
+        count += 1
+    return count
+
+def parse_chunks(data, chunksize=4096):
+    # the 'data[i:i + n]' idiom: the chunks are views on a buffer of a few
+    # hundred KB, and count() searches them without copying
+    total = 0
+    for i in xrange(0, len(data), chunksize):
+        chunk = data[i:i + chunksize]
+        total += chunk.count("1")
+    return total
+
+def bench_bytes(NUM=20000):
+    data = make_records(NUM)
+    count_operation("bytes: consuming parse", lambda: parse_consuming(data))
+    count_operation("bytes: chunks",
+                    lambda: [parse_chunks(data) for i in range(20)])
+
+def bench_list(NUM=20000):
+    items = []
+    for i in xrange(NUM):
+        items.append(i % 5 + 1)
+        items.extend(range(i % 5 + 1))
+    def consume(items):
+        count = 0
+        while items:
+            n = items[0]
+            items[1:1 + n]
+            items = items[1 + n:]
+            count += 1
+        return count
+    def windows(items, size=1000):
+        # sliding windows on a list of less than SLICE_MAX_KEPT_ALIVE items
+        total = 0
+        for i in xrange(0, len(items) - size, 100):
+            total += len(items[i:i + size])
+        return total
+    count_operation("list: consuming parse", lambda: consume(items))
+    count_operation("list: windows",
+                    lambda: [windows(items) for i in range(10)])
+
+if __name__ == '__main__':
+    bench_bytes()
+    bench_list()
@@ -0,0 +1,68 @@
+# -*- encoding: utf-8 -*-
+""" indexing, slicing and searching multi-MB non-ascii unicode documents.
+Compare pypys translated with and without the
+objspace.std.withfixedwidthunicode option.
+"""
+
+import time
+
+def count_operation(name, function):
+    t0 = time.time()
+    retval = function()
+    tk = time.time()
+    print name, " takes: %f" % (tk - t0)
+    return retval
+
+def make_document(words, size):
+    parts = []
+    total = 0
+    i = 0
+    while total < size:
+        word = words[i % len(words)]
+        parts.append(word)
+        total += len(word)
+        i = (i * 7 + 3) % 1000003
+    return u" ".join(parts)
+
+LATIN1_WORDS = [u"déjà", u"vu", u"über", u"façade", u"naïve", u"crème",
+                u"brûlée", u"jalapeño", u"smörgåsbord", u"a"]
+WIDE_WORDS = [u"日本語", u"テキスト", u"€", u"Ελληνικά", u"кириллица",
+              u"😀", u"mixed-ascii", u"中文", u"한국어", u"x"]
+
+def random_indexing(doc, count=200000):
+    n = len(doc)
+    total = 0
+    i = 1
+    for k in xrange(count):
+        i = (i * 1103515245 + 12345) % n
+        total += ord(doc[i])
+    return total
+
+def slicing(doc, size=200, count=20000):
+    n = len(doc) - size
+    total = 0
+    i = 1
+    for k in xrange(count):
+        i = (i * 1103515245 + 12345) % n
+        total += len(doc[i:i + size])
+    return total
+
+def finding(doc, words):
+    total = 0
+    for word in words:
+        pos = doc.find(word)
+        while pos >= 0:
+            total += 1
+            pos = doc.find(word, pos + 1000)
+    return total
+
+def bench(name, words, size=4 * 1024 * 1024):
+    doc = make_document(words, size)
+    count_operation(name + ": random indexing",
+                    lambda: random_indexing(doc))
+    count_operation(name + ": slicing", lambda: slicing(doc))
+    count_operation(name + ": find", lambda: finding(doc, words))
+
+if __name__ == '__main__':
+    bench("latin1", LATIN1_WORDS)
+    bench("wide", WIDE_WORDS)
@@ -7,7 +7,7 @@ from rpython.rlib.debug import check_list_of_chars, check_nonneg
 from rpython.rtyper.lltypesystem import rffi
 from rpython.rlib.rgc import (resizable_list_supporting_raw_ptr,
                               nonmoving_raw_ptr_for_resizable_list)
-from rpython.rlib import jit
+from rpython.rlib import jit, rstringsearch
 from rpython.rlib.buffer import (GCBuffer,
                                  get_gc_data_for_list_of_chars,
                                  get_gc_data_offset_for_list_of_chars)
@@ -508,6 +508,16 @@ class W_BytearrayObject(W_Root):
         ofs = self._offset
         return (self._data, start + ofs, end + ofs, ofs)
 
+    _StringMethods_search_bytes = _search_bytes
+    def _search_bytes(self, value, sub, start, end, mode):
+        # 'value' is self._data, see _convert_idx_params()
+        if not rstringsearch.use_word_search(value, start, end):
+            return self._StringMethods_search_bytes(value, sub, start, end,
+                                                    mode)
+        ll_chars = nonmoving_raw_ptr_for_resizable_list(value)
+        return rstringsearch.search_raw(ll_chars, len(value), sub, start, end,
+                                        mode)
+
     def descr_getitem(self, space, w_index):
         # optimization: this version doesn't force getdata()
         if isinstance(w_index, W_SliceObject):
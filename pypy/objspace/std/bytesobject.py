@@ -1,10 +1,14 @@
 """The builtin str implementation"""
 
+import inspect
+
+import py
+
 from rpython.rlib import jit, rutf8
 from rpython.rlib.objectmodel import (
     compute_hash, compute_unique_id, import_from_mixin)
 from rpython.rlib.buffer import StringBuffer
-from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rstring import StringBuilder, find
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.buffer import SimpleView
@@ -436,6 +440,15 @@ class W_AbstractBytesObject(W_Root):
         of the specified width. The string S is never truncated.
         """
 
+    def descr_getbuffer(self, space, w_flags):
+        ""
+
+    def descr_formatter_parser(self, space):
+        ""
+
+    def descr_formatter_field_name_split(self, space):
+        ""
+
 class W_BytesObject(W_AbstractBytesObject):
     import_from_mixin(StringMethods)
     _immutable_fields_ = ['_value']
@@ -502,7 +515,7 @@ class W_BytesObject(W_AbstractBytesObject):
     @staticmethod
     def _use_rstr_ops(space, w_other):
         from pypy.objspace.std.unicodeobject import W_UnicodeObject
-        return (isinstance(w_other, W_BytesObject) or
+        return (isinstance(w_other, W_AbstractBytesObject) or
                 isinstance(w_other, W_UnicodeObject))
 
     @staticmethod
@@ -615,35 +628,48 @@ class W_BytesObject(W_AbstractBytesObject):
         return mod_format(space, w_values, self, do_unicode=False)
 
     def descr_eq(self, space, w_other):
-        if not isinstance(w_other, W_BytesObject):
+        w_other = _as_bytes_object(space, w_other)
+        if w_other is None:
             return space.w_NotImplemented
         return space.newbool(self._value == w_other._value)
 
     def descr_ne(self, space, w_other):
-        if not isinstance(w_other, W_BytesObject):
+        w_other = _as_bytes_object(space, w_other)
+        if w_other is None:
             return space.w_NotImplemented
         return space.newbool(self._value != w_other._value)
 
     def descr_lt(self, space, w_other):
-        if not isinstance(w_other, W_BytesObject):
+        w_other = _as_bytes_object(space, w_other)
+        if w_other is None:
             return space.w_NotImplemented
         return space.newbool(self._value < w_other._value)
 
     def descr_le(self, space, w_other):
-        if not isinstance(w_other, W_BytesObject):
+        w_other = _as_bytes_object(space, w_other)
+        if w_other is None:
             return space.w_NotImplemented
         return space.newbool(self._value <= w_other._value)
 
     def descr_gt(self, space, w_other):
-        if not isinstance(w_other, W_BytesObject):
+        w_other = _as_bytes_object(space, w_other)
+        if w_other is None:
             return space.w_NotImplemented
         return space.newbool(self._value > w_other._value)
 
     def descr_ge(self, space, w_other):
-        if not isinstance(w_other, W_BytesObject):
+        w_other = _as_bytes_object(space, w_other)
+        if w_other is None:
             return space.w_NotImplemented
         return space.newbool(self._value >= w_other._value)
 
+    _StringMethods__sliced = _sliced
+    def _sliced(self, space, s, start, stop, orig_obj):
+        if space.config.objspace.std.withstrslice:
+            from pypy.objspace.std.strsliceobject import slice_of_string
+            return slice_of_string(s, start, stop)
+        return self._StringMethods__sliced(space, s, start, stop, orig_obj)
+
     # auto-conversion fun
 
     _StringMethods_descr_add = descr_add
@@ -657,6 +683,10 @@ class W_BytesObject(W_AbstractBytesObject):
             from .bytearrayobject import W_BytearrayObject, _make_data
             self_as_bytearray = W_BytearrayObject(_make_data(self._value))
             return space.add(self_as_bytearray, w_other)
+        if (space.config.objspace.std.withstrbuf and
+                isinstance(w_other, W_AbstractBytesObject)):
+            from pypy.objspace.std.strbufobject import concat_strings
+            return concat_strings(space, self._value, space.bytes_w(w_other))
         return self._StringMethods_descr_add(space, w_other)
 
     _StringMethods__startswith = _startswith
@@ -686,8 +716,8 @@ class W_BytesObject(W_AbstractBytesObject):
             assert isinstance(w_sub, W_UnicodeObject)
             self_as_unicode = unicode_from_encoded_object(space, self, None,
                                                           None)
-            return space.newbool(
-                self_as_unicode._utf8.find(w_sub._utf8) >= 0)
+            value = self_as_unicode._utf8
+            return space.newbool(find(value, w_sub._utf8, 0, len(value)) >= 0)
         return self._StringMethods_descr_contains(space, w_sub)
 
     _StringMethods_descr_replace = descr_replace
@@ -830,6 +860,15 @@ class W_BytesObject(W_AbstractBytesObject):
         return tformat.formatter_field_name_split()
 
 
+def _as_bytes_object(space, w_obj):
+    """Return 'w_obj' as a W_BytesObject, forcing deferred strings, or None
+    if it is not a string."""
+    if isinstance(w_obj, W_BytesObject):
+        return w_obj
+    if isinstance(w_obj, W_DeferredBytesObject):
+        return w_obj.force()
+    return None
+
 def _create_list_from_bytes(value):
     # need this helper function to allow the jit to look inside and inline
     # listview_bytes
@@ -905,21 +944,87 @@ W_BytesObject.typedef = TypeDef(
     translate = interpindirect2app(W_AbstractBytesObject.descr_translate),
     upper = interpindirect2app(W_AbstractBytesObject.descr_upper),
     zfill = interpindirect2app(W_AbstractBytesObject.descr_zfill),
-    __buffer__ = interp2app(W_BytesObject.descr_getbuffer),
+    __buffer__ = interpindirect2app(W_AbstractBytesObject.descr_getbuffer),
 
-    format = interpindirect2app(W_BytesObject.descr_format),
-    __format__ = interpindirect2app(W_BytesObject.descr__format__),
-    __mod__ = interpindirect2app(W_BytesObject.descr_mod),
-    __rmod__ = interpindirect2app(W_BytesObject.descr_rmod),
+    format = interpindirect2app(W_AbstractBytesObject.descr_format),
+    __format__ = interpindirect2app(W_AbstractBytesObject.descr__format__),
+    __mod__ = interpindirect2app(W_AbstractBytesObject.descr_mod),
+    __rmod__ = interpindirect2app(W_AbstractBytesObject.descr_rmod),
     __getnewargs__ = interpindirect2app(
         W_AbstractBytesObject.descr_getnewargs),
-    _formatter_parser = interp2app(W_BytesObject.descr_formatter_parser),
-    _formatter_field_name_split =
-        interp2app(W_BytesObject.descr_formatter_field_name_split),
+    _formatter_parser = interpindirect2app(
+        W_AbstractBytesObject.descr_formatter_parser),
+    _formatter_field_name_split = interpindirect2app(
+        W_AbstractBytesObject.descr_formatter_field_name_split),
 )
 W_BytesObject.typedef.flag_sequence_bug_compat = True
 
 
+class W_DeferredBytesObject(W_AbstractBytesObject):
+    """Base class of the other implementations of 'str', which compute
+    their value only when force() is called: see strsliceobject.py and
+    strbufobject.py.  Subclasses implement some methods directly; all
+    the other methods force the string and call the W_BytesObject ones.
+    """
+    typedef = W_BytesObject.typedef
+
+    def force(self):
+        raise NotImplementedError
+
+    def unwrap(self, space):
+        return self.force()._value
+
+    def str_w(self, space):
+        return self.force()._value
+
+    def utf8_w(self, space):
+        return self.force()._value
+
+    charbuf_w = str_w
+
+    def buffer_w(self, space, flags):
+        return self.force().buffer_w(space, flags)
+
+    def readbuf_w(self, space):
+        return self.force().readbuf_w(space)
+
+    def writebuf_w(self, space):
+        return self.force().writebuf_w(space)
+
+    def listview_bytes(self):
+        return self.force().listview_bytes()
+
+    def ord(self, space):
+        return self.force().ord(space)
+
+    def descr_str(self, space):
+        # the subclasses are never subclassed at app-level
+        return self
+
+
+def _make_forwarder(name):
+    # the arguments and their defaults are the ones of the abstract method,
+    # which are the ones interpindirect2app() calls the implementation with
+    # and the ones that direct interp-level callers rely on
+    func = W_AbstractBytesObject.__dict__[name]
+    argnames = inspect.getargs(func.func_code).args[1:]
+    source = py.code.Source("""
+    def %(name)s(self, %(args)s):
+        return self.force().%(name)s(%(args)s)
+    """ % {'name': name, 'args': ', '.join(argnames)})
+    d = {}
+    exec source.compile() in d
+    forwarder = d[name]
+    forwarder.func_defaults = func.func_defaults
+    return forwarder
+
+for _name in W_AbstractBytesObject.__dict__:
+    if (_name.startswith('descr_') and
+            _name not in W_DeferredBytesObject.__dict__):
+        setattr(W_DeferredBytesObject, _name, _make_forwarder(_name))
+del _name
+
+
 @jit.elidable
 def string_escape_encode(s, quote):
     buf = StringBuilder(len(s) + 2)
@@ -2,6 +2,7 @@
 
 from rpython.rlib import jit, rerased, objectmodel, rutf8
 from rpython.rlib.debug import mark_dict_non_null
+from rpython.rlib.longlong2float import float2longlong
 from rpython.rlib.objectmodel import newlist_hint, r_dict, specialize
 from rpython.tool.sourcetools import func_renamer, func_with_new_name
 
@@ -412,7 +413,7 @@ def _add_indirections():
                     length w_keys values items \
                     iterkeys itervalues iteritems \
                     listview_bytes listview_ascii listview_int \
-                    view_as_kwargs".split()
+                    listview_float view_as_kwargs".split()
 
     def make_method(method):
         def f(self, *args):
@@ -587,6 +588,9 @@ class DictStrategy(object):
     def listview_int(self, w_dict):
         return None
 
+    def listview_float(self, w_dict):
+        return None
+
     def view_as_kwargs(self, w_dict):
         return (None, None)
 
@@ -675,6 +679,11 @@ class EmptyDictStrategy(DictStrategy):
         w_type = self.space.type(w_key)
         if self.space.is_w(w_type, self.space.w_int):
             self.switch_to_int_strategy(w_dict)
+        elif self.space.is_w(w_type, self.space.w_float):
+            self.switch_to_float_strategy(w_dict)
+        elif (self.space.config.objspace.std.withintpairdicts and
+              _is_int_pair(self.space, w_key)):
+            self.switch_to_int_pair_strategy(w_dict)
         elif w_type.compares_by_identity():
             self.switch_to_identity_strategy(w_dict)
         else:
@@ -698,6 +707,18 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.set_strategy(strategy)
         w_dict.dstorage = storage
 
+    def switch_to_float_strategy(self, w_dict):
+        strategy = self.space.fromcache(FloatDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = storage
+
+    def switch_to_int_pair_strategy(self, w_dict):
+        strategy = self.space.fromcache(IntPairDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = storage
+
     def switch_to_identity_strategy(self, w_dict):
         from pypy.objspace.std.identitydict import IdentityDictStrategy
         strategy = self.space.fromcache(IdentityDictStrategy)
@@ -1334,6 +1355,112 @@ class IntDictStrategy(AbstractTypedStrategy, DictStrategy):
 create_iterator_classes(IntDictStrategy)
 
 
+def float_eq(x, y):
+    # like the app-level 'is' of floats: NaNs with the same bits are
+    # equal; 0.0 and -0.0 are equal too, like with '=='
+    return x == y or float2longlong(x) == float2longlong(y)
+
+def float_hash(x):
+    return objectmodel.compute_hash(x)
+
+class FloatDictStrategy(AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, unwrapped):
+        return self.space.newfloat(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.float_w(wrapped)
+
+    def get_empty_storage(self):
+        return self.erase(r_dict(float_eq, float_hash, simple_hash_eq=True))
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        return space.is_w(space.type(w_obj), space.w_float)
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        # XXX there are many more types
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_bytes) or
+                space.is_w(w_lookup_type, space.w_unicode) or
+                space.is_w(w_lookup_type, space.w_tuple)
+                )
+
+    def listview_float(self, w_dict):
+        return self.unerase(w_dict.dstorage).keys()
+
+    def wrapkey(space, key):
+        return space.newfloat(key)
+
+    def w_keys(self, w_dict):
+        return self.space.newlist_float(self.listview_float(w_dict))
+
+create_iterator_classes(FloatDictStrategy)
+
+
+def _is_int_pair(space, w_obj):
+    """Is w_obj an exact tuple of two exact ints?"""
+    from pypy.objspace.std.intobject import W_IntObject
+    from pypy.objspace.std.specialisedtupleobject import Cls_ii
+    from pypy.objspace.std.tupleobject import W_AbstractTupleObject
+    if type(w_obj) is Cls_ii:
+        return True
+    if not isinstance(w_obj, W_AbstractTupleObject):
+        return False
+    if (not space.is_w(space.type(w_obj), space.w_tuple) or
+            w_obj.length() != 2):
+        return False
+    return (type(w_obj.getitem(space, 0)) is W_IntObject and
+            type(w_obj.getitem(space, 1)) is W_IntObject)
+
+class IntPairDictStrategy(AbstractTypedStrategy, DictStrategy):
+    """Keys are tuples of two ints, stored unboxed as RPython tuples."""
+    erase, unerase = rerased.new_erasing_pair("intpair")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, unwrapped):
+        a, b = unwrapped
+        space = self.space
+        return space.newtuple([space.newint(a), space.newint(b)])
+
+    def unwrap(self, wrapped):
+        from pypy.objspace.std.specialisedtupleobject import Cls_ii
+        from pypy.objspace.std.tupleobject import W_AbstractTupleObject
+        if type(wrapped) is Cls_ii:
+            return (wrapped.value0, wrapped.value1)
+        space = self.space
+        assert isinstance(wrapped, W_AbstractTupleObject)
+        return (space.int_w(wrapped.getitem(space, 0)),
+                space.int_w(wrapped.getitem(space, 1)))
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def is_correct_type(self, w_obj):
+        return _is_int_pair(self.space, w_obj)
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        # XXX there are many more types
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_bytes) or
+                space.is_w(w_lookup_type, space.w_unicode) or
+                space.is_w(w_lookup_type, space.w_int) or
+                space.is_w(w_lookup_type, space.w_float)
+                )
+
+    def wrapkey(space, key):
+        a, b = key
+        return space.newtuple([space.newint(a), space.newint(b)])
+
+create_iterator_classes(IntPairDictStrategy)
+
+
 def update1(space, w_dict, w_data):
     if isinstance(w_data, W_DictMultiObject):    # optimization case only
         update1_dict_dict(space, w_dict, w_data)
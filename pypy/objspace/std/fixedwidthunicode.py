@@ -0,0 +1,111 @@
+"""Fixed-width buffers for large unicode strings (the 'withfixedwidthunicode'
+option)
+
+A W_UnicodeObject stores its characters as utf8.  Indexing into a non-ascii
+string needs an index structure to go from a codepoint index to a byte
+position, and searching needs the slow reverse conversion.  For large
+strings that are indexed, sliced or searched, we instead build on demand a
+copy of the characters with one element per codepoint: an RPython str if all
+codepoints are < 256 (latin1), or else an RPython unicode (UCS2 or UCS4,
+depending on the size of wchar_t).  The utf8 string stays the real value of
+the object; the buffer is only a cache.
+"""
+
+from rpython.rlib import jit, rutf8
+from rpython.rlib.rstring import StringBuilder, UnicodeBuilder
+from rpython.rlib.runicode import MAXUNICODE
+
+
+# only non-ascii strings of at least this many codepoints get a buffer;
+# for smaller strings, the utf8 index structure is cheap enough
+FIXED_WIDTH_MIN_LENGTH = 4096
+
+
+class FixedWidthBuffer(object):
+    """Base class.  The prebuilt instance NO_BUFFER is used for strings
+    that cannot be represented with the available widths."""
+
+    def getitem_utf8(self, index):
+        raise NotImplementedError
+
+    def slice_utf8(self, start, stop):
+        raise NotImplementedError
+
+    def search(self, sub, sublength, start, end, forward):
+        raise NotImplementedError
+
+NO_BUFFER = FixedWidthBuffer()
+
+
+class Latin1Buffer(FixedWidthBuffer):
+    def __init__(self, chars):
+        self.chars = chars
+
+    def getitem_utf8(self, index):
+        return rutf8.unichr_as_utf8(ord(self.chars[index]))
+
+    def slice_utf8(self, start, stop):
+        builder = StringBuilder(stop - start)
+        for i in range(start, stop):
+            rutf8.unichr_as_utf8_append(builder, ord(self.chars[i]))
+        return builder.build()
+
+    def search(self, sub, sublength, start, end, forward):
+        """Search for the utf8 string 'sub' of 'sublength' codepoints in
+        chars[start:end].  Returns the codepoint index or -1."""
+        if len(sub) != sublength:
+            builder = StringBuilder(sublength)
+            for code in rutf8.Utf8StringIterator(sub):
+                if code > 0xff:
+                    return -1     # cannot be in this string
+                builder.append(chr(code))
+            sub = builder.build()
+        if forward:
+            return self.chars.find(sub, start, end)
+        return self.chars.rfind(sub, start, end)
+
+
+class WideBuffer(FixedWidthBuffer):
+    def __init__(self, chars):
+        self.chars = chars
+
+    def getitem_utf8(self, index):
+        return rutf8.unichr_as_utf8(ord(self.chars[index]),
+                                    allow_surrogates=True)
+
+    def slice_utf8(self, start, stop):
+        builder = StringBuilder(2 * (stop - start))
+        for i in range(start, stop):
+            rutf8.unichr_as_utf8_append(builder, ord(self.chars[i]),
+                                        allow_surrogates=True)
+        return builder.build()
+
+    def search(self, sub, sublength, start, end, forward):
+        builder = UnicodeBuilder(sublength)
+        for code in rutf8.Utf8StringIterator(sub):
+            if code > MAXUNICODE:
+                return -1     # cannot be in this string
+            builder.append(unichr(code))
+        usub = builder.build()
+        if forward:
+            return self.chars.find(usub, start, end)
+        return self.chars.rfind(usub, start, end)
+
+
+@jit.dont_look_inside
+def make_fixed_width_buffer(utf8, length):
+    maxcode = 0
+    for code in rutf8.Utf8StringIterator(utf8):
+        if code > maxcode:
+            maxcode = code
+    if maxcode <= 0xff:
+        builder = StringBuilder(length)
+        for code in rutf8.Utf8StringIterator(utf8):
+            builder.append(chr(code))
+        return Latin1Buffer(builder.build())
+    if maxcode <= MAXUNICODE:
+        ubuilder = UnicodeBuilder(length)
+        for code in rutf8.Utf8StringIterator(utf8):
+            ubuilder.append(unichr(code))
+        return WideBuffer(ubuilder.build())
+    return NO_BUFFER
@@ -42,6 +42,16 @@ __all__ = ['W_ListObject', 'make_range_list', 'make_empty_list_with_size']
 
 UNROLL_CUTOFF = 5
 
+# with 'withlistslices', slices of at least SLICE_MIN_LENGTH items share
+# the items of the list they are taken from instead of copying them; shorter
+# slices are copied, which is not more expensive than making a view.  A
+# view keeps all the shared items alive, so the items outside of the view
+# must be at most SLICE_MAX_KEPT_ALIVE, or at most SLICE_MAX_RATIO - 1 times
+# the length of the view.  See strsliceobject.py.
+SLICE_MIN_LENGTH = 64
+SLICE_MAX_KEPT_ALIVE = 128 * 1024
+SLICE_MAX_RATIO = 4
+
 
 def make_range_list(space, start, step, length):
     if length <= 0:
@@ -116,6 +126,17 @@ def get_strategy_from_list_objects(space, list_w, sizehint):
         else:
             return space.fromcache(FloatListStrategy)
 
+    elif (isinstance(w_firstobj, W_AbstractTupleObject) and
+            space.config.objspace.std.withtuplelists):
+        # check for all-tuples with the same kinds of items
+        kinds = get_row_kinds(space, w_firstobj)
+        if kinds is not None:
+            for i in range(1, len(list_w)):
+                if not row_matches(space, kinds, list_w[i]):
+                    break
+            else:
+                return space.fromcache(TupleListStrategy)
+
     if check_int_or_float:
         for w_obj in list_w:
             if type(w_obj) is W_IntObject:
@@ -385,8 +406,15 @@ class W_ListObject(W_Root):
         """Sets the slice of the list from start to start+step*slicelength to
         the sequence sequence_w.
         Used by setslice and setitem."""
+        sequence_w.unshare_slice()
         self.strategy.setslice(self, start, step, slicelength, sequence_w)
 
+    def unshare_slice(self):
+        """If the list is a slice view sharing its items with other lists,
+        give it a private copy of the items and its unsliced strategy."""
+        if isinstance(self.strategy, BaseSliceListStrategy):
+            self.strategy.switch_to_unsliced_strategy(self)
+
     def insert(self, index, w_item):
         """Inserts an item at the given position. Item must be wrapped,
         index not."""
@@ -848,6 +876,7 @@ class ListStrategy(object):
         space = self.space
         if type(w_any) is W_ListObject or (isinstance(w_any, W_ListObject) and
                                            space._uses_list_iter(w_any)):
+            w_any.unshare_slice()
             self._extend_from_list(w_list, w_any)
         elif space.is_generator(w_any):
             w_any.unpack_into_w(w_list)
@@ -953,6 +982,12 @@ class EmptyListStrategy(ListStrategy):
             strategy = self.space.fromcache(AsciiListStrategy)
         elif type(w_item) is W_FloatObject:
             strategy = self.space.fromcache(FloatListStrategy)
+        elif (self.space.config.objspace.std.withtuplelists and
+                get_row_kinds(self.space, w_item) is not None):
+            strategy = self.space.fromcache(TupleListStrategy)
+            w_list.strategy = strategy
+            w_list.lstorage = strategy.get_storage_for_row(w_item)
+            return
         else:
             strategy = self.space.fromcache(ObjectListStrategy)
 
@@ -1410,11 +1445,19 @@ class AbstractUnwrappedStrategy(object):
         items = self.unerase(w_list.lstorage)[:]
         return self.erase(items)
 
+    def get_slice_strategy(self):
+        return None
+
     def getslice(self, w_list, start, stop, step, length):
         if step == 1 and 0 <= start <= stop:
             l = self.unerase(w_list.lstorage)
             assert start >= 0
             assert stop >= 0
+            if self.space.config.objspace.std.withlistslices:
+                slice_strategy = self.get_slice_strategy()
+                if (slice_strategy is not None and
+                        is_worth_a_slice(stop - start, len(l))):
+                    return slice_strategy.share_slice(w_list, start, stop)
             sublist = l[start:stop]
             storage = self.erase(sublist)
             return W_ListObject.from_storage_and_strategy(
@@ -1668,6 +1711,9 @@ class IntegerListStrategy(ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(IntegerListStrategy)
 
+    def get_slice_strategy(self):
+        return self.space.fromcache(IntegerSliceListStrategy)
+
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
         sorter = IntSort(l, len(l))
@@ -1764,6 +1810,9 @@ class FloatListStrategy(ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(FloatListStrategy)
 
+    def get_slice_strategy(self):
+        return self.space.fromcache(FloatSliceListStrategy)
+
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
         sorter = FloatSort(l, len(l))
@@ -1888,6 +1937,9 @@ class IntOrFloatListStrategy(ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(IntOrFloatListStrategy)
 
+    def get_slice_strategy(self):
+        return self.space.fromcache(IntOrFloatSliceListStrategy)
+
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
         sorter = IntOrFloatSort(l, len(l))
@@ -1981,6 +2033,9 @@ class BytesListStrategy(ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(BytesListStrategy)
 
+    def get_slice_strategy(self):
+        return self.space.fromcache(BytesSliceListStrategy)
+
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
         sorter = StringSort(l, len(l))
@@ -2014,6 +2069,9 @@ class AsciiListStrategy(ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(AsciiListStrategy)
 
+    def get_slice_strategy(self):
+        return self.space.fromcache(AsciiSliceListStrategy)
+
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
         sorter = UnicodeSort(l, len(l))
@@ -2024,6 +2082,591 @@ class AsciiListStrategy(ListStrategy):
     def getitems_ascii(self, w_list):
         return self.unerase(w_list.lstorage)
 
+
+def is_worth_a_slice(length, fulllength):
+    return (length >= SLICE_MIN_LENGTH and
+            (fulllength - length <= SLICE_MAX_KEPT_ALIVE or
+             length * SLICE_MAX_RATIO >= fulllength))
+
+
+class ListSlice(object):
+    """The storage of the slice strategies: the items start:stop of the
+    storage of another strategy.  That storage is shared between several
+    lists and is never mutated; a list copies its part of it before its
+    first mutation."""
+    _immutable_fields_ = ['lstorage', 'start', 'stop']
+
+    def __init__(self, lstorage, start, stop):
+        assert 0 <= start <= stop
+        self.lstorage = lstorage
+        self.start = start
+        self.stop = stop
+
+
+class BaseSliceListStrategy(ListStrategy):
+    """Slice views on the items of the unwrapped strategies, created by
+    getslice() when the 'withlistslices' option is enabled.  Both the
+    sliced list and the slice become views, so that the items stay
+    unchanged for as long as they are shared; like the range strategies,
+    the views switch back to their unsliced strategy on any mutation."""
+
+    erase, unerase = rerased.new_erasing_pair("slice")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def switch_to_unsliced_strategy(self, w_list):
+        raise NotImplementedError
+
+    def init_from_list_w(self, w_list, list_w):
+        raise NotImplementedError
+
+    def clone(self, w_list):
+        # the storage is never mutated, no need to copy it
+        return W_ListObject.from_storage_and_strategy(
+            self.space, w_list.lstorage, self)
+
+    def _resize_hint(self, w_list, hint):
+        assert hint >= 0
+
+    def copy_into(self, w_list, w_other):
+        w_other.strategy = self
+        w_other.lstorage = w_list.lstorage
+
+    def getstorage_copy(self, w_list):
+        return w_list.lstorage
+
+    def length(self, w_list):
+        view = self.unerase(w_list.lstorage)
+        return view.stop - view.start
+
+    def append(self, w_list, w_item):
+        self.switch_to_unsliced_strategy(w_list)
+        w_list.append(w_item)
+
+    def inplace_mul(self, w_list, times):
+        self.switch_to_unsliced_strategy(w_list)
+        w_list.inplace_mul(times)
+
+    def deleteslice(self, w_list, start, step, slicelength):
+        self.switch_to_unsliced_strategy(w_list)
+        w_list.deleteslice(start, step, slicelength)
+
+    def pop(self, w_list, index):
+        self.switch_to_unsliced_strategy(w_list)
+        return w_list.pop(index)
+
+    def pop_end(self, w_list):
+        self.switch_to_unsliced_strategy(w_list)
+        return w_list.pop_end()
+
+    def setitem(self, w_list, index, w_item):
+        self.switch_to_unsliced_strategy(w_list)
+        w_list.setitem(index, w_item)
+
+    def setslice(self, w_list, start, step, slicelength, sequence_w):
+        self.switch_to_unsliced_strategy(w_list)
+        w_list.setslice(start, step, slicelength, sequence_w)
+
+    def insert(self, w_list, index, w_item):
+        self.switch_to_unsliced_strategy(w_list)
+        w_list.insert(index, w_item)
+
+    def extend(self, w_list, w_any):
+        self.switch_to_unsliced_strategy(w_list)
+        w_list.extend(w_any)
+
+    def reverse(self, w_list):
+        self.switch_to_unsliced_strategy(w_list)
+        w_list.reverse()
+
+    def sort(self, w_list, reverse):
+        self.switch_to_unsliced_strategy(w_list)
+        w_list.sort(reverse)
+
+
+class AbstractSliceStrategy(object):
+    """The part of the slice strategies that depends on the type of the
+    items.  get_unsliced_strategy() returns the strategy of the storage."""
+
+    def get_unsliced_strategy(self):
+        raise NotImplementedError("abstract base class")
+
+    def share_slice(self, w_list, start, stop):
+        """Turn 'w_list', which uses the unsliced strategy, into a view on
+        its own items and return a new list that is a view on the items
+        start:stop."""
+        strategy = self.get_unsliced_strategy()
+        assert w_list.strategy is strategy
+        lstorage = w_list.lstorage
+        length = strategy.length(w_list)
+        w_list.strategy = self
+        w_list.lstorage = self.erase(ListSlice(lstorage, 0, length))
+        storage = self.erase(ListSlice(lstorage, start, stop))
+        return W_ListObject.from_storage_and_strategy(self.space, storage,
+                                                      self)
+
+    def _items(self, view):
+        return self.get_unsliced_strategy().unerase(view.lstorage)
+
+    def _getitems_unwrapped(self, w_list):
+        view = self.unerase(w_list.lstorage)
+        items = self._items(view)
+        if view.start == 0 and view.stop == len(items):
+            return items
+        return items[view.start:view.stop]
+
+    def switch_to_unsliced_strategy(self, w_list):
+        view = self.unerase(w_list.lstorage)
+        items = self._items(view)[view.start:view.stop]
+        strategy = self.get_unsliced_strategy()
+        w_list.strategy = strategy
+        w_list.lstorage = strategy.erase(items)
+
+    def find(self, w_list, w_obj, start, stop):
+        strategy = self.get_unsliced_strategy()
+        if strategy.is_correct_type(w_obj):
+            view = self.unerase(w_list.lstorage)
+            # search directly in the shared items
+            w_items = W_ListObject.from_storage_and_strategy(
+                self.space, view.lstorage, strategy)
+            stop = min(stop, view.stop - view.start)
+            index = strategy._safe_find(w_items, strategy.unwrap(w_obj),
+                                        view.start + start,
+                                        view.start + stop)
+            return index - view.start
+        return ListStrategy.find(self, w_list, w_obj, start, stop)
+
+    def getitem(self, w_list, index):
+        view = self.unerase(w_list.lstorage)
+        length = view.stop - view.start
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError
+        items = self._items(view)
+        return self.get_unsliced_strategy().wrap(items[view.start + index])
+
+    @jit.look_inside_iff(lambda self, w_list:
+            jit.loop_unrolling_heuristic(w_list, w_list.length(),
+                                         UNROLL_CUTOFF))
+    def getitems_copy(self, w_list):
+        view = self.unerase(w_list.lstorage)
+        items = self._items(view)
+        strategy = self.get_unsliced_strategy()
+        return [strategy.wrap(items[i]) for i in range(view.start, view.stop)]
+
+    @jit.unroll_safe
+    def getitems_unroll(self, w_list):
+        view = self.unerase(w_list.lstorage)
+        items = self._items(view)
+        strategy = self.get_unsliced_strategy()
+        return [strategy.wrap(items[i]) for i in range(view.start, view.stop)]
+
+    @jit.look_inside_iff(lambda self, w_list:
+            jit.loop_unrolling_heuristic(w_list, w_list.length(),
+                                         UNROLL_CUTOFF))
+    def getitems_fixedsize(self, w_list):
+        return self.getitems_unroll(w_list)
+
+    def getslice(self, w_list, start, stop, step, length):
+        view = self.unerase(w_list.lstorage)
+        items = self._items(view)
+        start += view.start
+        stop += view.start
+        if step == 1 and 0 <= start <= stop:
+            if is_worth_a_slice(length, len(items)):
+                storage = self.erase(ListSlice(view.lstorage, start, stop))
+                return W_ListObject.from_storage_and_strategy(
+                        self.space, storage, self)
+            sublist = items[start:stop]
+        else:
+            sublist = [items[start + i * step] for i in range(length)]
+        strategy = self.get_unsliced_strategy()
+        return W_ListObject.from_storage_and_strategy(
+                self.space, strategy.erase(sublist), strategy)
+
+
+class IntegerSliceListStrategy(BaseSliceListStrategy):
+    import_from_mixin(AbstractSliceStrategy)
+
+    def get_unsliced_strategy(self):
+        return self.space.fromcache(IntegerListStrategy)
+
+    def getitems_int(self, w_list):
+        return self._getitems_unwrapped(w_list)
+
+
+class FloatSliceListStrategy(BaseSliceListStrategy):
+    import_from_mixin(AbstractSliceStrategy)
+
+    def get_unsliced_strategy(self):
+        return self.space.fromcache(FloatListStrategy)
+
+    def getitems_float(self, w_list):
+        return self._getitems_unwrapped(w_list)
+
+
+class IntOrFloatSliceListStrategy(BaseSliceListStrategy):
+    import_from_mixin(AbstractSliceStrategy)
+
+    def get_unsliced_strategy(self):
+        return self.space.fromcache(IntOrFloatListStrategy)
+
+
+class BytesSliceListStrategy(BaseSliceListStrategy):
+    import_from_mixin(AbstractSliceStrategy)
+
+    def get_unsliced_strategy(self):
+        return self.space.fromcache(BytesListStrategy)
+
+    def getitems_bytes(self, w_list):
+        return self._getitems_unwrapped(w_list)
+
+
+class AsciiSliceListStrategy(BaseSliceListStrategy):
+    import_from_mixin(AbstractSliceStrategy)
+
+    def get_unsliced_strategy(self):
+        return self.space.fromcache(AsciiListStrategy)
+
+    def getitems_ascii(self, w_list):
+        return self._getitems_unwrapped(w_list)
+
+
+MAX_ROW_LENGTH = 8
+
+def _item_kind(w_item):
+    if type(w_item) is W_IntObject:
+        return 'i'
+    elif type(w_item) is W_FloatObject:
+        return 'f'
+    elif type(w_item) is W_BytesObject:
+        return 'b'
+    return '\x00'
+
+def get_row_kinds(space, w_obj):
+    """If w_obj is a tuple that TupleListStrategy can store, return a string
+    with the kind of each of its items ('i', 'f' or 'b'); otherwise None."""
+    if not isinstance(w_obj, W_AbstractTupleObject):
+        return None
+    if not space.is_w(space.type(w_obj), space.w_tuple):
+        return None
+    length = w_obj.length()
+    if length < 2 or length > MAX_ROW_LENGTH:
+        return None
+    kinds = ['\x00'] * length
+    for i in range(length):
+        kind = _item_kind(w_obj.getitem(space, i))
+        if kind == '\x00':
+            return None
+        kinds[i] = kind
+    return ''.join(kinds)
+
+@jit.unroll_safe
+def row_matches(space, kinds, w_obj):
+    if not isinstance(w_obj, W_AbstractTupleObject):
+        return False
+    if w_obj.length() != len(kinds):
+        return False
+    if not space.is_w(space.type(w_obj), space.w_tuple):
+        return False
+    for i in range(len(kinds)):
+        if _item_kind(w_obj.getitem(space, i)) != kinds[i]:
+            return False
+    return True
+
+
+class TupleColumns(object):
+    """The storage of TupleListStrategy: the items of the tuples, one
+    unboxed list per position in the tuples.  'kinds' gives the kind of
+    each position and 'index' the position's list in int_columns,
+    float_columns or bytes_columns."""
+    _immutable_fields_ = ['kinds', 'index[*]']
+
+    def __init__(self, kinds):
+        self.kinds = kinds
+        index = [0] * len(kinds)
+        n_int = n_float = n_bytes = 0
+        for i in range(len(kinds)):
+            kind = kinds[i]
+            if kind == 'i':
+                index[i] = n_int
+                n_int += 1
+            elif kind == 'f':
+                index[i] = n_float
+                n_float += 1
+            else:
+                index[i] = n_bytes
+                n_bytes += 1
+        self.index = index
+        self.int_columns = [[0] * 0 for i in range(n_int)]
+        self.float_columns = [[0.0] * 0 for i in range(n_float)]
+        self.bytes_columns = [[''] * 0 for i in range(n_bytes)]
+
+    def length(self):
+        kind = self.kinds[0]
+        if kind == 'i':
+            return len(self.int_columns[0])
+        elif kind == 'f':
+            return len(self.float_columns[0])
+        else:
+            return len(self.bytes_columns[0])
+
+    @jit.unroll_safe
+    def getrow(self, space, row):
+        items_w = [None] * len(self.kinds)
+        for i in range(len(self.kinds)):
+            kind = self.kinds[i]
+            if kind == 'i':
+                w_item = space.newint(self.int_columns[self.index[i]][row])
+            elif kind == 'f':
+                w_item = space.newfloat(self.float_columns[self.index[i]][row])
+            else:
+                w_item = space.newbytes(self.bytes_columns[self.index[i]][row])
+            items_w[i] = w_item
+        return space.newtuple(items_w)
+
+    @jit.unroll_safe
+    def setrow(self, space, row, w_tuple):
+        for i in range(len(self.kinds)):
+            kind = self.kinds[i]
+            w_item = w_tuple.getitem(space, i)
+            if kind == 'i':
+                self.int_columns[self.index[i]][row] = space.int_w(w_item)
+            elif kind == 'f':
+                self.float_columns[self.index[i]][row] = space.float_w(w_item)
+            else:
+                self.bytes_columns[self.index[i]][row] = space.bytes_w(w_item)
+
+    @jit.unroll_safe
+    def insert(self, space, row, w_tuple):
+        for i in range(len(self.kinds)):
+            kind = self.kinds[i]
+            w_item = w_tuple.getitem(space, i)
+            if kind == 'i':
+                self.int_columns[self.index[i]].insert(row, space.int_w(w_item))
+            elif kind == 'f':
+                self.float_columns[self.index[i]].insert(
+                    row, space.float_w(w_item))
+            else:
+                self.bytes_columns[self.index[i]].insert(
+                    row, space.bytes_w(w_item))
+
+    @jit.unroll_safe
+    def append(self, space, w_tuple):
+        for i in range(len(self.kinds)):
+            kind = self.kinds[i]
+            w_item = w_tuple.getitem(space, i)
+            if kind == 'i':
+                self.int_columns[self.index[i]].append(space.int_w(w_item))
+            elif kind == 'f':
+                self.float_columns[self.index[i]].append(space.float_w(w_item))
+            else:
+                self.bytes_columns[self.index[i]].append(space.bytes_w(w_item))
+
+    def delete(self, row):
+        for column in self.int_columns:
+            del column[row]
+        for column in self.float_columns:
+            del column[row]
+        for column in self.bytes_columns:
+            del column[row]
+
+    def slice(self, start, stop):
+        assert 0 <= start <= stop
+        result = TupleColumns(self.kinds)
+        for i in range(len(self.int_columns)):
+            result.int_columns[i] = self.int_columns[i][start:stop]
+        for i in range(len(self.float_columns)):
+            result.float_columns[i] = self.float_columns[i][start:stop]
+        for i in range(len(self.bytes_columns)):
+            result.bytes_columns[i] = self.bytes_columns[i][start:stop]
+        return result
+
+    def copy(self):
+        return self.slice(0, self.length())
+
+    def extend(self, other):
+        assert other.kinds == self.kinds
+        for i in range(len(self.int_columns)):
+            self.int_columns[i].extend(other.int_columns[i])
+        for i in range(len(self.float_columns)):
+            self.float_columns[i].extend(other.float_columns[i])
+        for i in range(len(self.bytes_columns)):
+            self.bytes_columns[i].extend(other.bytes_columns[i])
+
+    def reverse(self):
+        for column in self.int_columns:
+            column.reverse()
+        for column in self.float_columns:
+            column.reverse()
+        for column in self.bytes_columns:
+            column.reverse()
+
+
+class TupleListStrategy(ListStrategy):
+    """TupleListStrategy is used, if objspace.std.withtuplelists is enabled,
+    for lists of tuples of the same length (between 2 and MAX_ROW_LENGTH)
+    whose items are ints, floats or bytes, with the same kind of item at
+    each position in all the tuples.  The storage is a TupleColumns that
+    keeps the items column-wise and unboxed; the tuples are only created
+    when they are read from the list.  Anything else switches to
+    ObjectListStrategy."""
+
+    erase, unerase = rerased.new_erasing_pair("tuple")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def get_storage_for_row(self, w_row):
+        kinds = get_row_kinds(self.space, w_row)
+        assert kinds is not None
+        return self.erase(TupleColumns(kinds))
+
+    def init_from_list_w(self, w_list, list_w):
+        storage = self.get_storage_for_row(list_w[0])
+        columns = self.unerase(storage)
+        for w_item in list_w:
+            columns.append(self.space, w_item)
+        w_list.lstorage = storage
+
+    def clone(self, w_list):
+        storage = self.getstorage_copy(w_list)
+        return W_ListObject.from_storage_and_strategy(self.space, storage,
+                                                      self)
+
+    def _resize_hint(self, w_list, hint):
+        assert hint >= 0
+
+    def copy_into(self, w_list, w_other):
+        w_other.strategy = self
+        w_other.lstorage = self.getstorage_copy(w_list)
+
+    def getstorage_copy(self, w_list):
+        return self.erase(self.unerase(w_list.lstorage).copy())
+
+    def length(self, w_list):
+        return self.unerase(w_list.lstorage).length()
+
+    def _normalize_index(self, columns, index):
+        length = columns.length()
+        if index < 0:
+            index += length
+            if index < 0:
+                raise IndexError
+        elif index >= length:
+            raise IndexError
+        return index
+
+    def getitem(self, w_list, index):
+        columns = self.unerase(w_list.lstorage)
+        index = self._normalize_index(columns, index)
+        return columns.getrow(self.space, index)
+
+    def getitems_copy(self, w_list):
+        columns = self.unerase(w_list.lstorage)
+        return [columns.getrow(self.space, i)
+                for i in range(columns.length())]
+
+    @jit.unroll_safe
+    def getitems_unroll(self, w_list):
+        columns = self.unerase(w_list.lstorage)
+        return [columns.getrow(self.space, i)
+                for i in range(columns.length())]
+
+    @jit.look_inside_iff(lambda self, w_list:
+            jit.loop_unrolling_heuristic(w_list, w_list.length(),
+                                         UNROLL_CUTOFF))
+    def getitems_fixedsize(self, w_list):
+        return self.getitems_unroll(w_list)
+
+    def getslice(self, w_list, start, stop, step, length):
+        columns = self.unerase(w_list.lstorage)
+        if step == 1 and 0 <= start <= stop:
+            storage = self.erase(columns.slice(start, stop))
+            return W_ListObject.from_storage_and_strategy(
+                    self.space, storage, self)
+        items_w = [None] * length
+        for i in range(length):
+            items_w[i] = columns.getrow(self.space, start)
+            start += step
+        return W_ListObject(self.space, items_w)
+
+    def append(self, w_list, w_item):
+        columns = self.unerase(w_list.lstorage)
+        if row_matches(self.space, columns.kinds, w_item):
+            columns.append(self.space, w_item)
+            return
+        w_list.switch_to_object_strategy()
+        w_list.append(w_item)
+
+    def insert(self, w_list, index, w_item):
+        columns = self.unerase(w_list.lstorage)
+        if row_matches(self.space, columns.kinds, w_item):
+            columns.insert(self.space, index, w_item)
+            return
+        w_list.switch_to_object_strategy()
+        w_list.insert(index, w_item)
+
+    def setitem(self, w_list, index, w_item):
+        columns = self.unerase(w_list.lstorage)
+        index = self._normalize_index(columns, index)
+        if row_matches(self.space, columns.kinds, w_item):
+            columns.setrow(self.space, index, w_item)
+            return
+        w_list.switch_to_object_strategy()
+        w_list.setitem(index, w_item)
+
+    def pop(self, w_list, index):
+        columns = self.unerase(w_list.lstorage)
+        index = self._normalize_index(columns, index)
+        w_result = columns.getrow(self.space, index)
+        columns.delete(index)
+        return w_result
+
+    def pop_end(self, w_list):
+        return self.pop(w_list, -1)
+
+    def _extend_from_list(self, w_list, w_other):
+        columns = self.unerase(w_list.lstorage)
+        if w_other.strategy is self:
+            other = self.unerase(w_other.lstorage)
+            if other.kinds == columns.kinds:
+                columns.extend(other)
+                return
+        elif w_other.strategy.is_empty_strategy():
+            return
+        w_other = w_other._temporarily_as_objects()
+        w_list.switch_to_object_strategy()
+        w_list.extend(w_other)
+
+    def inplace_mul(self, w_list, times):
+        w_list.switch_to_object_strategy()
+        w_list.inplace_mul(times)
+
+    def deleteslice(self, w_list, start, step, slicelength):
+        w_list.switch_to_object_strategy()
+        w_list.deleteslice(start, step, slicelength)
+
+    def setslice(self, w_list, start, step, slicelength, sequence_w):
+        w_list.switch_to_object_strategy()
+        w_list.setslice(start, step, slicelength, sequence_w)
+
+    def reverse(self, w_list):
+        self.unerase(w_list.lstorage).reverse()
+
+    def sort(self, w_list, reverse):
+        # comparing tuples of ints, floats and bytes cannot run app-level
+        # code, so the list cannot be mutated while it is sorted
+        items_w = self.getitems_copy(w_list)
+        sorter = SimpleSort(items_w, len(items_w))
+        sorter.space = self.space
+        if reverse:
+            items_w.reverse()
+        sorter.sort()
+        if reverse:
+            items_w.reverse()
+        self.init_from_list_w(w_list, items_w)
+
 # _______________________________________________________
 
 init_signature = Signature(['sequence'], None, None)
@@ -1,7 +1,8 @@
 import weakref, sys
 
 from rpython.rlib import jit, objectmodel, debug, rerased
-from rpython.rlib.rarithmetic import intmask, r_uint
+from rpython.rlib.longlong2float import float2longlong, longlong2float
+from rpython.rlib.rarithmetic import intmask, r_uint, r_int64
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.objspace.std.dictmultiobject import (
@@ -9,6 +10,8 @@ from pypy.objspace.std.dictmultiobject import (
     BaseValueIterator, BaseItemIterator, _never_equal_to_string,
     W_DictObject, BytesDictStrategy, UnicodeDictStrategy
 )
+from pypy.objspace.std.floatobject import W_FloatObject
+from pypy.objspace.std.intobject import W_IntObject
 from pypy.objspace.std.typeobject import MutableCell
 
 
@@ -29,6 +32,22 @@ NUM_DIGITS_POW2 = 1 << NUM_DIGITS
 # dict)
 LIMIT_MAP_ATTRIBUTES = 80
 
+# how an attribute stores its values (the 'withunboxedattributes' option)
+BOXED = 0
+UNBOXED_INT = 1
+UNBOXED_FLOAT = 2
+
+def _unboxed_type(space, w_value):
+    if type(w_value) is W_IntObject:
+        unboxed_type = UNBOXED_INT
+    elif type(w_value) is W_FloatObject:
+        unboxed_type = UNBOXED_FLOAT
+    else:
+        return BOXED
+    if not space.config.objspace.std.withunboxedattributes:
+        return BOXED
+    return unboxed_type
+
 
 class AbstractAttribute(object):
     _immutable_fields_ = ['terminator']
@@ -44,6 +63,8 @@ class AbstractAttribute(object):
         attr = self.find_map_attr(name, attrkind)
         if attr is None:
             return self.terminator._read_terminator(obj, name, attrkind)
+        if isinstance(attr, UnboxedPlainAttribute):
+            return attr._direct_read(obj)
         if (
             jit.isconstant(attr.storageindex) and
             jit.isconstant(obj) and
@@ -63,7 +84,7 @@ class AbstractAttribute(object):
             return self.terminator._write_terminator(obj, name, attrkind, w_value)
         if not attr.ever_mutated:
             attr.ever_mutated = True
-        obj._mapdict_write_storage(attr.storageindex, w_value)
+        attr._direct_write(obj, w_value)
         return True
 
     def delete(self, obj, name, attrkind):
@@ -120,6 +141,17 @@ class AbstractAttribute(object):
     def length(self):
         raise NotImplementedError("abstract base class")
 
+    @jit.elidable
+    def num_attributes(self):
+        # usually the same as length(), but unboxed attributes share
+        # their storage entry
+        num = 0
+        attr = self
+        while isinstance(attr, PlainAttribute):
+            num += 1
+            attr = attr.back
+        return num
+
     def get_terminator(self):
         return self.terminator
 
@@ -134,13 +166,21 @@ class AbstractAttribute(object):
         return None
 
     @jit.elidable
-    def _get_new_attr(self, name, attrkind):
+    def _get_new_attr(self, name, attrkind, unboxed_type=BOXED):
+        # 'unboxed_type' only matters when the attribute is added for the
+        # first time: if it is later added with a value of another type,
+        # UnboxedPlainAttribute._switch_map_and_write_storage() replaces it
         cache = self.cache_attrs
         if cache is None:
             cache = self.cache_attrs = {}
         attr = cache.get((name, attrkind), None)
         if attr is None:
-            attr = PlainAttribute(name, attrkind, self)
+            if unboxed_type == UNBOXED_INT:
+                attr = UnboxedIntAttribute(name, attrkind, self)
+            elif unboxed_type == UNBOXED_FLOAT:
+                attr = UnboxedFloatAttribute(name, attrkind, self)
+            else:
+                attr = PlainAttribute(name, attrkind, self)
             cache[name, attrkind] = attr
         return attr
 
@@ -167,7 +207,7 @@ class AbstractAttribute(object):
 
 
     @jit.elidable
-    def _find_branch_to_move_into(self, name, attrkind):
+    def _find_branch_to_move_into(self, name, attrkind, unboxed_type):
         # walk up the map chain to find an ancestor with lower order that
         # already has the current name as a child inserted
         current_order = sys.maxint
@@ -182,7 +222,7 @@ class AbstractAttribute(object):
                 # we reached the top, so we didn't find it anywhere,
                 # just add it to the top attribute
                 if not isinstance(current, PlainAttribute):
-                    return 0, self._get_new_attr(name, attrkind)
+                    return 0, self._get_new_attr(name, attrkind, unboxed_type)
 
             else:
                 return number_to_readd, attr
@@ -219,17 +259,18 @@ class AbstractAttribute(object):
         stack_index = 0
         while True:
             current = self
-            number_to_readd, attr = self._find_branch_to_move_into(name, attrkind)
+            unboxed_type = _unboxed_type(self.space, w_value)
+            number_to_readd, attr = self._find_branch_to_move_into(
+                    name, attrkind, unboxed_type)
             # we found the attributes further up, need to save the
             # previous values of the attributes we passed
             if number_to_readd:
                 if stack is None:
-                    stack = [erase_map(None)] * (self.length() * 2)
+                    stack = [erase_map(None)] * (self.num_attributes() * 2)
                 current = self
                 for i in range(number_to_readd):
                     assert isinstance(current, PlainAttribute)
-                    w_self_value = obj._mapdict_read_storage(
-                            current.storageindex)
+                    w_self_value = current._direct_read(obj)
                     stack[stack_index] = erase_map(current)
                     stack[stack_index + 1] = erase_item(w_self_value)
                     stack_index += 2
@@ -369,7 +410,7 @@ class DevolvedDictTerminator(Terminator):
 class PlainAttribute(AbstractAttribute):
     _immutable_fields_ = ['name', 'attrkind', 'storageindex', 'back', 'ever_mutated?', 'order']
 
-    def __init__(self, name, attrkind, back):
+    def __init__(self, name, attrkind, back, order=-1):
         AbstractAttribute.__init__(self, back.space, back.terminator)
         self.name = name
         self.attrkind = attrkind
@@ -377,7 +418,15 @@ class PlainAttribute(AbstractAttribute):
         self.back = back
         self._size_estimate = self.length() * NUM_DIGITS_POW2
         self.ever_mutated = False
-        self.order = len(back.cache_attrs) if back.cache_attrs else 0
+        if order == -1:
+            order = len(back.cache_attrs) if back.cache_attrs else 0
+        self.order = order
+
+    def _direct_read(self, obj):
+        return obj._mapdict_read_storage(self.storageindex)
+
+    def _direct_write(self, obj, w_value):
+        obj._mapdict_write_storage(self.storageindex, w_value)
 
     def _copy_attr(self, obj, new_obj):
         w_value = self.read(obj, self.name, self.attrkind)
@@ -416,7 +465,7 @@ class PlainAttribute(AbstractAttribute):
         new_obj = self.back.materialize_r_dict(space, obj, dict_w)
         if self.attrkind == DICT:
             w_attr = space.newtext(self.name)
-            dict_w[w_attr] = obj._mapdict_read_storage(self.storageindex)
+            dict_w[w_attr] = self._direct_read(obj)
         else:
             self._copy_attr(obj, new_obj)
         return new_obj
@@ -424,7 +473,7 @@ class PlainAttribute(AbstractAttribute):
     def materialize_str_dict(self, space, obj, str_dict):
         new_obj = self.back.materialize_str_dict(space, obj, str_dict)
         if self.attrkind == DICT:
-            str_dict[self.name] = obj._mapdict_read_storage(self.storageindex)
+            str_dict[self.name] = self._direct_read(obj)
         else:
             self._copy_attr(obj, new_obj)
         return new_obj
@@ -438,6 +487,141 @@ class PlainAttribute(AbstractAttribute):
     def __repr__(self):
         return "<PlainAttribute %s %s %s %r>" % (self.name, self.attrkind, self.storageindex, self.back)
 
+
+class UnboxedStorage(W_Root):
+    """The storage entry that holds the values of all the unboxed
+    attributes of an object, as longlongs.  Never visible at app-level."""
+    def __init__(self, values):
+        self.values = values
+
+
+class UnboxedPlainAttribute(PlainAttribute):
+    """An attribute whose values are stored unboxed, as long as they are
+    all of the same type (see the subclasses).  The unboxed attributes of an
+    object share one storage entry, an UnboxedStorage, which is stored at
+    the index of the first one; 'listindex' is the index in its 'values'.
+    Writing a value of another type converts the object to boxed storage
+    (see _write_boxed())."""
+    _immutable_fields_ = ['listindex', 'storagelength']
+
+    def __init__(self, name, attrkind, back, order=-1):
+        listindex = 0
+        storageindex = back.length()
+        prev = back
+        while isinstance(prev, PlainAttribute):
+            if isinstance(prev, UnboxedPlainAttribute):
+                listindex = prev.listindex + 1
+                storageindex = prev.storageindex
+                break
+            prev = prev.back
+        self.listindex = listindex
+        if listindex == 0:
+            self.storagelength = back.length() + 1
+        else:
+            self.storagelength = back.length()
+        PlainAttribute.__init__(self, name, attrkind, back, order)
+        self.storageindex = storageindex
+
+    def length(self):
+        return self.storagelength
+
+    def _is_unboxable(self, w_value):
+        raise NotImplementedError("abstract base class")
+
+    def _unbox(self, w_value):
+        raise NotImplementedError("abstract base class")
+
+    def _box(self, value):
+        raise NotImplementedError("abstract base class")
+
+    def _get_unboxed_storage(self, obj):
+        storage = obj._mapdict_read_storage(self.storageindex)
+        assert isinstance(storage, UnboxedStorage)
+        return storage
+
+    def _direct_read(self, obj):
+        values = self._get_unboxed_storage(obj).values
+        return self._box(values[self.listindex])
+
+    def _direct_write(self, obj, w_value):
+        if not self._is_unboxable(w_value):
+            self._write_boxed(obj, w_value)
+            return
+        values = self._get_unboxed_storage(obj).values
+        values[self.listindex] = self._unbox(w_value)
+
+    def _switch_map_and_write_storage(self, obj, w_value):
+        if not self._is_unboxable(w_value):
+            attr = self._replace_by_boxed_attr()
+            attr._switch_map_and_write_storage(obj, w_value)
+            return
+        value = self._unbox(w_value)
+        if self.listindex == 0:
+            storage = UnboxedStorage([value])
+            PlainAttribute._switch_map_and_write_storage(self, obj, storage)
+            return
+        storage = self._get_unboxed_storage(obj)
+        values = storage.values
+        if self.listindex >= len(values):
+            values = values + [r_int64(0)] * (self.listindex + 1 -
+                                                 len(values))
+            storage.values = values
+        obj._set_mapdict_map(self)
+        values[self.listindex] = value
+
+    @jit.dont_look_inside
+    def _replace_by_boxed_attr(self):
+        """Replace this attribute in the tree of maps by a boxed one, which
+        is used by all the objects that get the attribute from now on.
+        Returns the boxed attribute."""
+        back = self.back
+        key = (self.name, self.attrkind)
+        attr = back.cache_attrs.get(key, None)
+        if attr is None or isinstance(attr, UnboxedPlainAttribute):
+            attr = PlainAttribute(self.name, self.attrkind, back, self.order)
+            back.cache_attrs[key] = attr
+        return attr
+
+    @jit.dont_look_inside
+    def _write_boxed(self, obj, w_value):
+        # a value of another type is written into the attribute: give up
+        # unboxing it.  'obj' is rebuilt with maps where it is boxed
+        self._replace_by_boxed_attr()
+        new_obj = obj._get_mapdict_map().copy(obj)
+        obj._set_mapdict_storage_and_map(new_obj.storage, new_obj.map)
+        flag = obj._get_mapdict_map().write(obj, self.name, self.attrkind,
+                                            w_value)
+        assert flag
+
+    def __repr__(self):
+        return "<%s %s %s %s[%s] %r>" % (
+            self.__class__.__name__, self.name, self.attrkind,
+            self.storageindex, self.listindex, self.back)
+
+
+class UnboxedIntAttribute(UnboxedPlainAttribute):
+    def _is_unboxable(self, w_value):
+        return type(w_value) is W_IntObject
+
+    def _unbox(self, w_value):
+        assert isinstance(w_value, W_IntObject)
+        return r_int64(w_value.intval)
+
+    def _box(self, value):
+        return self.space.newint(intmask(value))
+
+
+class UnboxedFloatAttribute(UnboxedPlainAttribute):
+    def _is_unboxable(self, w_value):
+        return type(w_value) is W_FloatObject
+
+    def _unbox(self, w_value):
+        assert isinstance(w_value, W_FloatObject)
+        return float2longlong(w_value.floatval)
+
+    def _box(self, value):
+        return self.space.newfloat(longlong2float(value))
+
 class MapAttrCache(object):
     def __init__(self, space):
         SIZE = 1 << space.config.objspace.std.methodcachesizeexp
@@ -991,9 +1175,11 @@ class MapDictIteratorItems(BaseItemIterator):
 class CacheEntry(object):
     version_tag = None
     storageindex = 0
+    unboxed_attr = None
     w_method = None # for callmethod
     success_counter = 0
     failure_counter = 0
+    fill_counter = 0 # number of times the entry was (re)filled
 
     def is_valid_for_obj(self, w_obj):
         map = w_obj._get_mapdict_map()
@@ -1023,7 +1209,8 @@ def init_mapdict_cache(pycode):
     pycode._mapdict_caches = [INVALID_CACHE_ENTRY] * num_entries
 
 @jit.dont_look_inside
-def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None):
+def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None,
+                unboxed_attr=None):
     if not pycode.space._side_effects_ok():
         return
     entry = pycode._mapdict_caches[nameindex]
@@ -1034,6 +1221,8 @@ def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None
     entry.version_tag = version_tag
     entry.storageindex = storageindex
     entry.w_method = w_method
+    entry.unboxed_attr = unboxed_attr
+    entry.fill_counter += 1
     if pycode.space.config.objspace.std.withmethodcachecounter:
         entry.failure_counter += 1
 
@@ -1044,6 +1233,8 @@ def LOAD_ATTR_caching(pycode, w_obj, nameindex):
     map = w_obj._get_mapdict_map()
     if entry.is_valid_for_map(map) and entry.w_method is None:
         # everything matches, it's incredibly fast
+        if entry.unboxed_attr is not None:
+            return entry.unboxed_attr._direct_read(w_obj)
         return w_obj._mapdict_read_storage(entry.storageindex)
     return LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map)
 LOAD_ATTR_caching._always_inline_ = True
@@ -1090,8 +1281,12 @@ def LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map):
                     # Note that if map.terminator is a DevolvedDictTerminator
                     # or the class provides its own dict, not using mapdict, then:
                     # map.find_map_attr will always return None if attrkind==DICT.
-                    _fill_cache(pycode, nameindex, map, version_tag, attr.storageindex)
-                    return w_obj._mapdict_read_storage(attr.storageindex)
+                    unboxed_attr = None
+                    if isinstance(attr, UnboxedPlainAttribute):
+                        unboxed_attr = attr
+                    _fill_cache(pycode, nameindex, map, version_tag,
+                                attr.storageindex, unboxed_attr=unboxed_attr)
+                    return attr._direct_read(w_obj)
     if space.config.objspace.std.withmethodcachecounter:
         INVALID_CACHE_ENTRY.failure_counter += 1
     return space.getattr(w_obj, w_name)
@@ -1129,3 +1324,57 @@ def LOOKUP_METHOD_mapdict_fill_cache_method(space, pycode, name, nameindex,
 # XXX fix me: if a function contains a loop with both LOAD_ATTR and
 # XXX LOOKUP_METHOD on the same attribute name, it keeps trashing and
 # XXX rebuilding the cache
+
+
+# ____________________________________________________________
+# Statistics, for __pypy__.mapdict_tree_stats() and friends
+
+def map_tree_stats(terminator):
+    """Return (number of maps, number of terminal maps, depth) of the tree
+    of maps that starts at 'terminator'.  Terminal maps are the maps that no
+    attribute was ever added to; the depth is the length of the longest
+    map."""
+    num_maps = 0
+    num_terminal = 0
+    depth = 0
+    todo = [terminator]
+    while todo:
+        map = todo.pop()
+        if map.cache_attrs:
+            for attr in map.cache_attrs.itervalues():
+                todo.append(attr)
+        elif map is not terminator:
+            num_terminal += 1
+        if map is not terminator:
+            num_maps += 1
+        depth = max(depth, map.num_attributes())
+    return num_maps, num_terminal, depth
+
+def map_attribute_names(map):
+    """Return the list of the names of the attributes in 'map', in storage
+    order.  The entries that are not instance attributes are written like
+    '<weakref>' or '<slot 0>'."""
+    names = []
+    while isinstance(map, PlainAttribute):
+        if map.attrkind == DICT:
+            names.append(map.name)
+        elif map.attrkind >= SLOTS_STARTING_FROM:
+            names.append("<slot %d>" % (map.attrkind - SLOTS_STARTING_FROM))
+        else:
+            names.append("<%s>" % (map.name,))
+        map = map.back
+    names.reverse()
+    return names
+
+def code_mapdict_sites(pycode):
+    """Return a list of (nameindex, fill_counter) for all the attribute
+    caches of 'pycode' that were filled at least once.  An entry that is
+    filled over and over again is used by objects with many different maps
+    (or classes): the attribute lookups of its site are megamorphic."""
+    result = []
+    caches = pycode._mapdict_caches
+    for nameindex in range(len(caches)):
+        entry = caches[nameindex]
+        if entry.fill_counter > 0:
+            result.append((nameindex, entry.fill_counter))
+    return result
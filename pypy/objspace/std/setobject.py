@@ -4,6 +4,8 @@ from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.signature import Signature
 from pypy.interpreter.typedef import TypeDef
 from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.dictmultiobject import float_eq, float_hash
+from pypy.objspace.std.floatobject import W_FloatObject
 from pypy.objspace.std.intobject import W_IntObject
 from pypy.objspace.std.unicodeobject import W_UnicodeObject
 from pypy.objspace.std.util import IDTAG_SPECIAL, IDTAG_SHIFT
@@ -95,6 +97,10 @@ class W_BaseSetObject(W_Root):
         """ If this is an int set return its contents as a list of uwnrapped ints. Otherwise return None. """
         return self.strategy.listview_int(self)
 
+    def listview_float(self):
+        """ If this is a float set return its contents as a list of uwnrapped floats. Otherwise return None. """
+        return self.strategy.listview_float(self)
+
     def get_storage_copy(self):
         """ Returns a copy of the storage. Needed when we want to clone all elements from one set and
         put them into another. """
@@ -729,6 +735,9 @@ class SetStrategy(object):
     def listview_int(self, w_set):
         return None
 
+    def listview_float(self, w_set):
+        return None
+
     #def erase(self, storage):
     #    raise NotImplementedError
 
@@ -828,8 +837,13 @@ class EmptySetStrategy(SetStrategy):
             strategy = self.space.fromcache(IntegerSetStrategy)
         elif type(w_key) is W_BytesObject:
             strategy = self.space.fromcache(BytesSetStrategy)
-        elif type(w_key) is W_UnicodeObject and w_key.is_ascii():
-            strategy = self.space.fromcache(AsciiSetStrategy)
+        elif type(w_key) is W_UnicodeObject:
+            if w_key.is_ascii():
+                strategy = self.space.fromcache(AsciiSetStrategy)
+            else:
+                strategy = self.space.fromcache(UnicodeSetStrategy)
+        elif type(w_key) is W_FloatObject:
+            strategy = self.space.fromcache(FloatSetStrategy)
         elif self.space.type(w_key).compares_by_identity():
             strategy = self.space.fromcache(IdentitySetStrategy)
         else:
@@ -947,6 +961,9 @@ class AbstractUnwrappedSetStrategy(object):
         else:
             w_set.switch_to_object_strategy(self.space)
             w_set.add(w_key)
+    # for the subclasses that override add(); being part of the mixin,
+    # this gets specialized for every class like add() itself
+    _add_unwrapped = add
 
     def remove(self, w_set, w_item):
         d = self.unerase(w_set.sstorage)
@@ -1031,6 +1048,10 @@ class AbstractUnwrappedSetStrategy(object):
             storage = self._difference_wrapped(w_set, w_other)
         return storage
 
+    # for the subclasses that override _difference_base(); like
+    # _add_unwrapped, this gets specialized for every class
+    _generic_difference_base = _difference_base
+
     def difference(self, w_set, w_other):
         storage = self._difference_base(w_set, w_other)
         w_newset = w_set.from_storage_and_strategy(storage, w_set.strategy)
@@ -1067,6 +1088,7 @@ class AbstractUnwrappedSetStrategy(object):
                 self._difference_update_unwrapped(w_set, w_other)
             elif w_set.strategy.may_contain_equal_elements(w_other.strategy):
                 self._difference_update_wrapped(w_set, w_other)
+    _generic_difference_update = difference_update
 
     def _symmetric_difference_unwrapped(self, w_set, w_other):
         d_new = self.get_empty_dict()
@@ -1109,6 +1131,8 @@ class AbstractUnwrappedSetStrategy(object):
             storage = self._symmetric_difference_wrapped(w_set, w_other)
         return storage, strategy
 
+    _generic_symmetric_difference_base = _symmetric_difference_base
+
     def symmetric_difference(self, w_set, w_other):
         if w_other.length() == 0:
             return w_set.copy_real()
@@ -1142,6 +1166,8 @@ class AbstractUnwrappedSetStrategy(object):
                 storage = self._intersect_wrapped(w_set, w_other)
         return storage, strategy
 
+    _generic_intersect_base = _intersect_base
+
     def _intersect_wrapped(self, w_set, w_other):
         result = newset(self.space)
         for key in self.unerase(w_set.sstorage):
@@ -1240,6 +1266,7 @@ class AbstractUnwrappedSetStrategy(object):
             return
         w_set.switch_to_object_strategy(self.space)
         w_set.update(w_other)
+    _update_unwrapped = update
 
     def popitem(self, w_set):
         storage = self.unerase(w_set.sstorage)
@@ -1275,6 +1302,8 @@ class BytesSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def may_contain_equal_elements(self, strategy):
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        elif strategy is self.space.fromcache(FloatSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1314,6 +1343,8 @@ class AsciiSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def may_contain_equal_elements(self, strategy):
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        elif strategy is self.space.fromcache(FloatSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1329,6 +1360,184 @@ class AsciiSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def iter(self, w_set):
         return UnicodeIteratorImplementation(self.space, self, w_set)
 
+    def add(self, w_set, w_key):
+        if type(w_key) is W_UnicodeObject and not w_key.is_ascii():
+            self.switch_to_unicode_strategy(w_set)
+            w_set.add(w_key)
+        else:
+            self._add_unwrapped(w_set, w_key)
+
+    def update(self, w_set, w_other):
+        if w_other.strategy is self.space.fromcache(UnicodeSetStrategy):
+            self.switch_to_unicode_strategy(w_set)
+            w_set.update(w_other)
+        else:
+            self._update_unwrapped(w_set, w_other)
+
+    def switch_to_unicode_strategy(self, w_set):
+        # both strategies store utf8 strings, so the dict can be reused
+        strategy = self.space.fromcache(UnicodeSetStrategy)
+        w_set.sstorage = strategy.erase(self.unerase(w_set.sstorage))
+        w_set.strategy = strategy
+
+    # the operations with a UnicodeSetStrategy compare the utf8 strings
+    # directly; see _difference_utf8() and the following functions
+
+    def _difference_base(self, w_set, w_other):
+        unicode_strategy = self.space.fromcache(UnicodeSetStrategy)
+        if w_other.strategy is unicode_strategy:
+            return self.erase(_difference_utf8(
+                self.unerase(w_set.sstorage),
+                unicode_strategy.unerase(w_other.sstorage)))
+        return self._generic_difference_base(w_set, w_other)
+
+    def difference_update(self, w_set, w_other):
+        unicode_strategy = self.space.fromcache(UnicodeSetStrategy)
+        if w_other.strategy is unicode_strategy:
+            _difference_update_utf8(self.unerase(w_set.sstorage),
+                                    unicode_strategy.unerase(w_other.sstorage))
+        else:
+            self._generic_difference_update(w_set, w_other)
+
+    def _symmetric_difference_base(self, w_set, w_other):
+        unicode_strategy = self.space.fromcache(UnicodeSetStrategy)
+        if w_other.strategy is unicode_strategy:
+            storage = unicode_strategy.erase(_symmetric_difference_utf8(
+                self.unerase(w_set.sstorage),
+                unicode_strategy.unerase(w_other.sstorage)))
+            return storage, unicode_strategy
+        return self._generic_symmetric_difference_base(w_set, w_other)
+
+    def _intersect_base(self, w_set, w_other):
+        unicode_strategy = self.space.fromcache(UnicodeSetStrategy)
+        if w_other.strategy is unicode_strategy:
+            # all the common keys are ascii
+            storage = self.erase(_intersect_utf8(
+                self.unerase(w_set.sstorage),
+                unicode_strategy.unerase(w_other.sstorage)))
+            return storage, self
+        return self._generic_intersect_base(w_set, w_other)
+
+
+class UnicodeSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
+    """ Sets of unicode strings, some of which are not ascii.  The keys are
+    the utf8 strings of the W_UnicodeObjects. """
+    erase, unerase = rerased.new_erasing_pair("utf8")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    intersect_jmp = jit.JitDriver(greens = [], reds = 'auto',
+                                  name='set(utf8).intersect')
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def get_empty_dict(self):
+        return {}
+
+    def is_correct_type(self, w_key):
+        return type(w_key) is W_UnicodeObject
+
+    def may_contain_equal_elements(self, strategy):
+        if strategy is self.space.fromcache(IntegerSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(FloatSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(EmptySetStrategy):
+            return False
+        elif strategy is self.space.fromcache(IdentitySetStrategy):
+            return False
+        return True
+
+    def unwrap(self, w_item):
+        return self.space.utf8_w(w_item)
+
+    def wrap(self, item):
+        return self.space.newutf8(item, rutf8.codepoints_in_utf8(item))
+
+    def iter(self, w_set):
+        return Utf8IteratorImplementation(self.space, self, w_set)
+
+    def update(self, w_set, w_other):
+        ascii_strategy = self.space.fromcache(AsciiSetStrategy)
+        if w_other.strategy is ascii_strategy:
+            d_set = self.unerase(w_set.sstorage)
+            d_set.update(ascii_strategy.unerase(w_other.sstorage))
+        else:
+            self._update_unwrapped(w_set, w_other)
+
+    def _difference_base(self, w_set, w_other):
+        ascii_strategy = self.space.fromcache(AsciiSetStrategy)
+        if w_other.strategy is ascii_strategy:
+            return self.erase(_difference_utf8(
+                self.unerase(w_set.sstorage),
+                ascii_strategy.unerase(w_other.sstorage)))
+        return self._generic_difference_base(w_set, w_other)
+
+    def difference_update(self, w_set, w_other):
+        ascii_strategy = self.space.fromcache(AsciiSetStrategy)
+        if w_other.strategy is ascii_strategy:
+            _difference_update_utf8(self.unerase(w_set.sstorage),
+                                    ascii_strategy.unerase(w_other.sstorage))
+        else:
+            self._generic_difference_update(w_set, w_other)
+
+    def _symmetric_difference_base(self, w_set, w_other):
+        ascii_strategy = self.space.fromcache(AsciiSetStrategy)
+        if w_other.strategy is ascii_strategy:
+            storage = self.erase(_symmetric_difference_utf8(
+                self.unerase(w_set.sstorage),
+                ascii_strategy.unerase(w_other.sstorage)))
+            return storage, self
+        return self._generic_symmetric_difference_base(w_set, w_other)
+
+    def _intersect_base(self, w_set, w_other):
+        ascii_strategy = self.space.fromcache(AsciiSetStrategy)
+        if w_other.strategy is ascii_strategy:
+            storage = ascii_strategy.erase(_intersect_utf8(
+                ascii_strategy.unerase(w_other.sstorage),
+                self.unerase(w_set.sstorage)))
+            return storage, ascii_strategy
+        return self._generic_intersect_base(w_set, w_other)
+
+
+def _difference_utf8(d_this, d_other):
+    # the keys of AsciiSetStrategy and UnicodeSetStrategy are both utf8
+    # strings, so they can be compared without wrapping them
+    result = {}
+    for key, keyhash in iterkeys_with_hash(d_this):
+        if not contains_with_hash(d_other, key, keyhash):
+            setitem_with_hash(result, key, keyhash, None)
+    return result
+
+def _difference_update_utf8(d_this, d_other):
+    if len(d_this) < len(d_other):
+        for key, keyhash in iterkeys_with_hash(d_this.copy()):
+            if contains_with_hash(d_other, key, keyhash):
+                delitem_with_hash(d_this, key, keyhash)
+    else:
+        for key, keyhash in iterkeys_with_hash(d_other):
+            try:
+                delitem_with_hash(d_this, key, keyhash)
+            except KeyError:
+                pass
+
+def _symmetric_difference_utf8(d_this, d_other):
+    result = _difference_utf8(d_this, d_other)
+    for key, keyhash in iterkeys_with_hash(d_other):
+        if not contains_with_hash(d_this, key, keyhash):
+            setitem_with_hash(result, key, keyhash, None)
+    return result
+
+def _intersect_utf8(d_this, d_other):
+    if len(d_this) > len(d_other):
+        d_this, d_other = d_other, d_this
+    result = {}
+    for key, keyhash in iterkeys_with_hash(d_this):
+        if contains_with_hash(d_other, key, keyhash):
+            setitem_with_hash(result, key, keyhash, None)
+    return result
+
 
 class IntegerSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     erase, unerase = rerased.new_erasing_pair("integer")
@@ -1355,6 +1564,8 @@ class IntegerSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
             return False
         elif strategy is self.space.fromcache(AsciiSetStrategy):
             return False
+        elif strategy is self.space.fromcache(UnicodeSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1371,6 +1582,50 @@ class IntegerSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
         return IntegerIteratorImplementation(self.space, self, w_set)
 
 
+class FloatSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    intersect_jmp = jit.JitDriver(greens = [], reds = 'auto',
+                                  name='set(float).intersect')
+
+    def get_empty_storage(self):
+        return self.erase(self.get_empty_dict())
+
+    def get_empty_dict(self):
+        # NaNs with the same bits are equal, like with the 'is' of floats
+        return r_dict(float_eq, float_hash, simple_hash_eq=True)
+
+    def listview_float(self, w_set):
+        return self.unerase(w_set.sstorage).keys()
+
+    def is_correct_type(self, w_key):
+        return type(w_key) is W_FloatObject
+
+    def may_contain_equal_elements(self, strategy):
+        if strategy is self.space.fromcache(BytesSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(AsciiSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(UnicodeSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(EmptySetStrategy):
+            return False
+        elif strategy is self.space.fromcache(IdentitySetStrategy):
+            return False
+        return True
+
+    def unwrap(self, w_item):
+        return self.space.float_w(w_item)
+
+    def wrap(self, item):
+        return self.space.newfloat(item)
+
+    def iter(self, w_set):
+        return FloatIteratorImplementation(self.space, self, w_set)
+
+
 class ObjectSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     erase, unerase = rerased.new_erasing_pair("object")
     erase = staticmethod(erase)
@@ -1446,6 +1701,10 @@ class IdentitySetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
             return False
         if strategy is self.space.fromcache(AsciiSetStrategy):
             return False
+        if strategy is self.space.fromcache(UnicodeSetStrategy):
+            return False
+        if strategy is self.space.fromcache(FloatSetStrategy):
+            return False
         return True
 
     def unwrap(self, w_item):
@@ -1533,6 +1792,19 @@ class UnicodeIteratorImplementation(IteratorImplementation):
             return None
 
 
+class Utf8IteratorImplementation(IteratorImplementation):
+    def __init__(self, space, strategy, w_set):
+        IteratorImplementation.__init__(self, space, strategy, w_set)
+        d = strategy.unerase(w_set.sstorage)
+        self.iterator = d.iterkeys()
+
+    def next_entry(self):
+        for key in self.iterator:
+            return self.space.newutf8(key, rutf8.codepoints_in_utf8(key))
+        else:
+            return None
+
+
 class IntegerIteratorImplementation(IteratorImplementation):
     #XXX same implementation in dictmultiobject on dictstrategy-branch
     def __init__(self, space, strategy, w_set):
@@ -1547,6 +1819,18 @@ class IntegerIteratorImplementation(IteratorImplementation):
         else:
             return None
 
+class FloatIteratorImplementation(IteratorImplementation):
+    def __init__(self, space, strategy, w_set):
+        IteratorImplementation.__init__(self, space, strategy, w_set)
+        d = strategy.unerase(w_set.sstorage)
+        self.iterator = d.iterkeys()
+
+    def next_entry(self):
+        for key in self.iterator:
+            return self.space.newfloat(key)
+        else:
+            return None
+
 class IdentityIteratorImplementation(IteratorImplementation):
     def __init__(self, space, strategy, w_set):
         IteratorImplementation.__init__(self, space, strategy, w_set)
@@ -1638,6 +1922,13 @@ def set_strategy_and_setdata(space, w_set, w_iterable):
         w_set.sstorage = strategy.get_storage_from_unwrapped_list(intlist)
         return
 
+    floatlist = space.listview_float(w_iterable)
+    if floatlist is not None:
+        strategy = space.fromcache(FloatSetStrategy)
+        w_set.strategy = strategy
+        w_set.sstorage = strategy.get_storage_from_unwrapped_list(floatlist)
+        return
+
     length_hint = space.length_hint(w_iterable, 0)
 
     if jit.isconstant(length_hint) and length_hint:
@@ -1679,6 +1970,24 @@ def _pick_correct_strategy_unroll(space, w_set, w_iterable):
         w_set.sstorage = w_set.strategy.get_storage_from_list(iterable_w)
         return
 
+    # check for non-ascii unicode
+    for w_item in iterable_w:
+        if type(w_item) is not W_UnicodeObject:
+            break
+    else:
+        w_set.strategy = space.fromcache(UnicodeSetStrategy)
+        w_set.sstorage = w_set.strategy.get_storage_from_list(iterable_w)
+        return
+
+    # check for floats
+    for w_item in iterable_w:
+        if type(w_item) is not W_FloatObject:
+            break
+    else:
+        w_set.strategy = space.fromcache(FloatSetStrategy)
+        w_set.sstorage = w_set.strategy.get_storage_from_list(iterable_w)
+        return
+
     # check for compares by identity
     for w_item in iterable_w:
         if not space.type(w_item).compares_by_identity():
@@ -1,6 +1,8 @@
 from pypy.interpreter.error import oefmt
 from pypy.objspace.std.tupleobject import W_AbstractTupleObject
 from pypy.objspace.std.util import negate
+from rpython.rlib import jit
+from rpython.rlib.debug import make_sure_not_resized
 from rpython.rlib.objectmodel import specialize
 from rpython.rlib.rarithmetic import intmask
 from rpython.rlib.unroll import unrolling_iterable
@@ -144,6 +146,125 @@ Cls_ii = make_specialised_class((int, int))
 Cls_oo = make_specialised_class((object, object))
 Cls_ff = make_specialised_class((float, float))
 
+# ---------- packed versions, for longer tuples of ints or floats ----------
+
+MAX_PACKED_LENGTH = 8
+
+def make_packed_class(typ):
+    """Make a class for tuples of 3 to MAX_PACKED_LENGTH items that are all
+    exact ints or all exact floats, stored unboxed in a fixed-size list."""
+    if typ == int:
+        wrap = lambda space, x: space.newint(x)
+    elif typ == float:
+        wrap = lambda space, x: space.newfloat(x)
+    else:
+        assert 0
+
+    class cls(W_AbstractTupleObject):
+        _immutable_fields_ = ['values[*]']
+
+        def __init__(self, space, values):
+            make_sure_not_resized(values)
+            self.space = space
+            self.values = values
+
+        def length(self):
+            return len(self.values)
+
+        @jit.unroll_safe
+        def tolist(self):
+            list_w = [None] * len(self.values)
+            for i in range(len(self.values)):
+                list_w[i] = wrap(self.space, self.values[i])
+            return list_w
+
+        # same source code, but builds and returns a resizable list
+        getitems_copy = func_with_new_name(tolist, 'getitems_copy')
+
+        @jit.unroll_safe
+        def descr_hash(self, space):
+            # the same algorithm as W_TupleObject.descr_hash()
+            mult = 1000003
+            x = 0x345678
+            z = len(self.values)
+            for value in self.values:
+                if typ == float:
+                    from pypy.objspace.std.floatobject import _hash_float
+                    y = _hash_float(space, value)
+                else:
+                    from pypy.objspace.std.intobject import _hash_int
+                    y = _hash_int(value)
+                x = (x ^ y) * mult
+                z -= 1
+                mult += 82520 + z + z
+            x += 97531
+            return space.newint(intmask(x))
+
+        @jit.unroll_safe
+        def descr_eq(self, space, w_other):
+            if not isinstance(w_other, W_AbstractTupleObject):
+                return space.w_NotImplemented
+            length = len(self.values)
+            if w_other.length() != length:
+                return space.w_False
+            if not isinstance(w_other, cls):
+                for i in range(length):
+                    w_item = wrap(space, self.values[i])
+                    if not space.eq_w(w_item, w_other.getitem(space, i)):
+                        return space.w_False
+                return space.w_True
+            for i in range(length):
+                myval = self.values[i]
+                otherval = w_other.values[i]
+                if myval != otherval:
+                    if typ == float:
+                        # issue with NaNs, which should be equal here
+                        if float2longlong(myval) == float2longlong(otherval):
+                            continue
+                    return space.w_False
+            return space.w_True
+
+        descr_ne = negate(descr_eq)
+
+        def getitem(self, space, index):
+            length = len(self.values)
+            if index < 0:
+                index += length
+            if not 0 <= index < length:
+                raise oefmt(space.w_IndexError, "tuple index out of range")
+            return wrap(space, self.values[index])
+
+    cls.__name__ = 'W_SpecialisedTupleObject_N' + typ.__name__[0]
+    _specialisations.append(cls)
+    return cls
+
+Cls_Ni = make_packed_class(int)
+Cls_Nf = make_packed_class(float)
+
+@jit.unroll_safe
+def _make_packed_tuple(space, list_w):
+    from pypy.objspace.std.intobject import W_IntObject
+    from pypy.objspace.std.floatobject import W_FloatObject
+    length = len(list_w)
+    if type(list_w[0]) is W_IntObject:
+        for w_item in list_w:
+            if type(w_item) is not W_IntObject:
+                raise NotSpecialised
+        ints = [0] * length
+        for i in range(length):
+            ints[i] = space.int_w(list_w[i])
+        return Cls_Ni(space, ints)
+    elif type(list_w[0]) is W_FloatObject:
+        for w_item in list_w:
+            if type(w_item) is not W_FloatObject:
+                raise NotSpecialised
+        floats = [0.0] * length
+        for i in range(length):
+            floats[i] = space.float_w(list_w[i])
+        return Cls_Nf(space, floats)
+    raise NotSpecialised
+
+
 def makespecialisedtuple(space, list_w):
     from pypy.objspace.std.intobject import W_IntObject
     from pypy.objspace.std.floatobject import W_FloatObject
@@ -156,6 +277,8 @@ def makespecialisedtuple(space, list_w):
             if type(w_arg2) is W_FloatObject:
                 return Cls_ff(space, space.float_w(w_arg1), space.float_w(w_arg2))
         return Cls_oo(space, w_arg1, w_arg2)
+    elif 3 <= len(list_w) <= MAX_PACKED_LENGTH:
+        return _make_packed_tuple(space, list_w)
     else:
         raise NotSpecialised
 
@@ -0,0 +1,68 @@
+"""String buffers (the 'withstrbuf' option)
+
+'a + b' where 'a' is a long enough string returns a W_StringBufferObject,
+which keeps the pieces in a StringBuilder.  Adding more strings to the end
+appends them to the same builder, so that building a string with
+'s += piece' in a loop takes linear time even without the JIT.  Any other
+operation first forces the W_StringBufferObject into a W_BytesObject.
+"""
+
+from rpython.rlib.rstring import StringBuilder
+
+from pypy.objspace.std.bytesobject import (
+    W_AbstractBytesObject, W_BytesObject, W_DeferredBytesObject)
+
+
+# 'a + b' only makes a string buffer if 'a' has at least this length;
+# shorter strings are cheaper to copy than to put in a builder
+MIN_BUFFER_LENGTH = 256
+
+
+def concat_strings(space, s1, s2):
+    if len(s1) < MIN_BUFFER_LENGTH:
+        return W_BytesObject(s1 + s2)
+    builder = StringBuilder(2 * (len(s1) + len(s2)))
+    builder.append(s1)
+    builder.append(s2)
+    return W_StringBufferObject(builder)
+
+
+class W_StringBufferObject(W_DeferredBytesObject):
+    w_str = None
+
+    def __init__(self, builder):
+        self.builder = builder             # StringBuilder
+        self.length = builder.getlength()
+
+    def force(self):
+        if self.w_str is None:
+            s = self.builder.build()
+            if self.length < len(s):
+                # more was appended to the builder by another
+                # W_StringBufferObject
+                s = s[:self.length]
+            self.w_str = W_BytesObject(s)
+        return self.w_str
+
+    def __repr__(self):
+        """representation for debugging purposes"""
+        return "%s(%r[:%d])" % (
+            self.__class__.__name__, self.builder, self.length)
+
+    def descr_len(self, space):
+        return space.newint(self.length)
+
+    def descr_add(self, space, w_other):
+        if not isinstance(w_other, W_AbstractBytesObject):
+            # unicode, bytearray, buffers...
+            return self.force().descr_add(space, w_other)
+        other = space.bytes_w(w_other)
+        if self.builder.getlength() != self.length:
+            # the builder already contains what was added to this string
+            # by someone else: start a new one
+            builder = StringBuilder(2 * (self.length + len(other)))
+            builder.append(space.bytes_w(self))
+        else:
+            builder = self.builder
+        builder.append(other)
+        return W_StringBufferObject(builder)
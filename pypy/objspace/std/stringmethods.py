@@ -4,7 +4,8 @@ from rpython.rlib import jit
 from rpython.rlib.objectmodel import specialize, newlist_hint
 from rpython.rlib.rarithmetic import ovfcheck
 from rpython.rlib.rstring import (
-    find, rfind, count, endswith, replace, rsplit, split, startswith)
+    find, rfind, count, endswith, replace, rsplit, split, startswith,
+    SEARCH_COUNT, SEARCH_FIND, SEARCH_RFIND)
 from rpython.rlib.buffer import Buffer
 
 from pypy.interpreter.error import OperationError, oefmt
@@ -22,6 +23,16 @@ class StringMethods(object):
         #    return orig_obj
         return self._new(s[start:stop])
 
+    def _search_bytes(self, value, sub, start, end, mode):
+        # search for the RPython string 'sub' in 'value', which is what
+        # _convert_idx_params() returns; overridden in bytearrayobject.py
+        if mode == SEARCH_FIND:
+            return find(value, sub, start, end)
+        elif mode == SEARCH_RFIND:
+            return rfind(value, sub, start, end)
+        else:
+            return count(value, sub, start, end)
+
     def _convert_idx_params(self, space, w_start, w_end):
         value = self._val(space)
         lenself = len(value)
@@ -42,12 +53,12 @@ class StringMethods(object):
         value, start, end, _ = self._convert_idx_params(space, None, None)
         if self._use_rstr_ops(space, w_sub):
             other = self._op_val(space, w_sub)
-            return space.newbool(value.find(other, start, end) >= 0)
+            return space.newbool(find(value, other, start, end) >= 0)
 
         from pypy.objspace.std.bytesobject import W_BytesObject
         if isinstance(w_sub, W_BytesObject):
             other = self._op_val(space, w_sub)
-            res = find(value, other, start, end)
+            res = self._search_bytes(value, other, start, end, SEARCH_FIND)
         else:
             buffer = _get_buffer(space, w_sub)
             res = find(value, buffer, start, end)
@@ -150,15 +161,16 @@ class StringMethods(object):
         value, start, end, _ = self._convert_idx_params(space, w_start, w_end)
 
         if self._use_rstr_ops(space, w_sub):
-            return space.newint(value.count(self._op_val(space, w_sub), start,
-                                            end))
+            return space.newint(count(value, self._op_val(space, w_sub), start,
+                                      end))
 
         from pypy.objspace.std.bytearrayobject import W_BytearrayObject
         from pypy.objspace.std.bytesobject import W_BytesObject
         if isinstance(w_sub, W_BytearrayObject):
             res = count(value, w_sub.getdata(), start, end)
         elif isinstance(w_sub, W_BytesObject):
-            res = count(value, w_sub._value, start, end)
+            res = self._search_bytes(value, w_sub._value, start, end,
+                                     SEARCH_COUNT)
         else:
             buffer = _get_buffer(space, w_sub)
             res = count(value, buffer, start, end)
@@ -239,7 +251,7 @@ class StringMethods(object):
         value, start, end, ofs = self._convert_idx_params(space, w_start, w_end)
 
         if self._use_rstr_ops(space, w_sub):
-            res = value.find(self._op_val(space, w_sub), start, end)
+            res = find(value, self._op_val(space, w_sub), start, end)
             return space.newint(res)
 
         from pypy.objspace.std.bytearrayobject import W_BytearrayObject
@@ -247,7 +259,8 @@ class StringMethods(object):
         if isinstance(w_sub, W_BytearrayObject):
             res = find(value, w_sub.getdata(), start, end)
         elif isinstance(w_sub, W_BytesObject):
-            res = find(value, w_sub._value, start, end)
+            res = self._search_bytes(value, w_sub._value, start, end,
+                                     SEARCH_FIND)
         else:
             buffer = _get_buffer(space, w_sub)
             res = find(value, buffer, start, end)
@@ -259,7 +272,7 @@ class StringMethods(object):
         value, start, end, ofs = self._convert_idx_params(space, w_start, w_end)
 
         if self._use_rstr_ops(space, w_sub):
-            res = value.rfind(self._op_val(space, w_sub), start, end)
+            res = rfind(value, self._op_val(space, w_sub), start, end)
             return space.newint(res)
 
         from pypy.objspace.std.bytearrayobject import W_BytearrayObject
@@ -267,7 +280,8 @@ class StringMethods(object):
         if isinstance(w_sub, W_BytearrayObject):
             res = rfind(value, w_sub.getdata(), start, end)
         elif isinstance(w_sub, W_BytesObject):
-            res = rfind(value, w_sub._value, start, end)
+            res = self._search_bytes(value, w_sub._value, start, end,
+                                     SEARCH_RFIND)
         else:
             buffer = _get_buffer(space, w_sub)
             res = rfind(value, buffer, start, end)
@@ -281,11 +295,12 @@ class StringMethods(object):
         from pypy.objspace.std.bytearrayobject import W_BytearrayObject
         from pypy.objspace.std.bytesobject import W_BytesObject
         if self._use_rstr_ops(space, w_sub):
-            res = value.find(self._op_val(space, w_sub), start, end)
+            res = find(value, self._op_val(space, w_sub), start, end)
         elif isinstance(w_sub, W_BytearrayObject):
             res = find(value, w_sub.getdata(), start, end)
         elif isinstance(w_sub, W_BytesObject):
-            res = find(value, w_sub._value, start, end)
+            res = self._search_bytes(value, w_sub._value, start, end,
+                                     SEARCH_FIND)
         else:
             buffer = _get_buffer(space, w_sub)
             res = find(value, buffer, start, end)
@@ -303,11 +318,12 @@ class StringMethods(object):
         from pypy.objspace.std.bytearrayobject import W_BytearrayObject
         from pypy.objspace.std.bytesobject import W_BytesObject
         if self._use_rstr_ops(space, w_sub):
-            res = value.rfind(self._op_val(space, w_sub), start, end)
+            res = rfind(value, self._op_val(space, w_sub), start, end)
         elif isinstance(w_sub, W_BytearrayObject):
             res = rfind(value, w_sub.getdata(), start, end)
         elif isinstance(w_sub, W_BytesObject):
-            res = rfind(value, w_sub._value, start, end)
+            res = self._search_bytes(value, w_sub._value, start, end,
+                                     SEARCH_RFIND)
         else:
             buffer = _get_buffer(space, w_sub)
             res = rfind(value, buffer, start, end)
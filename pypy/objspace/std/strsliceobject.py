@@ -0,0 +1,122 @@
+"""Strings optimized for slicing (the 'withstrslice' option)
+
+A W_StringSliceObject is a view on the characters start:stop of another
+string.  It is a regular 'str' at app-level; len(), indexing, slicing,
+count() and find() with a str argument work on the view, and everything
+else first forces it into a real W_BytesObject.
+"""
+
+from pypy.interpreter.error import oefmt
+from pypy.objspace.std.bytesobject import W_BytesObject, W_DeferredBytesObject
+from pypy.objspace.std.sliceobject import (W_SliceObject,
+    normalize_simple_slice, unwrap_start_stop)
+from rpython.rlib import rstring
+
+
+# only slices of at least SLICE_MIN_LENGTH characters become views; shorter
+# slices are copied, which is not more expensive than making a view.  A
+# view keeps the whole string it is taken from alive, so the characters
+# outside of the view must be at most SLICE_MAX_KEPT_ALIVE, or at most
+# SLICE_MAX_RATIO - 1 times the length of the view: the first bound allows
+# short chunks of a medium-sized buffer, the second one large slices of
+# any string, like in 'data = data[n:]'.
+SLICE_MIN_LENGTH = 64
+SLICE_MAX_KEPT_ALIVE = 1024 * 1024
+SLICE_MAX_RATIO = 4
+
+
+def is_worth_a_slice(length, fulllength):
+    return (length >= SLICE_MIN_LENGTH and
+            (fulllength - length <= SLICE_MAX_KEPT_ALIVE or
+             length * SLICE_MAX_RATIO >= fulllength))
+
+def slice_of_string(s, start, stop):
+    """Return a W_StringSliceObject or a W_BytesObject for s[start:stop]."""
+    assert 0 <= start <= stop
+    if is_worth_a_slice(stop - start, len(s)):
+        return W_StringSliceObject(s, start, stop)
+    return W_BytesObject(s[start:stop])
+
+
+class W_StringSliceObject(W_DeferredBytesObject):
+    w_str = None
+
+    def __init__(self, str, start, stop):
+        assert 0 <= start <= stop <= len(str)
+        self.str = str
+        self.start = start
+        self.stop = stop
+
+    def force(self):
+        if self.w_str is None:
+            start = self.start
+            stop = self.stop
+            assert 0 <= start <= stop
+            s = self.str[start:stop]
+            self.w_str = W_BytesObject(s)
+            # don't keep the sliced string alive any longer
+            self.str = s
+            self.start = 0
+            self.stop = len(s)
+        return self.w_str
+
+    def __repr__(self):
+        """representation for debugging purposes"""
+        return "%s(%r[%d:%d])" % (self.__class__.__name__, self.str,
+                                  self.start, self.stop)
+
+    def _slice(self, start, stop):
+        if start >= stop:
+            return W_BytesObject.EMPTY
+        return slice_of_string(self.str, self.start + start,
+                               self.start + stop)
+
+    def descr_len(self, space):
+        return space.newint(self.stop - self.start)
+
+    def descr_getitem(self, space, w_index):
+        length = self.stop - self.start
+        if isinstance(w_index, W_SliceObject):
+            start, stop, step, sl = w_index.indices4(space, length)
+            if step == 1:
+                return self._slice(start, stop)
+            return self.force().descr_getitem(space, w_index)
+        index = space.getindex_w(w_index, space.w_IndexError, "string index")
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise oefmt(space.w_IndexError, "string index out of range")
+        return space.newbytes(self.str[self.start + index])
+
+    def descr_getslice(self, space, w_start, w_stop):
+        start, stop = normalize_simple_slice(space, self.stop - self.start,
+                                             w_start, w_stop)
+        return self._slice(start, stop)
+
+    def _search_bounds(self, space, w_start, w_end):
+        # the bounds of a search in self.str
+        length = self.stop - self.start
+        start, end = unwrap_start_stop(space, length, w_start, w_end)
+        if end > length:
+            end = length
+        return self.start + start, self.start + end
+
+    def descr_count(self, space, w_sub, w_start=None, w_end=None):
+        if not space.isinstance_w(w_sub, space.w_bytes):
+            return self.force().descr_count(space, w_sub, w_start, w_end)
+        start, end = self._search_bounds(space, w_start, w_end)
+        if start > end:
+            return space.newint(0)
+        return space.newint(rstring.count(self.str, space.bytes_w(w_sub),
+                                          start, end))
+
+    def descr_find(self, space, w_sub, w_start=None, w_end=None):
+        if not space.isinstance_w(w_sub, space.w_bytes):
+            return self.force().descr_find(space, w_sub, w_start, w_end)
+        start, end = self._search_bounds(space, w_start, w_end)
+        if start > end:
+            return space.newint(-1)
+        res = rstring.find(self.str, space.bytes_w(w_sub), start, end)
+        if res >= 0:
+            res -= self.start
+        return space.newint(res)
@@ -155,6 +155,12 @@ class TestW_DictObject(object):
         w_d.initialize_content([(w(1), w("a")), (w(2), w("b"))])
         assert self.space.listview_int(w_d) == [1, 2]
 
+    def test_listview_float_dict(self):
+        w = self.space.wrap
+        w_d = self.space.newdict()
+        w_d.initialize_content([(w(1.5), w("a")), (w(2.5), w("b"))])
+        assert self.space.listview_float(w_d) == [1.5, 2.5]
+
     def test_keys_on_string_unicode_int_dict(self, monkeypatch):
         w = self.space.wrap
         wb = self.space.newbytes
@@ -1170,6 +1176,41 @@ class AppTestStrategies(object):
         assert "IntDictStrategy" in self.get_strategy(d)
         assert d[1L] == "hi"
 
+    def test_empty_to_float(self):
+        d = {}
+        d[1.5] = "a"
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        nan = float("nan")
+        d[nan] = "nan"
+        d[0.0] = "zero"
+        d[-0.0] = "minus zero"
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert len(d) == 3
+        assert d[nan] == "nan"
+        assert d[0.0] == "minus zero"
+        assert [str(key) for key in d if key == 0.0] == ["0.0"]
+        assert d.get(float("-nan")) is None
+        assert d.get("x") is None
+        assert d.get(None) is None
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d[1.5] == "a"
+        assert 1.5 in d.keys()
+        assert d.pop(1.5) == "a"
+        assert d.get(1.5) is None
+        #
+        d = {2.0: "two"}
+        assert d[2] == "two"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+
+    def test_int_pair_keys_keep_identity(self):
+        # IntPairDictStrategy is only used with withintpairdicts
+        t = (1, 2)
+        d = {t: 0}
+        assert "IntPairDictStrategy" not in self.get_strategy(d)
+        assert list(d)[0] is t
+        assert d.keys()[0] is t
+        assert d.items()[0][0] is t
+
     def test_iter_dict_length_change(self):
         d = {1: 2, 3: 4, 5: 6}
         it = d.iteritems()
@@ -1198,6 +1239,53 @@ class AppTestStrategies(object):
         raises(RuntimeError, list, it)
 
 
+class AppTestIntPairStrategy(object):
+    spaceconfig = {"objspace.std.withintpairdicts": True}
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            py.test.skip("__repr__ doesn't work on appdirect")
+
+    def w_get_strategy(self, obj):
+        import __pypy__
+        r = __pypy__.internal_repr(obj)
+        return r[r.find("(") + 1: r.find(")")]
+
+    def test_empty_to_int_pair(self):
+        d = {}
+        d[1, 2] = "a"
+        assert "IntPairDictStrategy" in self.get_strategy(d)
+        d[-5, 2**40] = "b"
+        assert d[(1, 2)] == "a"
+        assert d[-5, 2**40] == "b"
+        assert d.get((2, 1)) is None
+        assert d.get(3) is None
+        assert d.get(3.5) is None
+        assert "IntPairDictStrategy" in self.get_strategy(d)
+        assert sorted(d.keys()) == [(-5, 2**40), (1, 2)]
+        assert sorted(d.items()) == [((-5, 2**40), "b"), ((1, 2), "a")]
+        assert type(d.keys()[0]) is tuple
+        #
+        for key in [(1L, 2), (1.0, 2), (True, 2)]:
+            d = {(1, 2): "a"}
+            assert d[key] == "a"
+            assert "ObjectDictStrategy" in self.get_strategy(d)
+        d = {(1, 2): "a"}
+        d[1, 2, 3] = "b"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d == {(1, 2): "a", (1, 2, 3): "b"}
+        d = {}
+        d[True, 2] = "a"
+        assert "IntPairDictStrategy" not in self.get_strategy(d)
+
+    def test_int_pair_keys_are_new_tuples(self):
+        t = (1, 2)
+        d = {t: 0}
+        assert "IntPairDictStrategy" in self.get_strategy(d)
+        assert list(d)[0] == t
+        assert list(d)[0] is not t
+
+
 class FakeWrapper(object):
     hash_count = 0
     def unwrap(self, space):
@@ -0,0 +1,90 @@
+# -*- encoding: utf-8 -*-
+from pypy.objspace.std import fixedwidthunicode
+from pypy.objspace.std.fixedwidthunicode import (
+    FIXED_WIDTH_MIN_LENGTH, Latin1Buffer, WideBuffer, NO_BUFFER,
+    make_fixed_width_buffer)
+
+
+def test_make_buffer():
+    u = u"caf\xe9" * 10
+    buf = make_fixed_width_buffer(u.encode("utf-8"), len(u))
+    assert isinstance(buf, Latin1Buffer)
+    assert buf.chars == u.encode("latin-1")
+    u = u"€\xe9x" * 10
+    buf = make_fixed_width_buffer(u.encode("utf-8"), len(u))
+    assert isinstance(buf, WideBuffer)
+    assert buf.chars == u
+
+def test_buffer_operations():
+    for u in [u"a\xe9b\xff" * 5, u"a€b\xe9\U0001f600" * 5]:
+        buf = make_fixed_width_buffer(u.encode("utf-8"), len(u))
+        if buf is NO_BUFFER:
+            continue      # narrow host python
+        for i in range(len(u)):
+            assert buf.getitem_utf8(i) == u[i].encode("utf-8")
+        assert buf.slice_utf8(3, 13) == u[3:13].encode("utf-8")
+        for sub in [u"b", u"\xe9b", u"€", u"ሴ", u""]:
+            for start, end in [(0, len(u)), (5, 12)]:
+                utf8 = sub.encode("utf-8")
+                assert buf.search(utf8, len(sub), start, end, True) == (
+                    u.find(sub, start, end))
+                assert buf.search(utf8, len(sub), start, end, False) == (
+                    u.rfind(sub, start, end))
+
+
+class TestFixedWidthUnicode:
+    spaceconfig = {"objspace.std.withfixedwidthunicode": True}
+
+    def test_large_string(self):
+        space = self.space
+        u = u"€" + u"x" * FIXED_WIDTH_MIN_LENGTH
+        w_u = space.newutf8(u.encode("utf-8"), len(u))
+        assert w_u._fixedwidth is None
+        w_c = space.getitem(w_u, space.newint(0))
+        assert space.utf8_w(w_c) == u"€".encode("utf-8")
+        assert isinstance(w_u._fixedwidth, WideBuffer)
+        assert not w_u._index_storage
+        w_res = space.call_method(w_u, "find", space.newutf8("x", 1))
+        assert space.int_w(w_res) == 1
+
+    def test_small_or_ascii_string(self):
+        space = self.space
+        for u in [u"€" * 10, u"x" * FIXED_WIDTH_MIN_LENGTH]:
+            w_u = space.newutf8(u.encode("utf-8"), len(u))
+            space.getitem(w_u, space.newint(5))
+            assert w_u._fixedwidth is None
+
+
+class AppTestFixedWidthUnicode:
+    spaceconfig = {"objspace.std.withfixedwidthunicode": True}
+
+    def setup_class(cls):
+        cls.w_N = cls.space.newint(FIXED_WIDTH_MIN_LENGTH)
+
+    def test_latin1(self):
+        s = u"d\xe9j\xe0 vu, " * (self.N // 5)
+        assert s[1] == u"\xe9"
+        assert s[-6] == u"\xe0"
+        assert s[10:20] == u"\xe9j\xe0 vu, d\xe9"
+        assert s[len(s) - 3:] == u"u, "
+        assert s.find(u"vu") == 5
+        assert s.find(u"\u20ac") == -1
+        assert s.find(u"j\xe0", 5) == 11
+        assert s.rfind(u"d\xe9") == len(s) - 9
+        assert s.index(u"\xe9j", 4, 20) == 10
+        raises(ValueError, s.rindex, u"d\xe9", 1, 10)
+        assert s.find(u"") == 0
+        assert s.find(u"", len(s) + 1) == -1
+        raises(IndexError, "s[len(s)]")
+
+    def test_wide(self):
+        s = u"\u20ac12,\U0001f600 " * (self.N // 5)
+        assert s[0] == u"\u20ac"
+        assert s[4] == u"\U0001f600"
+        assert s[4:8] == u"\U0001f600 \u20ac1"
+        assert s.find(u"\U0001f600 \u20ac") == 4
+        assert s.rfind(u"\u20ac") == len(s) - 6
+        assert s.count(u"\u20ac") == self.N // 5
+        assert (s + u"\U0001f601").find(u"\U0001f601") == len(s)
+        assert s.startswith(u"12", 1)
+        assert s[::-1][0] == u" "
@@ -1782,6 +1782,75 @@ class AppTestWithoutStrategies:
         assert notshared == []
 
 
+class AppTestTupleLists:
+    spaceconfig = {"objspace.std.withtuplelists": True}
+
+    def test_rows(self):
+        from __pypy__ import strategy
+        l = [(i, i * 0.5, str(i)) for i in range(10)]
+        assert strategy(l) == "TupleListStrategy"
+        assert l[3] == (3, 1.5, "3")
+        assert l[-1] == (9, 4.5, "9")
+        assert l[2:4] == [(2, 1.0, "2"), (3, 1.5, "3")]
+        assert (5, 2.5, "5") in l
+        assert l.index((5, 2.5, "5")) == 5
+        l.append((10, 5.0, "10"))
+        del l[0]
+        assert len(l) == 10
+        assert sorted(l, reverse=True)[0] == (10, 5.0, "10")
+        assert strategy(l) == "TupleListStrategy"
+        l.append((11, 5.5))
+        assert strategy(l) == "ObjectListStrategy"
+        assert l[-2:] == [(10, 5.0, "10"), (11, 5.5)]
+
+    def test_tuple_subclass(self):
+        from __pypy__ import strategy
+        class T(tuple):
+            pass
+        l = [(1, 2), T((3, 4))]
+        assert strategy(l) == "ObjectListStrategy"
+        assert type(l[1]) is T
+
+
+class AppTestListSlices:
+    spaceconfig = {"objspace.std.withlistslices": True}
+
+    def test_slices(self):
+        from __pypy__ import strategy
+        l = range(100) + [100]
+        a = l[10:]
+        b = a[10:]
+        assert strategy(l) == "IntegerSliceListStrategy"
+        assert strategy(b) == "IntegerSliceListStrategy"
+        assert a[0] == 10 and b[0] == 20 and b[-1] == 100
+        assert len(b) == 81
+        assert 50 in b and 5 not in b
+        assert b.index(50) == 30
+        assert b.count(50) == 1
+        assert b[::10] == range(20, 101, 10)
+        assert b[::-1] == range(100, 19, -1)
+        assert b == range(20, 101)
+        assert sorted(b, reverse=True)[0] == 100
+        l[20] = "x"
+        a.append(101)
+        b.reverse()
+        assert l[19:21] == [19, "x"]
+        assert a[9:11] == [19, 20] and a[-1] == 101
+        assert b[0] == 100 and b[-1] == 20
+        assert b + [1] == range(100, 19, -1) + [1]
+        assert b * 2 == range(100, 19, -1) * 2
+        assert strategy(a) == strategy(b) == "IntegerListStrategy"
+
+    def test_chunks(self):
+        data = [str(i) for i in range(1000)]
+        chunks = []
+        while data:
+            chunks.append(data[:100])
+            data = data[100:]
+        assert [len(c) for c in chunks] == [100] * 10
+        assert chunks[-1][-1] == "999"
+
+
 class AppTestListFastSubscr:
     spaceconfig = {"objspace.std.optimized_list_getitem": True}
 
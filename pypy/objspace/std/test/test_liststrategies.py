@@ -4,7 +4,8 @@ from pypy.objspace.std.listobject import (
     W_ListObject, EmptyListStrategy, ObjectListStrategy, IntegerListStrategy,
     FloatListStrategy, BytesListStrategy, RangeListStrategy,
     SimpleRangeListStrategy, make_range_list, AsciiListStrategy,
-    IntOrFloatListStrategy)
+    IntOrFloatListStrategy, TupleListStrategy, IntegerSliceListStrategy,
+    FloatSliceListStrategy, BytesSliceListStrategy, SLICE_MAX_KEPT_ALIVE)
 from pypy.objspace.std import listobject
 from pypy.objspace.std.test.test_listobject import TestW_ListObject
 
@@ -1051,6 +1052,165 @@ class TestW_ListStrategies(TestW_ListObject):
         assert isinstance(w_item, space.StringObjectCls)
 
 
+class TestW_SliceListStrategy:
+    spaceconfig = {"objspace.std.withlistslices": True}
+
+    def test_share_slice(self):
+        space = self.space
+        w_l = W_ListObject(space, [space.wrap(i) for i in range(200)])
+        w_s = w_l.getslice(100, 200, 1, 100)
+        assert isinstance(w_l.strategy, IntegerSliceListStrategy)
+        assert isinstance(w_s.strategy, IntegerSliceListStrategy)
+        storage = w_l.strategy.unerase(w_l.lstorage).lstorage
+        assert w_s.strategy.unerase(w_s.lstorage).lstorage is storage
+        assert space.int_w(w_s.getitem(0)) == 100
+        assert space.int_w(w_s.getitem(-1)) == 199
+        py.test.raises(IndexError, w_s.getitem, 100)
+        assert w_s.length() == 100
+        assert w_s.getitems_int() == range(100, 200)
+        assert w_l.getitems_int() is IntegerListStrategy.unerase(storage)
+        assert w_s.find(space.wrap(150)) == 50
+        py.test.raises(ValueError, w_s.find, space.wrap(50))
+        # slicing a slice shares the same items
+        w_s2 = w_s.getslice(10, 90, 1, 80)
+        assert w_s2.strategy.unerase(w_s2.lstorage).lstorage is storage
+        assert w_s2.getitems_int() == range(110, 190)
+
+    def test_mutation_copies(self):
+        space = self.space
+        w_l = W_ListObject(space, [space.wrap(i) for i in range(200)])
+        w_s = w_l.getslice(0, 100, 1, 100)
+        w_l.setitem(0, space.wrap(-1))
+        assert isinstance(w_l.strategy, IntegerListStrategy)
+        assert space.int_w(w_s.getitem(0)) == 0
+        w_s.append(space.wrap(5.5))
+        assert isinstance(w_s.strategy, IntOrFloatListStrategy)
+        assert w_s.length() == 101
+        assert w_l.length() == 200
+        assert space.int_w(w_l.getitem(100)) == 100
+
+    def test_small_slices_are_copied(self):
+        space = self.space
+        w_l = W_ListObject(space, [space.wrap(i) for i in range(1000)])
+        # too short
+        w_s = w_l.getslice(0, 10, 1, 10)
+        assert isinstance(w_s.strategy, IntegerListStrategy)
+        # extended slices
+        w_s = w_l.getslice(0, 1000, 2, 500)
+        assert isinstance(w_s.strategy, IntegerListStrategy)
+        # a short slice of a big list would keep too many items alive
+        length = SLICE_MAX_KEPT_ALIVE + 1000
+        w_l = space.newlist_int(range(length))
+        w_s = w_l.getslice(0, 200, 1, 200)
+        assert isinstance(w_s.strategy, IntegerListStrategy)
+        assert isinstance(w_l.strategy, IntegerListStrategy)
+        # a slice of a slice is compared to the shared items
+        w_s = w_l.getslice(1000, length, 1, length - 1000)
+        assert isinstance(w_s.strategy, IntegerSliceListStrategy)
+        w_s2 = w_s.getslice(0, 200, 1, 200)
+        assert isinstance(w_s2.strategy, IntegerListStrategy)
+        assert w_s2.getitems_int() == range(1000, 1200)
+
+    def test_chunks_are_shared(self):
+        space = self.space
+        w_l = W_ListObject(space, [space.wrap(i) for i in range(1000)])
+        w_s = w_l.getslice(200, 300, 1, 100)
+        assert isinstance(w_s.strategy, IntegerSliceListStrategy)
+        assert w_s.getitems_int() == range(200, 300)
+
+    def test_other_strategies(self):
+        space = self.space
+        w_l = W_ListObject(space, [space.wrap(i + 0.5) for i in range(100)])
+        w_s = w_l.getslice(0, 100, 1, 100)
+        assert isinstance(w_s.strategy, FloatSliceListStrategy)
+        assert w_s.getitems_float() == [i + 0.5 for i in range(100)]
+        w_l = W_ListObject(space, [space.newbytes(str(i)) for i in range(100)])
+        w_s = w_l.getslice(20, 100, 1, 80)
+        assert isinstance(w_s.strategy, BytesSliceListStrategy)
+        assert w_s.getitems_bytes() == [str(i) for i in range(20, 100)]
+        w_l = W_ListObject(space, [space.wrap(i) for i in range(100)] +
+                                  [space.newbytes("x")])
+        w_s = w_l.getslice(0, 100, 1, 100)
+        assert isinstance(w_s.strategy, ObjectListStrategy)
+
+    def test_extend_from_slice(self):
+        space = self.space
+        w_l = W_ListObject(space, [space.wrap(i) for i in range(100)])
+        w_s = w_l.getslice(0, 100, 1, 100)
+        w_l2 = W_ListObject(space, [space.wrap(-1)])
+        w_l2.extend(w_s)
+        assert isinstance(w_l2.strategy, IntegerListStrategy)
+        assert w_l2.getitems_int() == [-1] + range(100)
+        w_l2.setslice(0, 1, 1, w_l)
+        assert isinstance(w_l2.strategy, IntegerListStrategy)
+        assert w_l2.length() == 200
+
+
+class TestW_TupleListStrategy:
+    spaceconfig = {"objspace.std.withtuplelists": True}
+
+    def rows(self, *rows):
+        space = self.space
+        return [space.newtuple([space.wrap(x) for x in row]) for row in rows]
+
+    def test_check_strategy(self):
+        space = self.space
+        l = W_ListObject(space, self.rows((1, 2.5, "a"), (3, 4.5, "b")))
+        assert isinstance(l.strategy, TupleListStrategy)
+        columns = l.strategy.unerase(l.lstorage)
+        assert columns.kinds == "ifb"
+        assert columns.int_columns == [[1, 3]]
+        assert columns.float_columns == [[2.5, 4.5]]
+        assert columns.bytes_columns == [["a", "b"]]
+        for rows in [[(1, 2), (3, 4.5)], [(1, 2), (3, 4, 5)], [(1,), (2,)],
+                     [(1, (2, 3)), (1, (2, 3))], [tuple(range(9))]]:
+            l = W_ListObject(space, self.rows(*rows))
+            assert isinstance(l.strategy, ObjectListStrategy)
+        l = W_ListObject(space, self.rows((1, 2)) + [space.wrap(5)])
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_empty_to_tuple(self):
+        space = self.space
+        l = W_ListObject(space, [])
+        l.append(self.rows((1, 2))[0])
+        assert isinstance(l.strategy, TupleListStrategy)
+        l.append(self.rows((3, 4))[0])
+        assert space.unwrap(l) == [(1, 2), (3, 4)]
+        l.append(self.rows((3, 4.5))[0])
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l) == [(1, 2), (3, 4), (3, 4.5)]
+
+    def test_operations(self):
+        space = self.space
+        l = W_ListObject(space, self.rows((1, 2), (3, 4), (5, 6)))
+        assert space.unwrap(l.getitem(-1)) == (5, 6)
+        py.test.raises(IndexError, l.getitem, 3)
+        py.test.raises(IndexError, l.getitem, -4)
+        l.setitem(0, self.rows((7, 8))[0])
+        l.insert(1, self.rows((9, 10))[0])
+        assert space.unwrap(l) == [(7, 8), (9, 10), (3, 4), (5, 6)]
+        assert space.unwrap(l.pop(1)) == (9, 10)
+        assert space.unwrap(l.pop_end()) == (5, 6)
+        w_slice = l.getslice(0, 1, 1, 1)
+        assert isinstance(w_slice.strategy, TupleListStrategy)
+        assert space.unwrap(w_slice) == [(7, 8)]
+        l.extend(W_ListObject(space, self.rows((1, 1), (2, 2))))
+        assert isinstance(l.strategy, TupleListStrategy)
+        l.reverse()
+        assert space.unwrap(l) == [(2, 2), (1, 1), (3, 4), (7, 8)]
+        l.sort(False)
+        assert isinstance(l.strategy, TupleListStrategy)
+        assert space.unwrap(l) == [(1, 1), (2, 2), (3, 4), (7, 8)]
+        l.sort(True)
+        assert space.unwrap(l) == [(7, 8), (3, 4), (2, 2), (1, 1)]
+        w_clone = l.clone()
+        w_clone.pop_end()
+        assert l.length() == 4
+        l.extend(W_ListObject(space, self.rows((1.5, 1.5))))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l)[-1] == (1.5, 1.5)
+
+
 class TestW_ListStrategiesDisabled:
     spaceconfig = {"objspace.std.withliststrategies": False}
 
@@ -679,6 +679,105 @@ def test_specialized_class():
         assert obj2.getdictvalue(space, "b") is w6
         assert obj2.map is abmap
 
+class TestUnboxedAttributes(object):
+    spaceconfig = {"objspace.std.withunboxedattributes": True}
+
+    def make_obj(self):
+        return self.space.appexec([], """():
+            class A(object):
+                pass
+            return A()
+        """)
+
+    def test_unboxed_storage(self):
+        space = self.space
+        w_obj = self.make_obj()
+        w_obj.setdictvalue(space, "x", space.newint(1))
+        w_obj.setdictvalue(space, "s", space.newtext("abc"))
+        w_obj.setdictvalue(space, "y", space.newfloat(2.5))
+        mapy = w_obj._get_mapdict_map()
+        assert isinstance(mapy, UnboxedFloatAttribute)
+        assert mapy.listindex == 1
+        assert mapy.storageindex == 0
+        assert mapy.length() == 2
+        mapx = mapy.back.back
+        assert isinstance(mapx, UnboxedIntAttribute)
+        assert mapx.listindex == 0
+        assert isinstance(mapy.back, PlainAttribute)
+        assert not isinstance(mapy.back, UnboxedPlainAttribute)
+        storage = w_obj._mapdict_read_storage(0)
+        assert isinstance(storage, UnboxedStorage)
+        assert len(storage.values) == 2
+        w_obj.setdictvalue(space, "x", space.newint(-42))
+        w_obj.setdictvalue(space, "y", space.newfloat(-0.0))
+        assert w_obj._mapdict_read_storage(0) is storage
+        assert space.int_w(w_obj.getdictvalue(space, "x")) == -42
+        w_y = w_obj.getdictvalue(space, "y")
+        assert space.float_w(w_y) == 0.0
+        assert str(space.float_w(w_y)) == "-0.0"
+        assert space.text_w(w_obj.getdictvalue(space, "s")) == "abc"
+
+    def test_bool_and_subclasses_are_boxed(self):
+        space = self.space
+        w_obj = self.make_obj()
+        w_obj.setdictvalue(space, "b", space.w_True)
+        assert not isinstance(w_obj._get_mapdict_map(), UnboxedPlainAttribute)
+        w_obj.setdictvalue(space, "l", space.newlong(5))
+        assert not isinstance(w_obj._get_mapdict_map(), UnboxedPlainAttribute)
+
+    def test_type_change(self):
+        space = self.space
+        w_obj1 = self.make_obj()
+        w_obj1.setdictvalue(space, "x", space.newint(1))
+        w_obj1.setdictvalue(space, "y", space.newint(2))
+        w_cls = w_obj1.getclass(space)
+        w_obj2 = space.call_function(w_cls)
+        w_obj2.setdictvalue(space, "x", space.newint(3))
+        w_obj2.setdictvalue(space, "y", space.newint(4))
+        unboxed_map = w_obj1._get_mapdict_map()
+        assert w_obj2._get_mapdict_map() is unboxed_map
+        # writing a float into the int attribute 'x' makes it boxed
+        w_obj1.setdictvalue(space, "x", space.newfloat(1.5))
+        boxed_map = w_obj1._get_mapdict_map()
+        assert boxed_map is not unboxed_map
+        assert not isinstance(boxed_map.back, UnboxedPlainAttribute)
+        assert isinstance(boxed_map, UnboxedIntAttribute)
+        assert boxed_map.listindex == 0
+        assert space.float_w(w_obj1.getdictvalue(space, "x")) == 1.5
+        assert space.int_w(w_obj1.getdictvalue(space, "y")) == 2
+        # obj2 keeps its map until it sees a value of another type
+        assert w_obj2._get_mapdict_map() is unboxed_map
+        assert space.int_w(w_obj2.getdictvalue(space, "x")) == 3
+        # new objects get the boxed 'x' directly
+        w_obj3 = space.call_function(w_cls)
+        w_obj3.setdictvalue(space, "x", space.newint(5))
+        w_obj3.setdictvalue(space, "y", space.newint(6))
+        assert w_obj3._get_mapdict_map() is boxed_map
+        # adding a value of another type to an existing unboxed map
+        w_obj4 = space.call_function(w_cls)
+        w_obj4.setdictvalue(space, "x", space.newint(7))
+        w_obj4.setdictvalue(space, "y", space.newtext("seven"))
+        assert not isinstance(w_obj4._get_mapdict_map(),
+                              UnboxedPlainAttribute)
+        assert space.text_w(w_obj4.getdictvalue(space, "y")) == "seven"
+
+    def test_reorder(self):
+        space = self.space
+        w_obj1 = self.make_obj()
+        w_cls = w_obj1.getclass(space)
+        w_obj1.setdictvalue(space, "a", space.newint(1))
+        w_obj1.setdictvalue(space, "b", space.newfloat(2.0))
+        w_obj1.setdictvalue(space, "c", space.newint(3))
+        w_obj2 = space.call_function(w_cls)
+        w_obj2.setdictvalue(space, "c", space.newint(30))
+        w_obj2.setdictvalue(space, "b", space.newfloat(20.0))
+        w_obj2.setdictvalue(space, "a", space.newint(10))
+        assert w_obj1._get_mapdict_map() is w_obj2._get_mapdict_map()
+        for name, value in [("a", 10), ("b", 20.0), ("c", 30)]:
+            w_value = w_obj2.getdictvalue(space, name)
+            assert space.eq_w(w_value, space.wrap(value))
+            assert space.type(w_value) is space.type(space.wrap(value))
+
 # ___________________________________________________________
 # integration tests
 
@@ -1302,6 +1401,68 @@ class AppTestWithMapDictAndCounters(object):
 
 
 
+class AppTestWithMapDictUnboxed(AppTestWithMapDict):
+    spaceconfig = {"objspace.std.withunboxedattributes": True}
+
+    def test_unboxed_values(self):
+        class A(object):
+            pass
+        a = A()
+        a.i = 5
+        a.f = 1.5
+        a.s = "abc"
+        for i in range(10):
+            a.i += i
+            a.f *= 2
+        assert a.i == 50
+        assert a.f == 1536.0
+        assert type(a.i) is int and type(a.f) is float
+        assert a.__dict__ == {"i": 50, "f": 1536.0, "s": "abc"}
+        a.i = True
+        assert a.i is True
+        a.f = "x"
+        assert a.f == "x"
+        b = A()
+        b.i = -2 ** 63
+        b.f = float("-inf")
+        assert b.i == -2 ** 63
+        assert b.f == float("-inf")
+        assert vars(b) == {"i": -2 ** 63, "f": float("-inf")}
+
+    def test_unboxed_slots(self):
+        class P(object):
+            __slots__ = ["x", "y"]
+        p = P()
+        p.x = 1.0
+        p.y = 2
+        p.x += 0.5
+        assert (p.x, p.y) == (1.5, 2)
+        p.y = None
+        assert p.y is None
+        del p.x
+        raises(AttributeError, "p.x")
+
+    def test_change_class_unboxed(self):
+        class A(object):
+            pass
+        class B(object):
+            pass
+        a = A()
+        a.x = 1
+        a.y = 2.0
+        a.__class__ = B
+        assert (a.x, a.y) == (1, 2.0)
+        del a.x
+        assert a.y == 2.0
+        a.x = 4
+        assert a.__dict__ == {"x": 4, "y": 2.0}
+
+
+class AppTestWithMapDictAndCountersUnboxed(AppTestWithMapDictAndCounters):
+    spaceconfig = {"objspace.std.withmethodcachecounter": True,
+                   "objspace.std.withunboxedattributes": True}
+
+
 class AppTestGlobalCaching(AppTestWithMapDict):
     spaceconfig = {"objspace.std.withmethodcachecounter": True}
 
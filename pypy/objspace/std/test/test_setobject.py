@@ -81,6 +81,7 @@ class TestW_SetObject:
     def test_create_set_from_list(self):
         from pypy.interpreter.baseobjspace import W_Root
         from pypy.objspace.std.setobject import BytesSetStrategy, ObjectSetStrategy
+        from pypy.objspace.std.setobject import FloatSetStrategy
         from pypy.objspace.std.floatobject import W_FloatObject
 
         w = self.space.wrap
@@ -116,9 +117,9 @@ class TestW_SetObject:
         w_list = W_ListObject(self.space, [w(1.0), w(2.0), w(3.0)])
         w_set = W_SetObject(self.space)
         _initialize_set(self.space, w_set, w_list)
-        assert w_set.strategy is self.space.fromcache(ObjectSetStrategy)
-        for item in w_set.strategy.unerase(w_set.sstorage):
-            assert isinstance(item, W_FloatObject)
+        assert w_set.strategy is self.space.fromcache(FloatSetStrategy)
+        assert sorted(w_set.strategy.unerase(w_set.sstorage).keys()) == [
+            1.0, 2.0, 3.0]
 
         # changed cached object, need to change it back for other tests to pass
         intstr.get_storage_from_list = tmp_func
@@ -1069,6 +1070,30 @@ class AppTestAppSetTest:
         s.intersection_update(set())
         assert strategy(s) == "EmptySetStrategy"
 
+    def test_unicode_and_float_strategies(self):
+        from __pypy__ import strategy
+        s = set([u"\xe9t\xe9", u"hiver"])
+        assert strategy(s) == "UnicodeSetStrategy"
+        assert u"\xe9t\xe9" in s
+        assert u"hiver" in s
+        assert strategy(s) == "UnicodeSetStrategy"
+        assert sorted(s) == [u"hiver", u"\xe9t\xe9"]
+        assert s == set([u"hiver", u"\xe9t\xe9"])
+        assert s == set([u"hiver"]) | set([u"\xe9t\xe9"])
+        #
+        nan = float("nan")
+        s = set([1.5, nan, 0.0, -0.0])
+        assert strategy(s) == "FloatSetStrategy"
+        assert len(s) == 3
+        assert nan in s
+        assert float("-nan") not in s
+        s2 = set([nan, 2.5])
+        assert strategy(s & s2) == "FloatSetStrategy"
+        assert list(s & s2)[0] is nan
+        assert 2 not in s
+        assert strategy(s) == "ObjectSetStrategy"
+        assert s == set([1.5, nan, 0.0])
+
     def test_weird_exception_from_iterable(self):
         def f():
            raise ValueError
@@ -2,7 +2,8 @@ from pypy.objspace.std.setobject import W_SetObject
 from pypy.objspace.std.setobject import (
     BytesIteratorImplementation, BytesSetStrategy, EmptySetStrategy,
     IntegerIteratorImplementation, IntegerSetStrategy, ObjectSetStrategy,
-    UnicodeIteratorImplementation, AsciiSetStrategy)
+    UnicodeIteratorImplementation, AsciiSetStrategy, UnicodeSetStrategy,
+    Utf8IteratorImplementation, FloatSetStrategy, FloatIteratorImplementation)
 from pypy.objspace.std.listobject import W_ListObject
 
 class TestW_SetStrategies:
@@ -29,6 +30,12 @@ class TestW_SetStrategies:
         s = W_SetObject(self.space, self.wrapped([u"a", u"b"]))
         assert s.strategy is self.space.fromcache(AsciiSetStrategy)
 
+        s = W_SetObject(self.space, self.wrapped([u"a", u"\xe9"]))
+        assert s.strategy is self.space.fromcache(UnicodeSetStrategy)
+
+        s = W_SetObject(self.space, self.wrapped([1.5, 2.5]))
+        assert s.strategy is self.space.fromcache(FloatSetStrategy)
+
     def test_switch_to_object(self):
         s = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
         s.add(self.space.wrap("six"))
@@ -43,8 +50,86 @@ class TestW_SetStrategies:
         s = W_SetObject(self.space, self.wrapped([]))
         s.add(self.space.wrap(u"six"))
         assert s.strategy is self.space.fromcache(AsciiSetStrategy)
+        s.add(self.space.wrap(u"s\xe9pt"))
+        assert s.strategy is self.space.fromcache(UnicodeSetStrategy)
+        s.add(self.space.wrap(u"eight"))
+        assert s.strategy is self.space.fromcache(UnicodeSetStrategy)
+        assert s.length() == 3
+
+        s1 = W_SetObject(self.space, self.wrapped([u"a", u"b"]))
+        s2 = W_SetObject(self.space, self.wrapped([u"b", u"\xe9"]))
+        s1.update(s2)
+        assert s1.strategy is self.space.fromcache(UnicodeSetStrategy)
+        s2.update(W_SetObject(self.space, self.wrapped([u"c"])))
+        assert s2.strategy is self.space.fromcache(UnicodeSetStrategy)
+        assert s1.length() == 3
+        assert s2.length() == 3
+
+    def test_unicode_and_ascii_algebra(self):
+        space = self.space
+        ascii_strategy = space.fromcache(AsciiSetStrategy)
+        unicode_strategy = space.fromcache(UnicodeSetStrategy)
+        def unwrapped(w_set):
+            return sorted([space.utf8_w(w_item).decode('utf8')
+                           for w_item in space.unpackiterable(w_set)])
+        def check(w_set, strategy, expected):
+            assert w_set.strategy is strategy
+            assert unwrapped(w_set) == expected
+        for swap in [False, True]:
+            w_a = W_SetObject(space, self.wrapped([u"a", u"b", u"c"]))
+            w_u = W_SetObject(space, self.wrapped([u"b", u"\xe9", u"d",
+                                                   u"e"]))
+            if swap:
+                # the bigger operand first, for intersect()
+                w_a.add(space.wrap(u"f"))
+                w_a.add(space.wrap(u"g"))
+            a = unwrapped(w_a)
+            check(w_a.difference(w_u), ascii_strategy,
+                  sorted(set(a) - set([u"b"])))
+            check(w_u.difference(w_a), unicode_strategy,
+                  [u"d", u"e", u"\xe9"])
+            check(w_a.symmetric_difference(w_u), unicode_strategy,
+                  sorted(set(a) ^ set([u"b", u"d", u"e", u"\xe9"])))
+            check(w_u.symmetric_difference(w_a), unicode_strategy,
+                  sorted(set(a) ^ set([u"b", u"d", u"e", u"\xe9"])))
+            check(w_a.intersect(w_u), ascii_strategy, [u"b"])
+            check(w_u.intersect(w_a), ascii_strategy, [u"b"])
+            # the operands keep their strategies and items
+            check(w_a, ascii_strategy, a)
+            check(w_u, unicode_strategy, [u"b", u"d", u"e", u"\xe9"])
+        w_u.intersect_update(w_a)
+        check(w_u, ascii_strategy, [u"b"])
+        w_a.difference_update(W_SetObject(space, self.wrapped([u"a",
+                                                               u"\xe9"])))
+        check(w_a, ascii_strategy, [u"b", u"c", u"f", u"g"])
+
+    def test_switch_to_float(self):
+        s = W_SetObject(self.space, self.wrapped([]))
+        s.add(self.space.wrap(1.5))
+        assert s.strategy is self.space.fromcache(FloatSetStrategy)
+        s.add(self.space.wrap(1))
+        assert s.strategy is self.space.fromcache(ObjectSetStrategy)
+
+    def test_same_strategy_algebra(self):
+        space = self.space
+        for strategy, unwrap, l1, l2 in [
+                (UnicodeSetStrategy, lambda w: space.utf8_w(w).decode('utf8'),
+                 [u"\xe9", u"a", u"b"], [u"b", u"\xe9", u"c"]),
+                (FloatSetStrategy, space.float_w,
+                 [0.5, 1.5, 2.5], [2.5, 0.5, 3.5])]:
+            s1 = W_SetObject(space, self.wrapped(l1))
+            s2 = W_SetObject(space, self.wrapped(l2))
+            for s3, expected in [(s1.intersect(s2), [l1[0], l1[2]]),
+                                 (s1.difference(s2), [l1[1]]),
+                                 (s1.symmetric_difference(s2),
+                                  [l1[1], l2[2]])]:
+                assert s3.strategy is space.fromcache(strategy)
+                assert sorted([unwrap(w_item) for w_item in s3.getkeys()]) == (
+                    sorted(expected))
+            assert not s1.issubset(s2)
+            assert not s1.isdisjoint(s2)
+
 
-    def test_symmetric_difference(self):
         s1 = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
         s2 = W_SetObject(self.space, self.wrapped(["six", "seven"]))
         s1.symmetric_difference_update(s2)
@@ -133,6 +218,18 @@ class TestW_SetStrategies:
         #assert isinstance(it, UnicodeIteratorImplementation)
         #assert space.unwrap(it.next()) == u"a"
         #assert space.unwrap(it.next()) == u"b"
+        #
+        s = W_SetObject(space, self.wrapped([u"\xe9t\xe9"]))
+        it = s.iter()
+        assert isinstance(it, Utf8IteratorImplementation)
+        w_item = it.next()
+        assert space.utf8_w(w_item).decode('utf8') == u"\xe9t\xe9"
+        assert space.len_w(w_item) == 3
+        #
+        s = W_SetObject(space, self.wrapped([1.5]))
+        it = s.iter()
+        assert isinstance(it, FloatIteratorImplementation)
+        assert space.unwrap(it.next()) == 1.5
 
     def test_listview(self):
         space = self.space
@@ -142,5 +239,8 @@ class TestW_SetStrategies:
         s = W_SetObject(space, self.wrapped(["a", "b"]))
         assert sorted(space.listview_bytes(s)) == ["a", "b"]
         #
+        s = W_SetObject(space, self.wrapped([1.5, 2.5]))
+        assert sorted(space.listview_float(s)) == [1.5, 2.5]
+        #
         #s = W_SetObject(space, self.wrapped([u"a", u"b"]))
         #assert sorted(space.listview_unicode(s)) == [u"a", u"b"]
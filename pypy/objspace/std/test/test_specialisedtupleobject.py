@@ -49,7 +49,11 @@ class TestW_SpecialisedTupleObject():
         hash_test([1, (1, 2)])
         hash_test([1, ('a', 2)])
         hash_test([1, ()])
-        hash_test([1, 2, 3], must_be_specialized=False)
+        hash_test([1, 2, 3])
+        hash_test([1.5, -2.0, 3.25, 0.0])
+        hash_test([-1] * 8)
+        hash_test([1, 2.5, 3], must_be_specialized=False)
+        hash_test([1] * 9, must_be_specialized=False)
         hash_test([1 << 62, 0])
 
     try:
@@ -101,9 +105,33 @@ class AppTestW_SpecialisedTupleObject:
         assert len(t) == 2
 
     def test_notspecialisedtuple(self):
-        assert not self.isspecialised((42, 43, 44, 45))
+        assert not self.isspecialised((42, 43.5, 44, 45))
+        assert not self.isspecialised((42, 43, 44, "45"))
+        assert not self.isspecialised(tuple(range(9)))
         assert not self.isspecialised((1.5,))
 
+    def test_packed(self):
+        t = (1, 2, 3, 4, 5)
+        assert self.isspecialised(t, '_Ni')
+        assert self.isspecialised((1.5, 2.5, -0.0), '_Nf')
+        assert len(t) == 5
+        assert t[0] == 1 and t[-1] == 5 and t[4] == 5
+        raises(IndexError, "t[5]")
+        raises(IndexError, "t[-6]")
+        assert list(t) == [1, 2, 3, 4, 5]
+        assert t[1:3] == (2, 3)
+        assert t == (1, 2, 3, 4, 5)
+        assert t == (1, 2L, 3.0, 4, 5)
+        assert t != (1, 2, 3, 4, 6)
+        assert t != (1, 2, 3, 4)
+        assert t < (1, 2, 3, 5) and t > (1, 2, 3, 4)
+        assert hash(t) == hash((1, 2L, 3.0, 4, 5))
+        nan = float('nan')
+        assert (nan, 1.0, 2.0) == (nan, 1.0, 2.0)
+        assert (0.0, 1.0, 2.0) == (-0.0, 1.0, 2.0)
+        assert hash((0.0, 1.0, 2.0)) == hash((-0.0, 1, 2))
+        assert {t: 42}[(1, 2, 3, 4, 5)] == 42
+
     def test_slicing_to_specialised(self):
         t = (1, 2, 3)
         assert self.isspecialised(t[0:2])
@@ -226,7 +254,7 @@ class AppTestW_SpecialisedTupleObject:
         assert a == (2.2,) + b
         assert not a != (2.2,) + b
         #
-        if not self.isspecialised((1, 2, 3)):
+        if not self.isspecialised((1, 2.2, '333')):
             skip("don't have specialization for 3-tuples")
         a = (1, 2.2, '333')
         assert self.isspecialised(a)
@@ -0,0 +1,57 @@
+from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.strbufobject import W_StringBufferObject
+from pypy.objspace.std.test import test_bytesobject
+
+
+class TestW_StringBufferObject:
+    spaceconfig = {"objspace.std.withstrbuf": True}
+
+    def test_add(self):
+        space = self.space
+        w_short = space.add(space.newbytes("a"), space.newbytes("b"))
+        assert type(w_short) is W_BytesObject
+        w_s = space.add(space.newbytes("x" * 300), space.newbytes("b"))
+        assert isinstance(w_s, W_StringBufferObject)
+        w_s2 = space.add(w_s, space.newbytes("c"))
+        assert isinstance(w_s2, W_StringBufferObject)
+        assert w_s2.builder is w_s.builder
+        # 'w_s' cannot append to the shared builder any more
+        w_s3 = space.add(w_s, space.newbytes("d"))
+        assert w_s3.builder is not w_s.builder
+        assert space.bytes_w(w_s) == "x" * 300 + "b"
+        assert space.bytes_w(w_s2) == "x" * 300 + "bc"
+        assert space.bytes_w(w_s3) == "x" * 300 + "bd"
+        assert space.int_w(space.len(w_s2)) == 302
+
+
+class AppTestStringBufferObject(test_bytesobject.AppTestBytesObject):
+    spaceconfig = {"objspace.std.withstrbuf": True}
+
+    def test_basic(self):
+        import __pypy__
+        s = "x" * 300
+        for i in range(10):
+            s += str(i)
+        assert "W_StringBufferObject" in __pypy__.internal_repr(s)
+        assert type(s) is str
+        assert len(s) == 310
+        assert s == "x" * 300 + "0123456789"
+        assert s.endswith("89")
+        assert s[-3:] == "789"
+        assert hash(s) == hash("x" * 300 + "0123456789")
+        assert str(s) is s
+
+    def test_add_other_types(self):
+        s = "x" * 300 + "y"
+        assert s + u"z" == u"x" * 300 + u"yz"
+        assert s + bytearray("z") == bytearray("x" * 300 + "yz")
+        raises(TypeError, "s + 5")
+
+    def test_shared_builder(self):
+        a = "x" * 300 + "y"
+        b = a + "b"
+        c = a + "c"
+        d = b + "d"
+        assert (a, b, c, d) == ("x" * 300 + "y", "x" * 300 + "yb",
+                                "x" * 300 + "yc", "x" * 300 + "ybd")
+        assert a + a == "x" * 300 + "y" + "x" * 300 + "y"
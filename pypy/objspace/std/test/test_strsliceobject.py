@@ -0,0 +1,101 @@
+from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.strsliceobject import (W_StringSliceObject,
+    SLICE_MAX_KEPT_ALIVE)
+from pypy.objspace.std.test import test_bytesobject
+
+
+class TestW_StringSliceObject:
+    spaceconfig = {"objspace.std.withstrslice": True}
+
+    def test_slice(self):
+        space = self.space
+        s = "".join([chr(ord("a") + i % 26) for i in range(200)])
+        w_s = space.newbytes(s)
+        w_slice = space.getslice(w_s, space.wrap(50), space.wrap(200))
+        assert isinstance(w_slice, W_StringSliceObject)
+        assert w_slice.str is s
+        assert space.int_w(space.len(w_slice)) == 150
+        w_slice2 = space.getitem(w_slice, space.newslice(space.wrap(10),
+                                                         space.w_None,
+                                                         space.w_None))
+        assert isinstance(w_slice2, W_StringSliceObject)
+        assert w_slice2.str is s
+        assert w_slice2.start == 60
+        assert space.bytes_w(space.getitem(w_slice2, space.wrap(0))) == s[60]
+        assert w_slice2.w_str is None
+        assert space.bytes_w(w_slice2) == s[60:]
+        # forcing drops the reference to the sliced string
+        assert w_slice2.str is not s
+        assert w_slice2.w_str is not None
+
+    def test_short_slices_are_copied(self):
+        space = self.space
+        w_s = space.newbytes("x" * 1000)
+        w_slice = space.getslice(w_s, space.wrap(0), space.wrap(10))
+        assert type(w_slice) is W_BytesObject
+        # a chunk of a buffer that is not too big is a view
+        w_slice = space.getslice(w_s, space.wrap(500), space.wrap(600))
+        assert isinstance(w_slice, W_StringSliceObject)
+        # but it would keep too much memory alive in a big one
+        w_s = space.newbytes("x" * (SLICE_MAX_KEPT_ALIVE + 1000))
+        w_slice = space.getslice(w_s, space.wrap(500), space.wrap(600))
+        assert type(w_slice) is W_BytesObject
+        w_slice = space.getslice(w_s, space.wrap(500), space.w_None)
+        assert isinstance(w_slice, W_StringSliceObject)
+
+    def test_search_does_not_force(self):
+        space = self.space
+        s = "abcab" * 100
+        w_slice = space.getslice(space.newbytes(s), space.wrap(101),
+                                 space.wrap(401))
+        t = s[101:401]
+        for args in [("ab",), ("ab", 2), ("ab", -10), ("ab", 5, 7),
+                     ("ab", 2, 1000), ("", 400), ("", 300), ("", 1, 0),
+                     ("x",), ("cab", -4, -1)]:
+            args_w = [space.newbytes(args[0])] + [space.wrap(arg)
+                                                  for arg in args[1:]]
+            w_count = space.call_method(w_slice, "count", *args_w)
+            assert space.int_w(w_count) == t.count(*args)
+            w_find = space.call_method(w_slice, "find", *args_w)
+            assert space.int_w(w_find) == t.find(*args)
+        assert w_slice.w_str is None
+        w_count = space.call_method(w_slice, "count", space.wrap(u"ab"))
+        assert space.int_w(w_count) == t.count("ab")
+
+
+class AppTestStringSliceObject(test_bytesobject.AppTestBytesObject):
+    spaceconfig = {"objspace.std.withstrslice": True}
+
+    def test_basic(self):
+        import __pypy__
+        s = "hello world, " * 10
+        t = s[13:]
+        assert "W_StringSliceObject" in __pypy__.internal_repr(t)
+        assert type(t) is str
+        assert len(t) == 117
+        assert t == s[:117]
+        assert t[0] == "h" and t[-1] == " "
+        assert t[6:11] == "world"
+        assert t.split(", ")[0] == "hello world"
+        assert hash(t) == hash(s[:117])
+        assert {t: 1}[s[:117]] == 1
+        assert t + t == s[13:] * 2
+        assert str(t) is t
+        assert t.startswith("hello")
+
+    def test_compare(self):
+        s = "abc" * 50
+        t = s[3:]
+        u = s[6:]
+        assert t == s[:147] and not t != s[:147]
+        assert t > u[3:] and u[3:] < t
+        assert s[:147] == t
+        assert t != u
+
+    def test_chunks(self):
+        data = "".join([chr(i % 256) for i in range(1000)])
+        chunks = []
+        while data:
+            chunks.append(data[:100])
+            data = data[100:]
+        assert "".join(chunks) == "".join([chr(i % 256) for i in range(1000)])
@@ -10,7 +10,7 @@ from rpython.rlib.mutbuffer import MutableStringBuffer
 from rpython.rlib.rarithmetic import ovfcheck
 from rpython.rlib.rstring import (
     StringBuilder, split, rsplit, UnicodeBuilder, replace_count, startswith,
-    endswith)
+    endswith, find, rfind, count)
 from rpython.rlib import rutf8, jit
 
 from pypy.interpreter import unicodehelper
@@ -21,6 +21,8 @@ from pypy.interpreter.typedef import TypeDef
 from pypy.module.unicodedata.interp_ucd import unicodedb
 from pypy.objspace.std import newformat
 from pypy.objspace.std.basestringtype import basestring_typedef
+from pypy.objspace.std.fixedwidthunicode import (
+    FIXED_WIDTH_MIN_LENGTH, NO_BUFFER, make_fixed_width_buffer)
 from pypy.objspace.std.formatting import mod_format
 from pypy.objspace.std.sliceobject import (W_SliceObject,
     unwrap_start_stop, normalize_simple_slice)
@@ -49,6 +51,7 @@ def codepoint_at_pos_dont_look_inside(utf8, p):
 class W_UnicodeObject(W_Root):
     import_from_mixin(StringMethods)
     _immutable_fields_ = ['_utf8']
+    _fixedwidth = None    # see fixedwidthunicode.py
 
     @enforceargs(utf8str=str)
     def __init__(self, utf8str, length):
@@ -754,6 +757,9 @@ class W_UnicodeObject(W_Root):
         #     full index, but second does?
         assert start >= 0
         assert stop >= 0
+        buf = self._get_fixed_width_buffer(space)
+        if buf is not None:
+            return W_UnicodeObject(buf.slice_utf8(start, stop), stop - start)
         byte_start = self._index_to_byte(start)
         byte_stop = self._index_to_byte(stop)
         return W_UnicodeObject(self._utf8[byte_start:byte_stop], stop - start)
@@ -822,12 +828,12 @@ class W_UnicodeObject(W_Root):
         start_index, end_index = self._unwrap_and_compute_idx_params(
             space, w_start, w_end)
         sub = self.convert_arg_to_w_unicode(space, w_sub)._utf8
-        return space.newint(value.count(sub, start_index, end_index))
+        return space.newint(count(value, sub, start_index, end_index))
 
     def descr_contains(self, space, w_sub):
         value = self._utf8
         w_other = self.convert_arg_to_w_unicode(space, w_sub)
-        return space.newbool(value.find(w_other._utf8) >= 0)
+        return space.newbool(find(value, w_other._utf8, 0, len(value)) >= 0)
 
     def descr_partition(self, space, w_sub):
         value = self._utf8
@@ -836,7 +842,7 @@ class W_UnicodeObject(W_Root):
         if sublen == 0:
             raise oefmt(space.w_ValueError, "empty separator")
 
-        pos = value.find(sub._utf8)
+        pos = find(value, sub._utf8, 0, len(value))
 
         if pos < 0:
             return space.newtuple([self, self._empty(), self._empty()])
@@ -854,7 +860,7 @@ class W_UnicodeObject(W_Root):
         if sublen == 0:
             raise oefmt(space.w_ValueError, "empty separator")
 
-        pos = value.rfind(sub._utf8)
+        pos = rfind(value, sub._utf8, 0, len(value))
 
         if pos < 0:
             return space.newtuple([self._empty(), self._empty(), self])
@@ -908,6 +914,25 @@ class W_UnicodeObject(W_Root):
         self._index_storage = storage
         return storage
 
+    def _get_fixed_width_buffer(self, space):
+        """Return the fixed-width buffer of a large non-ascii string,
+        building it the first time, or None if this string is indexed
+        through its utf8 index structure."""
+        if not space.config.objspace.std.withfixedwidthunicode:
+            return None
+        if self._length < FIXED_WIDTH_MIN_LENGTH or self.is_ascii():
+            return None
+        buf = self._fixedwidth
+        if buf is None:
+            buf = make_fixed_width_buffer(self._utf8, self._length)
+            self._fixedwidth = buf
+            # the buffer replaces the index structure for indexing, slicing
+            # and searching; other operations rebuild it if they need it
+            self._index_storage = rutf8.null_storage()
+        if buf is NO_BUFFER:
+            return None
+        return buf
+
     def _getitem_result(self, space, index):
         if (jit.we_are_jitted() and
                 not self.is_ascii() and
@@ -918,6 +943,9 @@ class W_UnicodeObject(W_Root):
             index += self._length
         if index < 0 or index >= self._length:
             raise oefmt(space.w_IndexError, "string index out of range")
+        buf = self._get_fixed_width_buffer(space)
+        if buf is not None:
+            return W_UnicodeObject(buf.getitem_utf8(index), 1)
         start = self._index_to_byte(index)
         # we must not inline next_codepoint_pos, otherwise we produce a guard!
         end = self.next_codepoint_pos_dont_look_inside(start)
@@ -991,6 +1019,16 @@ class W_UnicodeObject(W_Root):
     def _unwrap_and_search(self, space, w_sub, w_start, w_end, forward=True):
         w_sub = self.convert_arg_to_w_unicode(space, w_sub)
         start, end = unwrap_start_stop(space, self._length, w_start, w_end)
+        buf = self._get_fixed_width_buffer(space)
+        if buf is not None:
+            if start > self._length:
+                return None
+            if end > self._length:
+                end = self._length
+            res = buf.search(w_sub._utf8, w_sub._len(), start, end, forward)
+            if res < 0:
+                return None
+            return space.newint(res)
         if start == 0:
             start_index = 0
         elif start > self._length:
@@ -1005,14 +1043,14 @@ class W_UnicodeObject(W_Root):
             end_index = self._index_to_byte(end)
 
         if forward:
-            res_index = self._utf8.find(w_sub._utf8, start_index, end_index)
+            res_index = find(self._utf8, w_sub._utf8, start_index, end_index)
             if res_index < 0:
                 return None
             res = self._byte_to_index(res_index)
             assert res >= 0
             return space.newint(res)
         else:
-            res_index = self._utf8.rfind(w_sub._utf8, start_index, end_index)
+            res_index = rfind(self._utf8, w_sub._utf8, start_index, end_index)
             if res_index < 0:
                 return None
             res = self._byte_to_index(res_index)
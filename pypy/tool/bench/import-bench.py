@@ -0,0 +1,110 @@
+"""
+Measures the time taken to import a big tree of modules, with the .pyc
+files and with the code cache (PYPY_CODE_CACHE).  Run with any Python; the
+interpreter that is measured is given on the command line:
+
+    python import-bench.py /path/to/pypy [packages [modules [functions]]]
+
+The tree contains 'packages' packages of 'modules' modules each, and every
+module defines 'functions' functions and a class, of which only a few are
+called at import time, like in a typical large application.
+"""
+
+import os, sys, time, subprocess, tempfile, shutil
+
+RUNS = 5
+
+MODULE = '''
+"""Module %(name)s."""
+import os, sys
+%(imports)s
+
+class Class%(index)d(object):
+    """A class."""
+    def __init__(self, value):
+        self.value = value
+
+    def method(self, x):
+        if x > self.value:
+            return x - self.value
+        return [self.value + i for i in range(x)]
+
+%(functions)s
+
+TABLE = dict((i, func0(i)) for i in range(10))
+'''
+
+FUNCTION = '''
+def func%(i)d(x, y=None, *args, **kwds):
+    """Function number %(i)d."""
+    result = []
+    for i in range(x):
+        try:
+            result.append(str(i) + repr(y))
+        except ValueError as e:
+            print >> sys.stderr, e
+    if kwds:
+        return dict(kwds, x=x)
+    return len(result) + %(i)d
+'''
+
+def make_tree(root, packages, modules, functions):
+    all_names = []
+    for p in range(packages):
+        pkgname = 'pkg%d' % p
+        os.mkdir(os.path.join(root, pkgname))
+        with open(os.path.join(root, pkgname, '__init__.py'), 'w') as f:
+            f.write('"""Package %s."""\n' % pkgname)
+        for m in range(modules):
+            name = '%s.mod%d' % (pkgname, m)
+            if all_names:
+                imports = 'import %s' % (all_names[-1],)
+            else:
+                imports = ''
+            funcs = ''.join([FUNCTION % {'i': i} for i in range(functions)])
+            with open(os.path.join(root, pkgname, 'mod%d.py' % m), 'w') as f:
+                f.write(MODULE % {'name': name, 'index': m,
+                                  'imports': imports, 'functions': funcs})
+            all_names.append(name)
+    with open(os.path.join(root, 'bigtree.py'), 'w') as f:
+        for name in all_names:
+            f.write('import %s\n' % name)
+
+def run(executable, root, env):
+    start = time.time()
+    subprocess.check_call([executable, '-c', 'import bigtree'], cwd=root,
+                          env=env)
+    return time.time() - start
+
+def measure(executable, root, env):
+    run(executable, root, env)    # writes the .pyc files or the cache
+    times = sorted([run(executable, root, env) for i in range(RUNS)])
+    return times[0], times[len(times) // 2]
+
+def main(argv):
+    if len(argv) < 2:
+        print __doc__
+        return 2
+    executable = argv[1]
+    packages, modules, functions = ([int(x) for x in argv[2:5]] +
+                                    [20, 50, 30][len(argv[2:5]):])
+    root = tempfile.mkdtemp(prefix='import-bench-')
+    try:
+        make_tree(root, packages, modules, functions)
+        print '%d modules of %d functions each' % (packages * modules,
+                                                   functions)
+        env = os.environ.copy()
+        env.pop('PYPY_CODE_CACHE', None)
+        print 'from the sources:     min %.3fs, median %.3fs' % measure(
+            executable, root, dict(env, PYTHONDONTWRITEBYTECODE='1'))
+        print 'with .pyc files:      min %.3fs, median %.3fs' % measure(
+            executable, root, env)
+        env['PYPY_CODE_CACHE'] = os.path.join(root, 'code.cache')
+        print 'with PYPY_CODE_CACHE: min %.3fs, median %.3fs' % measure(
+            executable, root, env)
+    finally:
+        shutil.rmtree(root)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
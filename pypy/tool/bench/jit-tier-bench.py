@@ -0,0 +1,129 @@
+"""
+Compares the total run time of short programs on a PyPy with the JIT,
+without and with the baseline tier (the JIT parameter baseline_threshold).
+Run with any Python; the interpreter that is measured is given on the
+command line:
+
+    python jit-tier-bench.py /path/to/pypy [baseline_threshold]
+
+The workload looks like the startup of a program, or like a service that
+handles a few hundred requests: many different functions with branches,
+each called a few hundred times, which is not enough for the tracing JIT
+with its default 'threshold'.  It is run with several numbers of requests,
+and the median of the total run times is printed for every one.
+"""
+
+import sys, subprocess, tempfile, shutil, os, time
+
+RUNS = 5
+REQUESTS = [50, 200, 500, 2000, 10000]
+
+WORKLOAD = '''
+import sys
+
+def parse_line(line):
+    key, _, value = line.partition('=')
+    key = key.strip().lower()
+    value = value.strip()
+    if value.isdigit():
+        return key, int(value)
+    if value in ('true', 'yes', 'on'):
+        return key, True
+    if value in ('false', 'no', 'off'):
+        return key, False
+    return key, value
+
+def load_config(lines):
+    config = {}
+    for line in lines:
+        if not line or line.startswith('#'):
+            continue
+        key, value = parse_line(line)
+        config[key] = value
+    return config
+
+def route(path):
+    parts = path.strip('/').split('/')
+    if not parts[0]:
+        return 'index', ()
+    if parts[0] == 'user' and len(parts) == 2:
+        return 'user', (int(parts[1]),)
+    if parts[0] == 'item' and len(parts) == 3:
+        return 'item', (parts[1], int(parts[2]))
+    return 'notfound', ()
+
+def render(name, args, config):
+    if name == 'index':
+        return '<h1>%s</h1>' % (config['title'],)
+    if name == 'user':
+        uid = args[0]
+        total = 0
+        for i in range(uid % 50):
+            total += i * config['scale']
+        return '<p>user %d: %d</p>' % (uid, total)
+    if name == 'item':
+        return '<p>%s</p>' % ('-'.join([args[0]] * (args[1] % 7)),)
+    return '<p>not found</p>'
+
+def handle(path, config):
+    name, args = route(path)
+    body = render(name, args, config)
+    headers = ['Content-Type: text/html',
+               'Content-Length: %d' % len(body)]
+    if config['debug']:
+        headers.append('X-Route: %s' % name)
+    return '\\r\\n'.join(headers) + '\\r\\n\\r\\n' + body
+
+CONFIG = [
+    '# example',
+    'title = example',
+    'scale = 3',
+    'debug = yes',
+    'workers = 4',
+]
+
+PATHS = ['/', '/user/17', '/user/123', '/item/abc/9', '/missing/page']
+
+def main(requests):
+    size = 0
+    for i in range(requests):
+        config = load_config(CONFIG)
+        size += len(handle(PATHS[i % len(PATHS)], config))
+    return size
+
+main(int(sys.argv[1]))
+'''
+
+def run(executable, root, args, requests):
+    start = time.time()
+    subprocess.check_call([executable] + args + ['workload.py',
+                                                 str(requests)], cwd=root)
+    return time.time() - start
+
+def measure(executable, root, args, requests):
+    results = sorted([run(executable, root, args, requests)
+                      for i in range(RUNS)])
+    return results[len(results) // 2]
+
+def main(argv):
+    if len(argv) < 2:
+        print __doc__
+        return 2
+    executable = argv[1]
+    threshold = int(argv[2]) if len(argv) > 2 else 50
+    root = tempfile.mkdtemp(prefix='jit-tier-bench-')
+    try:
+        with open(os.path.join(root, 'workload.py'), 'w') as f:
+            f.write(WORKLOAD)
+        baseline = ['--jit', 'baseline_threshold=%d' % (threshold,)]
+        print 'requests   default   baseline_threshold=%d' % (threshold,)
+        for requests in REQUESTS:
+            print '%8d  %7.3fs  %7.3fs' % (requests,
+                measure(executable, root, [], requests),
+                measure(executable, root, baseline, requests))
+    finally:
+        shutil.rmtree(root)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,131 @@
+"""
+Measures how long a PyPy with the JIT needs to reach its peak throughput,
+without and with a JIT cache (PYPY_JIT_CACHE) recorded by a previous run
+of the same workload.  Run with any Python; the interpreter that is
+measured is given on the command line:
+
+    python jit-warmup-bench.py /path/to/pypy [rounds]
+
+The workload is made of small kernels like the ones of
+pypy/module/pypyjit/test_pypy_c, called in 'rounds' rounds.  Every round
+is timed, and the time to peak is the time elapsed until the first round
+that is less than 10% slower than the fastest one.
+"""
+
+import os, sys, subprocess, tempfile, shutil
+
+RUNS = 5
+
+WORKLOAD = '''
+import time
+
+def intloop(n):
+    i = 0
+    total = 0
+    while i < n:
+        total += i & 0xff
+        i += 1
+    return total
+
+def floatloop(n):
+    x = 0.0
+    for i in range(n):
+        x += i * 0.5 - x / 3.0
+    return x
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def norm2(self):
+        return self.x * self.x + self.y * self.y
+
+def objects(n):
+    total = 0
+    for i in range(n):
+        total += Point(i, i + 1).norm2() % 7
+    return total
+
+def strings(n):
+    parts = []
+    for i in range(n):
+        s = str(i)
+        if s.endswith('7'):
+            parts.append(s.upper())
+    return len(''.join(parts))
+
+def dicts(n):
+    d = {}
+    for i in range(n):
+        d[i % 97] = d.get(i % 97, 0) + i
+    return sum(d.values())
+
+def small(x):
+    return x + 1
+
+def calls(n):
+    total = 0
+    for i in range(n):
+        total = small(total)
+    return total
+
+KERNELS = [intloop, floatloop, objects, strings, dicts, calls]
+
+def main(rounds):
+    start = time.time()
+    for r in range(rounds):
+        t0 = time.time()
+        for kernel in KERNELS:
+            kernel(2000)
+        t1 = time.time()
+        print '%f %f' % (t1 - start, t1 - t0)
+
+main(ROUNDS)
+'''
+
+def run(executable, root, env, recorded=None):
+    if recorded is not None:
+        # every run starts from the recorded cache, not from the one
+        # updated by the previous run
+        shutil.copyfile(recorded, env['PYPY_JIT_CACHE'])
+    output = subprocess.check_output([executable, 'workload.py'], cwd=root,
+                                     env=env)
+    rounds = [map(float, line.split()) for line in output.splitlines()]
+    fastest = min([duration for elapsed, duration in rounds])
+    for elapsed, duration in rounds:
+        if duration <= fastest * 1.1:
+            return elapsed, fastest
+    assert False
+
+def measure(executable, root, env, recorded=None):
+    results = sorted([run(executable, root, env, recorded)
+                      for i in range(RUNS)])
+    return results[0][0], results[len(results) // 2][0]
+
+def main(argv):
+    if len(argv) < 2:
+        print __doc__
+        return 2
+    executable = argv[1]
+    rounds = int(argv[2]) if len(argv) > 2 else 200
+    root = tempfile.mkdtemp(prefix='jit-warmup-bench-')
+    try:
+        with open(os.path.join(root, 'workload.py'), 'w') as f:
+            f.write(WORKLOAD.replace('ROUNDS', str(rounds)))
+        recorded = os.path.join(root, 'recorded.jitcache')
+        env = os.environ.copy()
+        env.pop('PYPY_JIT_CACHE', None)
+        print '%d rounds, time to peak throughput:' % (rounds,)
+        print 'without a cache: min %.3fs, median %.3fs' % measure(
+            executable, root, env)
+        run(executable, root, dict(env, PYPY_JIT_CACHE=recorded))
+        env['PYPY_JIT_CACHE'] = os.path.join(root, 'jitcache')
+        print 'with a cache:    min %.3fs, median %.3fs' % measure(
+            executable, root, env, recorded)
+    finally:
+        shutil.rmtree(root)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
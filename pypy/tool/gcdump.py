@@ -3,11 +3,65 @@
 Prints a human-readable total out of a dumpfile produced
 by gc.dump_rpy_heap(), and optionally a typeids.txt.
 
-Syntax:  dump.py  <dumpfile>  [<typeids.txt>]
+Syntax:  gcdump.py  <dumpfile>  [<typeids.txt>]
 
 By default, typeids.txt is loaded from the same dir as dumpfile.
+
+With --diff, compares two dumpfiles of the same process, taken at
+different times, and prints the types whose total size grew the most,
+followed by the most common chains of references that keep alive the
+objects of these types:
+
+Syntax:  gcdump.py  --diff  <old-dumpfile>  <new-dumpfile>  [<typeids.txt>]
+
+The dumpfiles are read sequentially, a chunk at a time, so that they can
+be much larger than the available memory.  The retaining paths are found
+by reading the new dumpfile once more for every level of references.
 """
-import sys, array, struct, os
+import sys, array, struct, os, random
+
+
+WORD = struct.calcsize('l')
+TERMINATOR = struct.pack('l', -1)
+CHUNKSIZE = 4 * 1024 * 1024    # bytes read at once
+
+
+def iter_dump(filename, chunksize=CHUNKSIZE):
+    """Yield (addr, typenum, size, refs, is_root) for all objects of the
+    dumpfile, reading it one chunk at a time.  'refs' is an array of the
+    addresses of the objects that this object points to.  'is_root' is
+    True for the objects that come before the end-of-roots marker."""
+    f = open(filename, 'rb')
+    try:
+        buf = ''
+        pos = 0
+        is_root = True
+        while True:
+            # the first three words of an object are never -1; a match
+            # for TERMINATOR that is not at a word boundary is made of
+            # parts of two words, and must be skipped
+            end = buf.find(TERMINATOR, pos + 3 * WORD)
+            while end >= 0 and (end - pos) % WORD != 0:
+                end = buf.find(TERMINATOR, end + 1)
+            if end < 0:
+                data = f.read(chunksize)
+                if not data:
+                    break
+                buf = buf[pos:] + data
+                pos = 0
+                continue
+            a = array.array('l')
+            a.fromstring(buf[pos:end])
+            pos = end + WORD
+            if len(a) == 3 and a[0] == 0 and a[1] == 0 and a[2] == 0:
+                is_root = False      # the end-of-roots marker
+                continue
+            yield (a[0], a[1], a[2], a[3:], is_root)
+        if pos != len(buf):
+            raise ValueError("invalid or truncated dump file "
+                             "(or 32/64-bit mix)")
+    finally:
+        f.close()
 
 
 class Stat(object):
@@ -16,11 +70,12 @@ class Stat(object):
     BIGOBJ = 65536   # bytes
 
     def summarize(self, filename):
-        a = self.load_dump_file(filename)
         self.summary = {}     # {typenum: [count, totalsize]}
         self.bigobjs = []     # list of individual (size, typenum)
-        for obj in self.walk(a):
-            self.add_object_summary(obj[2], obj[3])
+        print >> sys.stderr, 'walking %s...' % (filename,),
+        for obj in iter_dump(filename):
+            self.add_object_summary(obj[1], obj[2])
+        print >> sys.stderr, 'done'
 
     def load_typeids(self, filename_or_iter):
         self.typeids = Stat.typeids.copy()
@@ -101,7 +156,226 @@ class Stat(object):
         print >> sys.stderr, 'done'
 
 
+class HeapDiff(object):
+    """Compares the summaries of two dumps of the same process.  The type
+    numbers in a dump are indexes in the list returned by
+    gc.get_typeids_list(), so they can only be compared directly if both
+    dumps come from the same executable."""
+
+    TOP = 20          # number of types reported
+    PATHS_TYPES = 5   # number of types for which we look for retainers
+    PATHS = 3         # number of retaining paths reported per type
+    SAMPLE = 1000     # objects per type whose retainers are searched
+    DEPTH = 8         # maximum length of a retaining path
+
+    def __init__(self, old, new, remap=None):
+        self.old = old
+        self.new = new
+        self.remap = remap    # {old typenum: new typenum}, or None
+
+    def compute(self):
+        """Return a list of (typenum, count, size, dcount, dsize),
+        where the typenums and totals are those of the new dump, sorted
+        by decreasing growth of total size."""
+        oldsummary = {}
+        for typenum, (count, size) in self.old.summary.items():
+            if self.remap is not None:
+                typenum = self.remap.get(typenum, -1 - typenum)
+            stat = oldsummary.setdefault(typenum, [0, 0])
+            stat[0] += count
+            stat[1] += size
+        result = []
+        for typenum in set(oldsummary) | set(self.new.summary):
+            oldcount, oldsize = oldsummary.get(typenum, (0, 0))
+            count, size = self.new.summary.get(typenum, (0, 0))
+            result.append((typenum, count, size,
+                           count - oldcount, size - oldsize))
+        result.sort(key=lambda item: (-item[4], -item[3], item[0]))
+        return result
+
+    def get_type_name(self, typenum):
+        if typenum < 0:     # only in the old dump, with a different remap
+            return self.old.get_type_name(-1 - typenum)
+        return self.new.get_type_name(typenum)
+
+    def print_diff(self, diff):
+        print '   count    delta      size      delta  type'
+        for typenum, count, size, dcount, dsize in diff[:self.TOP]:
+            print '%8d %+8d %8.2fM %+9.2fM  %s' % (
+                count, dcount, size / (1024.0*1024.0),
+                dsize / (1024.0*1024.0), self.get_type_name(typenum))
+        totalsize = sum([item[2] for item in diff])
+        totaldelta = sum([item[4] for item in diff])
+        print 'total %.1fM (%+.1fM)' % (totalsize / (1024.0*1024.0),
+                                       totaldelta / (1024.0*1024.0))
+
+    def print_paths(self, filename, diff):
+        typenums = [item[0] for item in diff[:self.PATHS_TYPES]
+                    if item[4] > 0 and item[0] >= 0]
+        if not typenums:
+            return
+        paths = find_retaining_paths(filename, typenums, self.SAMPLE,
+                                     self.DEPTH)
+        for typenum in typenums:
+            print
+            print 'retaining paths of %s:' % (self.get_type_name(typenum),)
+            counts = paths.get(typenum, {})
+            total = sum(counts.values())
+            items = counts.items()
+            items.sort(key=lambda (path, count): (-count, path))
+            for path, count in items[:self.PATHS]:
+                names = []
+                for num in path:
+                    if num is None:
+                        names.append('...')
+                    else:
+                        names.append(self.get_type_name(num))
+                print '%8d/%d  %s' % (count, total, ' -> '.join(names))
+
+
+def find_retaining_paths(filename, typenums, sample=HeapDiff.SAMPLE,
+                         depth=HeapDiff.DEPTH, chunksize=CHUNKSIZE):
+    """Find how the objects of the given types are reachable from the
+    roots of the dump.  Returns {typenum: {path: count}}, where every
+    path is a tuple of typenums that starts with a root and ends with
+    'typenum'.  A path that is longer than 'depth' starts with None.
+
+    Only a random sample of at most 'sample' objects per type is
+    considered, and for every object, only the first object found that
+    points to it, which is a root if there is one.  The dumpfile is read
+    once to pick the sample and once per level of references."""
+    rng = random.Random(42)
+    wanted = dict.fromkeys(typenums)
+    samples = {}     # {typenum: [addr]}
+    seen = {}        # {typenum: number of objects}
+    types = {}       # {addr: typenum} for the objects of the paths
+    roots = set()
+    for addr, typenum, size, refs, is_root in iter_dump(filename, chunksize):
+        if typenum not in wanted:
+            continue
+        n = seen.get(typenum, 0)
+        seen[typenum] = n + 1
+        lst = samples.setdefault(typenum, [])
+        if n < sample:
+            lst.append(addr)
+        else:
+            i = rng.randrange(n + 1)
+            if i < sample:
+                lst[i] = addr
+        if is_root:
+            roots.add(addr)
+    for typenum, lst in samples.items():
+        for addr in lst:
+            types[addr] = typenum
+    #
+    parents = {}     # {addr: addr of the first object found pointing to it}
+    frontier = set(types)
+    frontier.difference_update(roots)
+    for level in range(depth):
+        if not frontier:
+            break
+        found = {}
+        for addr, typenum, size, refs, is_root in iter_dump(filename,
+                                                           chunksize):
+            hits = frontier.intersection(refs)
+            if hits:
+                for ref in hits:
+                    if ref not in found:
+                        found[ref] = (addr, typenum, is_root)
+                frontier.difference_update(hits)
+        frontier = set()
+        for ref, (addr, typenum, is_root) in found.items():
+            parents[ref] = addr
+            if addr not in types:
+                types[addr] = typenum
+                if is_root:
+                    roots.add(addr)
+                else:
+                    frontier.add(addr)
+    #
+    result = {}
+    for typenum, lst in samples.items():
+        counts = result[typenum] = {}
+        for addr in lst:
+            path = [typenum]
+            visited = set([addr])
+            while addr not in roots:
+                if addr not in parents or len(path) > depth:
+                    path.append(None)
+                    break
+                addr = parents[addr]
+                if addr in visited:
+                    path.append(None)
+                    break
+                visited.add(addr)
+                path.append(types[addr])
+            path.reverse()
+            path = tuple(path)
+            counts[path] = counts.get(path, 0) + 1
+    return result
+
+
+def load_typeids_list(dumpfile):
+    filename = os.path.join(os.path.dirname(dumpfile), 'typeids.lst')
+    if not os.path.isfile(filename):
+        return None
+    f = open(filename)
+    try:
+        return f.read().split()
+    finally:
+        f.close()
+
+def load_typeids(stat, dumpfile, typeid_name=None):
+    if typeid_name is None:
+        typeid_name = os.path.join(os.path.dirname(dumpfile), 'typeids.txt')
+    if os.path.isfile(typeid_name):
+        stat.load_typeids(typeid_name)
+    else:
+        import zlib, gc
+        stat.load_typeids(zlib.decompress(gc.get_typeids_z()).split("\n"))
+
+def compute_remap(old, new):
+    """If the two dumps come from different executables, map the type
+    numbers of the old dump to those of the new dump with the same
+    name.  Returns None if they come from the same executable."""
+    if old.typeids == new.typeids:
+        return None
+    byname = {}
+    for typenum, name in new.typeids.items():
+        byname.setdefault(name, typenum)
+    remap = {}
+    for typenum, name in old.typeids.items():
+        if name in byname:
+            remap[typenum] = byname[name]
+    return remap
+
+def main_diff(oldname, newname, typeid_name=None):
+    old = Stat()
+    new = Stat()
+    old.summarize(oldname)
+    new.summarize(newname)
+    load_typeids(new, newname, typeid_name)
+    remap = None
+    if load_typeids_list(oldname) != load_typeids_list(newname):
+        print >> sys.stderr, ('the dumps come from different executables: '
+                              'comparing the types by name')
+        load_typeids(old, oldname)
+        remap = compute_remap(old, new)
+    else:
+        old.typeids = new.typeids
+    heapdiff = HeapDiff(old, new, remap)
+    diff = heapdiff.compute()
+    heapdiff.print_diff(diff)
+    heapdiff.print_paths(newname, diff)
+
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--diff':
+        if len(sys.argv) <= 3:
+            print >> sys.stderr, __doc__
+            sys.exit(2)
+        main_diff(*sys.argv[2:5])
+        sys.exit(0)
     if len(sys.argv) <= 1:
         print >> sys.stderr, __doc__
         sys.exit(2)
@@ -111,11 +385,7 @@ if __name__ == '__main__':
     if len(sys.argv) > 2:
         typeid_name = sys.argv[2]
     else:
-        typeid_name = os.path.join(os.path.dirname(sys.argv[1]), 'typeids.txt')
-    if os.path.isfile(typeid_name):
-        stat.load_typeids(typeid_name)
-    else:
-        import zlib, gc
-        stat.load_typeids(zlib.decompress(gc.get_typeids_z()).split("\n"))
+        typeid_name = None
+    load_typeids(stat, sys.argv[1], typeid_name)
     #
     stat.print_summary()
@@ -0,0 +1,107 @@
+import py, array
+from pypy.tool import gcdump
+from rpython.tool.udir import udir
+
+
+def write_dump(filename, roots, objects):
+    # 'roots' and 'objects' are lists of (addr, typenum, size, [refs])
+    a = array.array('l')
+    for lst in [roots, [(0, 0, 0, [])], objects]:
+        for addr, typenum, size, refs in lst:
+            a.extend([addr, typenum, size] + refs + [-1])
+    f = open(str(filename), 'wb')
+    a.tofile(f)
+    f.close()
+    return str(filename)
+
+def make_dump(name, nleaves):
+    # one root 1000 (type 1) -> container 2000 (type 2) -> 'nleaves' leaves
+    # of type 3, plus one root 1008 (type 1) -> one leaf of type 4
+    leaves = [3000 + 8 * i for i in range(nleaves)]
+    objects = [(2000, 2, 16, leaves)]
+    objects += [(addr, 3, 24, []) for addr in leaves]
+    objects.append((5000, 4, 32, []))
+    return write_dump(udir.join(name), [(1000, 1, 8, [2000]),
+                                        (1008, 1, 8, [5000])], objects)
+
+
+def test_iter_dump():
+    filename = make_dump('gcdump_iter', 3)
+    for chunksize in [8, 13, 1000]:
+        objs = list(gcdump.iter_dump(filename, chunksize))
+        assert [(addr, typenum, size, list(refs), is_root)
+                for (addr, typenum, size, refs, is_root) in objs] == [
+            (1000, 1, 8, [2000], True),
+            (1008, 1, 8, [5000], True),
+            (2000, 2, 16, [3000, 3008, 3016], False),
+            (3000, 3, 24, [], False),
+            (3008, 3, 24, [], False),
+            (3016, 3, 24, [], False),
+            (5000, 4, 32, [], False)]
+
+def test_iter_dump_unaligned_terminator():
+    # the bytes of -256 followed by 255 contain a -1 that is not aligned
+    filename = write_dump(udir.join('gcdump_unaligned'), [],
+                          [(1000, 1, 8, [-256, 255]), (2000, 1, 8, [])])
+    for chunksize in [8, 20, 1000]:
+        objs = list(gcdump.iter_dump(filename, chunksize))
+        assert [list(obj[3]) for obj in objs] == [[-256, 255], []]
+
+def test_iter_dump_truncated():
+    filename = make_dump('gcdump_truncated', 2)
+    data = open(filename, 'rb').read()
+    f = open(filename, 'wb')
+    f.write(data[:-gcdump.WORD])
+    f.close()
+    py.test.raises(ValueError, list, gcdump.iter_dump(filename))
+
+def test_summarize():
+    stat = gcdump.Stat()
+    stat.summarize(make_dump('gcdump_summarize', 5))
+    assert stat.summary == {1: [2, 16], 2: [1, 16], 3: [5, 120], 4: [1, 32]}
+
+def test_diff():
+    old = gcdump.Stat()
+    old.summarize(make_dump('gcdump_old', 2))
+    new = gcdump.Stat()
+    new.summarize(make_dump('gcdump_new', 10))
+    diff = gcdump.HeapDiff(old, new).compute()
+    assert diff[0] == (3, 10, 240, 8, 192)
+    assert sorted(diff[1:]) == [(1, 2, 16, 0, 0), (2, 1, 16, 0, 0),
+                                (4, 1, 32, 0, 0)]
+
+def test_diff_remap():
+    old = gcdump.Stat()
+    old.summarize(make_dump('gcdump_old', 2))
+    old.typeids = {1: 'root', 2: 'container', 3: 'leaf', 4: 'other'}
+    new = gcdump.Stat()
+    new.summarize(make_dump('gcdump_new', 10))
+    new.typeids = {1: 'root', 2: 'container', 3: 'other', 4: 'leaf'}
+    remap = gcdump.compute_remap(old, new)
+    assert remap == {1: 1, 2: 2, 3: 4, 4: 3}
+    diff = gcdump.HeapDiff(old, new, remap).compute()
+    # the 10 objects of type 3 are 'leaf' in the new dump; 2 'leaf' in
+    # the old dump become type 4 and one 'other' becomes type 3
+    assert diff[0] == (3, 10, 240, 9, 240 - 32)
+
+def test_retaining_paths():
+    filename = make_dump('gcdump_paths', 10)
+    for chunksize in [16, 1000]:
+        paths = gcdump.find_retaining_paths(filename, [3, 4],
+                                            chunksize=chunksize)
+        assert paths == {3: {(1, 2, 3): 10}, 4: {(1, 4): 1}}
+
+def test_retaining_paths_sample_and_depth():
+    filename = make_dump('gcdump_paths', 10)
+    paths = gcdump.find_retaining_paths(filename, [3], sample=4)
+    assert paths == {3: {(1, 2, 3): 4}}
+    paths = gcdump.find_retaining_paths(filename, [3], depth=1)
+    assert paths == {3: {(None, 2, 3): 10}}
+
+def test_retaining_paths_cycle():
+    # 2000 and 2008 point to each other, but only 2000 is reachable
+    # from the root
+    filename = write_dump(udir.join('gcdump_cycle'), [(1000, 1, 8, [2000])],
+                          [(2000, 2, 8, [2008]), (2008, 3, 8, [2000])])
+    paths = gcdump.find_retaining_paths(filename, [3])
+    assert paths == {3: {(1, 2, 3): 1}}
@@ -102,6 +102,14 @@ translation_optiondescription = OptionDescription(
                  requires={
                      "shadowstack": [("translation.gctransformer", "framework")],
                     }),
+    BoolOption("gcparallelmark",
+               "Mark the heap with several threads during major "
+               "collections (incminimark only)",
+               default=False, cmdline="--gc-parallel-mark"),
+    BoolOption("gcconcurrentsweep",
+               "Sweep the arenas in a background thread after the marking "
+               "phase of major collections (incminimark only)",
+               default=False, cmdline="--gc-concurrent-sweep"),
 
     # other noticeable options
     BoolOption("thread", "enable use of threading primitives",
@@ -173,6 +181,15 @@ translation_optiondescription = OptionDescription(
     IntOption("make_jobs", "Specify -j argument to make for compilation"
               " (C backend only)",
               cmdline="--make-jobs", default=detect_number_of_processors()),
+    BoolOption("parallel_compile",
+               "Split the C sources into smaller files and compile them "
+               "with a pool of make_jobs compiler processes instead of "
+               "letting make do it (C backend with a GNU Makefile only)",
+               default=False, cmdline="--parallel-compile"),
+    StrOption("compile_cache",
+              "Directory in which --parallel-compile caches the object "
+              "files, keyed by the hash of their preprocessed source",
+              cmdline="--compile-cache", default=None),
 
     # Flags of the TranslationContext:
     BoolOption("list_comprehension_operations",
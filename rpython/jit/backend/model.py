@@ -162,6 +162,12 @@ class AbstractCPU(object):
         """
         pass
 
+    def get_code_size(self, compiled_loop_token):
+        """Return the size in bytes of the machine code and raw data
+        allocated so far for the loop and all the bridges attached to it.
+        """
+        return 0
+
     def sizeof(self, S):
         raise NotImplementedError
 
@@ -22,6 +22,7 @@ from rpython.jit.metainterp.resume import (
 from rpython.jit.metainterp.resumecode import NUMBERING
 from rpython.jit.metainterp.support import adr2int
 from rpython.jit.codewriter import longlong
+from rpython.jit.backend.llsupport.symbolic import WORD
 
 
 def giveup():
@@ -168,6 +169,20 @@ def make_jitcell_token(jitdriver_sd):
     jitcell_token.outermost_jitdriver_sd = jitdriver_sd
     return jitcell_token
 
+TIER_UP_COUNTER = lltype.GcArray(lltype.Signed)
+
+class BaselineInfo(object):
+    """Attached to the JitCellTokens compiled by the baseline tier (see the
+    'baseline_threshold' parameter).  'counter' is an array of length 1,
+    incremented at every iteration of a loop until it reaches 'limit'; see
+    MetaInterp.record_tier_up_counter()."""
+
+    def __init__(self, jitcell, limit):
+        self.jitcell = jitcell
+        self.limit = limit
+        self.counter = lltype.malloc(TIER_UP_COUNTER, 1)
+        self.counter[0] = 0
+
 def record_loop_or_bridge(metainterp_sd, loop):
     """Do post-backend recordings and cleanups on 'loop'.
     """
@@ -262,6 +277,8 @@ def compile_loop(metainterp, greenkey, start, inputargs, jumpargs,
             faildescr=None, entry_bridge=False)
     #
     enable_opts = jitdriver_sd.warmstate.enable_opts
+    if metainterp.baseline:
+        enable_opts = jitdriver_sd.warmstate.baseline_enable_opts
     jitcell_token = make_jitcell_token(jitdriver_sd)
     cut_at = history.get_trace_position()
     history.record(rop.JUMP, jumpargs, None, descr=jitcell_token)
@@ -556,7 +573,12 @@ def send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, type,
                                       name=loopname)
     #
     if metainterp_sd.warmrunnerdesc is not None:    # for tests
-        metainterp_sd.warmrunnerdesc.memory_manager.keep_loop_alive(original_jitcell_token)
+        memmgr = metainterp_sd.warmrunnerdesc.memory_manager
+        code_size = metainterp_sd.cpu.get_code_size(
+            original_jitcell_token.compiled_loop_token)
+        memmgr.add_code_size(original_jitcell_token,
+                             code_size + estimate_resume_size(operations))
+        memmgr.keep_loop_alive(original_jitcell_token)
 
 def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
                            operations, original_loop_token, memo):
@@ -578,6 +600,8 @@ def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
         else:
             hooks = None
     operations = get_deep_immutable_oplist(operations)
+    clt = original_loop_token.compiled_loop_token
+    code_size = metainterp_sd.cpu.get_code_size(clt)
     metainterp_sd.profiler.start_backend()
     debug_start("jit-backend")
     log = have_debug_prints() or jl.jitlog_enabled()
@@ -603,11 +627,27 @@ def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
     metainterp_sd.logger_ops.log_bridge(inputargs, operations, None, faildescr,
                                         ops_offset, memo=memo)
     #
+    if metainterp_sd.warmrunnerdesc is not None:    # for tests
+        code_size = metainterp_sd.cpu.get_code_size(clt) - code_size
+        metainterp_sd.warmrunnerdesc.memory_manager.add_code_size(
+            original_loop_token,
+            code_size + estimate_resume_size(operations))
     #if metainterp_sd.warmrunnerdesc is not None:    # for tests
     #    metainterp_sd.warmrunnerdesc.memory_manager.keep_loop_alive(
     #        original_loop_token)
     return asminfo
 
+def estimate_resume_size(operations):
+    """Return an estimate of the size in bytes of the resume data of the
+    guards in 'operations', for the memory manager."""
+    size = 0
+    for op in operations:
+        if op.is_guard():
+            descr = op.getdescr()
+            if isinstance(descr, AbstractResumeGuardDescr):
+                size += descr.get_resume_size()
+    return size
+
 # ____________________________________________________________
 
 class _DoneWithThisFrameDescr(AbstractFailDescr):
@@ -688,9 +728,15 @@ class AbstractResumeGuardDescr(ResumeDescr):
     def get_resumestorage(self):
         raise NotImplementedError("abstract base class")
 
+    def get_resume_size(self):
+        # the resume data is shared with another guard, if any
+        return 0
+
     def handle_fail(self, deadframe, metainterp_sd, jitdriver_sd):
-        if (self.must_compile(deadframe, metainterp_sd, jitdriver_sd)
-                and not rstack.stack_almost_full()):
+        must_compile = self.must_compile(deadframe, metainterp_sd, jitdriver_sd)
+        if self.tier_up_loop(must_compile):
+            must_compile = False
+        if must_compile and not rstack.stack_almost_full():
             self.start_compiling()
             try:
                 self._trace_and_compile_from_bridge(deadframe, metainterp_sd,
@@ -717,6 +763,21 @@ class AbstractResumeGuardDescr(ResumeDescr):
         metainterp.handle_guard_failure(self, deadframe)
     _trace_and_compile_from_bridge._dont_inline_ = True
 
+    def tier_up_loop(self, must_compile):
+        """If this guard is in a loop compiled by the baseline tier, we
+        don't compile bridges: instead, when the guard failed often enough,
+        or when it is the guard of the loop's counter, we ask for the loop
+        to be traced again with all the optimizations.  Returns True if
+        the guard is in such a loop."""
+        looptoken = self.rd_loop_token.loop_token_wref()
+        if looptoken is None or looptoken.baseline_info is None:
+            return False
+        info = looptoken.baseline_info
+        if must_compile or info.counter[0] >= info.limit:
+            info.counter[0] = 0
+            info.jitcell.request_tier_up(looptoken)
+        return True
+
     def get_jitcounter_hash(self):
         return self.status & self.ST_SHIFT_MASK
 
@@ -868,6 +929,21 @@ class ResumeGuardDescr(AbstractResumeGuardDescr):
     def get_resumestorage(self):
         return self
 
+    def get_resume_size(self):
+        size = 4 * WORD
+        if self.rd_numb:
+            size += len(self.rd_numb.code)
+        if self.rd_consts is not None:
+            size += len(self.rd_consts) * WORD
+        if self.rd_virtuals is not None:
+            for vinfo in self.rd_virtuals:
+                size += WORD
+                if vinfo is not None:
+                    size += 2 * WORD + len(vinfo.fieldnums) * 2
+        if self.rd_pendingfields:
+            size += len(self.rd_pendingfields) * 2 * WORD
+        return size
+
 class ResumeGuardExcDescr(ResumeGuardDescr):
     pass
 
@@ -1003,6 +1079,12 @@ class ResumeFromInterpDescr(ResumeDescr):
         # send the new_loop to warmspot.py, to be called directly the next time
         jitdriver_sd.warmstate.attach_procedure_to_interp(
             self.original_greenkey, jitcell_token)
+        if (metainterp.baseline and
+                new_loop.operations[-1].getopnum() == rop.FINISH):
+            # a function traced from its start by the baseline tier,
+            # see compile_trace()
+            jitcell_token.baseline_info = metainterp.new_baseline_info(
+                self.original_greenkey)
         metainterp_sd.stats.add_jitcell_token(jitcell_token)
         record_loop_or_bridge(metainterp_sd, new_loop)
 
@@ -1030,6 +1112,10 @@ def compile_trace(metainterp, resumekey, runtime_boxes, ends_with_jump=False):
     trace = metainterp.history.trace
     jitdriver_sd = metainterp.jitdriver_sd
     enable_opts = jitdriver_sd.warmstate.enable_opts
+    if metainterp.baseline and not ends_with_jump:
+        # the baseline tier only uses its own optimizations for traces
+        # that don't jump to a loop compiled with all of them
+        enable_opts = jitdriver_sd.warmstate.baseline_enable_opts
     call_pure_results = metainterp.call_pure_results
     resumestorage = resumekey.get_resumestorage()
 
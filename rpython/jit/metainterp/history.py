@@ -418,9 +418,12 @@ class JitCellToken(AbstractDescr):
     retraced_count = 0
     invalidated = False
     outermost_jitdriver_sd = None
+    baseline_info = None    # a compile.BaselineInfo for the baseline tier
     # and more data specified by the backend when the loop is compiled
     number = -1
     generation = r_int64(0)
+    code_size = 0           # machine code and resume data, in bytes
+    jitcounter_key = r_uint(0)    # the hash of the greenkey, if attached
     # one purpose of LoopToken is to keep alive the CompiledLoopToken
     # returned by the backend.  When the LoopToken goes away, the
     # CompiledLoopToken has its __del__ called, which frees the assembler
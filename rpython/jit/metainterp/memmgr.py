@@ -1,5 +1,6 @@
 import math
 from rpython.rlib.rarithmetic import r_int64
+from rpython.rlib.listsort import make_timsort_class
 from rpython.rlib.debug import debug_start, debug_print, debug_stop
 from rpython.rlib.objectmodel import we_are_translated
 
@@ -19,6 +20,31 @@ from rpython.rlib.objectmodel import we_are_translated
 # 'generation' field is much smaller than the current generation, and
 # removed from the set.
 #
+# Independently, the JIT parameter 'code_budget' puts a limit on the
+# memory used by the loops in 'alive_loops': the size of their machine
+# code (as allocated by asmmemmgr.py) and an estimate of the size of
+# their resume data, in 'looptoken.code_size'.  When the total goes over
+# the limit, the least recently entered loops are removed from the set,
+# until the total is back under 3/4 of the limit.  If the loops entered
+# recently are above the limit alone, the next attempt is only made once
+# the total grew by 1/8 of the limit, or after EVICT_RETRY generations.
+# An evicted loop that is entered again is put back in the set; if it
+# was freed in the meantime, it is traced and compiled again, which is
+# counted in 'recompiled_loops' (only for the last MAX_EVICTED_KEYS
+# evicted loops).
+#
+
+EVICT_RETRY = 32
+MAX_EVICTED_KEYS = 1000
+
+LoopTokenSortBase = make_timsort_class()
+
+class LoopTokenSort(LoopTokenSortBase):
+    # the invalidated loops first, then the least recently entered ones
+    def lt(self, a, b):
+        if a.invalidated != b.invalidated:
+            return a.invalidated
+        return a.generation < b.generation
 
 class MemoryManager(object):
 
@@ -38,6 +64,14 @@ class MemoryManager(object):
         self.current_generation = r_int64(1)
         self.next_check = r_int64(-1)
         self.alive_loops = {}
+        # see set_max_size()
+        self.max_size = 0
+        self.total_size = 0
+        self.evicted_loops = 0
+        self.recompiled_loops = 0
+        self.evicted_keys = {}     # jitcounter hashes of the evicted loops
+        self.evict_check_size = 0
+        self.next_evict_check = r_int64(0)
 
     def set_max_age(self, max_age, check_frequency=0):
         if max_age <= 0:
@@ -49,16 +83,48 @@ class MemoryManager(object):
             self.check_frequency = check_frequency
             self.next_check = self.current_generation + 1
 
+    def set_max_size(self, max_size):
+        """Limit the code size of the alive loops to 'max_size' bytes,
+        or no limit if 'max_size' is 0."""
+        self.max_size = max(max_size, 0)
+        self.evict_check_size = 0
+        self.next_evict_check = r_int64(0)
+
     def next_generation(self):
         self.current_generation += 1
         if self.current_generation == self.next_check:
             self._kill_old_loops_now()
             self.next_check = self.current_generation + self.check_frequency
+        if (self.max_size > 0 and self.total_size > self.max_size and
+                (self.total_size > self.evict_check_size or
+                 self.current_generation >= self.next_evict_check)):
+            self._evict_loops_now()
 
     def keep_loop_alive(self, looptoken):
         if looptoken.generation != self.current_generation:
             looptoken.generation = self.current_generation
-            self.alive_loops[looptoken] = None
+            if looptoken not in self.alive_loops:
+                self.total_size += looptoken.code_size
+                self.alive_loops[looptoken] = None
+
+    def add_code_size(self, looptoken, size):
+        """Called when a loop or a bridge of 'looptoken' was compiled,
+        with the size in bytes of its machine code and resume data."""
+        looptoken.code_size += size
+        if looptoken in self.alive_loops:
+            self.total_size += size
+
+    def loop_attached(self, looptoken, key):
+        """Called when 'looptoken' is attached to the interpreter at the
+        greenkey whose jitcounter hash is 'key'."""
+        looptoken.jitcounter_key = key
+        if key in self.evicted_keys:
+            del self.evicted_keys[key]
+            self.recompiled_loops += 1
+
+    def _remove_loop(self, looptoken):
+        del self.alive_loops[looptoken]
+        self.total_size -= looptoken.code_size
 
     def _kill_old_loops_now(self):
         debug_start("jit-mem-collect")
@@ -70,7 +136,7 @@ class MemoryManager(object):
         for looptoken in self.alive_loops.keys():
             if (0 <= looptoken.generation < max_generation or
                 looptoken.invalidated):
-                del self.alive_loops[looptoken]
+                self._remove_loop(looptoken)
         newtotal = len(self.alive_loops)
         debug_print("Loop tokens freed: ", oldtotal - newtotal)
         debug_print("Loop tokens left:  ", newtotal)
@@ -82,8 +148,42 @@ class MemoryManager(object):
             rgc.collect(); rgc.collect(); rgc.collect()
         debug_stop("jit-mem-collect")
 
+    def _evict_loops_now(self):
+        debug_start("jit-mem-evict")
+        debug_print("Current generation:", self.current_generation)
+        debug_print("Code size before:  ", self.total_size)
+        target_size = self.max_size - self.max_size // 4
+        # never evict the loops entered or compiled during the current
+        # or the previous generation
+        min_generation = self.current_generation - 1
+        looptokens = [looptoken for looptoken in self.alive_loops
+                      if 0 <= looptoken.generation < min_generation]
+        LoopTokenSort(looptokens).sort()
+        count = 0
+        for looptoken in looptokens:
+            if self.total_size <= target_size:
+                break
+            self._remove_loop(looptoken)
+            if looptoken.jitcounter_key != 0 and not looptoken.invalidated:
+                if len(self.evicted_keys) >= MAX_EVICTED_KEYS:
+                    self.evicted_keys.clear()
+                self.evicted_keys[looptoken.jitcounter_key] = None
+            count += 1
+        self.evict_check_size = self.total_size + self.max_size // 8
+        self.next_evict_check = self.current_generation + EVICT_RETRY
+        self.evicted_loops += count
+        debug_print("Loop tokens evicted:", count)
+        debug_print("Code size after:   ", self.total_size)
+        if not we_are_translated() and count > 0:
+            looptoken = None
+            looptokens = None
+            from rpython.rlib import rgc
+            rgc.collect(); rgc.collect(); rgc.collect()
+        debug_stop("jit-mem-evict")
+
     def release_all_loops(self):
         debug_start("jit-mem-releaseall")
         debug_print("Loop tokens cleared:", len(self.alive_loops))
         self.alive_loops.clear()
+        self.total_size = 0
         debug_stop("jit-mem-releaseall")
@@ -25,6 +25,10 @@ ALL_OPTS_DICT = dict.fromkeys([name for name, _ in ALL_OPTS])
 ALL_OPTS_LIST = [name for name, _ in ALL_OPTS]
 ALL_OPTS_NAMES = ':'.join([name for name, _ in ALL_OPTS])
 
+# the optimizations used by the baseline tier: the cheap ones, that only look
+# at one operation at a time and don't need unrolling to pay off
+BASELINE_OPTS = ['intbounds', 'rewrite', 'pure']
+
 assert ENABLE_ALL_OPTS == ALL_OPTS_NAMES, (
     'please fix rlib/jit.py to say ENABLE_ALL_OPTS = %r' % (ALL_OPTS_NAMES,))
 
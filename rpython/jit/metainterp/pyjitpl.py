@@ -1897,6 +1897,29 @@ class MetaInterpStaticData(object):
     def _freeze_(self):
         return True
 
+    def compile_deferred_loops(self, max_count):
+        """Compile the loops whose compilation was deferred, oldest first,
+        but at most 'max_count' of them if it is not negative.  Returns
+        the number of loops taken out of the queue."""
+        globaldata = self.globaldata
+        deferred_loops = globaldata.deferred_loops
+        count = 0
+        while (globaldata.deferred_head < len(deferred_loops) and
+               count != max_count):
+            i = globaldata.deferred_head
+            deferred_loop = deferred_loops[i]
+            deferred_loops[i] = None
+            globaldata.deferred_head = i + 1
+            deferred_loop.compile()
+            count += 1
+        # drop the compiled entries from the front of the list, but
+        # only when it is cheap compared to the calls already done
+        head = globaldata.deferred_head
+        if head > 0 and head * 2 >= len(deferred_loops):
+            del deferred_loops[:head]
+            globaldata.deferred_head = 0
+        return count
+
     def setup_insns(self, insns):
         self.opcode_names = ['?'] * len(insns)
         self.opcode_implementations = [None] * len(insns)
@@ -1948,6 +1971,9 @@ class MetaInterpStaticData(object):
         #
         self.cpu.propagate_exception_descr = exc_descr
         #
+        self.tier_up_counter_descr = self.cpu.arraydescrof(
+            compile.TIER_UP_COUNTER)
+        #
         self.globaldata = MetaInterpGlobalData(self)
 
     def finish_setup_descrs(self):
@@ -2037,6 +2063,26 @@ class MetaInterpGlobalData(object):
         self.initialized = False
         self.indirectcall_dict = None
         self.addr2name = None
+        self.deferred_loops = []    # see MetaInterp.defer_compile_loop()
+        self.deferred_head = 0      # index of the oldest one not compiled
+
+    def num_deferred_loops(self):
+        return len(self.deferred_loops) - self.deferred_head
+
+class DeferredLoop(object):
+    """A loop traced from the interpreter, waiting to be compiled."""
+
+    def __init__(self, metainterp, original_boxes, live_arg_boxes, start,
+                 use_unroll):
+        self.metainterp = metainterp
+        self.original_boxes = original_boxes
+        self.live_arg_boxes = live_arg_boxes
+        self.start = start
+        self.use_unroll = use_unroll
+
+    def compile(self):
+        self.metainterp.compile_deferred_loop(self.original_boxes,
+            self.live_arg_boxes, self.start, self.use_unroll)
 
 # ____________________________________________________________
 
@@ -2046,6 +2092,8 @@ class MetaInterp(object):
     exported_state = None
     last_exc_box = None
     _last_op = None
+    baseline = False       # tracing for the baseline tier, set by warmstate
+    baseline_info = None
 
     def __init__(self, staticdata, jitdriver_sd):
         self.staticdata = staticdata
@@ -2486,6 +2534,11 @@ class MetaInterp(object):
         self.current_merge_points = [(original_boxes, (0, 0, 0))]
         num_green_args = self.jitdriver_sd.num_green_args
         original_greenkey = original_boxes[:num_green_args]
+        hooks = self.staticdata.warmrunnerdesc.hooks
+        if hooks.are_hooks_enabled():
+            jd_sd = self.jitdriver_sd
+            hooks.on_trace_start(jd_sd.jitdriver, original_greenkey,
+                jd_sd.warmstate.get_location_str(original_greenkey))
         self.resumekey = compile.ResumeFromInterpDescr(original_greenkey)
         self.seen_loop_header_for_jdindex = -1
         try:
@@ -2535,7 +2588,12 @@ class MetaInterp(object):
         # a stack of blackhole interpreters filled with the same values, and
         # run it.
         from rpython.jit.metainterp.blackhole import convert_and_run_from_pyjitpl
-        self.aborted_tracing(stb.reason)
+        if stb.reason == Counters.DEFERRED_LOOPS:
+            # not an abort: the loop will be compiled later
+            self.staticdata.profiler.count(stb.reason)
+            debug_print('~~~ DEFERRING COMPILATION')
+        else:
+            self.aborted_tracing(stb.reason)
         convert_and_run_from_pyjitpl(self, stb.raising_exception)
         assert False    # ^^^ must raise
 
@@ -2600,7 +2658,8 @@ class MetaInterp(object):
         # we end now.
 
         can_use_unroll = (self.staticdata.cpu.supports_guard_gc_type and
-            'unroll' in self.jitdriver_sd.warmstate.enable_opts)
+            'unroll' in self.jitdriver_sd.warmstate.enable_opts and
+            not self.baseline)
         for j in range(len(self.current_merge_points)-1, -1, -1):
             original_boxes, start = self.current_merge_points[j]
             assert len(original_boxes) == len(live_arg_boxes)
@@ -2611,6 +2670,8 @@ class MetaInterp(object):
                     raise SwitchToBlackhole(Counters.ABORT_BAD_LOOP) # For now
             # Found!  Compile it as a loop.
             # raises in case it works -- which is the common case
+            if self.baseline:
+                self.record_tier_up_counter(original_boxes)
             self.history.trace.tracing_done()
             if self.partial_trace:
                 target_token = self.compile_retrace(
@@ -2622,6 +2683,9 @@ class MetaInterp(object):
                     self.staticdata.log('cancelled too many times!')
                     raise SwitchToBlackhole(Counters.ABORT_BAD_LOOP)
             else:
+                if self.cancel_count == 0 and self.can_defer_compile_loop():
+                    self.defer_compile_loop(original_boxes, live_arg_boxes,
+                                            start, can_use_unroll)
                 target_token = self.compile_loop(
                     original_boxes, live_arg_boxes, start,
                     use_unroll=can_use_unroll)
@@ -2755,7 +2819,38 @@ class MetaInterp(object):
         cell = JitCell.get_jit_cell_at_key(greenkey)
         if cell is None:
             return None
-        return cell.get_procedure_token()
+        token = cell.get_procedure_token()
+        if token is not None and token.baseline_info is not None:
+            # compiled by the baseline tier: don't jump there, because
+            # it is going to be replaced
+            return None
+        return token
+
+    def new_baseline_info(self, greenkey):
+        warmstate = self.jitdriver_sd.warmstate
+        cell = warmstate.JitCell.ensure_jit_cell_at_key(greenkey)
+        return compile.BaselineInfo(cell, warmstate.tier_up_threshold)
+
+    def record_tier_up_counter(self, original_boxes):
+        """Record at the end of a loop traced for the baseline tier the
+        operations that increment the counter of the loop, and a guard
+        that fails when it reaches the limit; see
+        AbstractResumeGuardDescr.tier_up_loop()."""
+        num_green_args = self.jitdriver_sd.num_green_args
+        info = self.new_baseline_info(original_boxes[:num_green_args])
+        self.baseline_info = info
+        descr = self.staticdata.tier_up_counter_descr
+        arraybox = ConstPtr(lltype.cast_opaque_ptr(llmemory.GCREF,
+                                                   info.counter))
+        countbox = self.execute_and_record(rop.GETARRAYITEM_GC_I, descr,
+                                           arraybox, ConstInt(0))
+        countbox = self.execute_and_record(rop.INT_ADD, None,
+                                           countbox, ConstInt(1))
+        self.execute_and_record(rop.SETARRAYITEM_GC, descr,
+                                arraybox, ConstInt(0), countbox)
+        condbox = self.execute_and_record(rop.INT_LT, None,
+                                          countbox, ConstInt(info.limit))
+        self.generate_guard(rop.GUARD_TRUE, condbox)
 
     def compile_loop(self, original_boxes, live_arg_boxes, start, use_unroll):
         num_green_args = self.jitdriver_sd.num_green_args
@@ -2770,12 +2865,62 @@ class MetaInterp(object):
             live_arg_boxes[num_green_args:], use_unroll=use_unroll)
         if target_token is not None:
             assert isinstance(target_token, TargetToken)
+            if self.baseline:
+                assert self.baseline_info is not None
+                target_token.targeting_jitcell_token.baseline_info = (
+                    self.baseline_info)
             self.jitdriver_sd.warmstate.attach_procedure_to_interp(
                 greenkey, target_token.targeting_jitcell_token)
             self.staticdata.stats.add_jitcell_token(
                 target_token.targeting_jitcell_token)
         return target_token
 
+    def can_defer_compile_loop(self):
+        limit = self.jitdriver_sd.warmstate.deferred_compile
+        return (limit > 0 and
+                isinstance(self.resumekey, compile.ResumeFromInterpDescr) and
+                self.staticdata.globaldata.num_deferred_loops() < limit)
+
+    def defer_compile_loop(self, original_boxes, live_arg_boxes, start,
+                           use_unroll):
+        """Queue the loop that was just traced, instead of compiling it now,
+        and continue in the blackhole interpreter.  The loop is optimized
+        and compiled by MetaInterpStaticData.compile_deferred_loops(), which
+        the interpreter calls at a more convenient time with
+        jit_hooks.stats_compile_deferred_loops().  This MetaInterp stays
+        alive until then, for its history."""
+        num_green_args = self.jitdriver_sd.num_green_args
+        greenkey = original_boxes[:num_green_args]
+        self.jitdriver_sd.warmstate.set_compile_pending(greenkey, True)
+        self.staticdata.globaldata.deferred_loops.append(
+            DeferredLoop(self, original_boxes, live_arg_boxes, start,
+                         use_unroll))
+        raise SwitchToBlackhole(Counters.DEFERRED_LOOPS)
+
+    def compile_deferred_loop(self, original_boxes, live_arg_boxes, start,
+                              use_unroll):
+        num_green_args = self.jitdriver_sd.num_green_args
+        greenkey = original_boxes[:num_green_args]
+        debug_start('jit-tracing')
+        try:
+            try:
+                target_token = self.compile_loop(
+                    original_boxes, live_arg_boxes, start, use_unroll)
+                if target_token is None and use_unroll:
+                    # like reached_loop_header(), try one last time
+                    # without unrolling
+                    target_token = self.compile_loop(
+                        original_boxes, live_arg_boxes, start,
+                        use_unroll=False)
+                if target_token is None:
+                    self.staticdata.log('deferred compilation cancelled')
+            except SwitchToBlackhole as stb:
+                # we already have a token now
+                self.staticdata.profiler.count(stb.reason)
+        finally:
+            self.jitdriver_sd.warmstate.set_compile_pending(greenkey, False)
+            debug_stop('jit-tracing')
+
     def compile_retrace(self, original_boxes, live_arg_boxes, start):
         num_green_args = self.jitdriver_sd.num_green_args
         greenkey = original_boxes[:num_green_args]
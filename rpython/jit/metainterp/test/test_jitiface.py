@@ -1,6 +1,7 @@
 
 import py
 from rpython.rlib.jit import JitDriver, JitHookInterface, Counters, dont_look_inside
+from rpython.rlib.jit import set_param
 from rpython.rlib import jit_hooks
 from rpython.jit.metainterp.test.support import LLJitMixin
 from rpython.jit.codewriter.policy import JitPolicy
@@ -202,6 +203,48 @@ class JitHookInterfaceTests(object):
         self.meta_interp(main, [5])
         self.check_jitcell_token_count(2)
 
+    def test_trace_asap(self):
+        driver = JitDriver(greens = ['s'], reds = ['i'], name='jit')
+
+        def loop(i, s):
+            while i > 0:
+                driver.jit_merge_point(i=i, s=s)
+                i -= 1
+
+        def main(s):
+            set_param(driver, 'threshold', 100)
+            loop(3, s)
+            assert not jit_hooks.get_jitcell_at_key("jit", s)
+            jit_hooks.trace_asap("jit", s)
+            assert jit_hooks.get_jitcell_at_key("jit", s)
+            loop(3, s)
+
+        self.meta_interp(main, [5])
+        self.check_jitcell_token_count(1)
+
+    def test_on_trace_start(self):
+        started = []
+
+        class MyJitIface(JitHookInterface):
+            def on_trace_start(self, jitdriver, greenkey, greenkey_repr):
+                assert jitdriver is driver
+                started.append((greenkey[0].getint(), greenkey_repr))
+
+        driver = JitDriver(greens = ['s'], reds = ['i'], name='jit',
+                           get_printable_location=lambda s: 'loop %d' % s)
+
+        def loop(i, s):
+            while i > 0:
+                driver.jit_merge_point(i=i, s=s)
+                i -= 1
+
+        def main(s):
+            loop(10, s)
+            loop(10, s + 1)
+
+        self.meta_interp(main, [5], policy=JitPolicy(MyJitIface()))
+        assert started == [(5, 'loop 5'), (6, 'loop 6')]
+
     def test_dont_trace_here(self):
         driver = JitDriver(greens = ['s'], reds = ['i', 'k'], name='jit')
 
@@ -349,6 +392,104 @@ class JitHookInterfaceTests(object):
                                no_stats_history=True)
         assert res == 42
 
+    def test_memmgr_code_size(self):
+        driver = JitDriver(greens = [], reds = ['i'])
+        def loop(i):
+            while i > 0:
+                driver.jit_merge_point(i=i)
+                i -= 1
+        def main():
+            if jit_hooks.stats_memmgr_code_size(None) != 0:
+                return 500
+            loop(30)
+            if jit_hooks.stats_memmgr_code_size(None) <= 0:
+                return 1000
+            if jit_hooks.stats_memmgr_evicted_loops(None) != 0:
+                return 1500
+            if jit_hooks.stats_memmgr_recompiled_loops(None) != 0:
+                return 2000
+            jit_hooks.stats_memmgr_release_all(None)
+            if jit_hooks.stats_memmgr_code_size(None) != 0:
+                return 2500
+            return 42
+
+        res = self.meta_interp(main, [], ProfilerClass=Profiler,
+                               no_stats_history=True)
+        assert res == 42
+
+    def test_deferred_compile(self):
+        driver = JitDriver(greens = [], reds = ['i', 'total'])
+        def loop(i):
+            total = 0
+            while i > 0:
+                driver.jit_merge_point(i=i, total=total)
+                total += i
+                i -= 1
+            return total
+        def counter(no):
+            return jit_hooks.stats_get_counter_value(None, no)
+        def main():
+            set_param(driver, 'deferred_compile', 10)
+            if loop(30) != 465:
+                return 500
+            if counter(Counters.TOTAL_COMPILED_LOOPS) != 0:
+                return 1000
+            # not traced again while the loop waits to be compiled
+            if loop(30) != 465:
+                return 1500
+            if counter(Counters.DEFERRED_LOOPS) != 1:
+                return 2000 + counter(Counters.DEFERRED_LOOPS)
+            if jit_hooks.stats_compile_deferred_loops(None, -1) != 1:
+                return 2500
+            if counter(Counters.TOTAL_COMPILED_LOOPS) != 1:
+                return 3000
+            if jit_hooks.stats_compile_deferred_loops(None, -1) != 0:
+                return 3500
+            if loop(30) != 465:
+                return 4000
+            if counter(Counters.TOTAL_COMPILED_LOOPS) != 1:
+                return 4500
+            return 42
+
+        res = self.meta_interp(main, [], ProfilerClass=Profiler,
+                               no_stats_history=True)
+        assert res == 42
+        self.check_jitcell_token_count(1)
+
+
+    def test_deferred_compile_one_at_a_time(self):
+        driver = JitDriver(greens = ['k'], reds = ['i', 'total'])
+        def loop(k, i):
+            total = 0
+            while i > 0:
+                driver.jit_merge_point(k=k, i=i, total=total)
+                total += i * k
+                i -= 1
+            return total
+        def counter(no):
+            return jit_hooks.stats_get_counter_value(None, no)
+        def main():
+            set_param(driver, 'deferred_compile', 10)
+            for k in range(1, 4):
+                if loop(k, 30) != 465 * k:
+                    return 500
+            for k in range(1, 4):
+                if jit_hooks.stats_compile_deferred_loops(None, 1) != 1:
+                    return 1000 + k
+                if counter(Counters.TOTAL_COMPILED_LOOPS) != k:
+                    return 1500 + k
+            if jit_hooks.stats_compile_deferred_loops(None, 1) != 0:
+                return 2000
+            if loop(4, 30) != 465 * 4:
+                return 2500
+            if jit_hooks.stats_compile_deferred_loops(None, -1) != 1:
+                return 3000
+            return 42
+
+        res = self.meta_interp(main, [], ProfilerClass=Profiler,
+                               no_stats_history=True)
+        assert res == 42
+
 
 class LLJitHookInterfaceTests(JitHookInterfaceTests):
     # use this for any backend, instead of the super class
@@ -11,16 +11,20 @@ if len(sys.argv) >= 4 and sys.argv[1] == '--sub':
     rpython.conftest.option.__dict__.update(eval(sys.argv[3]))
 
 import py
-from rpython.jit.metainterp.memmgr import MemoryManager
+from rpython.jit.metainterp.memmgr import (MemoryManager, EVICT_RETRY,
+    MAX_EVICTED_KEYS)
 from rpython.jit.metainterp.test.support import LLJitMixin
 from rpython.rlib.jit import JitDriver, dont_look_inside
 from rpython.jit.metainterp.warmspot import get_stats
+from rpython.jit.metainterp import pyjitpl
 from rpython.jit.metainterp.warmstate import BaseJitCell
 from rpython.rlib import rgc
 
 class FakeLoopToken:
     generation = 0
     invalidated = False
+    code_size = 0
+    jitcounter_key = 0
 
 
 class _TestMemoryManager:
@@ -78,6 +82,111 @@ class _TestMemoryManager:
             else:
                 assert tokens[i] in memmgr.alive_loops
 
+    def test_code_budget(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_size(1000)
+        tokens = [FakeLoopToken() for i in range(10)]
+        for i in range(len(tokens)):
+            memmgr.add_code_size(tokens[i], 300)
+            memmgr.keep_loop_alive(tokens[i])
+            memmgr.loop_attached(tokens[i], 100 + i)
+            memmgr.keep_loop_alive(tokens[0])
+            memmgr.next_generation()
+            assert memmgr.total_size <= 1000
+            assert memmgr.total_size == 300 * len(memmgr.alive_loops)
+        # tokens[0] is entered at every generation and stays alive
+        assert memmgr.alive_loops == dict.fromkeys([tokens[0], tokens[9]])
+        assert memmgr.evicted_loops == 8
+        assert memmgr.recompiled_loops == 0
+        # a bridge is compiled for a loop
+        memmgr.add_code_size(tokens[9], 200)
+        assert memmgr.total_size == 800
+        memmgr.add_code_size(tokens[1], 200)
+        assert memmgr.total_size == 800
+        # an evicted loop is entered again
+        memmgr.keep_loop_alive(tokens[1])
+        assert memmgr.total_size == 1300
+        memmgr.keep_loop_alive(tokens[9])
+        memmgr.next_generation()
+        assert memmgr.alive_loops == dict.fromkeys([tokens[1], tokens[9]])
+        assert memmgr.total_size == 1000
+        # a new loop for the same greenkey as an evicted one
+        memmgr.loop_attached(FakeLoopToken(), 103)
+        memmgr.loop_attached(FakeLoopToken(), 103)
+        assert memmgr.recompiled_loops == 1
+        #
+        memmgr.release_all_loops()
+        assert memmgr.total_size == 0
+
+    def test_code_budget_invalidated_first(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_size(1000)
+        tokens = [FakeLoopToken() for i in range(4)]
+        for i in range(len(tokens)):
+            memmgr.add_code_size(tokens[i], 300)
+            memmgr.keep_loop_alive(tokens[i])
+            memmgr.loop_attached(tokens[i], 10 + i)
+            if i == 2:
+                tokens[i].invalidated = True
+            memmgr.next_generation()
+        assert memmgr.alive_loops == dict.fromkeys([tokens[1], tokens[3]])
+        assert memmgr.evicted_loops == 2
+        # an invalidated loop is not counted if it is compiled again
+        assert memmgr.evicted_keys == {10: None}
+        # the loops entered in the previous generation are not evicted,
+        # even if they are above the budget alone
+        memmgr.add_code_size(tokens[3], 2000)
+        memmgr.keep_loop_alive(tokens[3])
+        memmgr.next_generation()
+        assert memmgr.alive_loops == dict.fromkeys([tokens[3]])
+        assert memmgr.total_size == 2300
+
+
+    def test_code_budget_retry(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_size(1000)
+        passes = []
+        evict_loops_now = memmgr._evict_loops_now
+        def _evict_loops_now():
+            passes.append(memmgr.current_generation)
+            evict_loops_now()
+        memmgr._evict_loops_now = _evict_loops_now
+        # a loop that is above the budget alone, and entered all the time
+        token = FakeLoopToken()
+        memmgr.add_code_size(token, 2000)
+        for i in range(EVICT_RETRY + 10):
+            memmgr.keep_loop_alive(token)
+            memmgr.next_generation()
+        assert passes == [2, 2 + EVICT_RETRY]
+        # no new pass if the total grows by less than 1/8 of the budget
+        memmgr.add_code_size(token, 100)
+        memmgr.keep_loop_alive(token)
+        memmgr.next_generation()
+        assert len(passes) == 2
+        memmgr.add_code_size(token, 100)
+        memmgr.keep_loop_alive(token)
+        memmgr.next_generation()
+        assert len(passes) == 3
+        assert memmgr.alive_loops == {token: None}
+        assert memmgr.evicted_loops == 0
+
+    def test_evicted_keys_limit(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_size(1000)
+        for i in range(MAX_EVICTED_KEYS + 10):
+            token = FakeLoopToken()
+            memmgr.add_code_size(token, 600)
+            memmgr.keep_loop_alive(token)
+            memmgr.loop_attached(token, 10 + i)
+            memmgr.next_generation()
+            memmgr.next_generation()
+            assert len(memmgr.evicted_keys) <= MAX_EVICTED_KEYS
+        assert memmgr.evicted_loops == MAX_EVICTED_KEYS + 9
+
 
 class _TestIntegration(LLJitMixin):
     # See comments in TestMemoryManager.  To get temporarily the normal
@@ -212,6 +321,39 @@ class _TestIntegration(LLJitMixin):
         assert res == 42
         self.check_enter_count(2 + 10*4)
 
+    def test_code_budget(self):
+        myjitdriver = JitDriver(greens=['m'], reds=['n', 'total'])
+        def g(m):
+            n = 10
+            total = 0
+            while n > 0:
+                myjitdriver.can_enter_jit(n=n, m=m, total=total)
+                myjitdriver.jit_merge_point(n=n, m=m, total=total)
+                if n % 3 == m % 3:
+                    total += m
+                n = n - 1
+            return total
+        def f():
+            for i in range(3):
+                for m in range(20):
+                    g(m)
+            return 42
+
+        res = self.meta_interp(f, [])
+        assert res == 42
+        memmgr = pyjitpl._warmrunnerdesc.memory_manager
+        assert memmgr.evicted_loops == 0
+        assert memmgr.total_size > 1024
+        count = len(get_stats().jitcell_token_wrefs)
+        #
+        res = self.meta_interp(f, [], code_budget=1)
+        assert res == 42
+        memmgr = pyjitpl._warmrunnerdesc.memory_manager
+        assert memmgr.evicted_loops > 0
+        assert memmgr.recompiled_loops > 0
+        assert memmgr.total_size <= 1024
+        assert len(get_stats().jitcell_token_wrefs) > count
+
     def test_call_assembler_keep_alive(self):
         myjitdriver1 = JitDriver(greens=['m'], reds=['n'])
         myjitdriver2 = JitDriver(greens=['m'], reds=['n', 'rec'])
@@ -109,6 +109,35 @@ class TestLLWarmspot(LLJitMixin):
         assert res == 0
         self.check_resops(new_with_vtable=0)
 
+    def test_baseline_tier(self):
+        myjitdriver = JitDriver(greens = [], reds = ['n', 'x'])
+        class A(object):
+            def __init__(self, n):
+                self.n = n
+
+        def f(n):
+            set_param(myjitdriver, 'baseline_threshold', 3)
+            set_param(myjitdriver, 'threshold', 20)
+            x = 0
+            while n > 0:
+                myjitdriver.can_enter_jit(n=n, x=x)
+                myjitdriver.jit_merge_point(n=n, x=x)
+                x += A(n).n
+                n -= 1
+            return x
+
+        res = self.meta_interp(f, [100])
+        assert res == 5050
+        # first a loop with few optimizations, which still allocates the
+        # A and counts its iterations, then the fully optimized one
+        loops = get_stats().get_all_loops()
+        assert len(loops) == 2
+        ops = [[op.getopname() for op in loop.operations] for loop in loops]
+        assert 'new_with_vtable' in ops[0]
+        assert 'setarrayitem_gc' in ops[0]
+        assert 'new_with_vtable' not in ops[1]
+        assert 'setarrayitem_gc' not in ops[1]
+
     def test_unwanted_loops(self):
         mydriver = JitDriver(reds = ['n', 'total', 'm'], greens = [])
 
@@ -638,6 +667,7 @@ class TestWarmspotDirect(object):
             fielddescrof = nodescr
             calldescrof  = nodescr
             sizeof       = nodescr
+            arraydescrof = nodescr
 
             def get_fail_descr_from_number(self, no):
                 return FakeFailDescr(no)
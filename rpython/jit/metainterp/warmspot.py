@@ -88,7 +88,8 @@ def ll_meta_interp(function, args, backendopt=False,
 
 def jittify_and_run(interp, graph, args, repeat=1, graph_and_interp_only=False,
                     backendopt=False, trace_limit=sys.maxint, inline=False,
-                    loop_longevity=0, retrace_limit=5, function_threshold=4,
+                    loop_longevity=0, code_budget=0, retrace_limit=5,
+                    function_threshold=4,
                     disable_unrolling=sys.maxint,
                     enable_opts=ALL_OPTS_NAMES, max_retrace_guards=15,
                     max_unroll_recursion=7, vec=0, vec_all=0, vec_cost=0,
@@ -111,6 +112,7 @@ def jittify_and_run(interp, graph, args, repeat=1, graph_and_interp_only=False,
         jd.warmstate.set_param_trace_limit(trace_limit)
         jd.warmstate.set_param_inlining(inline)
         jd.warmstate.set_param_loop_longevity(loop_longevity)
+        jd.warmstate.set_param_code_budget(code_budget)
         jd.warmstate.set_param_retrace_limit(retrace_limit)
         jd.warmstate.set_param_max_retrace_guards(max_retrace_guards)
         jd.warmstate.set_param_enable_opts(enable_opts)
@@ -208,7 +210,7 @@ def reset_stats():
 def reset_jit():
     """Helper for some tests (see micronumpy/test/test_zjit.py)"""
     reset_stats()
-    pyjitpl._warmrunnerdesc.memory_manager.alive_loops.clear()
+    pyjitpl._warmrunnerdesc.memory_manager.release_all_loops()
     pyjitpl._warmrunnerdesc.jitcounter._clear_all()
 
 def get_translator():
@@ -695,7 +697,8 @@ class WarmRunnerDesc(object):
                 jitdrivers_by_name[name] = jd
         m = _find_jit_markers(self.translator.graphs,
                               ('get_jitcell_at_key', 'trace_next_iteration',
-                               'dont_trace_here', 'trace_next_iteration_hash'))
+                               'dont_trace_here', 'trace_next_iteration_hash',
+                               'trace_asap'))
         accessors = {}
 
         def get_accessor(name, jitdriver_name, function, ARGS, green_arg_spec):
@@ -749,6 +752,8 @@ class WarmRunnerDesc(object):
                 func = JitCell.dont_trace_here
             elif op.args[0].value == 'trace_next_iteration_hash':
                 func = JitCell.trace_next_iteration_hash
+            elif op.args[0].value == 'trace_asap':
+                func = JitCell.trace_asap
             else:
                 func = JitCell._trace_next_iteration
             argspec = jitdrivers_by_name[jitdriver_name]._green_args_spec
@@ -137,6 +137,8 @@ JC_TRACING         = 0x01
 JC_DONT_TRACE_HERE = 0x02
 JC_TEMPORARY       = 0x04
 JC_TRACING_OCCURRED= 0x08
+JC_TRACE_ASAP      = 0x10
+JC_COMPILE_PENDING = 0x20
 
 class BaseJitCell(object):
     """Subclasses of BaseJitCell are used in tandem with the single
@@ -183,6 +185,18 @@ class BaseJitCell(object):
         this particular function.  (We only set this flag when aborting
         due to a trace too long, so we use the same flag as a hint to
         also mean "please trace from here as soon as possible".)
+
+        JC_TRACE_ASAP: start tracing the next time we reach this greenkey,
+        without counting.  Set with jit_hooks.trace_asap(), typically for
+        greenkeys that we know got compiled in a previous run of the same
+        program.  Cleared when tracing starts, so if it is aborted we are
+        back to counting normally.  Also set by request_tier_up(), to
+        replace a procedure_token compiled by the baseline tier.
+
+        JC_COMPILE_PENDING: a loop was traced from this greenkey, but its
+        compilation was deferred (see the 'deferred_compile' parameter).
+        We don't trace from here again until the loop is compiled by
+        jit_hooks.stats_compile_deferred_loops(), or its compilation failed.
     """
     flags = 0     # JC_xxx flags
     wref_procedure_token = None
@@ -214,6 +228,10 @@ class BaseJitCell(object):
             return False    # don't remove JitCells with a procedure_token
         if self.flags & JC_TRACING:
             return False    # don't remove JitCells that are being traced
+        if self.flags & JC_TRACE_ASAP:
+            return False    # don't forget that we should trace from here
+        if self.flags & JC_COMPILE_PENDING:
+            return False    # the loop from here is waiting to be compiled
         if self.flags & JC_DONT_TRACE_HERE:
             # if we have this flag, and we *had* a procedure_token but
             # we no longer have one, then remove me.  this prevents this
@@ -221,6 +239,13 @@ class BaseJitCell(object):
             return self.has_seen_a_procedure_token()     # i.e. dead weakref
         return True   # Other JitCells can be removed.
 
+    def request_tier_up(self, token):
+        """Called when 'token', compiled by the baseline tier (see the
+        'baseline_threshold' parameter), should be replaced by a fully
+        optimized version: trace again from here the next time."""
+        if self.get_procedure_token() is token:
+            self.flags |= JC_TRACE_ASAP
+
 # ____________________________________________________________
 
 
@@ -248,6 +273,9 @@ class WarmEnterState(object):
 
     def set_param_threshold(self, threshold):
         self.increment_threshold = self._compute_threshold(threshold)
+        # how many iterations a loop of the baseline tier runs before we
+        # trace it again; at least 2, see MetaInterp.record_tier_up_counter()
+        self.tier_up_threshold = max(threshold, 2)
 
     def set_param_function_threshold(self, threshold):
         self.increment_function_threshold = self._compute_threshold(threshold)
@@ -268,7 +296,8 @@ class WarmEnterState(object):
         self.disable_unrolling_threshold = value
 
     def set_param_enable_opts(self, value):
-        from rpython.jit.metainterp.optimizeopt import ALL_OPTS_DICT, ALL_OPTS_NAMES
+        from rpython.jit.metainterp.optimizeopt import (ALL_OPTS_DICT,
+            ALL_OPTS_NAMES, BASELINE_OPTS)
 
         d = {}
         if NonConstant(False):
@@ -281,6 +310,12 @@ class WarmEnterState(object):
                     raise ValueError('Unknown optimization ' + name)
                 d[name] = None
         self.enable_opts = d
+        # the cheap optimizations used by the baseline tier
+        b = {}
+        for name in BASELINE_OPTS:
+            if name in d:
+                b[name] = None
+        self.baseline_enable_opts = b
 
     def set_param_loop_longevity(self, value):
         # note: it's a global parameter, not a per-jitdriver one
@@ -288,6 +323,12 @@ class WarmEnterState(object):
             self.warmrunnerdesc.memory_manager is not None):   # all for tests
             self.warmrunnerdesc.memory_manager.set_max_age(value)
 
+    def set_param_code_budget(self, value):
+        # note: it's a global parameter, not a per-jitdriver one
+        if (self.warmrunnerdesc is not None and
+            self.warmrunnerdesc.memory_manager is not None):   # all for tests
+            self.warmrunnerdesc.memory_manager.set_max_size(value * 1024)
+
     def set_param_retrace_limit(self, value):
         if self.warmrunnerdesc:
             if self.warmrunnerdesc.memory_manager:
@@ -308,6 +349,13 @@ class WarmEnterState(object):
             if self.warmrunnerdesc.memory_manager:
                 self.warmrunnerdesc.memory_manager.max_unroll_recursion = value
 
+    def set_param_deferred_compile(self, value):
+        self.deferred_compile = value
+
+    def set_param_baseline_threshold(self, value):
+        self.baseline_threshold = value
+        self.increment_baseline_threshold = self._compute_threshold(value)
+
     def set_param_vec(self, ivalue):
         self.vec = bool(ivalue)
 
@@ -325,10 +373,21 @@ class WarmEnterState(object):
         debug_print("disabled inlining", loc)
         debug_stop("jit-disableinlining")
 
+    def set_compile_pending(self, greenkey, pending):
+        cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
+        if pending:
+            cell.flags |= JC_COMPILE_PENDING
+        else:
+            cell.flags &= ~JC_COMPILE_PENDING
+
     def attach_procedure_to_interp(self, greenkey, procedure_token):
         cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
         old_token = cell.get_procedure_token()
         cell.set_procedure_token(procedure_token)
+        if (self.warmrunnerdesc is not None and
+            self.warmrunnerdesc.memory_manager is not None):   # for tests
+            self.warmrunnerdesc.memory_manager.loop_attached(
+                procedure_token, self.JitCell.get_uhash_at_key(greenkey))
         if old_token is not None:
             self.cpu.redirect_call_assembler(old_token, procedure_token)
             # procedure_token is also kept alive by any loop that used
@@ -411,7 +470,7 @@ class WarmEnterState(object):
             fail_descr.handle_fail(deadframe, metainterp_sd, jitdriver_sd)
             assert 0, "should have raised"
 
-        def bound_reached(hash, cell, *args):
+        def bound_reached(hash, cell, baseline, *args):
             if not confirm_enter_jit(*args):
                 return
             jitcounter.decay_all_counters()
@@ -420,11 +479,13 @@ class WarmEnterState(object):
             # start tracing
             from rpython.jit.metainterp.pyjitpl import MetaInterp
             metainterp = MetaInterp(metainterp_sd, jitdriver_sd)
+            metainterp.baseline = baseline
             greenargs = args[:num_green_args]
             if cell is None:
                 cell = JitCell(*greenargs)
                 jitcounter.install_new_cell(hash, cell)
             cell.flags |= JC_TRACING | JC_TRACING_OCCURRED
+            cell.flags &= ~JC_TRACE_ASAP
             try:
                 metainterp.compile_and_run_once(jitdriver_sd, *args)
             finally:
@@ -448,9 +509,13 @@ class WarmEnterState(object):
                     break    # found
                 cell = cell.next
             else:
-                # not found. increment the counter
-                if jitcounter.tick(hash, increment_threshold):
-                    bound_reached(hash, None, *args)
+                # not found. increment the counter, with the threshold of
+                # the baseline tier if it is enabled
+                if self.baseline_threshold > 0:
+                    if jitcounter.tick(hash, self.increment_baseline_threshold):
+                        bound_reached(hash, None, True, *args)
+                elif jitcounter.tick(hash, increment_threshold):
+                    bound_reached(hash, None, False, *args)
                 return
 
             # Here, we have found 'cell'.
@@ -460,13 +525,26 @@ class WarmEnterState(object):
                     # tracing already happening in some outer invocation of
                     # this function. don't trace a second time.
                     return
-                # attached by compile_tmp_callback().  count normally
-                if jitcounter.tick(hash, increment_threshold):
-                    bound_reached(hash, cell, *args)
+                if cell.flags & JC_COMPILE_PENDING:
+                    return    # the loop traced from here is not compiled yet
+                # attached by compile_tmp_callback().  count normally,
+                # unless JC_TRACE_ASAP is set
+                if cell.flags & JC_TRACE_ASAP:
+                    bound_reached(hash, cell, False, *args)
+                elif self.baseline_threshold > 0:
+                    if jitcounter.tick(hash, self.increment_baseline_threshold):
+                        bound_reached(hash, cell, True, *args)
+                elif jitcounter.tick(hash, increment_threshold):
+                    bound_reached(hash, cell, False, *args)
                 return
             # machine code was already compiled for these greenargs
             procedure_token = cell.get_procedure_token()
             if procedure_token is None:
+                if cell.flags & JC_COMPILE_PENDING:
+                    return    # the loop traced from here is not compiled yet
+                if cell.flags & JC_TRACE_ASAP:
+                    bound_reached(hash, cell, False, *args)
+                    return
                 if cell.flags & JC_DONT_TRACE_HERE:
                     if not cell.has_seen_a_procedure_token():
                         # A JC_DONT_TRACE_HERE, i.e. a non-inlinable function.
@@ -477,12 +555,20 @@ class WarmEnterState(object):
                         else:
                             tick = True
                         if tick:
-                            bound_reached(hash, cell, *args)
+                            bound_reached(hash, cell, False, *args)
                         return
                 # it was an aborted compilation, or maybe a weakref that
                 # has been freed
                 jitcounter.cleanup_chain(hash)
                 return
+            if procedure_token.baseline_info is not None:
+                # compiled by the baseline tier: trace again, with all the
+                # optimizations, after 'threshold' more entries or when
+                # the machine code asks for it (see request_tier_up())
+                if (cell.flags & JC_TRACE_ASAP or
+                        jitcounter.tick(hash, increment_threshold)):
+                    bound_reached(hash, cell, False, *args)
+                    return
             if not confirm_enter_jit(*args):
                 return
             # extract and unspecialize the red arguments to pass to
@@ -588,6 +674,11 @@ class WarmEnterState(object):
                     cell = cell.next
                 return None
 
+            @staticmethod
+            def get_uhash_at_key(greenkey):
+                greenargs = unwrap_greenkey(greenkey)
+                return JitCell.get_uhash(*greenargs)
+
             @staticmethod
             def get_jit_cell_at_key(greenkey):
                 greenargs = unwrap_greenkey(greenkey)
@@ -629,6 +720,12 @@ class WarmEnterState(object):
             def dont_trace_here(*greenargs):
                 cell = JitCell._ensure_jit_cell_at_key(*greenargs)
                 cell.flags |= JC_DONT_TRACE_HERE
+
+            @staticmethod
+            def trace_asap(*greenargs):
+                cell = JitCell._ensure_jit_cell_at_key(*greenargs)
+                if cell.get_procedure_token() is None:
+                    cell.flags |= JC_TRACE_ASAP
         #
         self.JitCell = JitCell
         return JitCell
@@ -0,0 +1,345 @@
+"""
+Support for sweeping the arenas of incminimark in a background thread
+(translation option --gc-concurrent-sweep).
+
+When the marking phase of a major collection is finished, the pages of the
+ArenaCollection that contain objects from before the collection are swept
+by a helper thread while the program continues to run.  Every page swept
+is handed back to the main thread through a small set of lists protected
+by a lock: the main thread takes them when it needs a new page for some
+size class, and in the sweeping steps of the major collection.  The pages
+that are still being swept are never used for allocation.
+
+The helper thread only writes to the header of live objects to remove
+GCFLAG_VISITED, and it does so with an atomic 'and'.  When this option is
+enabled, the few places where the main thread changes the flags of old
+objects use atomic operations too (see IncrementalMiniMarkGC._tid_or()
+and _tid_and(), and PYPY_GC_CS_XOR for the toggle_gcflag_extra operation),
+so that no update is lost.
+
+The helper thread is started the first time it is needed and then waits
+for the next major collection.  It stops at a page boundary around fork();
+in the child process, the sweep is finished by the main thread.  On
+Windows, or if the thread cannot be started, the sweep is done in the
+incremental steps as usual.
+
+When running untranslated (e.g. in test_direct.py), there is no thread:
+the background sweep progresses by one batch of pages every time the main
+thread waits for it, or when emulate_progress() is called.
+"""
+
+import sys
+import time
+
+from rpython.rtyper.lltypesystem import lltype, rffi
+from rpython.rlib.objectmodel import we_are_translated
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+
+# number of pages that the helper thread sweeps between two checks of its
+# termination condition
+BATCH_PAGES = 64
+
+WORKER_FUNC = lltype.Ptr(lltype.FuncType([], lltype.Void))
+
+
+class State(object):
+    """Holds the GC that uses the helper thread, for worker_entry()."""
+    def _cleanup_(self):
+        self.gc = None
+        self.running = False
+        self.duration = 0.0
+state = State()
+state._cleanup_()
+
+def worker_entry():
+    state.gc._cs_sweep_in_background()
+
+# ____________________________________________________________
+
+_c_source = r"""
+#ifndef _WIN32
+#include <pthread.h>
+#include <signal.h>
+#include <time.h>
+
+static pthread_mutex_t cs_mutex = PTHREAD_MUTEX_INITIALIZER;
+static pthread_cond_t cs_start = PTHREAD_COND_INITIALIZER;
+static pthread_cond_t cs_progress = PTHREAD_COND_INITIALIZER;
+static int cs_thread_started;
+static int cs_atfork_registered;
+static Signed cs_generation;     /* incremented by every pypy_gc_cs_start() */
+static Signed cs_thread_gen0;    /* cs_generation when the thread started */
+static int cs_running;           /* the thread is running cs_fn */
+static int cs_waiting;           /* number of threads in pypy_gc_cs_wait() */
+static int cs_pause;             /* fork() in progress */
+static int cs_paused;            /* the helper thread is paused for fork() */
+static void (*cs_fn)(void);
+static double cs_duration;
+
+static double cs_now(void)
+{
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
+}
+
+static void *cs_thread_main(void *arg)
+{
+    Signed seen;
+    pthread_mutex_lock(&cs_mutex);
+    seen = cs_thread_gen0;
+    while (1) {
+        void (*fn)(void);
+        double start;
+        while (cs_generation == seen)
+            pthread_cond_wait(&cs_start, &cs_mutex);
+        seen = cs_generation;
+        fn = cs_fn;
+        pthread_mutex_unlock(&cs_mutex);
+        start = cs_now();
+        fn();
+        pthread_mutex_lock(&cs_mutex);
+        cs_duration = cs_now() - start;
+        cs_running = 0;
+        pthread_cond_broadcast(&cs_progress);
+    }
+    return NULL;
+}
+
+static void cs_atfork_prepare(void)
+{
+    /* wait until the helper thread reaches a page boundary, and keep the
+       lock during fork() */
+    pthread_mutex_lock(&cs_mutex);
+    cs_pause = 1;
+    while (cs_running && !cs_paused)
+        pthread_cond_wait(&cs_progress, &cs_mutex);
+}
+
+static void cs_atfork_parent(void)
+{
+    cs_pause = 0;
+    pthread_cond_broadcast(&cs_progress);
+    pthread_mutex_unlock(&cs_mutex);
+}
+
+static void cs_atfork_child(void)
+{
+    /* the helper thread doesn't exist in the child process: the sweep,
+       if any, must be finished by the main thread */
+    pthread_mutex_init(&cs_mutex, NULL);
+    pthread_cond_init(&cs_start, NULL);
+    pthread_cond_init(&cs_progress, NULL);
+    cs_thread_started = 0;
+    cs_running = 0;
+    cs_waiting = 0;
+    cs_pause = 0;
+    cs_paused = 0;
+}
+
+RPY_EXTERN Signed pypy_gc_cs_start(void (*fn)(void))
+{
+    pthread_mutex_lock(&cs_mutex);
+    if (!cs_atfork_registered) {
+        pthread_atfork(cs_atfork_prepare, cs_atfork_parent, cs_atfork_child);
+        cs_atfork_registered = 1;
+    }
+    if (!cs_thread_started) {
+        sigset_t all, old;
+        pthread_t th;
+        pthread_attr_t attr;
+        int err;
+        cs_thread_gen0 = cs_generation;
+        /* the helper thread must never run signal handlers */
+        sigfillset(&all);
+        pthread_sigmask(SIG_BLOCK, &all, &old);
+        pthread_attr_init(&attr);
+        pthread_attr_setdetachstate(&attr, PTHREAD_CREATE_DETACHED);
+        err = pthread_create(&th, &attr, cs_thread_main, NULL);
+        pthread_attr_destroy(&attr);
+        pthread_sigmask(SIG_SETMASK, &old, NULL);
+        if (err != 0) {
+            pthread_mutex_unlock(&cs_mutex);
+            return 0;
+        }
+        cs_thread_started = 1;
+    }
+    cs_fn = fn;
+    cs_running = 1;
+    cs_duration = 0.0;
+    cs_generation++;
+    pthread_cond_signal(&cs_start);
+    pthread_mutex_unlock(&cs_mutex);
+    return 1;
+}
+
+RPY_EXTERN Signed pypy_gc_cs_is_running(void)
+{
+    Signed result;
+    pthread_mutex_lock(&cs_mutex);
+    result = cs_running;
+    pthread_mutex_unlock(&cs_mutex);
+    return result;
+}
+
+RPY_EXTERN double pypy_gc_cs_join(void)
+{
+    pthread_mutex_lock(&cs_mutex);
+    while (cs_running)
+        pthread_cond_wait(&cs_progress, &cs_mutex);
+    pthread_mutex_unlock(&cs_mutex);
+    return cs_duration;
+}
+
+RPY_EXTERN void pypy_gc_cs_lock(void)
+{
+    pthread_mutex_lock(&cs_mutex);
+}
+
+RPY_EXTERN void pypy_gc_cs_unlock(void)
+{
+    pthread_mutex_unlock(&cs_mutex);
+}
+
+RPY_EXTERN void pypy_gc_cs_signal(void)
+{
+    /* called with the lock held */
+    if (cs_waiting > 0)
+        pthread_cond_broadcast(&cs_progress);
+}
+
+RPY_EXTERN void pypy_gc_cs_wait(void)
+{
+    /* called with the lock held */
+    if (cs_running) {
+        cs_waiting++;
+        pthread_cond_wait(&cs_progress, &cs_mutex);
+        cs_waiting--;
+    }
+}
+
+RPY_EXTERN void pypy_gc_cs_checkpoint(void)
+{
+    /* called by the helper thread between two pages */
+    pthread_mutex_lock(&cs_mutex);
+    while (cs_pause) {
+        cs_paused = 1;
+        pthread_cond_broadcast(&cs_progress);
+        pthread_cond_wait(&cs_progress, &cs_mutex);
+    }
+    cs_paused = 0;
+    pthread_mutex_unlock(&cs_mutex);
+}
+
+RPY_EXTERN void pypy_gc_cs_tid_and(Signed *p, Signed value)
+{
+    __sync_fetch_and_and(p, value);
+}
+
+RPY_EXTERN void pypy_gc_cs_tid_or(Signed *p, Signed value)
+{
+    __sync_fetch_and_or(p, value);
+}
+
+#else   /* _WIN32: no helper thread */
+
+RPY_EXTERN Signed pypy_gc_cs_start(void (*fn)(void)) { return 0; }
+RPY_EXTERN Signed pypy_gc_cs_is_running(void) { return 0; }
+RPY_EXTERN double pypy_gc_cs_join(void) { return 0.0; }
+RPY_EXTERN void pypy_gc_cs_lock(void) { }
+RPY_EXTERN void pypy_gc_cs_unlock(void) { }
+RPY_EXTERN void pypy_gc_cs_signal(void) { }
+RPY_EXTERN void pypy_gc_cs_wait(void) { }
+RPY_EXTERN void pypy_gc_cs_checkpoint(void) { }
+RPY_EXTERN void pypy_gc_cs_tid_and(Signed *p, Signed value) { *p &= value; }
+RPY_EXTERN void pypy_gc_cs_tid_or(Signed *p, Signed value) { *p |= value; }
+#endif
+"""
+
+if sys.platform == 'win32':
+    _libraries = []
+else:
+    _libraries = ['pthread']
+
+eci = ExternalCompilationInfo(
+    post_include_bits=["""
+RPY_EXTERN Signed pypy_gc_cs_start(void (*)(void));
+RPY_EXTERN Signed pypy_gc_cs_is_running(void);
+RPY_EXTERN double pypy_gc_cs_join(void);
+RPY_EXTERN void pypy_gc_cs_lock(void);
+RPY_EXTERN void pypy_gc_cs_unlock(void);
+RPY_EXTERN void pypy_gc_cs_signal(void);
+RPY_EXTERN void pypy_gc_cs_wait(void);
+RPY_EXTERN void pypy_gc_cs_checkpoint(void);
+RPY_EXTERN void pypy_gc_cs_tid_and(Signed *, Signed);
+RPY_EXTERN void pypy_gc_cs_tid_or(Signed *, Signed);
+#ifndef _WIN32
+#  define PYPY_GC_CS_XOR(p, value)  __sync_fetch_and_xor(p, value)
+#else
+#  define PYPY_GC_CS_XOR(p, value)  (*(p) ^= (value))
+#endif
+"""],
+    separate_module_sources=[_c_source],
+    libraries=_libraries)
+
+# emulation without threads, for the tests
+
+def emulate_progress():
+    """Untranslated only: let the 'helper thread' sweep one batch of
+    pages, if it is running."""
+    if state.running:
+        start = time.time()
+        if state.gc._cs_sweep_batch():
+            state.running = False
+        state.duration += time.time() - start
+
+def _emulated_start(fn):
+    state.running = True
+    state.duration = 0.0
+    return 1
+
+def _emulated_is_running():
+    return int(state.running)
+
+def _emulated_join():
+    while state.running:
+        emulate_progress()
+    return state.duration
+
+def _emulated_nothing():
+    pass
+
+def _external(name, args, result, callable):
+    return rffi.llexternal(name, args, result, compilation_info=eci,
+                           _callable=callable, _nowrapper=True,
+                           sandboxsafe=True)
+
+start = _external('pypy_gc_cs_start', [WORKER_FUNC], lltype.Signed,
+                  _emulated_start)
+is_running = _external('pypy_gc_cs_is_running', [], lltype.Signed,
+                       _emulated_is_running)
+join = _external('pypy_gc_cs_join', [], lltype.Float, _emulated_join)
+lock = _external('pypy_gc_cs_lock', [], lltype.Void, _emulated_nothing)
+unlock = _external('pypy_gc_cs_unlock', [], lltype.Void, _emulated_nothing)
+signal = _external('pypy_gc_cs_signal', [], lltype.Void, _emulated_nothing)
+wait = _external('pypy_gc_cs_wait', [], lltype.Void, emulate_progress)
+checkpoint = _external('pypy_gc_cs_checkpoint', [], lltype.Void,
+                       _emulated_nothing)
+_tid_and = _external('pypy_gc_cs_tid_and', [rffi.SIGNEDP, lltype.Signed],
+                     lltype.Void, None)
+_tid_or = _external('pypy_gc_cs_tid_or', [rffi.SIGNEDP, lltype.Signed],
+                    lltype.Void, None)
+
+def tid_and(hdr, mask):
+    """Atomically do 'hdr.tid &= mask'."""
+    if we_are_translated():
+        _tid_and(rffi.cast(rffi.SIGNEDP, hdr), mask)
+    else:
+        hdr.tid &= mask
+
+def tid_or(hdr, flags):
+    """Atomically do 'hdr.tid |= flags'."""
+    if we_are_translated():
+        _tid_or(rffi.cast(rffi.SIGNEDP, hdr), flags)
+    else:
+        hdr.tid |= flags
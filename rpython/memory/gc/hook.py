@@ -26,7 +26,8 @@ class GcHooks(object):
         Called after a minor collection
         """
 
-    def on_gc_collect_step(self, duration, oldstate, newstate):
+    def on_gc_collect_step(self, duration, oldstate, newstate,
+                           duration_p50, duration_p90, duration_p99):
         """
         Called after each individual step of a major collection, in case the GC is
         incremental.
@@ -34,15 +35,23 @@ class GcHooks(object):
         ``oldstate`` and ``newstate`` are integers which indicate the GC
         state; for incminimark, see incminimark.STATE_* and
         incminimark.GC_STATES.
+
+        ``duration_p50``, ``duration_p90`` and ``duration_p99`` are the
+        percentiles of the durations of all the steps so far, including
+        this one.
         """
 
 
     def on_gc_collect(self, num_major_collects,
                       arenas_count_before, arenas_count_after,
                       arenas_bytes, rawmalloc_bytes_before,
-                      rawmalloc_bytes_after):
+                      rawmalloc_bytes_after, sweep_duration):
         """
         Called after a major collection is fully done
+
+        ``sweep_duration`` is the time spent sweeping the arenas, including
+        the time spent by the background thread if the GC was translated
+        with --gc-concurrent-sweep.
         """
 
     # the fire_* methods are meant to be called from the GC are should NOT be
@@ -54,17 +63,19 @@ class GcHooks(object):
             self.on_gc_minor(duration, total_memory_used, pinned_objects)
 
     @rgc.no_collect
-    def fire_gc_collect_step(self, duration, oldstate, newstate):
+    def fire_gc_collect_step(self, duration, oldstate, newstate,
+                             duration_p50, duration_p90, duration_p99):
         if self.is_gc_collect_step_enabled():
-            self.on_gc_collect_step(duration, oldstate, newstate)
+            self.on_gc_collect_step(duration, oldstate, newstate,
+                                    duration_p50, duration_p90, duration_p99)
 
     @rgc.no_collect
     def fire_gc_collect(self, num_major_collects,
                         arenas_count_before, arenas_count_after,
                         arenas_bytes, rawmalloc_bytes_before,
-                        rawmalloc_bytes_after):
+                        rawmalloc_bytes_after, sweep_duration):
         if self.is_gc_collect_enabled():
             self.on_gc_collect(num_major_collects,
                                arenas_count_before, arenas_count_after,
                                arenas_bytes, rawmalloc_bytes_before,
-                               rawmalloc_bytes_after)
+                               rawmalloc_bytes_after, sweep_duration)
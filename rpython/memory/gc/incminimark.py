@@ -52,6 +52,27 @@ Environment variables can be used to fine-tune the following parameters:
                          in time.  Defaults to a conservative value depending
                          on nursery size and maximum object size inside the
                          nursery.  Useful for debugging by setting it to 0.
+
+ PYPY_GC_MARK_THREADS    The number of threads that mark the heap during
+                         major collections, if translated with
+                         --gc-parallel-mark.  Defaults to the number of
+                         processors, but at most 8.  1 disables parallel
+                         marking.
+
+ PYPY_GC_CONCURRENT_SWEEP  If translated with --gc-concurrent-sweep, set
+                         to 0 to sweep the arenas in the incremental steps
+                         of the major collections instead of in a
+                         background thread.
+
+ PYPY_GC_MAX_PAUSE       Target duration of the steps of the major
+                         collections, in milliseconds (e.g. '2' or '0.5').
+                         The amount of work done in each step is then
+                         computed from the measured duration of the
+                         previous steps, instead of from the nursery size
+                         and PYPY_GC_INCREMENT_STEP.  This is a target, not
+                         a guarantee: a step can still be longer, e.g. at
+                         the end of the marking phase, or if the program
+                         allocates faster than the GC can keep up.
 """
 # XXX Should find a way to bound the major collection threshold by the
 # XXX total addressable size.  Maybe by keeping some minimarkpage arenas
@@ -67,13 +88,15 @@ from rpython.rtyper.lltypesystem import lltype, llmemory, llarena, llgroup
 from rpython.rtyper.lltypesystem.lloperation import llop
 from rpython.rtyper.lltypesystem.llmemory import raw_malloc_usage
 from rpython.memory.gc.base import GCBase, MovingGCBase
-from rpython.memory.gc import env
+from rpython.memory.gc import env, parallelmark, concurrentsweep
+from rpython.memory.gc import pausestats
 from rpython.memory.support import mangle_hash
 from rpython.rlib.rarithmetic import ovfcheck, LONG_BIT, intmask, r_uint
 from rpython.rlib.rarithmetic import LONG_BIT_SHIFT
 from rpython.rlib.debug import ll_assert, debug_print, debug_start, debug_stop
 from rpython.rlib.objectmodel import specialize
 from rpython.rlib import rgc
+from rpython.rtyper.annlowlevel import llhelper
 from rpython.memory.gc.minimarkpage import out_of_memory
 
 #
@@ -188,6 +211,12 @@ STATE_FINALIZING = 3
 
 GC_STATES = ['SCANNING', 'MARKING', 'SWEEPING', 'FINALIZING']
 
+# With PYPY_GC_MAX_PAUSE, the objects found by the write barrier during the
+# marking phase are visited in steps whose budget doubles every time, until
+# it is this many times larger than the target; then they are all visited
+# at once.
+MAX_MARK_CATCHUP = 1024.0
+
 
 FORWARDSTUB = lltype.GcStruct('forwarding_stub',
                               ('forw', llmemory.Address))
@@ -296,6 +325,30 @@ class IncrementalMiniMarkGC(MovingGCBase):
         assert small_request_threshold % WORD == 0
         self.read_from_env = read_from_env
         self.nursery_size = nursery_size
+        #
+        # parallel marking, see parallelmark.py
+        self.mark_threads = 1
+        self.pm_workers = lltype.nullptr(parallelmark.WORKERS)
+        self.pm_pool = parallelmark.NULL_CHUNK
+        self.pm_nthreads = 0
+        self.pm_idle = 0
+        self.pm_stop = False
+        self.pm_budget = 0
+        #
+        # sweeping in a background thread, see concurrentsweep.py
+        self.concurrent_sweep = False
+        self.cs_pages_target = 0
+        # time spent sweeping during the current major collection
+        self.sweep_duration = 0.0
+        #
+        # pause-time target, see pausestats.py.  'max_pause' is in seconds,
+        # or 0.0 if the work per step is computed as usual.
+        self.max_pause = 0.0
+        self.mark_rate = pausestats.StepRate()        # bytes per second
+        self.sweep_rate = pausestats.StepRate()       # pages per second
+        self.rawsweep_rate = pausestats.StepRate()    # objects per second
+        self.pause_histogram = pausestats.PauseHistogram()
+        self.mark_catchup = 1.0
 
         self.small_request_threshold = small_request_threshold
         self.major_collection_threshold = major_collection_threshold
@@ -327,7 +380,12 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # The ArenaCollection() handles the nonmovable objects allocation.
         if ArenaCollectionClass is None:
             from rpython.memory.gc import minimarkpage
-            ArenaCollectionClass = minimarkpage.ArenaCollection
+            # 'config' is None in some tests
+            if config is not None and config.gcconcurrentsweep:
+                ArenaCollectionClass = (
+                    minimarkpage.ArenaCollectionWithBackgroundSweep)
+            else:
+                ArenaCollectionClass = minimarkpage.ArenaCollection
         self.ac = ArenaCollectionClass(arena_size, page_size,
                                        small_request_threshold)
         #
@@ -500,6 +558,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
             else:
                 self.gc_increment_step = newsize * 4
             #
+            max_pause = env.read_float_from_env('PYPY_GC_MAX_PAUSE')
+            if max_pause > 0.0:
+                self.max_pause = max_pause / 1000.0
+            #
             nursery_debug = env.read_uint_from_env('PYPY_GC_NURSERY_DEBUG')
             if nursery_debug > 0:
                 self.gc_nursery_debug = True
@@ -523,6 +585,20 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # Estimate this number conservatively
             bigobj = self.nonlarge_max + 1
             self.max_number_of_pinned_objects = self.nursery_size / (bigobj * 2)
+        #
+        if self.config.gcparallelmark:
+            mark_threads = parallelmark.default_number_of_threads()
+            if self.read_from_env:
+                env_mark_threads = env.read_from_env('PYPY_GC_MARK_THREADS')
+                if env_mark_threads > 0:
+                    mark_threads = env_mark_threads
+            self.set_mark_threads(mark_threads)
+        #
+        if self.config.gcconcurrentsweep:
+            self.concurrent_sweep = True
+            if (self.read_from_env and
+                    os.environ.get('PYPY_GC_CONCURRENT_SWEEP') == '0'):
+                self.concurrent_sweep = False
 
     def enable(self):
         self.enabled = True
@@ -1283,6 +1359,24 @@ class IncrementalMiniMarkGC(MovingGCBase):
             ((r_uint(length) + r_uint((8 << self.card_page_shift) - 1)) >>
              (self.card_page_shift + 3)))
 
+    def _tid_and(self, hdr, mask):
+        # 'hdr.tid &= mask' for an object that might be in a page that is
+        # being swept in the background: it must be atomic, like the
+        # removal of GCFLAG_VISITED by the sweeping thread
+        if self.config.gcconcurrentsweep:
+            concurrentsweep.tid_and(hdr, mask)
+        else:
+            hdr.tid &= mask
+    _tid_and._always_inline_ = True
+
+    def _tid_or(self, hdr, flags):
+        # 'hdr.tid |= flags', see _tid_and()
+        if self.config.gcconcurrentsweep:
+            concurrentsweep.tid_or(hdr, flags)
+        else:
+            hdr.tid |= flags
+    _tid_or._always_inline_ = True
+
     def debug_check_consistency(self):
         if self.DEBUG:
             ll_assert(not self.young_rawmalloced_objects,
@@ -1499,7 +1593,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # GC nowadays relies on this fact.
             self.old_objects_pointing_to_young.append(addr_struct)
             objhdr = self.header(addr_struct)
-            objhdr.tid &= ~GCFLAG_TRACK_YOUNG_PTRS
+            self._tid_and(objhdr, ~GCFLAG_TRACK_YOUNG_PTRS)
             #
             # Second part: if 'addr_struct' is actually a prebuilt GC
             # object and it's the first time we see a write to it, we
@@ -1532,7 +1626,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 #
                 # no cards, use default logic.  Mostly copied from above.
                 self.old_objects_pointing_to_young.append(addr_array)
-                objhdr.tid &= ~GCFLAG_TRACK_YOUNG_PTRS
+                self._tid_and(objhdr, ~GCFLAG_TRACK_YOUNG_PTRS)
                 if objhdr.tid & GCFLAG_NO_HEAP_PTRS:
                     objhdr.tid &= ~GCFLAG_NO_HEAP_PTRS
                     self.prebuilt_root_objects.append(addr_array)
@@ -1638,7 +1732,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if source_hdr.tid & GCFLAG_TRACK_YOUNG_PTRS == 0:
             # there might be in source a pointer to a young object
             self.old_objects_pointing_to_young.append(dest_addr)
-            dest_hdr.tid &= ~GCFLAG_TRACK_YOUNG_PTRS
+            self._tid_and(dest_hdr, ~GCFLAG_TRACK_YOUNG_PTRS)
         #
         if dest_hdr.tid & GCFLAG_NO_HEAP_PTRS:
             if source_hdr.tid & GCFLAG_NO_HEAP_PTRS == 0:
@@ -1692,7 +1786,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # visit shadow to keep it alive
             # XXX seems like it is save to set GCFLAG_VISITED, however
             # should be double checked
-            self.header(shadow).tid |= GCFLAG_VISITED
+            self._tid_or(self.header(shadow), GCFLAG_VISITED)
             new_shadow_object_dict.setitem(obj, shadow)
 
     def register_finalizer(self, fq_index, gcobj):
@@ -1918,7 +2012,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def _reset_flag_old_objects_pointing_to_pinned(self, obj, ignore):
         ll_assert(self.header(obj).tid & GCFLAG_PINNED_OBJECT_PARENT_KNOWN != 0,
                   "!GCFLAG_PINNED_OBJECT_PARENT_KNOWN, but requested to reset.")
-        self.header(obj).tid &= ~GCFLAG_PINNED_OBJECT_PARENT_KNOWN
+        self._tid_and(self.header(obj), ~GCFLAG_PINNED_OBJECT_PARENT_KNOWN)
 
     def _visit_old_objects_pointing_to_pinned(self, obj, ignore):
         self.trace(obj, self._trace_drag_out, obj)
@@ -2036,7 +2130,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             #
             # Add the flag GCFLAG_TRACK_YOUNG_PTRS.  All live objects should
             # have this flag set after a nursery collection.
-            self.header(obj).tid |= GCFLAG_TRACK_YOUNG_PTRS
+            self._tid_or(self.header(obj), GCFLAG_TRACK_YOUNG_PTRS)
             #
             # Trace the 'obj' to replace pointers to nursery with pointers
             # outside the nursery, possibly forcing nursery objects out
@@ -2132,7 +2226,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 #
                 self.old_objects_pointing_to_pinned.append(parent)
                 self.updated_old_objects_pointing_to_pinned = True
-                self.header(parent).tid |= GCFLAG_PINNED_OBJECT_PARENT_KNOWN
+                self._tid_or(self.header(parent),
+                             GCFLAG_PINNED_OBJECT_PARENT_KNOWN)
             #
             if hdr.tid & GCFLAG_VISITED:
                 return
@@ -2367,6 +2462,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # starting a major GC cycle: reset these two counters
             self.size_objects_made_old = r_uint(0)
             self.threshold_objects_made_old = r_uint(self.nursery_size // 2)
+            self.mark_catchup = 1.0
 
             self.objects_to_trace = self.AddressStack()
             self.collect_roots()
@@ -2383,7 +2479,18 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if estimate_from_nursery > estimate:
                 estimate = estimate_from_nursery
             estimate = intmask(estimate)
+            if self.max_pause > 0.0:
+                # what should take 'max_pause' seconds (or more, see
+                # 'mark_catchup' below), but still enough to keep up with
+                # the objects made old
+                estimate = max(self.mark_rate.budget(
+                                   self.max_pause * self.mark_catchup,
+                                   estimate),
+                               intmask(estimate_from_nursery))
+            mark_start = time.time()
             remaining = self.visit_all_objects_step(estimate)
+            self.mark_rate.update(estimate - remaining,
+                                  time.time() - mark_start)
             #
             if remaining >= estimate // 2:
                 if self.more_objects_to_trace.non_empty():
@@ -2395,7 +2502,15 @@ class IncrementalMiniMarkGC(MovingGCBase):
                     swap = self.objects_to_trace
                     self.objects_to_trace = self.more_objects_to_trace
                     self.more_objects_to_trace = swap
-                    self.visit_all_objects()
+                    if (self.max_pause > 0.0 and
+                            self.mark_catchup < MAX_MARK_CATCHUP):
+                        # With a pause-time target, visit them in the next
+                        # steps instead, but with a budget that doubles
+                        # every time we get here, which still ensures
+                        # termination.
+                        self.mark_catchup *= 2.0
+                    else:
+                        self.visit_all_objects()
 
             # XXX A simplifying assumption that should be checked,
             # finalizers/weak references are rare and short which means that
@@ -2438,6 +2553,9 @@ class IncrementalMiniMarkGC(MovingGCBase):
                     self.deal_with_old_objects_with_destructors()
                 # objects_to_trace processed fully, can move on to sweeping
                 self.ac.mass_free_prepare()
+                self.sweep_duration = 0.0
+                if self.config.gcconcurrentsweep and self.concurrent_sweep:
+                    self.start_sweep_in_background()
                 self.start_free_rawmalloc_objects()
                 #
                 # get rid of objects pointing to pinned objects that were not
@@ -2468,18 +2586,32 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 # a total object size of at least '3 * nursery_size' bytes
                 # is processed.
                 limit = 3 * self.nursery_size // self.small_request_threshold
+                if self.max_pause > 0.0:
+                    limit = self.rawsweep_rate.budget(self.max_pause, limit)
+                rawsweep_start = time.time()
                 nobjects = self.free_unvisited_rawmalloc_objects_step(limit)
+                self.rawsweep_rate.update(limit - nobjects,
+                                          time.time() - rawsweep_start)
                 debug_print("freeing raw objects:", limit-nobjects,
                             "freed, limit was", limit)
                 done = False    # the 2nd half below must still be done
+            elif (self.config.gcconcurrentsweep and
+                      self.ac.sweeping_in_background):
+                done = self.sweep_in_background_step()
             else:
                 # Ask the ArenaCollection to visit a fraction of the objects.
                 # Free the ones that have not been visited above, and reset
                 # GCFLAG_VISITED on the others.  Visit at most '3 *
                 # nursery_size' bytes.
-                limit = 3 * self.nursery_size // self.ac.page_size
+                sweep_start = time.time()
+                limit = self.sweep_step_pages()
                 done = self.ac.mass_free_incremental(self._free_if_unvisited,
                                                      limit)
+                sweep_step_duration = time.time() - sweep_start
+                self.sweep_duration += sweep_step_duration
+                if not done:
+                    # exactly 'limit' pages were swept
+                    self.sweep_rate.update(limit, sweep_step_duration)
                 status = done and "No more pages left." or "More to do."
                 debug_print("freeing GC objects, up to", limit, "pages.", status)
             # XXX tweak the limits above
@@ -2522,7 +2654,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
                     arenas_count_after=self.ac.arenas_count,
                     arenas_bytes=self.ac.total_memory_used,
                     rawmalloc_bytes_before=self.stat_rawmalloced_total_size,
-                    rawmalloc_bytes_after=self.rawmalloced_total_size)
+                    rawmalloc_bytes_after=self.rawmalloced_total_size,
+                    sweep_duration=self.sweep_duration)
                 #
                 # Max heap size: gives an upper bound on the threshold.  If we
                 # already have at least this much allocated, raise MemoryError.
@@ -2563,10 +2696,27 @@ class IncrementalMiniMarkGC(MovingGCBase):
         debug_stop("gc-collect-step")
         duration = time.time() - start
         self.total_gc_time += duration
-        self.hooks.fire_gc_collect_step(
-            duration=duration,
-            oldstate=oldstate,
-            newstate=self.gc_state)
+        self.pause_histogram.record(duration)
+        if self.hooks.is_gc_collect_step_enabled():
+            self.hooks.fire_gc_collect_step(
+                duration=duration,
+                oldstate=oldstate,
+                newstate=self.gc_state,
+                duration_p50=self.get_pause_percentile(50),
+                duration_p90=self.get_pause_percentile(90),
+                duration_p99=self.get_pause_percentile(99))
+
+    def sweep_step_pages(self):
+        # The number of pages of the ArenaCollection to sweep in a step
+        limit = 3 * self.nursery_size // self.ac.page_size
+        if self.max_pause > 0.0:
+            limit = self.sweep_rate.budget(self.max_pause, limit)
+        return limit
+
+    def get_pause_percentile(self, percent):
+        """The duration in seconds under which 'percent' % of the major
+        collection steps finished."""
+        return self.pause_histogram.percentile_usec(percent) / 1000000.0
 
     def _sweep_old_objects_pointing_to_pinned(self, obj, new_list):
         if self.header(obj).tid & GCFLAG_VISITED:
@@ -2576,13 +2726,61 @@ class IncrementalMiniMarkGC(MovingGCBase):
         size_gc_header = self.gcheaderbuilder.size_gc_header
         obj = hdr + size_gc_header
         if self.header(obj).tid & GCFLAG_VISITED:
-            self.header(obj).tid &= ~GCFLAG_VISITED
+            # atomic with --gc-concurrent-sweep, where this runs in the
+            # background thread
+            self._tid_and(self.header(obj), ~GCFLAG_VISITED)
             return False     # survives
         return True      # dies
 
     def _reset_gcflag_visited(self, obj, ignored):
         self.header(obj).tid &= ~GCFLAG_VISITED
 
+    def start_sweep_in_background(self):
+        self.ac.start_sweep_in_background()
+        self.cs_pages_target = 0
+        concurrentsweep.state.gc = self
+        if not concurrentsweep.start(llhelper(concurrentsweep.WORKER_FUNC,
+                                              concurrentsweep.worker_entry)):
+            # no thread: the sweeping steps do the sweep themselves
+            debug_print("cannot start the background sweeping thread")
+
+    def sweep_in_background_step(self):
+        # Take the pages swept so far by the background thread.  To make
+        # sure that the major collection progresses at least as fast as
+        # if the sweep was done in the steps, wait until the thread has
+        # swept as many pages as the incremental steps would have.
+        # Returns True when the sweep is finished.
+        start = time.time()
+        self.cs_pages_target += self.sweep_step_pages()
+        done = self.ac.take_swept_pages()
+        while not done and self.ac.pages_taken_back < self.cs_pages_target:
+            if concurrentsweep.is_running():
+                concurrentsweep.lock()
+                if not self.ac.background_sweep_done:
+                    concurrentsweep.wait()
+                concurrentsweep.unlock()
+            else:
+                # no thread: sweep the pages here
+                self._cs_sweep_batch()
+            done = self.ac.take_swept_pages()
+        debug_print("pages swept in the background:",
+                    self.ac.pages_taken_back)
+        if done:
+            self.sweep_duration += concurrentsweep.join()
+            self.ac.end_sweep_in_background()
+        self.sweep_duration += time.time() - start
+        return done
+
+    def _cs_sweep_batch(self):
+        return self.ac.sweep_in_background(self._free_if_unvisited,
+                                           concurrentsweep.BATCH_PAGES)
+
+    def _cs_sweep_in_background(self):
+        # Runs in the background thread.  Must not allocate GC objects,
+        # raise, or touch any state of the main thread.
+        while not self._cs_sweep_batch():
+            pass
+
     def free_rawmalloced_object_if_unvisited(self, obj, check_flag):
         if self.header(obj).tid & check_flag:
             self.header(obj).tid &= ~check_flag   # survives
@@ -2690,6 +2888,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
     TEST_VISIT_SINGLE_STEP = False    # for tests
 
     def visit_all_objects_step(self, size_to_track):
+        if self.mark_threads > 1 and self.config.gcparallelmark:
+            return self.parallel_visit_step(size_to_track)
         # Objects can be added to pending by visit
         pending = self.objects_to_trace
         while pending.non_empty():
@@ -2737,6 +2937,192 @@ class IncrementalMiniMarkGC(MovingGCBase):
         totalsize = size_gc_header + self.get_size(obj)
         return raw_malloc_usage(totalsize)
 
+    # ----------
+    # Parallel marking (translation option --gc-parallel-mark).  A marking
+    # step is done by 'mark_threads' threads, see parallelmark.py.
+
+    def set_mark_threads(self, n):
+        if n < 1:
+            n = 1
+        if n > parallelmark.MAX_THREADS:
+            n = parallelmark.MAX_THREADS
+        if self.pm_workers:
+            lltype.free(self.pm_workers, flavor='raw', track_allocation=False)
+            self.pm_workers = lltype.nullptr(parallelmark.WORKERS)
+        if n > 1:
+            self.pm_workers = lltype.malloc(parallelmark.WORKERS, n,
+                                            flavor='raw',
+                                            track_allocation=False)
+        self.mark_threads = n
+
+    def parallel_visit_step(self, size_to_track):
+        # Move all the gray objects to the shared pool
+        pending = self.objects_to_trace
+        while pending.non_empty():
+            chunk = parallelmark.allocate_chunk()
+            i = 0
+            while i < parallelmark.CHUNK_SIZE and pending.non_empty():
+                chunk.items[i] = pending.pop()
+                i += 1
+            chunk.length = i
+            chunk.next = self.pm_pool
+            self.pm_pool = chunk
+        if not self.pm_pool:
+            return size_to_track
+        #
+        nthreads = parallelmark.prepare(self.mark_threads)
+        i = 0
+        while i < nthreads:
+            worker = self.pm_workers[i]
+            worker.length = 0
+            worker.marked = 0
+            worker.unaccounted = 0
+            i += 1
+        self.pm_nthreads = nthreads
+        self.pm_idle = 0
+        self.pm_stop = False
+        self.pm_budget = size_to_track
+        parallelmark.state.gc = self
+        parallelmark.run(nthreads, llhelper(parallelmark.WORKER_FUNC,
+                                            parallelmark.worker_entry))
+        #
+        # If the budget was consumed, put the objects that are still gray
+        # back into 'objects_to_trace'
+        i = 0
+        while i < nthreads:
+            worker = self.pm_workers[i]
+            size_to_track -= worker.marked
+            j = 0
+            while j < worker.length:
+                pending.append(worker.items[j])
+                j += 1
+            i += 1
+        while self.pm_pool:
+            chunk = self.pm_pool
+            self.pm_pool = chunk.next
+            j = 0
+            while j < chunk.length:
+                pending.append(chunk.items[j])
+                j += 1
+            parallelmark.free_chunk(chunk)
+        if size_to_track < 0 or pending.non_empty():
+            return 0
+        return size_to_track
+
+    def _pm_worker(self, index):
+        # Runs in all the marking threads.  Must not allocate GC objects,
+        # raise, or touch any state that is not protected by the lock
+        # (parallelmark.lock()) apart from the worker's own local stack.
+        worker = self.pm_workers[index]
+        while self._pm_refill(worker):
+            while worker.length > 0:
+                worker.length -= 1
+                obj = worker.items[worker.length]
+                worker.unaccounted += self._pm_visit(obj, worker)
+                if worker.unaccounted >= parallelmark.ACCOUNTING_SIZE:
+                    parallelmark.lock()
+                    self._pm_account(worker)
+                    stop = self.pm_stop
+                    parallelmark.unlock()
+                    if stop:
+                        return
+                # unlocked read: only a hint that other workers are idle
+                if (self.pm_idle > 0 and
+                        worker.length > parallelmark.SHARE_THRESHOLD):
+                    self._pm_share(worker, worker.length // 2)
+
+    def _pm_account(self, worker):
+        # must be called with the lock held
+        worker.marked += worker.unaccounted
+        self.pm_budget -= worker.unaccounted
+        worker.unaccounted = 0
+        if self.pm_budget < 0:
+            self.pm_stop = True
+
+    def _pm_refill(self, worker):
+        # Take a chunk from the pool into the (empty) local stack of
+        # 'worker'.  If the pool is empty, wait until another worker
+        # shares some work.  Returns False when the step is finished,
+        # i.e. when the budget is consumed or when all the workers are
+        # idle with an empty pool.
+        parallelmark.lock()
+        self._pm_account(worker)
+        while True:
+            if self.pm_stop:
+                parallelmark.unlock()
+                return False
+            chunk = self.pm_pool
+            if chunk:
+                self.pm_pool = chunk.next
+                parallelmark.unlock()
+                j = 0
+                while j < chunk.length:
+                    worker.items[j] = chunk.items[j]
+                    j += 1
+                worker.length = chunk.length
+                parallelmark.free_chunk(chunk)
+                return True
+            self.pm_idle += 1
+            if self.pm_idle == self.pm_nthreads:
+                self.pm_stop = True      # no gray object left
+                parallelmark.unlock()
+                return False
+            while True:
+                parallelmark.unlock()
+                parallelmark.wait()
+                parallelmark.lock()
+                if self.pm_pool or self.pm_stop:
+                    break
+            self.pm_idle -= 1
+
+    def _pm_share(self, worker, count):
+        # Move the 'count' topmost objects of the local stack of 'worker'
+        # to a new chunk of the pool
+        chunk = parallelmark.allocate_chunk()
+        start = worker.length - count
+        j = 0
+        while j < count:
+            chunk.items[j] = worker.items[start + j]
+            j += 1
+        chunk.length = count
+        worker.length = start
+        parallelmark.lock()
+        chunk.next = self.pm_pool
+        self.pm_pool = chunk
+        parallelmark.unlock()
+
+    def _pm_visit(self, obj, worker):
+        # Like visit(), but the flags are set atomically, and only the
+        # worker that sets GCFLAG_VISITED traces the object
+        hdr = self.header(obj)
+        ll_assert((hdr.tid & GCFLAG_PINNED) == 0,
+                  "pinned object in 'objects_to_trace'")
+        ll_assert(not self.is_in_nursery(obj),
+                  "nursery object in 'objects_to_trace'")
+        if hdr.tid & (GCFLAG_VISITED | GCFLAG_NO_HEAP_PTRS):
+            return 0
+        oldtid = parallelmark.fetch_or_tid(
+            hdr, GCFLAG_VISITED | GCFLAG_TRACK_YOUNG_PTRS)
+        if oldtid & GCFLAG_VISITED:
+            return 0     # another worker was faster
+        if self.has_gcptr(llop.extract_ushort(llgroup.HALFWORD, oldtid)):
+            self.trace(obj, self._pm_collect_ref, worker)
+        size_gc_header = self.gcheaderbuilder.size_gc_header
+        totalsize = size_gc_header + self.get_size(obj)
+        return raw_malloc_usage(totalsize)
+
+    def _pm_collect_ref(self, root, worker):
+        obj = root.address[0]
+        llop.debug_nonnull_pointer(lltype.Void, obj)
+        if not self.is_in_nursery(obj):
+            if worker.length == parallelmark.LOCAL_SIZE:
+                self._pm_share(worker, parallelmark.CHUNK_SIZE)
+            worker.items[worker.length] = obj
+            worker.length += 1
+        else:
+            ll_assert(self._is_pinned(obj),
+                      "non-pinned nursery obj in _pm_collect_ref")
+
     # ----------
     # id() and identityhash() support
 
@@ -2961,7 +3347,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.visit_all_objects()
 
     def ignore_finalizer(self, obj):
-        self.header(obj).tid |= GCFLAG_IGNORE_FINALIZER
+        self._tid_or(self.header(obj), GCFLAG_IGNORE_FINALIZER)
 
 
     # ----------
@@ -3071,6 +3457,16 @@ class IncrementalMiniMarkGC(MovingGCBase):
             return intmask(self.nursery_size)
         elif stats_no == rgc.TOTAL_GC_TIME:
             return int(self.total_gc_time * 1000)
+        elif stats_no == rgc.GC_PAUSE_TARGET:
+            return int(self.max_pause * 1000000)
+        elif stats_no == rgc.GC_PAUSE_P50:
+            return self.pause_histogram.percentile_usec(50)
+        elif stats_no == rgc.GC_PAUSE_P90:
+            return self.pause_histogram.percentile_usec(90)
+        elif stats_no == rgc.GC_PAUSE_P99:
+            return self.pause_histogram.percentile_usec(99)
+        elif stats_no == rgc.GC_PAUSE_MAX:
+            return self.pause_histogram.max_usec
         return 0
 
 
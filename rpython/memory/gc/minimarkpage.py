@@ -86,6 +86,8 @@ PAGE_NULL = lltype.nullptr(PAGE_HEADER)
 
 class ArenaCollection(object):
     _alloc_flavor_ = "raw"
+    # True in ArenaCollectionWithBackgroundSweep only; constant-folded
+    background_sweep = False
 
     def __init__(self, arena_size, page_size, small_request_threshold):
         # 'small_request_threshold' is the largest size that we
@@ -104,6 +106,16 @@ class ArenaCollection(object):
         self.full_page_for_size     = self._new_page_ptr_list(length)
         self.old_page_for_size      = self._new_page_ptr_list(length)
         self.old_full_page_for_size = self._new_page_ptr_list(length)
+        #
+        # pages swept by the background thread but not yet taken back by
+        # the main thread (see sweep_in_background())
+        self.swept_page_for_size      = self._new_page_ptr_list(length)
+        self.swept_full_page_for_size = self._new_page_ptr_list(length)
+        self.swept_free_pages = PAGE_NULL
+        self.swept_memory_used = r_uint(0)
+        self.background_sweep_done = False
+        self.sweeping_in_background = False
+        self.pages_taken_back = 0
         self.nblocks_for_size = lltype.malloc(rffi.CArray(lltype.Signed),
                                               length, flavor='raw',
                                               immortal=True)
@@ -163,7 +175,11 @@ class ArenaCollection(object):
         size_class = nsize >> WORD_POWER_2
         page = self.page_for_size[size_class]
         if page == PAGE_NULL:
-            page = self.allocate_new_page(size_class)
+            if self.background_sweep and self.sweeping_in_background:
+                self.take_swept_pages()
+                page = self.page_for_size[size_class]
+            if page == PAGE_NULL:
+                page = self.allocate_new_page(size_class)
         #
         # The result is simply 'page.freeblock'
         result = page.freeblock
@@ -384,6 +400,130 @@ class ArenaCollection(object):
         ll_assert(res, "non-incremental mass_free_in_pages() returned False")
 
 
+    def start_sweep_in_background(self):
+        """Called after mass_free_prepare() instead of a series of calls
+        to mass_free_incremental(): from now on, the old pages are owned
+        by sweep_in_background(), which normally runs in another thread.
+        """
+        ll_assert(not self.sweeping_in_background,
+                  "start_sweep_in_background: already sweeping")
+        self.swept_free_pages = PAGE_NULL
+        self.swept_memory_used = r_uint(0)
+        self.background_sweep_done = False
+        self.pages_taken_back = 0
+        self.sweeping_in_background = True
+
+
+    def sweep_in_background(self, ok_to_free_func, max_pages):
+        """Like mass_free_incremental(), but running in the background
+        thread.  The swept pages are not put back into 'page_for_size' and
+        'full_page_for_size', which belong to the main thread, but into
+        'swept_page_for_size' and 'swept_full_page_for_size' under the lock;
+        the pages that became free go to 'swept_free_pages'.  The main
+        thread takes them with take_swept_pages().  Returns True if all the
+        pages are swept, or False if the limit 'max_pages' is reached.
+        """
+        from rpython.memory.gc import concurrentsweep
+        size_class = self.size_class_with_old_pages
+        #
+        while size_class >= 1:
+            nblocks = self.nblocks_for_size[size_class]
+            block_size = size_class * WORD
+            while True:
+                if max_pages <= 0:
+                    self.size_class_with_old_pages = size_class
+                    return False
+                concurrentsweep.checkpoint()
+                #
+                # First the full pages, then the other ones
+                page = self.old_full_page_for_size[size_class]
+                if page != PAGE_NULL:
+                    self.old_full_page_for_size[size_class] = page.nextpage
+                else:
+                    page = self.old_page_for_size[size_class]
+                    if page == PAGE_NULL:
+                        break
+                    self.old_page_for_size[size_class] = page.nextpage
+                #
+                surviving = self.walk_page(page, block_size, ok_to_free_func)
+                #
+                concurrentsweep.lock()
+                if surviving == nblocks:
+                    page.nextpage = self.swept_full_page_for_size[size_class]
+                    self.swept_full_page_for_size[size_class] = page
+                elif surviving > 0:
+                    page.nextpage = self.swept_page_for_size[size_class]
+                    self.swept_page_for_size[size_class] = page
+                else:
+                    page.nextpage = self.swept_free_pages
+                    self.swept_free_pages = page
+                self.swept_memory_used += r_uint(surviving * block_size)
+                concurrentsweep.signal()
+                concurrentsweep.unlock()
+                max_pages -= 1
+            #
+            size_class -= 1
+        #
+        self.size_class_with_old_pages = 0
+        concurrentsweep.lock()
+        self.background_sweep_done = True
+        concurrentsweep.signal()
+        concurrentsweep.unlock()
+        return True
+
+
+    def take_swept_pages(self):
+        """Called by the main thread: make the pages swept so far by
+        sweep_in_background() available again for allocation.  Returns
+        True if the sweep is finished.
+        """
+        from rpython.memory.gc import concurrentsweep
+        concurrentsweep.lock()
+        size_class = self.small_request_threshold >> WORD_POWER_2
+        while size_class >= 1:
+            page = self.swept_page_for_size[size_class]
+            self.swept_page_for_size[size_class] = PAGE_NULL
+            while page != PAGE_NULL:
+                nextpage = page.nextpage
+                page.nextpage = self.page_for_size[size_class]
+                self.page_for_size[size_class] = page
+                self.pages_taken_back += 1
+                page = nextpage
+            page = self.swept_full_page_for_size[size_class]
+            self.swept_full_page_for_size[size_class] = PAGE_NULL
+            while page != PAGE_NULL:
+                nextpage = page.nextpage
+                page.nextpage = self.full_page_for_size[size_class]
+                self.full_page_for_size[size_class] = page
+                self.pages_taken_back += 1
+                page = nextpage
+            size_class -= 1
+        free_pages = self.swept_free_pages
+        self.swept_free_pages = PAGE_NULL
+        self.total_memory_used += self.swept_memory_used
+        self.swept_memory_used = r_uint(0)
+        done = self.background_sweep_done
+        concurrentsweep.unlock()
+        #
+        # The arenas belong to the main thread
+        while free_pages != PAGE_NULL:
+            nextpage = free_pages.nextpage
+            self.free_page(free_pages)
+            self.pages_taken_back += 1
+            free_pages = nextpage
+        return done
+
+
+    def end_sweep_in_background(self):
+        """Called by the main thread when take_swept_pages() returned True
+        and the background thread is finished."""
+        ll_assert(self.sweeping_in_background,
+                  "end_sweep_in_background: not sweeping")
+        self.sweeping_in_background = False
+        self._rehash_arenas_lists()
+        self.size_class_with_old_pages = -1
+
+
     def _rehash_arenas_lists(self):
         #
         # Rehash arenas into the correct arenas_lists[i].  If
@@ -444,6 +584,7 @@ class ArenaCollection(object):
                 #
                 # Collect the page.
                 surviving = self.walk_page(page, block_size, ok_to_free_func)
+                self.total_memory_used += r_uint(surviving * block_size)
                 nextpage = page.nextpage
                 #
                 if surviving == nblocks:
@@ -561,9 +702,6 @@ class ArenaCollection(object):
             #
             obj += block_size
         #
-        # Update the global total size of objects.
-        self.total_memory_used += r_uint(surviving * block_size)
-        #
         # Return the number of surviving objects.
         return surviving
 
@@ -582,6 +720,13 @@ class ArenaCollection(object):
         return nblocks - num_initialized_blocks
 
 
+class ArenaCollectionWithBackgroundSweep(ArenaCollection):
+    """An ArenaCollection whose old pages can also be swept by another
+    thread, with start_sweep_in_background() and sweep_in_background()
+    instead of mass_free_incremental().  See concurrentsweep.py."""
+    background_sweep = True
+
+
 # ____________________________________________________________
 # Helpers to go from a pointer to the start of its page
 
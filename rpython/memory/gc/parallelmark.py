@@ -0,0 +1,330 @@
+"""
+Support for marking the heap with several threads during the major
+collections of incminimark (translation option --gc-parallel-mark).
+
+The marking is parallel but not concurrent: the mutator is stopped, as
+usual, during a marking step, and the step is done by a group of worker
+threads that all run until the step's budget is consumed or until there are
+no gray objects left.  Each worker has a local stack of gray objects.  A
+worker whose local stack is full, or that sees idle workers while it has
+more than enough work, moves a chunk of its stack to a shared pool, from
+which idle workers take their next objects.  The mark bit is set with an
+atomic fetch-and-or, so that an object reachable from several workers is
+only traced by one of them.
+
+The threads are started the first time they are needed and then wait for
+the next marking step.  The C part below only deals with the threads and
+the atomic operations; the marking itself is RPython code in incminimark.
+On Windows, only the calling thread is used.
+
+When running untranslated (e.g. in test_direct.py), the workers are emulated
+with Python threads.
+"""
+
+import sys
+import threading
+
+from rpython.rtyper.lltypesystem import lltype, llmemory, rffi
+from rpython.rlib.objectmodel import we_are_translated
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+
+# maximum number of threads, including the one that runs the collection
+MAX_THREADS = 64
+# default number of threads: the number of processors, but at most this
+DEFAULT_MAX_THREADS = 8
+
+# number of objects in a chunk of the shared pool
+CHUNK_SIZE = 512
+# size of the local stack of a worker
+LOCAL_SIZE = 4 * CHUNK_SIZE
+# a worker moves a chunk to the pool if some workers are idle and its local
+# stack contains more than this number of objects
+SHARE_THRESHOLD = 64
+# a worker subtracts the size of the objects it marked from the budget of
+# the step once it has marked this number of bytes
+ACCOUNTING_SIZE = 65536
+
+CHUNK = lltype.ForwardReference()
+CHUNK.become(lltype.Struct('gc_mark_chunk',
+                           ('next', lltype.Ptr(CHUNK)),
+                           ('length', lltype.Signed),
+                           ('items', lltype.FixedSizeArray(llmemory.Address,
+                                                           CHUNK_SIZE))))
+CHUNKPTR = lltype.Ptr(CHUNK)
+NULL_CHUNK = lltype.nullptr(CHUNK)
+
+WORKER = lltype.Struct('gc_mark_worker',
+                       ('length', lltype.Signed),
+                       ('marked', lltype.Signed),   # bytes marked
+                       ('unaccounted', lltype.Signed),
+                       ('items', lltype.FixedSizeArray(llmemory.Address,
+                                                       LOCAL_SIZE)))
+WORKERPTR = lltype.Ptr(WORKER)
+WORKERS = lltype.Array(WORKER, hints={'nolength': True})
+
+WORKER_FUNC = lltype.Ptr(lltype.FuncType([lltype.Signed], lltype.Void))
+
+
+def allocate_chunk():
+    addr = llmemory.raw_malloc(llmemory.sizeof(CHUNK))
+    if not addr:
+        from rpython.memory.gc.minimarkpage import out_of_memory
+        out_of_memory("out of memory: cannot allocate a mark chunk")
+    chunk = llmemory.cast_adr_to_ptr(addr, CHUNKPTR)
+    chunk.length = 0
+    return chunk
+
+def free_chunk(chunk):
+    llmemory.raw_free(llmemory.cast_ptr_to_adr(chunk))
+
+
+class State(object):
+    """Holds the GC whose workers are running, for worker_entry()."""
+    def _cleanup_(self):
+        self.gc = None
+state = State()
+state.gc = None
+
+def worker_entry(index):
+    state.gc._pm_worker(index)
+
+# ____________________________________________________________
+
+_c_source = r"""
+#ifndef _WIN32
+#include <pthread.h>
+#include <sched.h>
+#include <signal.h>
+#include <unistd.h>
+
+static pthread_mutex_t pm_run_mutex = PTHREAD_MUTEX_INITIALIZER;
+static pthread_cond_t pm_run_start = PTHREAD_COND_INITIALIZER;
+static pthread_cond_t pm_run_done = PTHREAD_COND_INITIALIZER;
+static pthread_mutex_t pm_work_mutex = PTHREAD_MUTEX_INITIALIZER;
+static Signed pm_threads;        /* number of helper threads started */
+static Signed pm_generation;     /* incremented by every pypy_gc_pm_run() */
+static Signed pm_thread_gen0;    /* pm_generation when the threads started */
+static Signed pm_running;        /* helper threads still in this run */
+static Signed pm_n;
+static void (*pm_fn)(Signed);
+static int pm_atfork_registered;
+
+static void *pm_thread_main(void *arg)
+{
+    Signed index = (Signed)arg;
+    Signed seen;
+    pthread_mutex_lock(&pm_run_mutex);
+    seen = pm_thread_gen0;
+    while (1) {
+        while (pm_generation == seen)
+            pthread_cond_wait(&pm_run_start, &pm_run_mutex);
+        seen = pm_generation;
+        if (index < pm_n) {
+            void (*fn)(Signed) = pm_fn;
+            pthread_mutex_unlock(&pm_run_mutex);
+            fn(index);
+            pthread_mutex_lock(&pm_run_mutex);
+        }
+        if (--pm_running == 0)
+            pthread_cond_signal(&pm_run_done);
+    }
+    return NULL;
+}
+
+static void pm_atfork_child(void)
+{
+    /* the helper threads don't exist in the child process */
+    pthread_mutex_init(&pm_run_mutex, NULL);
+    pthread_mutex_init(&pm_work_mutex, NULL);
+    pthread_cond_init(&pm_run_start, NULL);
+    pthread_cond_init(&pm_run_done, NULL);
+    pm_threads = 0;
+    pm_running = 0;
+}
+
+RPY_EXTERN Signed pypy_gc_pm_cpu_count(void)
+{
+    Signed n = sysconf(_SC_NPROCESSORS_ONLN);
+    return n > 0 ? n : 1;
+}
+
+RPY_EXTERN Signed pypy_gc_pm_prepare(Signed n)
+{
+    sigset_t all, old;
+    pthread_mutex_lock(&pm_run_mutex);
+    if (!pm_atfork_registered) {
+        pthread_atfork(NULL, NULL, pm_atfork_child);
+        pm_atfork_registered = 1;
+    }
+    pm_thread_gen0 = pm_generation;
+    /* the helper threads must never run signal handlers */
+    sigfillset(&all);
+    pthread_sigmask(SIG_BLOCK, &all, &old);
+    while (pm_threads < n - 1) {
+        pthread_t th;
+        pthread_attr_t attr;
+        int err;
+        pthread_attr_init(&attr);
+        pthread_attr_setdetachstate(&attr, PTHREAD_CREATE_DETACHED);
+        err = pthread_create(&th, &attr, pm_thread_main,
+                             (void *)(pm_threads + 1));
+        pthread_attr_destroy(&attr);
+        if (err != 0)
+            break;
+        pm_threads++;
+    }
+    pthread_sigmask(SIG_SETMASK, &old, NULL);
+    if (n > pm_threads + 1)
+        n = pm_threads + 1;
+    pthread_mutex_unlock(&pm_run_mutex);
+    return n;
+}
+
+RPY_EXTERN void pypy_gc_pm_run(Signed n, void (*fn)(Signed))
+{
+    pthread_mutex_lock(&pm_run_mutex);
+    pm_fn = fn;
+    pm_n = n;
+    pm_running = pm_threads;
+    pm_generation++;
+    pthread_cond_broadcast(&pm_run_start);
+    pthread_mutex_unlock(&pm_run_mutex);
+
+    fn(0);
+
+    pthread_mutex_lock(&pm_run_mutex);
+    while (pm_running > 0)
+        pthread_cond_wait(&pm_run_done, &pm_run_mutex);
+    pthread_mutex_unlock(&pm_run_mutex);
+}
+
+RPY_EXTERN void pypy_gc_pm_lock(void)
+{
+    pthread_mutex_lock(&pm_work_mutex);
+}
+
+RPY_EXTERN void pypy_gc_pm_unlock(void)
+{
+    pthread_mutex_unlock(&pm_work_mutex);
+}
+
+RPY_EXTERN void pypy_gc_pm_wait(void)
+{
+    sched_yield();
+}
+
+RPY_EXTERN Signed pypy_gc_pm_fetch_or(Signed *p, Signed value)
+{
+    return __sync_fetch_and_or(p, value);
+}
+
+#else   /* _WIN32: no helper threads */
+
+RPY_EXTERN Signed pypy_gc_pm_cpu_count(void) { return 1; }
+RPY_EXTERN Signed pypy_gc_pm_prepare(Signed n) { return 1; }
+RPY_EXTERN void pypy_gc_pm_run(Signed n, void (*fn)(Signed)) { fn(0); }
+RPY_EXTERN void pypy_gc_pm_lock(void) { }
+RPY_EXTERN void pypy_gc_pm_unlock(void) { }
+RPY_EXTERN void pypy_gc_pm_wait(void) { }
+RPY_EXTERN Signed pypy_gc_pm_fetch_or(Signed *p, Signed value)
+{
+    Signed old = *p;
+    *p = old | value;
+    return old;
+}
+#endif
+"""
+
+if sys.platform == 'win32':
+    _libraries = []
+else:
+    _libraries = ['pthread']
+
+eci = ExternalCompilationInfo(
+    post_include_bits=["""
+RPY_EXTERN Signed pypy_gc_pm_cpu_count(void);
+RPY_EXTERN Signed pypy_gc_pm_prepare(Signed);
+RPY_EXTERN void pypy_gc_pm_run(Signed, void (*)(Signed));
+RPY_EXTERN void pypy_gc_pm_lock(void);
+RPY_EXTERN void pypy_gc_pm_unlock(void);
+RPY_EXTERN void pypy_gc_pm_wait(void);
+RPY_EXTERN Signed pypy_gc_pm_fetch_or(Signed *, Signed);
+"""],
+    separate_module_sources=[_c_source],
+    libraries=_libraries)
+
+# emulation with Python threads, for the tests.  The lltype emulation is
+# not thread-safe, so the threads take turns: a thread runs while it holds
+# '_emulated_turn', and lets the other threads run only in unlock() and
+# wait(), i.e. in the places where real threads would interact.
+
+_emulated_turn = threading.Lock()
+_emulated_atomic = threading.Lock()
+
+def _emulated_cpu_count():
+    return 4
+
+def _emulated_prepare(n):
+    return n
+
+def _emulated_run(n, fn):
+    errors = []
+    def run(index):
+        _emulated_turn.acquire()
+        try:
+            fn(index)
+        except:
+            errors.append(sys.exc_info())
+        _emulated_turn.release()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(1, n)]
+    for thread in threads:
+        thread.start()
+    run(0)
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0][0], errors[0][1], errors[0][2]
+
+def _emulated_lock():
+    pass     # only one thread runs at a time
+
+def _emulated_wait():
+    import time
+    _emulated_turn.release()
+    time.sleep(0)
+    _emulated_turn.acquire()
+
+_emulated_unlock = _emulated_wait
+
+def _external(name, args, result, callable):
+    return rffi.llexternal(name, args, result, compilation_info=eci,
+                           _callable=callable, _nowrapper=True,
+                           sandboxsafe=True)
+
+cpu_count = _external('pypy_gc_pm_cpu_count', [], lltype.Signed,
+                      _emulated_cpu_count)
+prepare = _external('pypy_gc_pm_prepare', [lltype.Signed], lltype.Signed,
+                    _emulated_prepare)
+run = _external('pypy_gc_pm_run', [lltype.Signed, WORKER_FUNC], lltype.Void,
+                _emulated_run)
+lock = _external('pypy_gc_pm_lock', [], lltype.Void, _emulated_lock)
+unlock = _external('pypy_gc_pm_unlock', [], lltype.Void,
+                   _emulated_unlock)
+wait = _external('pypy_gc_pm_wait', [], lltype.Void, _emulated_wait)
+_fetch_or = _external('pypy_gc_pm_fetch_or', [rffi.SIGNEDP, lltype.Signed],
+                      lltype.Signed, None)
+
+def fetch_or_tid(hdr, flags):
+    """Atomically set 'flags' in hdr.tid; returns the previous tid."""
+    if we_are_translated():
+        return _fetch_or(rffi.cast(rffi.SIGNEDP, hdr), flags)
+    with _emulated_atomic:
+        oldtid = hdr.tid
+        hdr.tid = oldtid | flags
+    return oldtid
+
+def default_number_of_threads():
+    n = cpu_count()
+    if n > DEFAULT_MAX_THREADS:
+        n = DEFAULT_MAX_THREADS
+    return n
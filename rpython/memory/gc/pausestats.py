@@ -0,0 +1,109 @@
+"""
+Support for the pause-time target of incminimark (PYPY_GC_MAX_PAUSE).
+
+StepRate measures how much work of some kind (bytes marked, pages swept,
+...) a major collection step does per second, and gives the amount of work
+that should fit in the next step.  PauseHistogram records the duration of
+all the steps, to report percentiles.
+"""
+
+from rpython.rtyper.lltypesystem import lltype, rffi
+from rpython.rlib.rarithmetic import intmask
+
+# weight of the last measure in the estimated rate of work
+RATE_WEIGHT = 0.25
+
+# PauseHistogram: the durations are recorded in microseconds, with 16
+# buckets per power of two (so a percentile is precise to about 6%), up
+# to 2**MAX_BITS microseconds (about 12 days)
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+MAX_BITS = 40
+NUM_BUCKETS = (MAX_BITS - SUB_BITS + 2) * SUB_BUCKETS
+
+
+class StepRate(object):
+    """Estimated rate at which a major collection step does one kind of
+    work, in units of work per second."""
+
+    def __init__(self):
+        self.rate = 0.0
+
+    def update(self, work, duration):
+        if work <= 0 or duration <= 0.0:
+            return
+        rate = work / duration
+        if self.rate == 0.0:
+            self.rate = rate
+        else:
+            self.rate += (rate - self.rate) * RATE_WEIGHT
+
+    def budget(self, max_pause, default):
+        """The amount of work that should take 'max_pause' seconds, or
+        'default' if we have not measured anything yet.  At least 1."""
+        if self.rate == 0.0:
+            return default
+        work = self.rate * max_pause
+        if work < 1.0:
+            return 1
+        if work > float(default) * 1024.0:
+            return default * 1024   # avoid overflows
+        return int(work)
+
+
+def bucket_for_usec(usec):
+    if usec < SUB_BUCKETS:
+        return usec
+    bits = SUB_BITS
+    while (usec >> (bits + 1)) > 0 and bits < MAX_BITS:
+        bits += 1
+    sub = (usec >> (bits - SUB_BITS)) & (SUB_BUCKETS - 1)
+    return (bits - SUB_BITS + 1) * SUB_BUCKETS + sub
+
+def usec_for_bucket(bucket):
+    """The lowest duration, in microseconds, recorded in 'bucket'."""
+    if bucket < SUB_BUCKETS:
+        return bucket
+    shift = bucket // SUB_BUCKETS - 1
+    return (SUB_BUCKETS + bucket % SUB_BUCKETS) << shift
+
+
+class PauseHistogram(object):
+    """Histogram of the durations of the major collection steps."""
+
+    def __init__(self):
+        self.counts = lltype.malloc(rffi.CArray(lltype.Signed), NUM_BUCKETS,
+                                    flavor='raw', zero=True, immortal=True)
+        self.total = 0
+        self.max_usec = 0
+
+    def record(self, duration):
+        usec = intmask(int(duration * 1000000.0))
+        if usec < 0:
+            usec = 0
+        if usec > self.max_usec:
+            self.max_usec = usec
+        bucket = bucket_for_usec(usec)
+        self.counts[bucket] += 1
+        self.total += 1
+
+    def percentile_usec(self, percent):
+        """The duration, in microseconds, under which 'percent' % of the
+        steps finished.  This is the upper bound of the corresponding
+        bucket, but at most the longest duration recorded."""
+        if self.total == 0:
+            return 0
+        rank = (self.total * percent + 99) // 100
+        if rank < 1:
+            rank = 1
+        seen = 0
+        bucket = 0
+        while bucket < NUM_BUCKETS - 1:
+            seen += self.counts[bucket]
+            if seen >= rank:
+                break
+            bucket += 1
+        result = usec_for_bucket(bucket + 1) - 1
+        if result > self.max_usec:
+            result = self.max_usec
+        return result
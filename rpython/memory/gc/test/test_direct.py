@@ -70,6 +70,7 @@ class DirectRootWalker(object):
 
 class BaseDirectGCTest(object):
     GC_PARAMS = {}
+    TRANSLATION_OPTIONS = {}
 
     def get_extra_gc_params(self):
         return {}
@@ -77,6 +78,8 @@ class BaseDirectGCTest(object):
     def setup_method(self, meth):
         from rpython.config.translationoption import get_combined_translation_config
         config = get_combined_translation_config(translating=True).translation
+        for key, value in self.TRANSLATION_OPTIONS.items():
+            setattr(config, key, value)
         self.stackroots = []
         GC_PARAMS = self.GC_PARAMS.copy()
         if hasattr(meth, 'GC_PARAMS'):
@@ -844,3 +847,215 @@ class TestIncrementalMiniMarkGCFull(DirectGCTest):
             (incminimark.STATE_SWEEPING, incminimark.STATE_FINALIZING),
             (incminimark.STATE_FINALIZING, incminimark.STATE_SCANNING)
             ]
+
+    def test_max_pause(self):
+        from rpython.rlib import rgc
+        from rpython.memory.gc.incminimark import (
+            STATE_MARKING, STATE_SWEEPING, STATE_SCANNING)
+        for i in range(60):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        self.gc.collect()
+        assert self.gc.get_stats(rgc.GC_PAUSE_TARGET) == 0
+        assert self.gc.get_stats(rgc.GC_PAUSE_MAX) > 0
+        #
+        # with a tiny target, the steps are sized from the measured speed
+        # of the previous steps, and they become very small
+        self.gc.max_pause = 0.000001
+        self.gc.debug_gc_step_until(STATE_MARKING)
+        marking_steps = 0
+        while self.gc.gc_state == STATE_MARKING:
+            self.gc.debug_gc_step()
+            marking_steps += 1
+        sweeping_steps = 0
+        while self.gc.gc_state == STATE_SWEEPING:
+            self.gc.debug_gc_step()
+            sweeping_steps += 1
+        self.gc.debug_gc_step_until(STATE_SCANNING)
+        assert marking_steps > 5
+        assert sweeping_steps > 5
+        assert self.gc.mark_rate.rate > 0.0
+        assert self.gc.sweep_rate.rate > 0.0
+        for i in range(60):
+            assert self.stackroots[i].x == i
+        #
+        assert self.gc.get_stats(rgc.GC_PAUSE_TARGET) == 1
+        p50 = self.gc.get_stats(rgc.GC_PAUSE_P50)
+        p90 = self.gc.get_stats(rgc.GC_PAUSE_P90)
+        p99 = self.gc.get_stats(rgc.GC_PAUSE_P99)
+        assert 0 < p50 <= p90 <= p99 <= self.gc.get_stats(rgc.GC_PAUSE_MAX)
+        assert self.gc.get_pause_percentile(50) == p50 / 1000000.0
+
+
+class TestIncrementalMiniMarkGCParallelMark(DirectGCTest):
+    from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
+    TRANSLATION_OPTIONS = {'gcparallelmark': True}
+    GC_PARAMS = {'nursery_size': 64 * 1024}
+
+    def build_tree(self, depth):
+        # a binary tree of S objects
+        nodes = []
+        for j in range(1, 2 ** (depth + 1)):
+            p = self.malloc(S)
+            p.x = j
+            self.stackroots.append(p)
+            nodes.append(p)
+        self.gc.collect()
+        nodes = self.stackroots[-len(nodes):]
+        for j in range(len(nodes) - 1, 0, -1):
+            parent = nodes[(j + 1) // 2 - 1]
+            self.write(parent, 'prev' if j % 2 else 'next', nodes[j])
+        del self.stackroots[-(len(nodes) - 1):]
+        return len(nodes)
+
+    def check_tree(self, p, x=1):
+        count = 0
+        stack = [(p, x)]
+        while stack:
+            p, x = stack.pop()
+            if not p:
+                continue
+            assert p.x == x
+            count += 1
+            stack.append((p.prev, 2 * x))
+            stack.append((p.next, 2 * x + 1))
+        return count
+
+    def test_mark_threads(self):
+        assert self.gc.mark_threads == 4
+
+    def test_parallel_mark_tree(self):
+        n = self.build_tree(9)
+        self.gc.collect()
+        assert self.check_tree(self.stackroots[0]) == n
+        self.gc.collect()
+        assert self.check_tree(self.stackroots[0]) == n
+
+    def test_parallel_mark_shared_objects(self):
+        # many roots pointing to the same object: it must be traced by
+        # only one worker
+        shared = self.malloc(S)
+        shared.x = 42
+        self.stackroots.append(shared)
+        for i in range(600):
+            p = self.malloc(S)
+            p.x = i
+            self.write(p, 'next', self.stackroots[0])
+            self.stackroots.append(p)
+        self.gc.collect()
+        shared = self.stackroots[0]
+        assert shared.x == 42
+        for i in range(600):
+            assert self.stackroots[i + 1].x == i
+            assert self.stackroots[i + 1].next == shared
+        assert self.gc.pm_pool == incminimark.parallelmark.NULL_CHUNK
+
+    def test_parallel_mark_incremental(self):
+        from rpython.memory.gc.incminimark import STATE_MARKING
+        from rpython.memory.gc.parallelmark import CHUNK_SIZE
+        n = 3 * CHUNK_SIZE
+        for i in range(n):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        self.gc.collect()
+        self.gc.gc_increment_step = 20 * WORD
+        self.gc.debug_gc_step_until(STATE_MARKING)
+        steps = 0
+        while self.gc.gc_state == STATE_MARKING:
+            self.gc.debug_gc_step()
+            steps += 1
+        # the budget stops the workers before all the roots are marked
+        assert steps > 1
+        for i in range(n):
+            assert self.stackroots[i].x == i
+
+
+class TestIncrementalMiniMarkGCConcurrentSweep(DirectGCTest):
+    from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
+    TRANSLATION_OPTIONS = {'gcconcurrentsweep': True}
+    GC_PARAMS = {'nursery_size': 16 * 1024}
+
+    def make_old_objects(self, n):
+        # 'n' old objects, of which only the even ones stay alive
+        for i in range(n):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        self.gc.collect()
+        self.stackroots = self.stackroots[::2]
+
+    def test_concurrent_sweep_enabled(self):
+        from rpython.memory.gc.minimarkpage import (
+            ArenaCollectionWithBackgroundSweep)
+        assert self.gc.concurrent_sweep
+        assert isinstance(self.gc.ac, ArenaCollectionWithBackgroundSweep)
+
+    def test_sweep_in_background(self, monkeypatch):
+        from rpython.memory.gc import concurrentsweep
+        from rpython.memory.gc.incminimark import (
+            STATE_SWEEPING, STATE_SCANNING, GCFLAG_VISITED)
+        monkeypatch.setattr(concurrentsweep, 'BATCH_PAGES', 2)
+        self.make_old_objects(2000)
+        self.gc.debug_gc_step_until(STATE_SWEEPING)
+        ac = self.gc.ac
+        assert ac.sweeping_in_background
+        assert ac.pages_taken_back == 0
+        #
+        # the helper thread sweeps some pages, which are then available
+        # to the main thread
+        concurrentsweep.emulate_progress()
+        assert ac.take_swept_pages() is False
+        assert ac.pages_taken_back == 2
+        #
+        # the write barrier still works on objects that are being swept
+        oldobj = self.stackroots[-1]
+        newobj = self.malloc(S)
+        newobj.x = 1337
+        self.write(oldobj, 'next', newobj)
+        #
+        self.gc.debug_gc_step()
+        assert ac.pages_taken_back > 2
+        self.gc.debug_gc_step_until(STATE_SCANNING)
+        assert not ac.sweeping_in_background
+        assert not concurrentsweep.state.running
+        assert self.gc.sweep_duration > 0.0
+        assert oldobj.next.x == 1337
+        for i in range(1000):
+            p = self.stackroots[i]
+            assert p.x == 2 * i
+            hdr = self.gc.header(llmemory.cast_ptr_to_adr(p))
+            assert not (hdr.tid & GCFLAG_VISITED)
+        self.gc.collect()
+        assert oldobj.next.x == 1337
+        for i in range(1000):
+            assert self.stackroots[i].x == 2 * i
+
+    def test_allocate_while_sweeping(self, monkeypatch):
+        from rpython.memory.gc import concurrentsweep
+        from rpython.memory.gc.incminimark import STATE_SWEEPING
+        monkeypatch.setattr(concurrentsweep, 'BATCH_PAGES', 1)
+        self.make_old_objects(2000)
+        self.gc.debug_gc_step_until(STATE_SWEEPING)
+        # the objects that survive the minor collections during the sweep
+        # go into the pages already taken back by the main thread
+        steps = 0
+        while self.gc.gc_state == STATE_SWEEPING:
+            for i in range(50):
+                p = self.malloc(S)
+                p.x = -i
+                self.stackroots.append(p)
+            concurrentsweep.emulate_progress()
+            self.gc.debug_gc_step()
+            steps += 1
+        assert steps > 1
+        for i in range(1000):
+            assert self.stackroots[i].x == 2 * i
+        for i in range(steps * 50):
+            assert self.stackroots[1000 + i].x == -(i % 50)
+        self.gc.collect()
+        assert len(self.stackroots) == 1000 + steps * 50
+        for i in range(1000):
+            assert self.stackroots[i].x == 2 * i
+    test_allocate_while_sweeping.GC_PARAMS = {'nursery_size': 2048}
@@ -26,6 +26,8 @@ class MyGcHooks(GcHooks):
         self.steps = []
         self.collects = []
         self.durations = []
+        self.sweep_durations = []
+        self.percentiles = []
 
     def on_gc_minor(self, duration, total_memory_used, pinned_objects):
         self.durations.append(duration)
@@ -33,16 +35,18 @@ class MyGcHooks(GcHooks):
             'total_memory_used': total_memory_used,
             'pinned_objects': pinned_objects})
 
-    def on_gc_collect_step(self, duration, oldstate, newstate):
+    def on_gc_collect_step(self, duration, oldstate, newstate,
+                           duration_p50, duration_p90, duration_p99):
         self.durations.append(duration)
         self.steps.append({
             'oldstate': oldstate,
             'newstate': newstate})
+        self.percentiles.append((duration_p50, duration_p90, duration_p99))
 
     def on_gc_collect(self, num_major_collects,
                       arenas_count_before, arenas_count_after,
                       arenas_bytes, rawmalloc_bytes_before,
-                      rawmalloc_bytes_after):
+                      rawmalloc_bytes_after, sweep_duration):
         self.collects.append({
             'num_major_collects': num_major_collects,
             'arenas_count_before': arenas_count_before,
@@ -50,6 +54,7 @@ class MyGcHooks(GcHooks):
             'arenas_bytes': arenas_bytes,
             'rawmalloc_bytes_before': rawmalloc_bytes_before,
             'rawmalloc_bytes_after': rawmalloc_bytes_after})
+        self.sweep_durations.append(sweep_duration)
 
 
 class TestIncMiniMarkHooks(BaseDirectGCTest):
@@ -104,6 +109,14 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
         assert len(self.gc.hooks.durations) == 4 # 4 steps
         for d in self.gc.hooks.durations:
             assert d > 0.0
+        assert len(self.gc.hooks.sweep_durations) == 1
+        assert 0.0 < self.gc.hooks.sweep_durations[0] < self.gc.hooks.durations[2]
+        # the percentiles of the steps so far
+        p50, p90, p99 = self.gc.hooks.percentiles[-1]
+        durations = sorted(self.gc.hooks.durations)
+        assert durations[1] - 1e-6 <= p50 <= durations[3]
+        assert p90 == p99
+        assert abs(p99 - durations[3]) <= 1e-6
         self.gc.hooks.reset()
         #
         self.stackroots.append(self.malloc(S))
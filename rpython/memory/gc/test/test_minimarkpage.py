@@ -1,5 +1,6 @@
 import py
 from rpython.memory.gc.minimarkpage import ArenaCollection
+from rpython.memory.gc.minimarkpage import ArenaCollectionWithBackgroundSweep
 from rpython.memory.gc.minimarkpage import PAGE_HEADER, PAGE_PTR
 from rpython.memory.gc.minimarkpage import PAGE_NULL, WORD
 from rpython.memory.gc.minimarkpage import _dummy_size
@@ -62,11 +63,12 @@ def test_allocate_new_page():
     assert ac.page_for_size[4] == page
 
 
-def arena_collection_for_test(pagesize, pagelayout, fill_with_objects=False):
+def arena_collection_for_test(pagesize, pagelayout, fill_with_objects=False,
+                              ac_class=ArenaCollection):
     assert " " not in pagelayout.rstrip(" ")
     nb_pages = len(pagelayout)
     arenasize = pagesize * (nb_pages + 1) - 1
-    ac = ArenaCollection(arenasize, pagesize, 9*WORD)
+    ac = ac_class(arenasize, pagesize, 9*WORD)
     #
     def link(pageaddr, size_class, size_block, nblocks, nusedblocks, step=1):
         assert step in (1, 2)
@@ -402,11 +404,16 @@ def test_mass_free_half_page_becomes_more_free():
 
 # ____________________________________________________________
 
-def test_random(incremental=False):
+def test_random(incremental=False, background=False):
     import random
     pagesize = hdrsize + 24*WORD
     num_pages = 3
-    ac = arena_collection_for_test(pagesize, " " * num_pages)
+    if background:
+        ac_class = ArenaCollectionWithBackgroundSweep
+    else:
+        ac_class = ArenaCollection
+    ac = arena_collection_for_test(pagesize, " " * num_pages,
+                                   ac_class=ac_class)
     live_objects = {}
     #
     # Run the test until three arenas are freed.  This is a quick test
@@ -448,7 +455,22 @@ def test_random(incremental=False):
                                   multiarenas=True)
             live_objects_extra = {}
             fresh_extra = 0
-            if not incremental:
+            if background:
+                ac.mass_free_prepare()
+                ac.start_sweep_in_background()
+                while True:
+                    # the "background thread" sweeps a few pages, then the
+                    # main thread takes them and allocates objects that
+                    # may go into the swept pages
+                    ac.sweep_in_background(ok_to_free, random.randrange(1, 3))
+                    if ac.take_swept_pages():
+                        break
+                    print '()'
+                    prev = ac.total_memory_used
+                    allocate_object(live_objects_extra)
+                    fresh_extra += ac.total_memory_used - prev
+                ac.end_sweep_in_background()
+            elif not incremental:
                 ac.mass_free(ok_to_free)
             else:
                 ac.mass_free_prepare()
@@ -477,3 +499,6 @@ def test_random(incremental=False):
 
 def test_random_incremental():
     test_random(incremental=True)
+
+def test_random_background():
+    test_random(background=True)
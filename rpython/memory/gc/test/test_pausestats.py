@@ -0,0 +1,49 @@
+from rpython.memory.gc import pausestats
+from rpython.memory.gc.pausestats import StepRate, PauseHistogram
+
+
+def test_buckets():
+    for usec in [0, 1, 15, 16, 17, 31, 32, 33, 100, 1000, 12345, 10**9]:
+        bucket = pausestats.bucket_for_usec(usec)
+        assert bucket < pausestats.NUM_BUCKETS
+        assert (pausestats.usec_for_bucket(bucket) <= usec <
+                pausestats.usec_for_bucket(bucket + 1))
+    # precise to 1/16th
+    bucket = pausestats.bucket_for_usec(1000)
+    assert pausestats.usec_for_bucket(bucket) == 992
+    assert pausestats.usec_for_bucket(bucket + 1) == 1024
+
+def test_percentiles():
+    h = PauseHistogram()
+    assert h.percentile_usec(50) == 0
+    for i in range(1, 101):
+        h.record(i / 1000000.0)        # 1 to 100 microseconds
+    assert h.total == 100
+    assert h.max_usec == 100
+    assert 50 <= h.percentile_usec(50) <= 51
+    assert 90 <= h.percentile_usec(90) <= 91
+    assert 99 <= h.percentile_usec(99) <= 100
+    assert h.percentile_usec(100) == 100
+
+def test_percentiles_one_long_pause():
+    h = PauseHistogram()
+    for i in range(99):
+        h.record(0.001)
+    h.record(0.5)
+    assert 1000 <= h.percentile_usec(50) < 1000 * 17 // 16
+    assert 1000 <= h.percentile_usec(99) < 1000 * 17 // 16
+    assert h.percentile_usec(100) == 500000
+
+def test_step_rate():
+    r = StepRate()
+    assert r.budget(0.002, 12345) == 12345
+    r.update(0, 0.1)          # ignored
+    r.update(1000, 0.0)       # ignored
+    assert r.budget(0.002, 12345) == 12345
+    r.update(1000, 0.001)
+    assert r.rate == 1000000.0
+    assert r.budget(0.002, 12345) == 2000
+    r.update(2000, 0.001)
+    assert r.rate == 1250000.0
+    assert r.budget(0.0000001, 12345) == 1
+    assert r.budget(1000.0, 10) == 10240
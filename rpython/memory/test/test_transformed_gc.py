@@ -1424,13 +1424,14 @@ class MyGcHooks(GcHooks):
     def on_gc_minor(self, duration, total_memory_used, pinned_objects):
         self.stats.minors += 1
 
-    def on_gc_collect_step(self, duration, oldstate, newstate):
+    def on_gc_collect_step(self, duration, oldstate, newstate,
+                           duration_p50, duration_p90, duration_p99):
         self.stats.steps += 1
         
     def on_gc_collect(self, num_major_collects,
                       arenas_count_before, arenas_count_after,
                       arenas_bytes, rawmalloc_bytes_before,
-                      rawmalloc_bytes_after):
+                      rawmalloc_bytes_after, sweep_duration):
         self.stats.collects += 1
 
 
@@ -553,6 +553,7 @@ PARAMETER_DOCS = {
     'trace_limit': 'number of recorded operations before we abort tracing with ABORT_TOO_LONG',
     'inlining': 'inline python functions or not (1/0)',
     'loop_longevity': 'a parameter controlling how long loops will be kept before being freed, an estimate',
+    'code_budget': 'maximum size in KB of the machine code and resume data of the compiled loops; the least recently entered loops are freed above it (0=unlimited)',
     'retrace_limit': 'how many times we can try retracing before giving up',
     'max_retrace_guards': 'number of extra guards a retrace can cause',
     'max_unroll_loops': 'number of extra unrollings a loop can cause',
@@ -565,6 +566,8 @@ PARAMETER_DOCS = {
     'vec_cost': 'threshold for which traces to bail. Unpacking increases the counter,'\
                 ' vector operation decrease the cost',
     'vec_all': 'try to vectorize trace loops that occur outside of the numpypy library',
+    'deferred_compile': 'how many loops traced from the interpreter can wait to be compiled later, by jit_hooks.stats_compile_deferred_loops() (0=none)',
+    'baseline_threshold': 'number of times a loop or function has to run for it to be compiled quickly with few optimizations, before being traced again after threshold more runs (0=off)',
 }
 
 PARAMETERS = {'threshold': 1039, # just above 1024, prime
@@ -574,6 +577,7 @@ PARAMETERS = {'threshold': 1039, # just above 1024, prime
               'trace_limit': 6000,
               'inlining': 1,
               'loop_longevity': 1000,
+              'code_budget': 0,
               'retrace_limit': 0,
               'max_retrace_guards': 15,
               'max_unroll_loops': 0,
@@ -583,6 +587,8 @@ PARAMETERS = {'threshold': 1039, # just above 1024, prime
               'vec': 0,
               'vec_all': 0,
               'vec_cost': 0,
+              'deferred_compile': 0,
+              'baseline_threshold': 0,
               }
 unroll_parameters = unrolling_iterable(PARAMETERS.items())
 
@@ -1114,6 +1120,12 @@ class JitHookInterface(object):
         greenkey where it started, reason is a string why it got aborted
         """
 
+    def on_trace_start(self, jitdriver, greenkey, greenkey_repr):
+        """ A hook called each time the JIT starts tracing from the
+        interpreter at greenkey, because its counter reached 'threshold'
+        or 'function_threshold', or because of jit_hooks.trace_asap()
+        """
+
     def on_trace_too_long(self, jitdriver, greenkey, greenkey_repr):
         """ A hook called each time we abort the trace because it's too
         long with the greenkey being the one responsible for the
@@ -1329,6 +1341,7 @@ class Counters(object):
     ABORT_BAD_LOOP
     ABORT_ESCAPE
     ABORT_FORCE_QUASIIMMUT
+    DEFERRED_LOOPS
     NVIRTUALS
     NVHOLES
     NVREUSED
@@ -132,6 +132,22 @@ def stats_asmmemmgr_used(warmrunnerdesc):
 def stats_memmgr_release_all(warmrunnerdesc):
     warmrunnerdesc.memory_manager.release_all_loops()
 
+@register_helper(annmodel.SomeInteger())
+def stats_memmgr_code_size(warmrunnerdesc):
+    return warmrunnerdesc.memory_manager.total_size
+
+@register_helper(annmodel.SomeInteger())
+def stats_memmgr_evicted_loops(warmrunnerdesc):
+    return warmrunnerdesc.memory_manager.evicted_loops
+
+@register_helper(annmodel.SomeInteger())
+def stats_memmgr_recompiled_loops(warmrunnerdesc):
+    return warmrunnerdesc.memory_manager.recompiled_loops
+
+@register_helper(annmodel.SomeInteger())
+def stats_compile_deferred_loops(warmrunnerdesc, max_count):
+    return warmrunnerdesc.metainterp_sd.compile_deferred_loops(max_count)
+
 # ---------------------- jitcell interface ----------------------
 
 def _new_hook(name, resulttype):
@@ -161,3 +177,4 @@ get_jitcell_at_key = _new_hook('get_jitcell_at_key', SomePtr(llmemory.GCREF))
 trace_next_iteration = _new_hook('trace_next_iteration', None)
 dont_trace_here = _new_hook('dont_trace_here', None)
 trace_next_iteration_hash = _new_hook('trace_next_iteration_hash', None)
+trace_asap = _new_hook('trace_asap', None)
@@ -845,7 +845,9 @@ def cast_gcref_to_int(gcref):
 (TOTAL_MEMORY, TOTAL_ALLOCATED_MEMORY, TOTAL_MEMORY_PRESSURE,
  PEAK_MEMORY, PEAK_ALLOCATED_MEMORY, TOTAL_ARENA_MEMORY,
  TOTAL_RAWMALLOCED_MEMORY, PEAK_ARENA_MEMORY, PEAK_RAWMALLOCED_MEMORY,
- NURSERY_SIZE, TOTAL_GC_TIME) = range(11)
+ NURSERY_SIZE, TOTAL_GC_TIME,
+ GC_PAUSE_TARGET, GC_PAUSE_P50, GC_PAUSE_P90, GC_PAUSE_P99,
+ GC_PAUSE_MAX) = range(16)      # GC_PAUSE_*: in microseconds
 
 @not_rpython
 def get_stats(stat_no):
@@ -0,0 +1,152 @@
+"""Word-at-a-time substring search.
+
+The generic search loops in rstring.py and lltypesystem/rstr.py look at one
+character at a time.  The functions here read the haystack one machine word
+at a time, SWAR-style ("SIMD Within A Register"): for every candidate
+position in a word they compare at once the first and the last character
+of the needle, and only look at the single characters of a word if one of
+its positions matches both.  This is the word-sized version of the usual
+SSE2 "generic substring search".  It needs unaligned word reads, so it is
+only enabled on CPUs where those are cheap.
+"""
+
+from rpython.rlib import jit
+from rpython.rlib.objectmodel import specialize
+from rpython.rlib.rarithmetic import r_uint, LONG_BIT
+from rpython.rlib.rawstorage import misaligned_is_fine
+from rpython.rlib.rgc import must_split_gc_address_space
+from rpython.rlib.rstring import SEARCH_COUNT, SEARCH_FIND, SEARCH_RFIND
+from rpython.rtyper.lltypesystem import rffi
+
+if LONG_BIT == 64:
+    WORD_SIZE = 8
+    EVERY_BYTE_ONE = r_uint(0x0101010101010101)
+    EVERY_BYTE_HIGHEST_BIT = r_uint(0x8080808080808080)
+else:
+    WORD_SIZE = 4
+    EVERY_BYTE_ONE = r_uint(0x01010101)
+    EVERY_BYTE_HIGHEST_BIT = r_uint(0x80808080)
+
+USE_WORD_SEARCH = misaligned_is_fine
+
+# searching shorter ranges is not worth getting a raw pointer to the
+# characters; the byte-at-a-time loops are fine
+WORD_SEARCH_MIN_LENGTH = 64
+
+
+@specialize.argtype(0)
+def use_word_search(value, start, end):
+    """Tell if searching value[start:end] should use the functions of this
+    module."""
+    if not USE_WORD_SEARCH or must_split_gc_address_space():
+        return False
+    if start < 0:
+        start = 0
+    if end > len(value):
+        end = len(value)
+    return end - start >= WORD_SEARCH_MIN_LENGTH
+
+def char_repeated(ch):
+    return EVERY_BYTE_ONE * r_uint(ord(ch))
+
+def any_byte_zero(word):
+    # exact as far as "is there a zero byte at all" is concerned
+    return (word - EVERY_BYTE_ONE) & ~word & EVERY_BYTE_HIGHEST_BIT
+
+def _read_word(ll_chars, pos):
+    return rffi.cast(rffi.UNSIGNEDP, rffi.ptradd(ll_chars, pos))[0]
+
+def _matches(ll_chars, pos, other):
+    for j in range(1, len(other) - 1):
+        if ll_chars[pos + j] != other[j]:
+            return False
+    return True
+
+
+def search_raw(ll_chars, length, other, start, end, mode):
+    """Search for the string 'other' in the 'length' characters at
+    'll_chars', between 'start' and 'end', like rstring._search()."""
+    if start < 0:
+        start = 0
+    if end > length:
+        end = length
+    if start > end:
+        if mode == SEARCH_COUNT:
+            return 0
+        return -1
+    m = len(other)
+    if m == 0:
+        if mode == SEARCH_COUNT:
+            return end - start + 1
+        elif mode == SEARCH_RFIND:
+            return end
+        else:
+            return start
+    stop = end - m       # the last position where 'other' can start
+    if stop < start:
+        if mode == SEARCH_COUNT:
+            return 0
+        return -1
+    mlast = m - 1
+    firstchar = other[0]
+    lastchar = other[mlast]
+    first = char_repeated(firstchar)
+    last = char_repeated(lastchar)
+
+    if mode != SEARCH_RFIND:
+        count = 0
+        i = start
+        while i <= stop:
+            if i + WORD_SIZE - 1 <= stop:
+                # compare the WORD_SIZE candidate positions at once
+                word = ((_read_word(ll_chars, i) ^ first) |
+                        (_read_word(ll_chars, i + mlast) ^ last))
+                if not any_byte_zero(word):
+                    i += WORD_SIZE
+                    continue
+                limit = i + WORD_SIZE
+            else:
+                limit = stop + 1
+            while i < limit:
+                if (ll_chars[i] == firstchar and
+                        ll_chars[i + mlast] == lastchar and
+                        _matches(ll_chars, i, other)):
+                    if mode != SEARCH_COUNT:
+                        return i
+                    count += 1
+                    i += m
+                else:
+                    i += 1
+        if mode != SEARCH_COUNT:
+            return -1
+        return count
+    else:
+        i = stop
+        while i >= start:
+            base = i - WORD_SIZE + 1
+            if base >= start:
+                word = ((_read_word(ll_chars, base) ^ first) |
+                        (_read_word(ll_chars, base + mlast) ^ last))
+                if not any_byte_zero(word):
+                    i -= WORD_SIZE
+                    continue
+                limit = base
+            else:
+                limit = start
+            while i >= limit:
+                if (ll_chars[i] == firstchar and
+                        ll_chars[i + mlast] == lastchar and
+                        _matches(ll_chars, i, other)):
+                    return i
+                i -= 1
+        return -1
+
+@jit.elidable
+def search_str(value, other, start, end, mode):
+    """Same as search_raw(), for the characters of the RPython string
+    'value'."""
+    ll_chars, llobj, flag = rffi.get_nonmovingbuffer_ll(value)
+    try:
+        return search_raw(ll_chars, len(value), other, start, end, mode)
+    finally:
+        rffi.free_nonmovingbuffer_ll(ll_chars, llobj, flag)
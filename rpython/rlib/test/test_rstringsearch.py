@@ -0,0 +1,51 @@
+import random
+
+from rpython.rlib.rstring import SEARCH_COUNT, SEARCH_FIND, SEARCH_RFIND
+from rpython.rlib.rstring import find, rfind, count, split, rsplit, replace
+from rpython.rlib.rstringsearch import search_str, WORD_SEARCH_MIN_LENGTH
+from rpython.rtyper.test.test_llinterp import interpret
+
+
+def check_search(value, other, start, end):
+    assert search_str(value, other, start, end, SEARCH_FIND) == (
+        value.find(other, start, end))
+    assert search_str(value, other, start, end, SEARCH_RFIND) == (
+        value.rfind(other, start, end))
+    assert search_str(value, other, start, end, SEARCH_COUNT) == (
+        value.count(other, start, end))
+
+def test_search_str():
+    value = "GET /index.html HTTP/1.1\r\nHost: example.com\r\n\r\n" * 5
+    for other in ["", "G", "\n", "\r\n", "HTTP", "com\r\n\r\nGET", "xyz",
+                  "Host: example.com\r\n\r\nGET /index.html HTTP/1.1\r\nH",
+                  value, value + "x"]:
+        for start, end in [(0, len(value)), (3, 100), (17, 18), (50, 40),
+                           (0, 1000), (len(value), len(value))]:
+            check_search(value, other, start, end)
+
+def test_search_str_random():
+    r = random.Random(42)
+    for i in range(300):
+        value = "".join([r.choice("ab\x00\xff") for j in range(r.randrange(80))])
+        other = "".join([r.choice("ab\x00\xff") for j in range(r.randrange(5))])
+        start = r.randrange(0, len(value) + 3)
+        end = r.randrange(0, len(value) + 3)
+        check_search(value, other, start, end)
+
+def test_search_str_translated():
+    def f(n, mode):
+        value = "abc" * n + "abd" + "abc" * n
+        return search_str(value, "bd", 0, len(value), mode)
+    for mode in [SEARCH_FIND, SEARCH_RFIND, SEARCH_COUNT]:
+        assert interpret(f, [30, mode]) == f(30, mode)
+
+def test_rstring_functions_translated():
+    def f(n):
+        value = ",".join(["abc"] * n) + ";x"
+        return (find(value, ";", 0, len(value)) +
+                rfind(value, "ab", 0, len(value)) * 10 +
+                count(value, "c,", 0, len(value)) * 100 +
+                len(split(value, ",")) * 1000 +
+                len(rsplit(value, "c,a")) * 10000 +
+                len(replace(value, "bc", "x")) * 100000)
+    assert interpret(f, [50]) == f(50)
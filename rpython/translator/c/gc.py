@@ -408,8 +408,13 @@ class BasicFrameworkGcPolicy(BasicGcPolicy):
         if subopnum == 2:     # get_gcflag_extra
             parts.append('/* get_gcflag_extra */')
         elif subopnum == 3:     # toggle_gcflag_extra
-            parts.insert(0, '%s ^= %dL;' % (hdrfield,
-                                            gcflag_extra))
+            if self.db.translator.config.translation.gcconcurrentsweep:
+                # the background sweeping thread may change the same word
+                parts.insert(0, 'PYPY_GC_CS_XOR(&%s, %dL);' % (hdrfield,
+                                                             gcflag_extra))
+            else:
+                parts.insert(0, '%s ^= %dL;' % (hdrfield,
+                                                gcflag_extra))
             parts.append('/* toggle_gcflag_extra */')
         elif subopnum == 4:     # get_gcflag_dummy
             parts.append('/* get_gcflag_dummy */')
@@ -60,6 +60,7 @@ class CCompilerDriver(object):
 class CBuilder(object):
     c_source_filename = None
     _compiled = False
+    _makefile = None
     modulename = None
     split = False
 
@@ -207,7 +208,8 @@ class CBuilder(object):
                 defines['PYPY_MAIN_FUNCTION'] = "pypy_main_startup"
         self.eci, cfile, extra, headers_to_precompile = \
                 gen_source(db, modulename, targetdir,
-                           self.eci, defines=defines, split=self.split)
+                           self.eci, defines=defines, split=self.split,
+                           small_units=self.config.translation.parallel_compile)
         self.c_source_filename = py.path.local(cfile)
         self.extrafiles = self.eventually_copy(extra)
         self.gen_makefile(targetdir, exe_name=exe_name,
@@ -360,6 +362,12 @@ class CStandaloneBuilder(CBuilder):
             extra_opts += ["lldebug"]
         elif self.config.translation.lldebug0:
             extra_opts += ["lldebug0"]
+        if self.can_compile_in_parallel():
+            # compile the objects ourselves; make then only has to link
+            from rpython.translator.c.parallelcompile import compile_objects
+            compile_objects(self.translator.platform, self._makefile,
+                            self.config.translation.make_jobs,
+                            self.config.translation.compile_cache)
         self.translator.platform.execute_makefile(self.targetdir,
                                                   extra_opts)
         if shared:
@@ -369,6 +377,15 @@ class CStandaloneBuilder(CBuilder):
         self._compiled = True
         return self.executable_name
 
+    def can_compile_in_parallel(self):
+        from rpython.translator.platform.posix import GnuMakefile
+        translation = self.config.translation
+        # the special make targets compile with their own CFLAGS
+        return (translation.parallel_compile and
+                isinstance(self._makefile, GnuMakefile) and
+                not translation.profopt and
+                not translation.lldebug and not translation.lldebug0)
+
     def gen_makefile(self, targetdir, exe_name=None, headers_to_precompile=[]):
         module_files = self.eventually_copy(self.eci.separate_module_files)
         self.eci.separate_module_files = []
@@ -522,6 +539,7 @@ class CStandaloneBuilder(CBuilder):
         else:
             mk.rule('debug_target', '$(DEFAULT_TARGET)', '#')
         mk.write()
+        self._makefile = mk
         #self.translator.platform,
         #                           ,
         #                           self.eci, profbased=self.getprofbased()
@@ -532,6 +550,10 @@ class CStandaloneBuilder(CBuilder):
 SPLIT_CRITERIA = 65535 # support VC++ 7.2
 #SPLIT_CRITERIA = 32767 # enable to support VC++ 6.0
 
+# with --parallel-compile, use many smaller files of similar size: a few
+# huge files would keep compiling long after the other processes are done
+SPLIT_CRITERIA_PARALLEL = 16383
+
 MARKER = '/*/*/' # provide an easy way to split after generating
 
 class SourceGenerator:
@@ -544,7 +566,7 @@ class SourceGenerator:
         self.path = None
         self.namespace = NameManager()
 
-    def set_strategy(self, path, split=True):
+    def set_strategy(self, path, split=True, small_units=False):
         all_nodes = list(self.database.globalcontainers())
         # split off non-function nodes. We don't try to optimize these, yet.
         funcnodes = []
@@ -559,6 +581,7 @@ class SourceGenerator:
         self.funcnodes = funcnodes
         self.othernodes = othernodes
         self.path = path
+        self.small_units = small_units
 
     def uniquecname(self, name):
         assert name.endswith('.c')
@@ -664,8 +687,11 @@ class SourceGenerator:
             fi.close()
 
     def gen_readable_parts_of_source(self, f):
+        split_criteria = SPLIT_CRITERIA
         split_criteria_big = SPLIT_CRITERIA
-        if py.std.sys.platform != "win32":
+        if self.small_units:
+            split_criteria = split_criteria_big = SPLIT_CRITERIA_PARALLEL
+        elif py.std.sys.platform != "win32":
             if self.database.gcpolicy.need_no_typeptr():
                 pass    # XXX gcc uses toooooons of memory???
             else:
@@ -698,7 +724,8 @@ class SourceGenerator:
         nextralines = 11 + 1
         for name, nodeiter in self.splitnodesimpl('nonfuncnodes.c',
                                                    self.othernodes,
-                                                   nextralines, 1):
+                                                   nextralines, 1,
+                                                   split_criteria):
             with self.write_on_maybe_separate_source(f, name) as fc:
                 if fc is not f:
                     print >> fc, '/***********************************************************/'
@@ -864,7 +891,7 @@ def add_extra_files(database, eci):
 
 
 def gen_source(database, modulename, targetdir,
-               eci, defines={}, split=False):
+               eci, defines={}, split=False, small_units=False):
     if isinstance(targetdir, str):
         targetdir = py.path.local(targetdir)
 
@@ -894,7 +921,7 @@ def gen_source(database, modulename, targetdir,
     # 2) Implementation of functions and global structures and arrays
     #
     sg = SourceGenerator(database)
-    sg.set_strategy(targetdir, split)
+    sg.set_strategy(targetdir, split, small_units)
     sg.gen_readable_parts_of_source(f)
     headers_to_precompile = sg.headers_to_precompile[:]
     headers_to_precompile.insert(0, incfilename)
@@ -0,0 +1,182 @@
+"""Compile the C sources of a GnuMakefile with a bounded pool of compiler
+processes (translation option --parallel-compile).
+
+The translation process is usually huge, so it should not fork one
+compiler per source file.  Instead the list of compilation commands is
+written to a file and this module is run as a script in a small helper
+process (via rpython.tool.runsubprocess), which runs up to 'jobs'
+compilers at the same time, starting with the biggest files.  The object
+files are written where the Makefile expects them, so that the following
+'make' only has to link.
+
+If a cache directory is given, every object file is also stored there under
+the sha1 of the compilation flags and of the preprocessed source.  A later
+translation that produces an identical source file (after preprocessing)
+copies the object file instead of compiling it again.
+"""
+
+import sys
+import os
+import re
+import json
+import shutil
+import hashlib
+import subprocess
+import threading
+
+
+def _makefile_vars(makefile):
+    from rpython.translator.platform.posix import Definition
+    variables = {}
+    for line in makefile.lines:
+        if isinstance(line, Definition):
+            value = line.value
+            if not isinstance(value, str):
+                value = ' '.join(value)
+            variables[line.name] = value
+    return variables
+
+def _expand(variables, value):
+    def replace(match):
+        return _expand(variables, variables.get(match.group(1), ''))
+    return re.sub(r'\$\((\w+)\)', replace, value)
+
+def get_compile_units(makefile):
+    """Return one dict per C file of the makefile, with the shell commands
+    that compile and preprocess it exactly like the '%.o: %.c' rule."""
+    variables = _makefile_vars(makefile)
+    flags = _expand(variables, '$(CC) $(CFLAGS) $(CFLAGSEXTRA)')
+    includes = _expand(variables, '$(INCLUDEDIRS)')
+    units = []
+    for source, objfile in zip(makefile.cfiles,
+                               variables['OBJECTS'].split()):
+        if not source.endswith('.c'):
+            continue       # left to make
+        units.append({
+            'source': source,
+            'object': objfile,
+            'key': flags + ' ' + includes,
+            'compile': '%s -o %s -c %s %s' % (flags, objfile, source,
+                                              includes),
+            'preprocess': '%s -E -P %s %s' % (flags, source, includes),
+        })
+    return units
+
+def compile_objects(platform, makefile, jobs, cache_dir=None):
+    """Compile all the C files of 'makefile' in parallel, raising
+    CompilationError if any of them fails."""
+    from rpython.tool.runsubprocess import run_subprocess
+    from rpython.translator.platform import log
+    path = makefile.makefile_dir
+    units = get_compile_units(makefile)
+    jobfile = path.join('parallel_compile.json')
+    jobfile.write(json.dumps({
+        'units': units,
+        'jobs': max(jobs, 1),
+        'cache_dir': cache_dir and os.path.abspath(cache_dir),
+    }))
+    log.execute('compiling %d files with %d processes in %s' % (
+        len(units), max(jobs, 1), path))
+    script = os.path.abspath(__file__)
+    if script.endswith('.pyc') or script.endswith('.pyo'):
+        script = script[:-1]
+    returncode, stdout, stderr = run_subprocess(
+        sys.executable, [script, str(jobfile)], cwd=str(path))
+    platform._handle_error(returncode, stdout, stderr,
+                           path.join('parallel_compile'))
+    if stdout:
+        log.execute(stdout.strip())
+
+# ____________________________________________________________
+# the part below runs in the helper process
+
+def _run(cmd):
+    pipe = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    stdout, stderr = pipe.communicate()
+    return pipe.returncode, stdout, stderr
+
+def _cache_path(cache_dir, unit):
+    returncode, stdout, stderr = _run(unit['preprocess'])
+    if returncode != 0:
+        return None      # the compilation will report the error
+    h = hashlib.sha1(unit['key'].encode('utf-8'))
+    h.update(b'\0')
+    h.update(stdout)
+    digest = h.hexdigest()
+    return os.path.join(cache_dir, digest[:2], digest + '.o')
+
+def _store(cachefile, objfile):
+    dirname = os.path.dirname(cachefile)
+    if not os.path.isdir(dirname):
+        try:
+            os.makedirs(dirname)
+        except OSError:     # created by another translation
+            pass
+    # copy then rename, so that a concurrent translation never sees a
+    # partially written object file
+    tmpfile = '%s.%d.tmp' % (cachefile, os.getpid())
+    shutil.copyfile(objfile, tmpfile)
+    os.rename(tmpfile, cachefile)
+
+def compile_unit(unit, cache_dir):
+    """Compile one unit; return (returncode, stderr, was_cached)."""
+    cachefile = None
+    if cache_dir is not None:
+        cachefile = _cache_path(cache_dir, unit)
+        if cachefile is not None and os.path.exists(cachefile):
+            # copyfile() gives the object a fresh mtime, newer than the
+            # source, so that make does not rebuild it
+            shutil.copyfile(cachefile, unit['object'])
+            return 0, b'', True
+    returncode, stdout, stderr = _run(unit['compile'])
+    if returncode == 0 and cachefile is not None:
+        _store(cachefile, unit['object'])
+    return returncode, stdout + stderr, False
+
+def run_jobs(units, jobs, cache_dir=None):
+    """Compile all units with at most 'jobs' compilers running at the same
+    time.  Returns (number of cache hits, list of (source, error output))
+    for the failed units."""
+    # longest processing time first: starting with the biggest files gives
+    # a good balance between the processes at the end
+    units = sorted(units, key=lambda unit: -os.path.getsize(unit['source']))
+    lock = threading.Lock()
+    failures = []
+    cached = [0]
+
+    def worker():
+        while True:
+            with lock:
+                if not units or failures:
+                    return
+                unit = units.pop(0)
+            returncode, output, was_cached = compile_unit(unit, cache_dir)
+            with lock:
+                if returncode != 0:
+                    failures.append((unit['source'], output))
+                elif was_cached:
+                    cached[0] += 1
+
+    threads = [threading.Thread(target=worker) for i in range(jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return cached[0], failures
+
+def main(jobfile):
+    with open(jobfile) as f:
+        job = json.load(f)
+    units = job['units']
+    ncached, failures = run_jobs(units, job['jobs'], job['cache_dir'])
+    for source, output in failures:
+        sys.stderr.write('%s:\n' % (source,))
+        sys.stderr.write(output.decode('latin1'))
+    if job['cache_dir'] is not None:
+        sys.stdout.write('%d of %d object files found in the cache\n' % (
+            ncached, len(units)))
+    return int(bool(failures))
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1]))
@@ -23,6 +23,8 @@ class UsingFrameworkTest(object):
     should_be_moving = False
     removetypeptr = False
     taggedpointers = False
+    parallelmark = False
+    concurrentsweep = False
     GC_CAN_MOVE = False
     GC_CAN_SHRINK_ARRAY = False
 
@@ -44,7 +46,9 @@ class UsingFrameworkTest(object):
 
         t = Translation(main, gc=cls.gcpolicy,
                         taggedpointers=cls.taggedpointers,
-                        gcremovetypeptr=cls.removetypeptr)
+                        gcremovetypeptr=cls.removetypeptr,
+                        gcparallelmark=cls.parallelmark,
+                        gcconcurrentsweep=cls.concurrentsweep)
         t.disable(['backendopt'])
         t.set_backend_extra_options(c_debug_defines=True)
         t.rtype()
@@ -1913,6 +1917,27 @@ class TestIncrementalMiniMarkGC(TestMiniMarkGC):
         res = self.run("total_gc_time")
         assert res > 0 # should take a few microseconds
 
+    def define_gc_pause_stats(cls):
+        def f():
+            l = []
+            for i in range(100000):
+                l.append(str(i))
+            l = []
+            for i in range(10):
+                rgc.collect()
+            p50 = rgc.get_stats(rgc.GC_PAUSE_P50)
+            p90 = rgc.get_stats(rgc.GC_PAUSE_P90)
+            p99 = rgc.get_stats(rgc.GC_PAUSE_P99)
+            pmax = rgc.get_stats(rgc.GC_PAUSE_MAX)
+            if not (0 <= p50 <= p90 <= p99 <= pmax):
+                return -1
+            return pmax
+        return f
+
+    def test_gc_pause_stats(self):
+        res = self.run("gc_pause_stats")
+        assert res > 0
+
     def define_increase_root_stack_depth(cls):
         class X:
             pass
@@ -2046,3 +2071,9 @@ class TestMiniMarkGCMostCompact(TaggedPointersTest, TestMiniMarkGC):
 
 class TestIncrementalMiniMarkGCMostCompact(TaggedPointersTest, TestIncrementalMiniMarkGC):
     removetypeptr = True
+
+class TestIncrementalMiniMarkGCParallelMark(TestIncrementalMiniMarkGC):
+    parallelmark = True
+
+class TestIncrementalMiniMarkGCConcurrentSweep(TestIncrementalMiniMarkGC):
+    concurrentsweep = True
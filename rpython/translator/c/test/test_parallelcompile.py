@@ -0,0 +1,103 @@
+import os
+import py
+
+from rpython.config.translationoption import get_combined_translation_config
+from rpython.translator.c.test.test_standalone import StandaloneTests
+from rpython.translator.c import parallelcompile
+from rpython.translator.platform import platform, CompilationError
+from rpython.tool.udir import udir
+
+if platform.name == 'msvc':
+    py.test.skip("--parallel-compile needs a GNU Makefile")
+
+
+def test_get_compile_units():
+    from rpython.translator.platform.posix import GnuMakefile
+    m = GnuMakefile(str(udir))
+    m.cfiles = ['a.c', 'b.s']
+    m.definition('RPYDIR', '"/rpy"')
+    m.definition('OBJECTS', ['a.o', 'b.o'])
+    m.definition('CC', 'gcc')
+    m.definition('CFLAGS', ['-O3', '-DX'])
+    m.definition('CFLAGSEXTRA', [])
+    m.definition('INCLUDEDIRS', ['-I$(RPYDIR)/src', '-I.'])
+    units = parallelcompile.get_compile_units(m)
+    assert len(units) == 1
+    unit = units[0]
+    assert unit['source'] == 'a.c'
+    assert unit['object'] == 'a.o'
+    assert unit['compile'] == 'gcc -O3 -DX  -o a.o -c a.c -I"/rpy"/src -I.'
+    assert unit['preprocess'] == 'gcc -O3 -DX  -E -P a.c -I"/rpy"/src -I.'
+
+
+def test_run_jobs_and_cache():
+    tmpdir = udir.ensure('test_run_jobs_and_cache', dir=1)
+    cache_dir = str(tmpdir.join('cache'))
+    units = []
+    for i in range(5):
+        source = tmpdir.join('f%d.c' % i)
+        source.write('int f%d(void) { return %d; }\n' % (i, i * (i + 1)))
+        units.append({
+            'source': str(source),
+            'object': str(source.new(ext='o')),
+            'key': platform.cc,
+            'compile': '%s -c %s -o %s' % (platform.cc, source,
+                                           source.new(ext='o')),
+            'preprocess': '%s -E -P %s' % (platform.cc, source),
+        })
+    ncached, failures = parallelcompile.run_jobs(units[:], 3, cache_dir)
+    assert failures == []
+    assert ncached == 0
+    for unit in units:
+        assert os.path.exists(unit['object'])
+        os.unlink(unit['object'])
+    ncached, failures = parallelcompile.run_jobs(units[:], 3, cache_dir)
+    assert failures == []
+    assert ncached == 5
+    for unit in units:
+        assert os.path.exists(unit['object'])
+    # a changed source is not found in the cache
+    py.path.local(units[0]['source']).write('int f0(void) { return 42; }\n')
+    ncached, failures = parallelcompile.run_jobs(units[:], 3, cache_dir)
+    assert ncached == 4
+    py.path.local(units[1]['source']).write('syntax error\n')
+    ncached, failures = parallelcompile.run_jobs(units[:], 3, cache_dir)
+    assert [source for source, output in failures] == [units[1]['source']]
+
+
+class TestParallelCompile(StandaloneTests):
+
+    def setup_class(cls):
+        cls.cache_dir = str(udir.join('test_parallel_compile_cache'))
+        cls.config = get_combined_translation_config(translating=True)
+        cls.config.translation.parallel_compile = True
+        cls.config.translation.compile_cache = cls.cache_dir
+
+    def test_hello_world(self):
+        def entry_point(argv):
+            os.write(1, "hello world\n")
+            return 0
+
+        t, cbuilder = self.compile(entry_point)
+        assert cbuilder.targetdir.join('parallel_compile.json').check()
+        data = cbuilder.cmdexec('')
+        assert data.startswith('hello world')
+        cached = sorted(py.path.local(self.cache_dir).visit('*.o'))
+        assert cached
+        # translating again in the same process renames some local
+        # variables, so only some of the objects are found in the cache
+        t, cbuilder = self.compile(entry_point)
+        data = cbuilder.cmdexec('')
+        assert data.startswith('hello world')
+        assert set(py.path.local(self.cache_dir).visit('*.o')) > set(cached)
+
+    def test_compilation_error(self):
+        from rpython.translator.tool.cbuild import ExternalCompilationInfo
+        from rpython.rtyper.lltypesystem import rffi
+        eci = ExternalCompilationInfo(
+            separate_module_sources=['this is not C;'])
+        llfunc = rffi.llexternal('nothing', [], rffi.INT,
+                                 compilation_info=eci)
+        def entry_point(argv):
+            return llfunc()
+        py.test.raises(CompilationError, self.compile, entry_point)
@@ -0,0 +1,70 @@
+"""
+Measures the time taken by the major collections of a large heap, i.e.
+mostly the time spent marking it.  Translate with
+
+    rpython --gc=incminimark --gc-parallel-mark targetgcmarkbench.py
+
+and compare the results for various values of PYPY_GC_MARK_THREADS:
+
+    PYPY_GC_MARK_THREADS=1 ./targetgcmarkbench-c [depth [collections]]
+    PYPY_GC_MARK_THREADS=4 ./targetgcmarkbench-c [depth [collections]]
+    ...
+
+The heap is a forest of binary trees of total size 2**depth nodes, plus a
+few long linked lists (which cannot be marked in parallel).
+"""
+
+import os, time
+from rpython.rlib import rgc
+
+
+class Node(object):
+    def __init__(self, left, right, value):
+        self.left = left
+        self.right = right
+        self.value = value
+
+def make_tree(depth):
+    if depth == 0:
+        return Node(None, None, 0)
+    return Node(make_tree(depth - 1), make_tree(depth - 1), depth)
+
+def make_list(length):
+    head = None
+    for i in range(length):
+        head = Node(head, None, i)
+    return head
+
+class Heap(object):
+    def __init__(self, depth):
+        self.trees = [make_tree(depth - 4) for i in range(16)]
+        self.lists = [make_list(1 << (depth - 8)) for i in range(4)]
+
+def entry_point(argv):
+    depth = 22
+    collections = 10
+    if len(argv) > 1:
+        depth = int(argv[1])
+    if len(argv) > 2:
+        collections = int(argv[2])
+    print 'building a heap of about %d objects' % (1 << depth,)
+    heap = Heap(depth)
+    rgc.collect()
+    times = []
+    for i in range(collections):
+        start = time.time()
+        rgc.collect()
+        times.append(time.time() - start)
+    times.sort()
+    threads = os.environ.get('PYPY_GC_MARK_THREADS')
+    print 'PYPY_GC_MARK_THREADS=%s' % (threads or '(default)',)
+    print 'major collection: min %f, median %f, max %f seconds' % (
+        times[0], times[len(times) // 2], times[-1])
+    # keep the heap alive until the end
+    assert len(heap.trees) == 16
+    return 0
+
+# _____ Define and setup target ___
+
+def target(*args):
+    return entry_point, None